@@ -44,6 +44,7 @@ JAZZMIN_SETTINGS = {
     "order_with_respect_to": ["inventario"],
     "topmenu_links": [
         {"name": "Ver Vista de Usuario", "url": "lista_productos", "new_window": True},
+        {"name": "Valoración del inventario", "url": "valoracion_admin"},
     ],
 }
 
@@ -116,6 +117,46 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEBUG = config('DEBUG', default=False, cast=bool)
 IS_PRODUCTION = 'DATABASE_URL' in os.environ
 
+# --- CONFIGURACIÓN DE CACHÉ ---
+# Redis si hay REDIS_URL, archivos si hay CACHE_DIR y, si no, memoria local
+# (por proceso, con expulsión LRU al llegar a MAX_ENTRIES). TIMEOUT es el TTL.
+REDIS_URL = config('REDIS_URL', default='')
+CACHE_DIR = config('CACHE_DIR', default='')
+CACHE_TIMEOUT = config('CACHE_TIMEOUT', default=300, cast=int)
+CACHE_MAX_ENTRIES = config('CACHE_MAX_ENTRIES', default=2000, cast=int)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'TIMEOUT': CACHE_TIMEOUT,
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'TIMEOUT': CACHE_TIMEOUT,
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'inventario',
+            'TIMEOUT': CACHE_TIMEOUT,
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        }
+    }
+
+# Token opcional para que Prometheus lea /metricas/cache/ sin sesión de staff
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+# Token para suscribirse al calendario de vacunación (?token=...) desde apps de calendario sin sesión
+CALENDARIO_TOKEN = config('CALENDARIO_TOKEN', default='')
+
 # --- CONFIGURACIÓN DE ARCHIVOS ESTÁTICOS ---
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles' # Directorio para collectstatic
@@ -6,6 +6,7 @@ from inventario import views as inventario_views
 
 urlpatterns = [
     path('admin/get_sub_etiquetas/', inventario_views.get_sub_etiquetas, name='get_sub_etiquetas'),
+    path('admin/valoracion/', admin.site.admin_view(inventario_views.valoracion_admin), name='valoracion_admin'),
     path('admin/', admin.site.urls),
     path('login/', inventario_views.custom_login_view, name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='login'), name='logout'),
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from .models import Categoria, Proveedor, Ubicacion, Etiqueta
 from django.utils.html import mark_safe
+from inventario.admin_detalles import DetallesDiferidosMixin
+from inventario.imagenes import url_miniatura
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
@@ -9,7 +11,7 @@ class CategoriaAdmin(admin.ModelAdmin):
     list_per_page = 10
 
 @admin.register(Proveedor)
-class ProveedorAdmin(admin.ModelAdmin):
+class ProveedorAdmin(DetallesDiferidosMixin, admin.ModelAdmin):
     list_display = ('nombre', 'ver_detalles', 'nombre_local', 'telefono', 'correo_electronico', 'ubicacion', 'imagen_thumbnail')
     list_per_page = 10
     search_fields = ('nombre', 'nombre_local', 'telefono', 'correo_electronico')
@@ -29,14 +31,14 @@ class ProveedorAdmin(admin.ModelAdmin):
         }),
     )
 
-    def ver_detalles(self, obj):
+    def detalles_html(self, obj):
         nombre = obj.nombre or "Dato aún no ingresado"
         nombre_local = obj.nombre_local or "Dato aún no ingresado"
         telefono = obj.telefono or "Dato aún no ingresado"
         correo = obj.correo_electronico or "Dato aún no ingresado"
         ubicacion = obj.ubicacion.nombre if obj.ubicacion else "Dato aún no ingresado"
         
-        imagen_html = f'<img src="{obj.imagen.url}" class="details-img">' if obj.imagen and hasattr(obj.imagen, 'url') else "No hay imagen"
+        imagen_html = f'<img src="{url_miniatura(obj.imagen, "modal") or obj.imagen.url}" class="details-img">' if obj.imagen and hasattr(obj.imagen, 'url') else "No hay imagen"
 
         modal_html = f"""
         <div id="modal-proveedor-{obj.pk}" class="modal" style="display:none;">
@@ -68,20 +70,19 @@ class ProveedorAdmin(admin.ModelAdmin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-proveedor-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
     def imagen_thumbnail(self, obj):
         if obj.imagen:
-            return mark_safe(f'<a href="{obj.imagen.url}" target="_blank"><img src="{obj.imagen.url}" width="100" /></a>')
+            miniatura = url_miniatura(obj.imagen, 'admin') or obj.imagen.url
+            return mark_safe(f'<a href="{obj.imagen.url}" target="_blank"><img src="{miniatura}" width="100" /></a>')
         return "Sin imagen"
     imagen_thumbnail.short_description = 'Vista Previa'
 
 
 @admin.register(Ubicacion)
-class UbicacionAdmin(admin.ModelAdmin):
+class UbicacionAdmin(DetallesDiferidosMixin, admin.ModelAdmin):
     list_display = ('nombre', 'ver_detalles', 'barrio', 'direccion', 'link_con_icono', 'imagen_thumbnail')
     list_per_page = 10
     search_fields = ('nombre', 'barrio', 'direccion')
@@ -101,13 +102,13 @@ class UbicacionAdmin(admin.ModelAdmin):
         }),
     )
 
-    def ver_detalles(self, obj):
+    def detalles_html(self, obj):
         nombre = obj.nombre or "Dato aún no ingresado"
         barrio = obj.barrio or "Dato aún no ingresado"
         direccion = obj.direccion or "Dato aún no ingresado"
         link = f'<a href="{obj.link}" target="_blank">Abrir enlace</a>' if obj.link else "No disponible"
         
-        imagen_html = f'<img src="{obj.imagen.url}" class="details-img">' if obj.imagen and hasattr(obj.imagen, 'url') else "No hay imagen"
+        imagen_html = f'<img src="{url_miniatura(obj.imagen, "modal") or obj.imagen.url}" class="details-img">' if obj.imagen and hasattr(obj.imagen, 'url') else "No hay imagen"
 
         modal_html = f"""
         <div id="modal-ubicacion-{obj.pk}" class="modal" style="display:none;">
@@ -135,14 +136,13 @@ class UbicacionAdmin(admin.ModelAdmin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-ubicacion-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
     def imagen_thumbnail(self, obj):
         if obj.imagen:
-            return mark_safe(f'<a href="{obj.imagen.url}" target="_blank"><img src="{obj.imagen.url}" width="100" /></a>')
+            miniatura = url_miniatura(obj.imagen, 'admin') or obj.imagen.url
+            return mark_safe(f'<a href="{obj.imagen.url}" target="_blank"><img src="{miniatura}" width="100" /></a>')
         return "Sin imagen"
     imagen_thumbnail.short_description = 'Vista Previa'
 
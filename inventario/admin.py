@@ -1,14 +1,29 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Prefetch
 from django.utils.html import mark_safe
 from django import forms
-from caracteristicas.models import Etiqueta
+from caracteristicas.models import Etiqueta, Proveedor
+from .admin_detalles import DetallesDiferidosMixin
+from .imagenes import url_miniatura
+from .borrado_imagenes import HILOS, encolado_en_lote, procesar_pendientes
+from .programador import Cron, ExpresionCronInvalida
 from .models import (
     Producto, Ganado, Medicamento, Alimento, ControlPlaga,
     Potrero, Mantenimiento, Combustible, Trabajador, Dotacion, Pago, LugarMantenimiento,
     Animal, Vacuna, RegistroVacunacion, Comprador, VentaProducto, RegistroMedicamento,
-    FechaProduccion
+    FechaProduccion, MovimientoInventario, SuscripcionRecordatorio, TareaProgramada, EjecucionTarea
 )
 
+# Los modales de detalles se generan bajo demanda (ver admin_detalles.py).
+# Leen las relaciones con .all() y las comprueban con `if qs.all()` en lugar
+# de .exists(), así usan las precargas de get_detalles_queryset.
+
+def _prefetch_proveedores(ruta='proveedores'):
+    """Prefetch de proveedores con su ubicación, que muestra _get_proveedor_details_html."""
+    return Prefetch(ruta, queryset=Proveedor.objects.select_related('ubicacion'))
+
 def _get_ubicacion_details_html(u):
     if not u:
         return "<p>No especificada</p>"
@@ -57,8 +72,8 @@ def _get_lugar_mantenimiento_details_html(lugar):
     correo = lugar.correo or "No especificado"
     numero = lugar.numero or "No especificado"
     
-    ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in lugar.ubicaciones.all()]) if lugar.ubicaciones.exists() else "<p>No hay ubicaciones asociadas.</p>"
-    proveedores_html = "".join([_get_proveedor_details_html(p) for p in lugar.proveedores.all()]) if lugar.proveedores.exists() else "<p>No hay proveedores asociados.</p>"
+    ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in lugar.ubicaciones.all()]) if lugar.ubicaciones.all() else "<p>No hay ubicaciones asociadas.</p>"
+    proveedores_html = "".join([_get_proveedor_details_html(p) for p in lugar.proveedores.all()]) if lugar.proveedores.all() else "<p>No hay proveedores asociados.</p>"
 
     return f"""
         <div class="details-subsection" style="margin-bottom: 10px; padding: 10px; border: 1px solid #ddd; border-radius: 5px;">
@@ -77,34 +92,81 @@ def _get_lugar_mantenimiento_details_html(lugar):
 class ImagenAdminMixin(admin.ModelAdmin):
     """
     Mixin para añadir una vista previa de la imagen que se puede ampliar.
+    La lista muestra la miniatura transformada; el enlace abre la original.
     """
     def imagen_thumbnail(self, obj):
         if obj.imagen:
             try:
-                return mark_safe(f'<a href="{obj.imagen.url}" target="_blank"><img src="{obj.imagen.url}" width="100" /></a>')
+                miniatura = url_miniatura(obj.imagen, 'admin') or obj.imagen.url
+                return mark_safe(f'<a href="{obj.imagen.url}" target="_blank"><img src="{miniatura}" width="100" /></a>')
             except (AttributeError, ValueError):
                 return "No se pudo cargar la imagen"
         return "Sin imagen"
     imagen_thumbnail.short_description = 'Vista Previa'
 
+    def delete_queryset(self, request, queryset):
+        """
+        "Eliminar seleccionados": encola las imágenes con un solo INSERT y,
+        ya confirmado el borrado, las elimina de Cloudinary en lotes paralelos.
+        Las que fallan quedan en la cola para el worker.
+        """
+        with transaction.atomic(), encolado_en_lote() as public_ids:
+            super().delete_queryset(request, queryset)
+        if not public_ids:
+            return
+        borradas, fallidas = procesar_pendientes(hilos=HILOS, public_ids=public_ids)
+        if fallidas:
+            self.message_user(
+                request,
+                f'{fallidas} imágenes no se pudieron borrar de Cloudinary; se reintentarán más tarde.',
+                messages.WARNING,
+            )
+
+class DisponibilidadListFilter(admin.SimpleListFilter):
+    """Disponible / agotado con los métodos del StockQuerySet del modelo."""
+    title = 'disponibilidad'
+    parameter_name = 'disponibilidad'
+
+    def lookups(self, request, model_admin):
+        return (('disponible', 'Disponible'), ('agotado', 'Agotado'))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'disponible':
+            return queryset.disponibles()
+        if self.value() == 'agotado':
+            return queryset.agotados()
+        return queryset
+
+class MovimientoStockAdminMixin:
+    """
+    Anota el usuario del admin en el objeto para que los cambios de saldo
+    que se registran al guardarlo (ver stock.py) queden a su nombre.
+    """
+    def save_model(self, request, obj, form, change):
+        obj._usuario_movimiento = request.user
+        super().save_model(request, obj, form, change)
+
 @admin.register(Animal)
-class AnimalAdmin(admin.ModelAdmin):
+class AnimalAdmin(DetallesDiferidosMixin, admin.ModelAdmin):
     list_display = ('nombre', 'ver_detalles')
     search_fields = ('nombre',)
     list_per_page = 10
 
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).prefetch_related('ganado_set')
+
     class Media:
         js = ('inventario/js/modalManager.js',)
         css = {
             'all': ('inventario/css/StyleModal.css',)
         }
 
-    def ver_detalles(self, obj):
+    def detalles_html(self, obj):
         nombre = obj.nombre or "Dato aún no ingresado"
         
         # Obtener el ganado asociado a este tipo de animal
-        ganado_asociado = Ganado.objects.filter(animal=obj)
-        ganado_html = "<ul>" + "".join([f"<li>{g.identificador}</li>" for g in ganado_asociado]) + "</ul>" if ganado_asociado.exists() else "<p>No hay ganado de este tipo.</p>"
+        ganado_asociado = obj.ganado_set.all()
+        ganado_html = "<ul>" + "".join([f"<li>{g.identificador}</li>" for g in ganado_asociado]) + "</ul>" if ganado_asociado else "<p>No hay ganado de este tipo.</p>"
 
         modal_html = f"""
         <div id="modal-animal-{obj.pk}" class="modal" style="display:none;">
@@ -126,27 +188,30 @@ class AnimalAdmin(admin.ModelAdmin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-animal-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
 @admin.register(Comprador)
-class CompradorAdmin(admin.ModelAdmin):
+class CompradorAdmin(DetallesDiferidosMixin, admin.ModelAdmin):
     list_display = ('nombre', 'telefono', 'ver_detalles')
     search_fields = ('nombre',)
     list_per_page = 10
 
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).prefetch_related(
+            Prefetch('ventaproducto_set', queryset=VentaProducto.objects.select_related('producto'))
+        )
+
     class Media:
         js = ('inventario/js/modalManager.js',)
         css = {
             'all': ('inventario/css/StyleModal.css',)
         }
 
-    def ver_detalles(self, obj):
+    def detalles_html(self, obj):
         # Obtener productos comprados
         ventas = obj.ventaproducto_set.all()
-        productos_html = "<ul>" + "".join([f"<li>{v.producto.nombre} (Valor: ${v.valor_compra:,.2f}, Abono: ${v.valor_abono:,.2f})</li>" for v in ventas]) + "</ul>" if ventas.exists() else "<p>No ha comprado productos.</p>"
+        productos_html = "<ul>" + "".join([f"<li>{v.producto.nombre} (Valor: ${v.valor_compra:,.2f}, Abono: ${v.valor_abono:,.2f})</li>" for v in ventas]) + "</ul>" if ventas else "<p>No ha comprado productos.</p>"
 
         nombre = obj.nombre or "Dato aún no ingresado"
         telefono = obj.telefono or "Dato aún no ingresado"
@@ -175,10 +240,8 @@ class CompradorAdmin(admin.ModelAdmin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-comprador-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
 class FechaProduccionInline(admin.TabularInline):
     model = FechaProduccion
@@ -192,7 +255,7 @@ class VentaProductoInline(admin.TabularInline):
 
 
 @admin.register(Producto)
-class ProductoAdmin(ImagenAdminMixin):
+class ProductoAdmin(DetallesDiferidosMixin, ImagenAdminMixin):
     # CAMBIA la línea 'list_display' para incluir el estado
     list_display = ('nombre', 'ver_detalles', 'categoria', 'cantidad_con_unidad', 'estado', 'precio', 'precio_total_display', 'imagen_thumbnail')
     list_per_page = 10
@@ -214,20 +277,30 @@ class ProductoAdmin(ImagenAdminMixin):
             'fields': (('cantidad', 'unidad_medida'), 'precio')
         }),
     )
+
+    def get_queryset(self, request):
+        # precio_total_display ordena por el valor calculado en la base
+        return super().get_queryset(request).con_precio_total()
     
     inlines = [FechaProduccionInline, VentaProductoInline]
 
-    def ver_detalles(self, obj):
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).select_related('categoria').prefetch_related(
+            'ubicaciones', 'fechas_produccion',
+            Prefetch('ventaproducto_set', queryset=VentaProducto.objects.select_related('comprador')),
+        )
+
+    def detalles_html(self, obj):
         categoria = obj.categoria.nombre if obj.categoria else "Dato aún no ingresado"
         estado = obj.get_estado_display() or "Dato aún no ingresado"
         
-        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.exists() else "<p>Dato aún no ingresado</p>"
+        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.all() else "<p>Dato aún no ingresado</p>"
         
-        imagen_html = f'<img src="{obj.imagen.url}" class="details-img">' if obj.imagen and hasattr(obj.imagen, 'url') else "No hay imagen"
+        imagen_html = f'<img src="{url_miniatura(obj.imagen, "modal") or obj.imagen.url}" class="details-img">' if obj.imagen and hasattr(obj.imagen, 'url') else "No hay imagen"
         descripcion = obj.descripcion or "Sin descripción"
 
         # New table logic
-        ventas = obj.ventaproducto_set.all().select_related('comprador')
+        ventas = obj.ventaproducto_set.all()
         fechas_produccion = obj.fechas_produccion.all()
         
         total_ventas_valor = sum(v.valor_compra for v in ventas if v.valor_compra is not None)
@@ -250,7 +323,7 @@ class ProductoAdmin(ImagenAdminMixin):
                 <tbody>
         """
 
-        if ventas.exists():
+        if ventas:
             for venta in ventas:
                 cantidad_display = f"{venta.cantidad_vendida} {obj.get_unidad_medida_display()}" if venta.cantidad_vendida is not None else "N/A"
                 precio_unitario_display = f"${venta.precio_unitario_venta:,.2f}" if venta.precio_unitario_venta is not None else "N/A"
@@ -269,7 +342,7 @@ class ProductoAdmin(ImagenAdminMixin):
                 """
         else:
             # If no sales, show a row with current production info
-            fechas_produccion_str = "<br>".join([fp.fecha.strftime('%d/%m/%Y') for fp in fechas_produccion]) if fechas_produccion.exists() else "N/A"
+            fechas_produccion_str = "<br>".join([fp.fecha.strftime('%d/%m/%Y') for fp in fechas_produccion]) if fechas_produccion else "N/A"
             tabla_html += f"""
                 <tr>
                     <td>{obj.cantidad} {obj.get_unidad_medida_display()}</td>
@@ -315,18 +388,17 @@ class ProductoAdmin(ImagenAdminMixin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-producto-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
     def cantidad_con_unidad(self, obj):
         return f"{obj.cantidad} {obj.get_unidad_medida_display()}"
     cantidad_con_unidad.short_description = 'Cantidad'
     
     def precio_total_display(self, obj):
-        return f"${obj.precio_total:,.2f}"
+        return f"${obj.valor_total:,.2f}"
     precio_total_display.short_description = 'Precio Total'
+    precio_total_display.admin_order_field = 'valor_total'
 
 class RegistroVacunacionInline(admin.TabularInline):
     model = RegistroVacunacion
@@ -343,7 +415,7 @@ class RegistroMedicamentoInline(admin.TabularInline):
     extra = 1
 
 @admin.register(Ganado)
-class GanadoAdmin(ImagenAdminMixin):
+class GanadoAdmin(DetallesDiferidosMixin, ImagenAdminMixin):
     list_display = ('identificador', 'ver_detalles', 'animal', 'raza', 'genero', 'peso_kg', 'edad', 'fecha_nacimiento',
                     'crecimiento', 'estado', 'estado_salud', 'imagen_thumbnail')
     list_per_page = 10
@@ -381,7 +453,16 @@ class GanadoAdmin(ImagenAdminMixin):
 
     inlines = [RegistroVacunacionInline, RegistroMedicamentoInline]
 
-    def ver_detalles(self, obj):
+    def get_queryset(self, request):
+        return super().get_queryset(request).con_edad()
+
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).select_related('animal').prefetch_related(
+            Prefetch('vacunaciones', queryset=RegistroVacunacion.objects.select_related('vacuna')),
+            Prefetch('medicamentos_aplicados', queryset=RegistroMedicamento.objects.select_related('medicamento')),
+        )
+
+    def detalles_html(self, obj):
         animal = obj.animal.nombre if obj.animal else "Dato aún no ingresado"
         raza = obj.raza or "Dato aún no ingresado"
         genero = obj.get_genero_display() or "Dato aún no ingresado"
@@ -414,7 +495,7 @@ class GanadoAdmin(ImagenAdminMixin):
             f"Próxima dosis: {v.fecha_proxima_dosis.strftime('%d/%m/%Y') if v.fecha_proxima_dosis else 'No programada'}<br>"
             f"Notas: {v.notas or 'Sin notas'}</li>"
             for v in vacunaciones
-        ]) + "</ul>" if vacunaciones.exists() else "<p>No hay registros de vacunación.</p>"
+        ]) + "</ul>" if vacunaciones else "<p>No hay registros de vacunación.</p>"
 
         # Historial de medicamentos
         medicamentos = obj.medicamentos_aplicados.all()
@@ -422,9 +503,9 @@ class GanadoAdmin(ImagenAdminMixin):
             f"<li><strong>{m.medicamento.nombre}</strong> ({m.fecha_aplicacion.strftime('%d/%m/%Y')})<br>"
             f"Notas: {m.notas or 'Sin notas'}</li>"
             for m in medicamentos
-        ]) + "</ul>" if medicamentos.exists() else "<p>No hay registros de medicamentos.</p>"
+        ]) + "</ul>" if medicamentos else "<p>No hay registros de medicamentos.</p>"
 
-        imagen_html = f'<img src="{obj.imagen.url}" class="details-img">' if obj.imagen else "No hay imagen"
+        imagen_html = f'<img src="{url_miniatura(obj.imagen, "modal") or obj.imagen.url}" class="details-img">' if obj.imagen else "No hay imagen"
         descripcion = obj.descripcion or "Sin descripción"
 
         modal_html = f"""
@@ -485,16 +566,13 @@ class GanadoAdmin(ImagenAdminMixin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-ganado-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
     def edad(self, obj):
-        # Añadimos un print para ver qué objeto se está procesando
-        print(f"Procesando edad para Ganado ID: {obj.pk}") 
         return obj.edad
     edad.short_description = 'Edad'
+    edad.admin_order_field = 'edad_meses'
 
     def historial_vacunacion(self, obj):
         from django.utils.html import format_html
@@ -545,10 +623,10 @@ class GanadoAdmin(ImagenAdminMixin):
     proximas_vacunas.short_description = 'Próximas Vacunas'
 
 @admin.register(Medicamento)
-class MedicamentoAdmin(ImagenAdminMixin):
+class MedicamentoAdmin(DetallesDiferidosMixin, MovimientoStockAdminMixin, ImagenAdminMixin):
     list_display = ('nombre', 'ver_detalles', 'cantidad_ingresada', 'cantidad_usada', 'cantidad_restante_con_unidad', 'categoria', 'precio', 'imagen_thumbnail')
     list_per_page = 10
-    list_filter = ('categoria', 'ubicaciones', 'proveedores', 'fecha_vencimiento')
+    list_filter = ('categoria', DisponibilidadListFilter, 'ubicaciones', 'proveedores', 'fecha_vencimiento')
     search_fields = ('nombre', 'categoria__nombre', 'ubicaciones__nombre', 'proveedores__nombre')
     
     readonly_fields = ('cantidad_usada', 'cantidad_restante')
@@ -572,15 +650,20 @@ class MedicamentoAdmin(ImagenAdminMixin):
         }),
     )
 
-    def ver_detalles(self, obj):
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).select_related('categoria').prefetch_related(
+            'ubicaciones', _prefetch_proveedores()
+        )
+
+    def detalles_html(self, obj):
         categoria = obj.categoria.nombre if obj.categoria else "Dato aún no ingresado"
         
-        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.exists() else "<p>Dato aún no ingresado</p>"
-        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.exists() else "<p>Dato aún no ingresado</p>"
+        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.all() else "<p>Dato aún no ingresado</p>"
+        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.all() else "<p>Dato aún no ingresado</p>"
 
         imagen_html = "Dato aún no ingresado"
         if obj.imagen and hasattr(obj.imagen, 'url'):
-            imagen_html = f'<img src="{obj.imagen.url}" alt="Imagen de {obj.nombre}" class="details-img">'
+            imagen_html = f'<img src="{url_miniatura(obj.imagen, "modal") or obj.imagen.url}" alt="Imagen de {obj.nombre}" class="details-img">'
         
         descripcion = obj.descripcion or "Dato aún no ingresado"
         
@@ -634,14 +717,13 @@ class MedicamentoAdmin(ImagenAdminMixin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-medicamento-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
     def cantidad_restante_con_unidad(self, obj):
-        return f"{obj.cantidad_restante} {obj.get_unidad_medida_display()}"
+        return f"{obj.restante} {obj.get_unidad_medida_display()}"
     cantidad_restante_con_unidad.short_description = 'Restante'
+    cantidad_restante_con_unidad.admin_order_field = 'restante'
 
     def f_compra(self, obj):
         return obj.fecha_compra
@@ -697,7 +779,7 @@ class VacunaForm(forms.ModelForm):
             self.fields['sub_etiquetas'].initial = sub_tags
 
 @admin.register(Vacuna)
-class VacunaAdmin(ImagenAdminMixin):
+class VacunaAdmin(DetallesDiferidosMixin, ImagenAdminMixin):
     form = VacunaForm
     list_display = ('nombre', 'ver_detalles', 'tipo', 'disponible', 'mostrar_etiquetas', 'cantidad_con_unidad', 'fecha_compra', 'fecha_vencimiento', 'imagen_thumbnail')
     list_per_page = 10
@@ -732,15 +814,22 @@ class VacunaAdmin(ImagenAdminMixin):
             'all': ('inventario/css/StyleModal.css',)
         }
     
-    def ver_detalles(self, obj):
+    def get_queryset(self, request):
+        # mostrar_etiquetas se muestra en la lista
+        return super().get_queryset(request).prefetch_related('etiquetas')
+
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).prefetch_related('ubicaciones', _prefetch_proveedores())
+
+    def detalles_html(self, obj):
         tipo = obj.tipo or "Dato aún no ingresado"
         disponible = "Sí" if obj.disponible else "No"
         
-        etiquetas_html = "<ul>" + "".join([f"<li>{e.nombre}</li>" for e in obj.etiquetas.all()]) + "</ul>" if obj.etiquetas.exists() else "<p>Dato aún no ingresado</p>"
-        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.exists() else "<p>Dato aún no ingresado</p>"
-        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.exists() else "<p>Dato aún no ingresado</p>"
+        etiquetas_html = "<ul>" + "".join([f"<li>{e.nombre}</li>" for e in obj.etiquetas.all()]) + "</ul>" if obj.etiquetas.all() else "<p>Dato aún no ingresado</p>"
+        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.all() else "<p>Dato aún no ingresado</p>"
+        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.all() else "<p>Dato aún no ingresado</p>"
         
-        imagen_html = f'<img src="{obj.imagen.url}" class="details-img">' if obj.imagen and hasattr(obj.imagen, 'url') else "No hay imagen"
+        imagen_html = f'<img src="{url_miniatura(obj.imagen, "modal") or obj.imagen.url}" class="details-img">' if obj.imagen and hasattr(obj.imagen, 'url') else "No hay imagen"
         descripcion = obj.descripcion or "Sin descripción"
         
         fecha_compra = obj.fecha_compra.strftime('%d/%m/%Y') if obj.fecha_compra else "Dato aún no ingresado"
@@ -799,10 +888,8 @@ class VacunaAdmin(ImagenAdminMixin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-vacuna-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
@@ -819,13 +906,14 @@ class VacunaAdmin(ImagenAdminMixin):
             obj.etiquetas.clear()
 
     def mostrar_etiquetas(self, obj):
-        parent_tags = obj.etiquetas.filter(parent__isnull=True)
-        sub_tags = obj.etiquetas.filter(parent__isnull=False)
+        # Se separan en Python para aprovechar las etiquetas precargadas
+        parent_tags = [e for e in obj.etiquetas.all() if e.parent_id is None]
+        sub_tags = [e for e in obj.etiquetas.all() if e.parent_id is not None]
         
         display_parts = []
-        if parent_tags.exists():
+        if parent_tags:
             display_parts.append("Principales: " + ", ".join([e.nombre for e in parent_tags]))
-        if sub_tags.exists():
+        if sub_tags:
             display_parts.append("Sub: " + ", ".join([e.nombre for e in sub_tags]))
             
         return " | ".join(display_parts) if display_parts else "Ninguna"
@@ -877,7 +965,7 @@ class AlimentoForm(forms.ModelForm):
             self.fields['sub_etiquetas'].initial = sub_tags
 
 @admin.register(Alimento)
-class AlimentoAdmin(ImagenAdminMixin):
+class AlimentoAdmin(DetallesDiferidosMixin, MovimientoStockAdminMixin, ImagenAdminMixin):
     form = AlimentoForm
     list_display = ('nombre', 'ver_detalles','categoria', 'cantidad_kg_ingresada', 'cantidad_kg_usada', 'cantidad_kg_restante', 'precio', 'fecha_compra', 'fecha_vencimiento', 'imagen_thumbnail')
     list_per_page = 10
@@ -887,7 +975,7 @@ class AlimentoAdmin(ImagenAdminMixin):
         css = {
             'all': ('inventario/css/StyleModal.css',)
         }
-    list_filter = ('categoria', 'ubicaciones', 'proveedores', 'fecha_vencimiento', 'etiquetas')
+    list_filter = ('categoria', DisponibilidadListFilter, 'ubicaciones', 'proveedores', 'fecha_vencimiento', 'etiquetas')
     search_fields = ('nombre', 'categoria__nombre', 'proveedores__nombre', 'etiquetas__nombre')
     readonly_fields = ('cantidad_kg_usada', 'cantidad_kg_restante')
     
@@ -909,18 +997,23 @@ class AlimentoAdmin(ImagenAdminMixin):
 
     filter_horizontal = ('proveedores', 'ubicaciones')
 
-    def ver_detalles(self, obj):
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).select_related('categoria').prefetch_related(
+            'etiquetas', 'ubicaciones', _prefetch_proveedores()
+        )
+
+    def detalles_html(self, obj):
         # Obtener datos relacionados, manejando casos vacíos
         categoria = obj.categoria.nombre if obj.categoria else "Dato aún no ingresado"
         
         # Formatear listas para mostrarlas como elementos de lista HTML
-        etiquetas_html = "<ul>" + "".join([f"<li>{e.nombre}</li>" for e in obj.etiquetas.all()]) + "</ul>" if obj.etiquetas.exists() else "<p>Dato aún no ingresado</p>"
-        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.exists() else "<p>Dato aún no ingresado</p>"
-        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.exists() else "<p>Dato aún no ingresado</p>"
+        etiquetas_html = "<ul>" + "".join([f"<li>{e.nombre}</li>" for e in obj.etiquetas.all()]) + "</ul>" if obj.etiquetas.all() else "<p>Dato aún no ingresado</p>"
+        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.all() else "<p>Dato aún no ingresado</p>"
+        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.all() else "<p>Dato aún no ingresado</p>"
 
         imagen_html = "Dato aún no ingresado"
         if obj.imagen and hasattr(obj.imagen, 'url'):
-            imagen_html = f'<img src="{obj.imagen.url}" alt="Imagen de {obj.nombre}" class="details-img">'
+            imagen_html = f'<img src="{url_miniatura(obj.imagen, "modal") or obj.imagen.url}" alt="Imagen de {obj.nombre}" class="details-img">'
         
         descripcion = obj.descripcion or "Dato aún no ingresado"
         
@@ -976,10 +1069,8 @@ class AlimentoAdmin(ImagenAdminMixin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-alimento-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
 
     def save_model(self, request, obj, form, change):
@@ -1001,17 +1092,20 @@ class AlimentoAdmin(ImagenAdminMixin):
             obj.etiquetas.clear()
 
     def cantidad_kg_restante(self, obj):
-        return f"{obj.cantidad_kg_ingresada - obj.cantidad_kg_usada} Kg"
+        # La columna generada no existe hasta guardar: en el alta se calcula aquí
+        return f"{obj.restante if obj.pk else obj.cantidad_kg_restante} Kg"
     cantidad_kg_restante.short_description = 'Cantidad Restante'
+    cantidad_kg_restante.admin_order_field = 'restante'
 
     def mostrar_etiquetas(self, obj):
-        parent_tags = obj.etiquetas.filter(parent__isnull=True)
-        sub_tags = obj.etiquetas.filter(parent__isnull=False)
+        # Se separan en Python para aprovechar las etiquetas precargadas
+        parent_tags = [e for e in obj.etiquetas.all() if e.parent_id is None]
+        sub_tags = [e for e in obj.etiquetas.all() if e.parent_id is not None]
         
         display_parts = []
-        if parent_tags.exists():
+        if parent_tags:
             display_parts.append("Principales: " + ", ".join([e.nombre for e in parent_tags]))
-        if sub_tags.exists():
+        if sub_tags:
             display_parts.append("Sub: " + ", ".join([e.nombre for e in sub_tags]))
             
         return " | ".join(display_parts) if display_parts else "Ninguna"
@@ -1033,10 +1127,10 @@ class AlimentoAdmin(ImagenAdminMixin):
     mostrar_proveedores.short_description = 'Proveedores'
 
 @admin.register(ControlPlaga)
-class ControlPlagaAdmin(ImagenAdminMixin):
+class ControlPlagaAdmin(DetallesDiferidosMixin, MovimientoStockAdminMixin, ImagenAdminMixin):
     list_display = ('nombre_producto', 'ver_detalles', 'tipo', 'cantidad_ingresada', 'cantidad_usada', 'cantidad_restante_con_unidad', 'precio', 'fecha_compra', 'fecha_vencimiento', 'imagen_thumbnail')
     list_per_page = 10
-    list_filter = ('tipo', 'proveedores', 'ubicaciones', 'fecha_vencimiento')
+    list_filter = ('tipo', DisponibilidadListFilter, 'proveedores', 'ubicaciones', 'fecha_vencimiento')
     search_fields = ('nombre_producto', 'tipo', 'ubicaciones__nombre', 'proveedores__nombre')
     
     readonly_fields = ('cantidad_usada', 'cantidad_restante')
@@ -1061,14 +1155,17 @@ class ControlPlagaAdmin(ImagenAdminMixin):
     
     filter_horizontal = ('proveedores', 'ubicaciones')
     
-    def ver_detalles(self, obj):
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).prefetch_related('ubicaciones', _prefetch_proveedores())
+
+    def detalles_html(self, obj):
         # Formatear listas
-        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.exists() else "<p>Dato aún no ingresado</p>"
-        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.exists() else "<p>Dato aún no ingresado</p>"
+        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.all() else "<p>Dato aún no ingresado</p>"
+        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.all() else "<p>Dato aún no ingresado</p>"
 
         imagen_html = "Dato aún no ingresado"
         if obj.imagen and hasattr(obj.imagen, 'url'):
-            imagen_html = f'<img src="{obj.imagen.url}" alt="Imagen de {obj.nombre_producto}" class="details-img">'
+            imagen_html = f'<img src="{url_miniatura(obj.imagen, "modal") or obj.imagen.url}" alt="Imagen de {obj.nombre_producto}" class="details-img">'
         
         descripcion = obj.descripcion or "Dato aún no ingresado"
         
@@ -1122,10 +1219,8 @@ class ControlPlagaAdmin(ImagenAdminMixin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-controlplaga-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
     def cantidad_ingresada_con_unidad(self, obj):
         return f"{obj.cantidad_ingresada} {obj.get_unidad_medida_display()}"
@@ -1136,8 +1231,9 @@ class ControlPlagaAdmin(ImagenAdminMixin):
     cantidad_usada_con_unidad.short_description = 'Usado'
 
     def cantidad_restante_con_unidad(self, obj):
-        return f"{obj.cantidad_restante} {obj.get_unidad_medida_display()}"
+        return f"{obj.restante} {obj.get_unidad_medida_display()}"
     cantidad_restante_con_unidad.short_description = 'Restante'
+    cantidad_restante_con_unidad.admin_order_field = 'restante'
 
     def mostrar_proveedores(self, obj):
         from django.urls import reverse
@@ -1152,7 +1248,7 @@ class ControlPlagaAdmin(ImagenAdminMixin):
     mostrar_proveedores.short_description = 'Proveedores'
 
 @admin.register(Potrero)
-class PotreroAdmin(ImagenAdminMixin):
+class PotreroAdmin(DetallesDiferidosMixin, ImagenAdminMixin):
     list_display = ('nombre', 'ver_detalles', 'area_hectareas', 'empastado', 'fumigado', 'rozado', 'fecha_proximo_empaste', 'fecha_proxima_fumigacion', 'fecha_proximo_rozado', 'imagen_thumbnail')
     list_per_page = 10
     list_filter = ('empastado', 'fumigado', 'rozado')
@@ -1177,7 +1273,7 @@ class PotreroAdmin(ImagenAdminMixin):
         }),
     )
 
-    def ver_detalles(self, obj):
+    def detalles_html(self, obj):
         nombre = obj.nombre or "Dato aún no ingresado"
         area = f"{obj.area_hectareas} ha" if obj.area_hectareas is not None else "Dato aún no ingresado"
         
@@ -1192,7 +1288,7 @@ class PotreroAdmin(ImagenAdminMixin):
         intercambio_potrero = obj.intercambio_con_potrero.nombre if obj.intercambio_con_potrero else "Ninguno"
         fecha_intercambio = obj.fecha_intercambio.strftime('%d/%m/%Y') if obj.fecha_intercambio else "No programado"
         
-        imagen_html = f'<img src="{obj.imagen.url}" class="details-img">' if obj.imagen and hasattr(obj.imagen, 'url') else "No hay imagen"
+        imagen_html = f'<img src="{url_miniatura(obj.imagen, "modal") or obj.imagen.url}" class="details-img">' if obj.imagen and hasattr(obj.imagen, 'url') else "No hay imagen"
         descripcion = obj.descripcion or "Sin descripción"
 
         modal_html = f"""
@@ -1232,13 +1328,11 @@ class PotreroAdmin(ImagenAdminMixin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-potrero-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
 @admin.register(Mantenimiento)
-class MantenimientoAdmin(ImagenAdminMixin):
+class MantenimientoAdmin(DetallesDiferidosMixin, ImagenAdminMixin):
     list_display = (
         'equipo',
         'ver_detalles',
@@ -1268,15 +1362,20 @@ class MantenimientoAdmin(ImagenAdminMixin):
         }),
     )
 
-    def ver_detalles(self, obj):
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).prefetch_related(
+            'lugares_mantenimiento__ubicaciones', _prefetch_proveedores('lugares_mantenimiento__proveedores')
+        )
+
+    def detalles_html(self, obj):
         equipo = obj.equipo or "Dato aún no ingresado"
         fecha_ultimo = obj.fecha_ultimo_mantenimiento.strftime('%d/%m/%Y') if obj.fecha_ultimo_mantenimiento else "Dato aún no ingresado"
         fecha_proximo = obj.fecha_proximo_mantenimiento.strftime('%d/%m/%Y') if obj.fecha_proximo_mantenimiento else "Dato aún no ingresado"
         completado = "Sí" if obj.completado else "No"
         descripcion = obj.descripcion or "Dato aún no ingresado"
         
-        lugares_html = "".join([_get_lugar_mantenimiento_details_html(l) for l in obj.lugares_mantenimiento.all()]) if obj.lugares_mantenimiento.exists() else "<p>Dato aún no ingresado</p>"
-        imagen_html = f'<img src="{obj.imagen.url}" class="details-img">' if obj.imagen else "No hay imagen"
+        lugares_html = "".join([_get_lugar_mantenimiento_details_html(l) for l in obj.lugares_mantenimiento.all()]) if obj.lugares_mantenimiento.all() else "<p>Dato aún no ingresado</p>"
+        imagen_html = f'<img src="{url_miniatura(obj.imagen, "modal") or obj.imagen.url}" class="details-img">' if obj.imagen else "No hay imagen"
 
         modal_html = f"""
         <div id="modal-mantenimiento-{obj.pk}" class="modal" style="display:none;">
@@ -1313,10 +1412,8 @@ class MantenimientoAdmin(ImagenAdminMixin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-mantenimiento-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
     def mostrar_lugares_mantenimiento(self, obj):
         from django.urls import reverse
@@ -1334,10 +1431,10 @@ class MantenimientoAdmin(ImagenAdminMixin):
     mostrar_lugares_mantenimiento.short_description = "Lugares de Mantenimiento"
 
 @admin.register(Combustible)
-class CombustibleAdmin(ImagenAdminMixin):
+class CombustibleAdmin(DetallesDiferidosMixin, MovimientoStockAdminMixin, ImagenAdminMixin):
     list_display = ('tipo', 'ver_detalles', 'cantidad_galones_ingresada', 'cantidad_galones_usados', 'cantidad_galones_restantes', 'precio', 'imagen_thumbnail')
     list_per_page = 10
-    list_filter = ('tipo', 'ubicaciones', 'proveedores')
+    list_filter = ('tipo', DisponibilidadListFilter, 'ubicaciones', 'proveedores')
     search_fields = ('tipo', 'ubicaciones__nombre', 'proveedores__nombre')
 
     readonly_fields = ('cantidad_galones_usados', 'cantidad_galones_restantes')
@@ -1359,14 +1456,17 @@ class CombustibleAdmin(ImagenAdminMixin):
     
     filter_horizontal = ('proveedores', 'ubicaciones')
 
-    def ver_detalles(self, obj):
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).prefetch_related('ubicaciones', _prefetch_proveedores())
+
+    def detalles_html(self, obj):
         # Formatear listas para mostrarlas como elementos de lista HTML
-        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.exists() else "<p>Dato aún no ingresado</p>"
-        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.exists() else "<p>Dato aún no ingresado</p>"
+        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.all() else "<p>Dato aún no ingresado</p>"
+        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.all() else "<p>Dato aún no ingresado</p>"
 
         imagen_html = "Dato aún no ingresado"
         if obj.imagen and hasattr(obj.imagen, 'url'):
-            imagen_html = f'<img src="{obj.imagen.url}" alt="Imagen de {obj.tipo}" class="details-img">'
+            imagen_html = f'<img src="{url_miniatura(obj.imagen, "modal") or obj.imagen.url}" alt="Imagen de {obj.tipo}" class="details-img">'
         
         descripcion = obj.descripcion or "Dato aún no ingresado"
         
@@ -1416,14 +1516,14 @@ class CombustibleAdmin(ImagenAdminMixin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-combustible-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
     def cantidad_galones_restantes(self, obj):
-        return f"{obj.cantidad_galones_ingresada - obj.cantidad_galones_usados} gal"
+        # La columna generada no existe hasta guardar: en el alta se calcula aquí
+        return f"{obj.restante if obj.pk else obj.cantidad_galones_restantes} gal"
     cantidad_galones_restantes.short_description = 'Galones Restantes'
+    cantidad_galones_restantes.admin_order_field = 'restante'
 
     def mostrar_proveedores(self, obj):
         from django.urls import reverse
@@ -1440,30 +1540,36 @@ class CombustibleAdmin(ImagenAdminMixin):
 # de acá pa abajo lo nuevo xd 
 
 @admin.register(Trabajador)
-class TrabajadorAdmin(admin.ModelAdmin):
+class TrabajadorAdmin(DetallesDiferidosMixin, admin.ModelAdmin):
     list_display = ("nombre", "ver_detalles", "apellido", "cedula", "correo", "numero")
     search_fields = ("nombre", "apellido", "cedula")
     list_per_page = 10
 
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).prefetch_related(
+            Prefetch('dotaciones', queryset=Dotacion.objects.order_by('-fecha_entrega')),
+            Prefetch('pagos', queryset=Pago.objects.order_by('-fecha_pago')),
+        )
+
     class Media:
         js = ('inventario/js/modalManager.js',)
         css = {
             'all': ('inventario/css/StyleModal.css',)
         }
 
-    def ver_detalles(self, obj):
+    def detalles_html(self, obj):
         nombre = f"{obj.nombre} {obj.apellido}" or "Dato aún no ingresado"
         cedula = obj.cedula or "Dato aún no ingresado"
         correo = obj.correo or "Dato aún no ingresado"
         numero = obj.numero or "Dato aún no ingresado"
         
         # Historial de dotaciones
-        dotaciones = obj.dotaciones.all().order_by('-fecha_entrega')
-        dotaciones_html = "<ul>" + "".join([f"<li>Fecha: {d.fecha_entrega.strftime('%d/%m/%Y')} (Camisa: {'Sí' if d.camisa_franela else 'No'}, Pantalón: {'Sí' if d.pantalon else 'No'}, Zapatos: {'Sí' if d.zapato else 'No'})</li>" for d in dotaciones]) + "</ul>" if dotaciones.exists() else "<p>Sin historial de dotaciones.</p>"
+        dotaciones = obj.dotaciones.all()
+        dotaciones_html = "<ul>" + "".join([f"<li>Fecha: {d.fecha_entrega.strftime('%d/%m/%Y')} (Camisa: {'Sí' if d.camisa_franela else 'No'}, Pantalón: {'Sí' if d.pantalon else 'No'}, Zapatos: {'Sí' if d.zapato else 'No'})</li>" for d in dotaciones]) + "</ul>" if dotaciones else "<p>Sin historial de dotaciones.</p>"
         
         # Historial de pagos
-        pagos = obj.pagos.all().order_by('-fecha_pago')
-        pagos_html = "<ul>" + "".join([f"<li>Fecha: {p.fecha_pago.strftime('%d/%m/%Y')} - Valor: ${p.valor:,.2f} ({'Pagado' if p.pago_realizado else 'Pendiente'})</li>" for p in pagos]) + "</ul>" if pagos.exists() else "<p>Sin historial de pagos.</p>"
+        pagos = obj.pagos.all()
+        pagos_html = "<ul>" + "".join([f"<li>Fecha: {p.fecha_pago.strftime('%d/%m/%Y')} - Valor: ${p.valor:,.2f} ({'Pagado' if p.pago_realizado else 'Pendiente'})</li>" for p in pagos]) + "</ul>" if pagos else "<p>Sin historial de pagos.</p>"
 
         modal_html = f"""
         <div id="modal-trabajador-{obj.pk}" class="modal" style="display:none;">
@@ -1498,14 +1604,13 @@ class TrabajadorAdmin(admin.ModelAdmin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-trabajador-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
 @admin.register(Dotacion)
-class DotacionAdmin(admin.ModelAdmin):
+class DotacionAdmin(DetallesDiferidosMixin, admin.ModelAdmin):
     list_display = ("trabajador", "ver_detalles", "camisa_franela", "pantalon", "zapato", "fecha_entrega")
+    list_select_related = ("trabajador",)
     list_per_page = 10
     list_filter = ("camisa_franela", "pantalon", "zapato")
     list_editable = ("camisa_franela", "pantalon", "zapato")
@@ -1516,7 +1621,7 @@ class DotacionAdmin(admin.ModelAdmin):
             'all': ('inventario/css/StyleModal.css',)
         }
 
-    def ver_detalles(self, obj):
+    def detalles_html(self, obj):
         trabajador_info = f"{obj.trabajador.nombre} {obj.trabajador.apellido} (C.C: {obj.trabajador.cedula})" if obj.trabajador else "Dato aún no ingresado"
         
         # Formatear booleans
@@ -1551,14 +1656,13 @@ class DotacionAdmin(admin.ModelAdmin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-dotacion-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
 @admin.register(Pago)
-class PagoAdmin(admin.ModelAdmin):
+class PagoAdmin(DetallesDiferidosMixin, admin.ModelAdmin):
     list_display = ("trabajador", 'ver_detalles', "valor", "pago_realizado", "metodo_pago", "forma_pago", "fecha_pago")
+    list_select_related = ("trabajador",)
     list_per_page = 10
     list_filter = ("forma_pago", "pago_realizado")
     search_fields = ("trabajador__nombre", "trabajador__apellido", "trabajador__cedula")
@@ -1570,7 +1674,7 @@ class PagoAdmin(admin.ModelAdmin):
             'all': ('inventario/css/StyleModal.css',)
         }
 
-    def ver_detalles(self, obj):
+    def detalles_html(self, obj):
         trabajador_info = f"{obj.trabajador.nombre} {obj.trabajador.apellido} (C.C: {obj.trabajador.cedula})" if obj.trabajador else "Dato aún no ingresado"
         valor = f"${obj.valor:,.2f}" if obj.valor is not None else "Dato aún no ingresado"
         pago_realizado = "Sí" if obj.pago_realizado else "No"
@@ -1602,13 +1706,11 @@ class PagoAdmin(admin.ModelAdmin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-pago-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
 @admin.register(LugarMantenimiento)
-class LugarMantenimientoAdmin(admin.ModelAdmin):
+class LugarMantenimientoAdmin(DetallesDiferidosMixin, admin.ModelAdmin):
     list_display = ("nombre_lugar", "ver_detalles", "nombre_empresa", "correo", "numero")
     list_per_page = 10
     search_fields = ("nombre_lugar", "nombre_empresa", "ubicaciones__nombre", "proveedores__nombre")
@@ -1630,7 +1732,10 @@ class LugarMantenimientoAdmin(admin.ModelAdmin):
         }),
     )
 
-    def ver_detalles(self, obj):
+    def get_detalles_queryset(self, request):
+        return super().get_detalles_queryset(request).prefetch_related('ubicaciones', _prefetch_proveedores())
+
+    def detalles_html(self, obj):
         nombre_lugar = obj.nombre_lugar or "Dato aún no ingresado"
         nombre_empresa = obj.nombre_empresa or "Dato aún no ingresado"
         direccion = obj.direccion or "Dato aún no ingresado"
@@ -1638,8 +1743,8 @@ class LugarMantenimientoAdmin(admin.ModelAdmin):
         numero = obj.numero or "Dato aún no ingresado"
         descripcion = obj.descripcion or "Dato aún no ingresado"
         
-        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.exists() else "<p>Dato aún no ingresado</p>"
-        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.exists() else "<p>Dato aún no ingresado</p>"
+        ubicaciones_html = "".join([_get_ubicacion_details_html(u) for u in obj.ubicaciones.all()]) if obj.ubicaciones.all() else "<p>Dato aún no ingresado</p>"
+        proveedores_html = "".join([_get_proveedor_details_html(p) for p in obj.proveedores.all()]) if obj.proveedores.all() else "<p>Dato aún no ingresado</p>"
 
         modal_html = f"""
         <div id="modal-lugarmantenimiento-{obj.pk}" class="modal" style="display:none;">
@@ -1676,10 +1781,8 @@ class LugarMantenimientoAdmin(admin.ModelAdmin):
                 </div>
             </div>
         </div>
-        <button class="button" onclick="event.preventDefault(); event.stopPropagation(); document.getElementById('modal-lugarmantenimiento-{obj.pk}').style.display='block'">Ver</button>
         """
         return mark_safe(modal_html)
-    ver_detalles.short_description = 'Detalles'
 
     def mostrar_proveedores(self, obj):
         from django.urls import reverse
@@ -1693,6 +1796,81 @@ class LugarMantenimientoAdmin(admin.ModelAdmin):
         return format_html(", ".join(proveedores_links))
     mostrar_proveedores.short_description = 'Proveedores'
 
+@admin.register(MovimientoInventario)
+class MovimientoInventarioAdmin(admin.ModelAdmin):
+    """Solo lectura: los movimientos se crean desde stock.py y no se editan."""
+    list_display = ("fecha", "tipo", "item", "cantidad", "unidad", "usuario", "nota")
+    list_filter = ("tipo", "content_type")
+    list_select_related = ("content_type", "usuario")
+    date_hierarchy = "fecha"
+    list_per_page = 25
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("item")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class TareaProgramadaForm(forms.ModelForm):
+    """Rechaza las expresiones cron que el programador no entiende; el admin pone el modelo y los campos."""
+
+    def clean_programacion(self):
+        programacion = self.cleaned_data['programacion']
+        try:
+            Cron(programacion)
+        except ExpresionCronInvalida as e:
+            raise forms.ValidationError(str(e))
+        return programacion
+
+@admin.register(TareaProgramada)
+class TareaProgramadaAdmin(admin.ModelAdmin):
+    """Las filas las crea `run_scheduler` a partir de tareas.TAREAS; aquí se cambia su programación."""
+    form = TareaProgramadaForm
+    list_display = ("nombre", "programacion", "activa", "proxima_ejecucion", "ultima_ejecucion", "ultima_duracion", "ultimo_error")
+    list_editable = ("programacion", "activa")
+    readonly_fields = ("nombre", "reservada_hasta", "ultima_ejecucion", "ultima_duracion", "ultimo_error")
+    actions = ["ejecutar_ahora"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_changelist_form(self, request, **kwargs):
+        # Las filas editables de la lista también validan la expresión
+        return super().get_changelist_form(request, form=self.form, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        # Con otra programación la próxima ejecución sale de la nueva, salvo que se haya fijado a mano
+        if 'programacion' in form.changed_data and 'proxima_ejecucion' not in form.changed_data:
+            obj.proxima_ejecucion = Cron(obj.programacion).siguiente(timezone.now())
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description="Ejecutar en la próxima vuelta del programador")
+    def ejecutar_ahora(self, request, queryset):
+        actualizadas = queryset.update(proxima_ejecucion=timezone.now())
+        messages.success(request, f"{actualizadas} tareas se ejecutarán en la próxima vuelta del programador.")
+
+@admin.register(EjecucionTarea)
+class EjecucionTareaAdmin(admin.ModelAdmin):
+    """Solo lectura: historial de ejecuciones y duraciones de las tareas programadas."""
+    list_display = ("tarea", "inicio", "duracion", "exito", "resultado", "proceso")
+    list_filter = ("tarea", "exito")
+    list_select_related = ("tarea",)
+    date_hierarchy = "inicio"
+    list_per_page = 25
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User, Group
@@ -1700,7 +1878,13 @@ from django.utils.translation import gettext_lazy as _
 
 admin.site.unregister(Group)
 
+class SuscripcionRecordatorioInline(admin.TabularInline):
+    model = SuscripcionRecordatorio
+    extra = 0
+    verbose_name_plural = 'Recordatorios por correo'
+
 class CustomUserAdmin(UserAdmin):
+    inlines = [SuscripcionRecordatorioInline]
     
     def get_fieldsets(self, request, obj=None):
         fieldsets = super().get_fieldsets(request, obj)
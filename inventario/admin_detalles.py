@@ -0,0 +1,56 @@
+# inventario/admin_detalles.py
+"""
+Modales "Ver detalles" del admin cargados bajo demanda.
+
+La columna `ver_detalles` de las listas solo emite el botón; el HTML del
+modal lo genera `detalles_html(obj)` en la URL `<pk>/detalles/` del propio
+ModelAdmin cuando se pulsa, y js/adminDetalles.js lo inserta en la página.
+Así la lista no construye ni envía los historiales de cada fila.
+"""
+from django import forms
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import Http404, HttpResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+
+class DetallesDiferidosMixin:
+    """
+    Mixin para ModelAdmin con un método `detalles_html(obj)` que devuelve el
+    HTML del modal. Se pone antes de admin.ModelAdmin en las bases.
+    """
+    def get_detalles_queryset(self, request):
+        """Queryset del endpoint de detalles; aquí van las precargas del modal."""
+        return self.get_queryset(request)
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        urls = [
+            path(
+                '<path:object_id>/detalles/',
+                self.admin_site.admin_view(self.detalles_view),
+                name='%s_%s_detalles' % info,
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def detalles_view(self, request, object_id):
+        try:
+            obj = self.get_detalles_queryset(request).get(pk=object_id)
+        except (self.model.DoesNotExist, ValidationError, ValueError):
+            raise Http404
+        if not self.has_view_permission(request, obj):
+            raise PermissionDenied
+        return HttpResponse(self.detalles_html(obj))
+
+    def ver_detalles(self, obj):
+        url = reverse(
+            'admin:%s_%s_detalles' % (self.opts.app_label, self.opts.model_name),
+            args=[obj.pk], current_app=self.admin_site.name,
+        )
+        return format_html('<button type="button" class="button" data-detalles-url="{}">Ver</button>', url)
+    ver_detalles.short_description = 'Detalles'
+
+    @property
+    def media(self):
+        return super().media + forms.Media(js=['inventario/js/adminDetalles.js'])
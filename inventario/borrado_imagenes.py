@@ -0,0 +1,142 @@
+# inventario/borrado_imagenes.py
+"""
+Cola de borrados de imágenes en Cloudinary.
+
+Las señales llaman a `encolar_borrado` en lugar de `cloudinary.uploader.destroy`:
+la fila se escribe en la transacción del guardado, así que solo existe si el
+cambio se confirmó y ningún guardado espera a la red. El comando
+`procesar_borrados_imagenes` llama a `procesar_pendientes`, que:
+
+1. reserva un lote de filas vencidas (SELECT ... FOR UPDATE SKIP LOCKED donde
+   la base lo permite) moviendo su próximo intento `RESERVA` más adelante,
+   para que otro worker no las tome mientras se habla con Cloudinary;
+2. borra el lote con una sola llamada, fuera de la transacción;
+3. elimina las filas borradas y reprograma las fallidas con espera exponencial.
+
+Con `hilos` > 1 se reservan varios lotes de `TAMANO_LOTE` (el máximo que
+acepta Cloudinary por llamada) y se envían a la vez desde un pool de hilos
+acotado. Los borrados masivos del admin encolan todas sus imágenes con un
+solo INSERT (`encolado_en_lote`) y las procesan así al terminar.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+import cloudinary.api
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import BorradoImagenPendiente
+
+TAMANO_LOTE = 100  # máximo de la API delete_resources de Cloudinary
+RESERVA = timedelta(minutes=5)
+ESPERA_BASE = timedelta(minutes=1)
+ESPERA_MAXIMA = timedelta(hours=24)
+HILOS = 4
+
+_encolado = threading.local()
+
+
+def encolar_borrado(public_id):
+    """Programa el borrado de la imagen `public_id` (no hace llamadas a Cloudinary)."""
+    if not public_id:
+        return
+    lote = getattr(_encolado, 'lote', None)
+    if lote is not None:
+        lote.append(public_id)
+    else:
+        BorradoImagenPendiente.objects.create(public_id=public_id)
+
+
+@contextmanager
+def encolado_en_lote():
+    """
+    Junta los `encolar_borrado` hechos dentro del bloque y los guarda con un
+    solo bulk_create al salir. Entrega la lista de public_id encolados.
+    """
+    if getattr(_encolado, 'lote', None) is not None:
+        yield _encolado.lote
+        return
+    _encolado.lote = lote = []
+    try:
+        yield lote
+    finally:
+        _encolado.lote = None
+    BorradoImagenPendiente.objects.bulk_create([BorradoImagenPendiente(public_id=p) for p in lote])
+
+
+def borrar_en_cloudinary(public_ids, **opciones):
+    """
+    Borra las imágenes en una sola llamada a la API de administración.
+    Devuelve los public_id que ya no existen en Cloudinary (borrados o no encontrados).
+    """
+    respuesta = cloudinary.api.delete_resources(list(public_ids), **opciones)
+    return {public_id for public_id, estado in respuesta.get('deleted', {}).items() if estado in ('deleted', 'not_found')}
+
+
+def espera_para(intentos):
+    """Espera antes del siguiente intento: 1, 2, 4, ... minutos, como mucho un día."""
+    return min(ESPERA_BASE * 2 ** (intentos - 1), ESPERA_MAXIMA)
+
+
+def _reservar_lote(ahora, limite, public_ids=None):
+    with transaction.atomic():
+        pendientes = BorradoImagenPendiente.objects.filter(proximo_intento__lte=ahora).order_by('proximo_intento')
+        if public_ids is not None:
+            pendientes = pendientes.filter(public_id__in=public_ids)
+        if connection.features.has_select_for_update_skip_locked:
+            pendientes = pendientes.select_for_update(skip_locked=True)
+        reservados = list(pendientes[:limite])
+        BorradoImagenPendiente.objects.filter(pk__in=[p.pk for p in reservados]).update(proximo_intento=ahora + RESERVA)
+    return reservados
+
+
+def _borrar_lote(borrador, public_ids):
+    """(public_id borrados, mensaje de error) de una llamada a `borrador`."""
+    try:
+        return borrador(public_ids), ''
+    except Exception as e:
+        return set(), str(e) or e.__class__.__name__
+
+
+def borrar_por_lotes(public_ids, borrador=borrar_en_cloudinary, lote=TAMANO_LOTE, hilos=HILOS):
+    """
+    Borra `public_ids` en lotes de `lote`, con hasta `hilos` llamadas a la vez.
+    Devuelve (public_id borrados, {public_id: error} de los que fallaron).
+    """
+    public_ids = sorted(set(public_ids))
+    lotes = [set(public_ids[i:i + lote]) for i in range(0, len(public_ids), lote)]
+    if not lotes:
+        return set(), {}
+    with ThreadPoolExecutor(max_workers=min(hilos, len(lotes))) as pool:
+        resultados = list(pool.map(lambda ids: _borrar_lote(borrador, ids), lotes))
+
+    borrados, errores = set(), {}
+    for ids, (ok, error) in zip(lotes, resultados):
+        borrados |= ok & ids
+        for public_id in ids - ok:
+            errores[public_id] = error or 'Cloudinary no confirmó el borrado.'
+    return borrados, errores
+
+
+def procesar_pendientes(borrador=borrar_en_cloudinary, lote=TAMANO_LOTE, hilos=1, ahora=None, public_ids=None):
+    """
+    Procesa hasta `hilos` lotes de borrados vencidos con `borrador(public_ids) -> set`.
+    Con `public_ids` procesa solo esos, todos los que estén vencidos.
+    Devuelve (cantidad borrada, cantidad reprogramada).
+    """
+    ahora = ahora or timezone.now()
+    reservados = _reservar_lote(ahora, None if public_ids is not None else lote * hilos, public_ids)
+    if not reservados:
+        return 0, 0
+
+    borrados, errores = borrar_por_lotes({p.public_id for p in reservados}, borrador, lote, hilos)
+    fallidos = [p for p in reservados if p.public_id not in borrados]
+    BorradoImagenPendiente.objects.filter(pk__in=[p.pk for p in reservados if p.public_id in borrados]).delete()
+    for pendiente in fallidos:
+        pendiente.intentos += 1
+        pendiente.proximo_intento = ahora + espera_para(pendiente.intentos)
+        pendiente.ultimo_error = errores[pendiente.public_id]
+    BorradoImagenPendiente.objects.bulk_update(fallidos, ['intentos', 'proximo_intento', 'ultimo_error'])
+    return len(reservados) - len(fallidos), len(fallidos)
@@ -0,0 +1,173 @@
+# inventario/busqueda.py
+"""
+Búsqueda global del inventario (`/buscar/`).
+
+Cada objeto de los modelos de `TIPOS_BUSQUEDA` tiene una fila en
+`EntradaBusqueda` con su texto normalizado: minúsculas y sin tildes, así
+"maiz" encuentra "Maíz" y "prenez" encuentra "Preñez". Las señales la
+mantienen al día y `reconstruir_busqueda` la rehace por completo.
+
+La consulta depende del motor:
+
+- PostgreSQL: `texto LIKE '%q%'` sobre un índice GIN `gin_trgm_ops`
+  (extensión pg_trgm) y orden por similitud de trigramas.
+- SQLite (desarrollo): tabla FTS5 con tokenizador `trigram` que refleja
+  `EntradaBusqueda` mediante triggers, ordenada por bm25.
+- Otros motores, o consultas de menos de 3 letras (no forman un trigrama):
+  `LIKE` sobre la tabla.
+
+En todos los casos es una sola consulta para todos los tipos: un
+ROW_NUMBER() por tipo limita cada grupo en la base, y los resultados que
+empiezan por el texto buscado van primero. Una consulta indexada resulta más
+barata que una por modelo en paralelo, que además necesitaría una conexión
+a la base por hilo.
+"""
+import unicodedata
+
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When, Window
+from django.db.models.functions import RowNumber
+
+from caracteristicas.models import Proveedor, Ubicacion
+
+from .models import (
+    Alimento, Combustible, ControlPlaga, EntradaBusqueda, Ganado, Mantenimiento, Medicamento, Potrero,
+    Producto, Vacuna,
+)
+
+# tipo -> (etiqueta del grupo, modelo, campos con texto; el primero es el nombre)
+TIPOS_BUSQUEDA = {
+    'alimento': ('Alimentos', Alimento, ['nombre']),
+    'combustible': ('Combustibles', Combustible, ['tipo']),
+    'control_plaga': ('Control de plagas', ControlPlaga, ['nombre_producto', 'tipo']),
+    'ganado': ('Ganado', Ganado, ['identificador', 'raza']),
+    'mantenimiento': ('Mantenimientos', Mantenimiento, ['equipo']),
+    'medicamento': ('Medicamentos', Medicamento, ['nombre']),
+    'potrero': ('Potreros', Potrero, ['nombre']),
+    'producto': ('Productos', Producto, ['nombre']),
+    'vacuna': ('Vacunas', Vacuna, ['nombre']),
+    'proveedor': ('Proveedores', Proveedor, ['nombre', 'nombre_local']),
+    'ubicacion': ('Ubicaciones', Ubicacion, ['nombre', 'barrio']),
+}
+TIPO_POR_MODELO = {modelo: tipo for tipo, (_, modelo, _) in TIPOS_BUSQUEDA.items()}
+# Tipos que tienen vista `<tipo>_detalles_json` para abrir el modal
+TIPOS_CON_DETALLE = {
+    'alimento', 'combustible', 'control_plaga', 'ganado', 'mantenimiento', 'medicamento', 'potrero',
+    'producto', 'vacuna',
+}
+
+TABLA_FTS = 'inventario_busqueda_fts'
+LONGITUD_TRIGRAMA = 3
+MAX_POR_GRUPO = 20
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes ni diéresis: 'Maíz Preñez' -> 'maiz prenez'."""
+    descompuesto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower().strip()
+
+
+def _entrada(obj, tipo):
+    _, _, campos = TIPOS_BUSQUEDA[tipo]
+    valores = [str(getattr(obj, campo) or '') for campo in campos]
+    return EntradaBusqueda(
+        tipo=tipo, object_id=obj.pk, nombre=valores[0][:255],
+        texto=normalizar(' '.join(v for v in valores if v)),
+    )
+
+
+def indexar(obj, update_fields=None):
+    """Crea o actualiza la entrada de `obj`. No hace nada si no cambió ningún campo con texto."""
+    tipo = TIPO_POR_MODELO[type(obj)]
+    if update_fields is not None and not set(update_fields) & set(TIPOS_BUSQUEDA[tipo][2]):
+        return
+    entrada = _entrada(obj, tipo)
+    EntradaBusqueda.objects.update_or_create(
+        tipo=tipo, object_id=obj.pk, defaults={'nombre': entrada.nombre, 'texto': entrada.texto},
+    )
+
+
+def desindexar(obj):
+    EntradaBusqueda.objects.filter(tipo=TIPO_POR_MODELO[type(obj)], object_id=obj.pk).delete()
+
+
+def reconstruir_indice():
+    """Rehace todas las entradas a partir de los modelos. Devuelve cuántas quedaron."""
+    EntradaBusqueda.objects.all().delete()
+    entradas = []
+    for tipo, (_, modelo, campos) in TIPOS_BUSQUEDA.items():
+        entradas.extend(_entrada(obj, tipo) for obj in modelo.objects.only(*campos).iterator())
+    EntradaBusqueda.objects.bulk_create(entradas, batch_size=500)
+    return len(entradas)
+
+
+def _candidatos_postgresql(consulta, por_grupo):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    filas = EntradaBusqueda.objects.filter(texto__contains=consulta).annotate(
+        prefijo=_prefijo(consulta),
+        similitud=TrigramWordSimilarity(consulta, 'texto'),
+    ).annotate(
+        n=Window(RowNumber(), partition_by=F('tipo'), order_by=[F('prefijo').asc(), F('similitud').desc()]),
+    ).filter(n__lte=por_grupo).values_list('tipo', 'object_id', 'nombre', 'prefijo', 'similitud')
+    # Menor es mejor, como bm25
+    return [(tipo, pk, nombre, prefijo, -similitud) for tipo, pk, nombre, prefijo, similitud in filas]
+
+
+def _candidatos_sqlite(consulta, por_grupo):
+    # bm25() no se puede usar dentro de una ventana: se calcula antes en el CTE
+    frase = '"%s"' % consulta.replace('"', '""')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH coincidencias AS MATERIALIZED ('
+            f'  SELECT rowid AS id, bm25({TABLA_FTS}) AS rango FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s'
+            f') SELECT tipo, object_id, nombre, prefijo, rango FROM ('
+            f'  SELECT e.tipo, e.object_id, e.nombre, instr(e.texto, %s) != 1 AS prefijo, c.rango,'
+            f'    ROW_NUMBER() OVER (PARTITION BY e.tipo ORDER BY instr(e.texto, %s) != 1, c.rango) AS n'
+            f'  FROM coincidencias c JOIN inventario_entradabusqueda e ON e.id = c.id'
+            f') WHERE n <= %s',
+            [frase, consulta, consulta, por_grupo],
+        )
+        return cursor.fetchall()
+
+
+def _candidatos_like(consulta, por_grupo):
+    filas = EntradaBusqueda.objects.filter(texto__contains=consulta).annotate(prefijo=_prefijo(consulta)).annotate(
+        n=Window(RowNumber(), partition_by=F('tipo'), order_by=[F('prefijo').asc(), F('nombre').asc()]),
+    ).filter(n__lte=por_grupo).values_list('tipo', 'object_id', 'nombre', 'prefijo', 'n')
+    return list(filas)
+
+
+def _prefijo(consulta):
+    """0 si el texto empieza por `consulta`, 1 si no: los prefijos van primero."""
+    return Case(When(texto__startswith=consulta, then=Value(0)), default=Value(1), output_field=IntegerField())
+
+
+def buscar(q, por_grupo=5):
+    """
+    Resultados de `q` agrupados por tipo, en una sola consulta:
+    [{'tipo', 'etiqueta', 'resultados': [{'id', 'nombre'}, ...]}, ...].
+    Cada grupo trae como mucho `por_grupo` resultados, los mejores primero,
+    y los grupos se ordenan por su mejor resultado.
+    """
+    consulta = normalizar(q)
+    if not consulta:
+        return []
+    por_grupo = max(1, min(por_grupo, MAX_POR_GRUPO))
+
+    if len(consulta) < LONGITUD_TRIGRAMA:
+        candidatos = _candidatos_like(consulta, por_grupo)
+    elif connection.vendor == 'postgresql':
+        candidatos = _candidatos_postgresql(consulta, por_grupo)
+    elif connection.vendor == 'sqlite':
+        candidatos = _candidatos_sqlite(consulta, por_grupo)
+    else:
+        candidatos = _candidatos_like(consulta, por_grupo)
+
+    grupos = {}
+    for tipo, pk, nombre, _, _ in sorted(candidatos, key=lambda fila: (fila[3], fila[4])):
+        grupos.setdefault(tipo, []).append({'id': pk, 'nombre': nombre})
+    return [
+        {'tipo': tipo, 'etiqueta': TIPOS_BUSQUEDA[tipo][0], 'resultados': resultados}
+        for tipo, resultados in grupos.items()
+    ]
@@ -0,0 +1,269 @@
+# inventario/cache.py
+"""
+Caché de las respuestas JSON de los modales (detalles y listas).
+
+Cada entrada se guarda junto con las "generaciones" de las que depende:
+
+- `obj:<tipo>:<pk>`  cambia al guardar/borrar el objeto o sus hijos
+  (p. ej. un RegistroVacunacion invalida el detalle de su Ganado).
+- `deps:<tipo>`      cambia al modificar modelos compartidos que aparecen en
+  el detalle (Proveedor, Categoria, ...), afecta a todos los objetos del tipo.
+- `lista:<tipo>`     cambia con cualquier modificación del tipo o sus
+  dependencias; invalida todas las páginas y filtros de su lista.
+
+Las generaciones y la entrada se leen con un solo `get_many`, y la entrada
+solo vale si fue calculada con las generaciones actuales. Dentro de una
+transacción, las generaciones se incrementan al escribir (para que la propia
+transacción no lea su caché vieja) y otra vez al confirmar: un lector que
+entró entre el primer incremento y el COMMIT leyó las filas anteriores y las
+guardó con la generación nueva, y el segundo incremento las descarta. Así
+una escritura concurrente no deja datos viejos en la caché.
+
+Las señales de signals.py llaman a las funciones `invalidar_*`; el código
+que usa `queryset.update()` (que no dispara señales) debe llamar a
+`invalidar` explícitamente.
+
+El backend se configura en settings.CACHES (memoria local, archivos o Redis);
+la expulsión LRU/TTL la hace el propio backend.
+"""
+import hashlib
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from caracteristicas.models import Categoria, Etiqueta, Proveedor, Ubicacion
+from .models import (
+    Alimento, Animal, Combustible, Comprador, ControlPlaga, FechaProduccion, Ganado, LugarMantenimiento,
+    Mantenimiento, Medicamento, Potrero, Producto, RegistroMedicamento, RegistroVacunacion, Vacuna,
+    VentaProducto,
+)
+
+PREFIJO = 'inventario'
+
+# tipo -> (modelo, modelos compartidos que aparecen en su detalle o su lista,
+#          {modelo hijo: campo que apunta al objeto del tipo})
+TIPOS_CACHE = {
+    'alimento': (Alimento, [Categoria, Proveedor, Ubicacion, Etiqueta], {}),
+    'combustible': (Combustible, [Proveedor, Ubicacion], {}),
+    'control-plaga': (ControlPlaga, [Proveedor, Ubicacion], {}),
+    'mantenimiento': (Mantenimiento, [LugarMantenimiento], {}),
+    'lugar-mantenimiento': (LugarMantenimiento, [Proveedor, Ubicacion], {}),
+    'potrero': (Potrero, [], {}),
+    'producto': (Producto, [Categoria, Ubicacion, Comprador], {FechaProduccion: 'producto_id', VentaProducto: 'producto_id'}),
+    'comprador': (Comprador, [], {}),
+    'medicamento': (Medicamento, [Categoria, Proveedor, Ubicacion], {}),
+    'vacuna': (Vacuna, [Proveedor, Ubicacion, Etiqueta], {}),
+    'ganado': (Ganado, [Animal, Vacuna, Medicamento], {RegistroVacunacion: 'ganado_id', RegistroMedicamento: 'ganado_id'}),
+}
+
+
+# --- Contadores de aciertos y fallos ---
+
+class Contadores:
+    """Aciertos/fallos por espacio ('detalle', 'lista'). Son por proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def sumar(self, espacio, resultado, cantidad=1):
+        if not cantidad:
+            return
+        with self._lock:
+            clave = (espacio, resultado)
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def valores(self):
+        with self._lock:
+            return dict(self._valores)
+
+    def reiniciar(self):
+        with self._lock:
+            self._valores.clear()
+
+
+contadores = Contadores()
+
+
+def metricas_prometheus():
+    """Contadores en el formato de texto de Prometheus."""
+    valores = contadores.valores()
+    lineas = []
+    for resultado, ayuda in (('hits', 'Aciertos'), ('misses', 'Fallos')):
+        nombre = f'inventario_cache_{resultado}_total'
+        lineas.append(f'# HELP {nombre} {ayuda} de la caché de vistas JSON.')
+        lineas.append(f'# TYPE {nombre} counter')
+        for espacio in ('detalle', 'lista'):
+            lineas.append(f'{nombre}{{espacio="{espacio}"}} {valores.get((espacio, resultado), 0)}')
+    return '\n'.join(lineas) + '\n'
+
+
+# --- Generaciones ---
+
+def _clave_gen(nombre):
+    return f'{PREFIJO}:gen:{nombre}'
+
+
+def _nueva_generacion(clave):
+    # Si la generación fue expulsada de la caché se parte de un valor nuevo,
+    # nunca de uno que pudiera coincidir con el de entradas antiguas.
+    valor = time.time_ns()
+    cache.add(clave, valor, timeout=None)
+    return cache.get(clave, valor)
+
+
+def _incrementar_ahora(nombres):
+    for nombre in nombres:
+        clave = _clave_gen(nombre)
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.set(clave, time.time_ns(), timeout=None)
+
+
+def _incrementar(*nombres):
+    """Incrementa las generaciones `nombres` ya y, dentro de una transacción, otra vez al confirmarla."""
+    _incrementar_ahora(nombres)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _incrementar_ahora(nombres))
+
+
+def _leer(claves, generaciones):
+    """
+    Lee en una sola ida a la caché las entradas `claves` y las generaciones.
+    Devuelve ({clave: datos válidos}, {nombre de generación: valor actual}).
+    """
+    claves_gen = {nombre: _clave_gen(nombre) for nombre in generaciones}
+    encontrados = cache.get_many(list(claves) + list(claves_gen.values()))
+    actuales = {
+        nombre: encontrados[clave] if clave in encontrados else _nueva_generacion(clave)
+        for nombre, clave in claves_gen.items()
+    }
+    validos = {}
+    for clave, nombres in claves.items():
+        entrada = encontrados.get(clave)
+        if entrada is not None and entrada[0] == tuple(actuales[n] for n in nombres):
+            validos[clave] = entrada[1]
+    return validos, actuales
+
+
+# --- Detalles ---
+
+def _clave_detalle(tipo, pk):
+    return f'{PREFIJO}:detalle:{tipo}:{pk}'
+
+
+def _gens_detalle(tipo, pk):
+    return (f'deps:{tipo}', f'obj:{tipo}:{pk}')
+
+
+def obtener_detalles(pares, construir):
+    """
+    Detalles de varios (tipo, pk). `construir(faltantes)` recibe los pares que
+    no están en caché y devuelve {(tipo, pk): datos}; lo que devuelva se guarda.
+    """
+    claves = {_clave_detalle(tipo, pk): _gens_detalle(tipo, pk) for tipo, pk in pares}
+    generaciones = {nombre for nombres in claves.values() for nombre in nombres}
+    validos, actuales = _leer(claves, generaciones)
+
+    resultado, faltantes = {}, []
+    for tipo, pk in pares:
+        clave = _clave_detalle(tipo, pk)
+        if clave in validos:
+            resultado[(tipo, pk)] = validos[clave]
+        else:
+            faltantes.append((tipo, pk))
+    contadores.sumar('detalle', 'hits', len(resultado))
+    contadores.sumar('detalle', 'misses', len(faltantes))
+
+    if faltantes:
+        construidos = construir(faltantes)
+        cache.set_many({
+            _clave_detalle(tipo, pk): (tuple(actuales[n] for n in _gens_detalle(tipo, pk)), datos)
+            for (tipo, pk), datos in construidos.items()
+        })
+        resultado.update(construidos)
+    return resultado
+
+
+def obtener_detalle(tipo, pk, construir):
+    """Detalle de un objeto; `construir()` se llama solo si no está en caché."""
+    return obtener_detalles([(tipo, pk)], lambda faltantes: {(tipo, pk): construir()})[(tipo, pk)]
+
+
+# --- Listas ---
+
+def _clave_lista(tipo, params):
+    # El orden de los parámetros no importa y un filtro vacío es como no enviarlo
+    # (`cursor` vacío sí cuenta: pide la primera página por cursor, ver paginacion.py)
+    consulta = urlencode(sorted(
+        (clave, str(valor)) for clave, valor in params.items() if valor not in ('', None) or clave == 'cursor'
+    ))
+    return f'{PREFIJO}:lista:{tipo}:{hashlib.md5(consulta.encode()).hexdigest()}'
+
+
+def obtener_lista(tipo, params, construir):
+    """
+    JSON de una página de la lista de `tipo` según sus parámetros GET `params`
+    (filtros y página). `construir()` devuelve el JSON y se llama solo si no
+    está en caché.
+    """
+    clave = _clave_lista(tipo, params)
+    generacion = f'lista:{tipo}'
+    validos, actuales = _leer({clave: (generacion,)}, [generacion])
+    if clave in validos:
+        contadores.sumar('lista', 'hits')
+        return validos[clave]
+
+    contadores.sumar('lista', 'misses')
+    contenido = construir()
+    cache.set(clave, ((actuales[generacion],), contenido))
+    return contenido
+
+
+def cache_compartida():
+    """Indica si la caché la comparten los procesos (Redis, archivos) y no es la memoria de cada uno."""
+    backend = settings.CACHES['default']['BACKEND']
+    return not backend.endswith(('.locmem.LocMemCache', '.dummy.DummyCache'))
+
+
+# --- Invalidación ---
+
+def invalidar(tipo, pk):
+    """Invalida el detalle de un objeto y la lista de su tipo."""
+    _incrementar(f'obj:{tipo}:{pk}', f'lista:{tipo}')
+
+
+def invalidar_tipo(tipo):
+    """Invalida todos los detalles y la lista de un tipo."""
+    _incrementar(f'deps:{tipo}', f'lista:{tipo}')
+
+
+def invalidar_por_instancia(sender, instance):
+    """Invalida lo que depende de `instance`, según TIPOS_CACHE. Lo usan las señales."""
+    for tipo, (modelo, dependencias, hijos) in TIPOS_CACHE.items():
+        if sender is modelo:
+            invalidar(tipo, instance.pk)
+        if sender in dependencias:
+            invalidar_tipo(tipo)
+        if sender in hijos:
+            pk_padre = getattr(instance, hijos[sender])
+            if pk_padre is not None:
+                invalidar(tipo, pk_padre)
+
+
+def invalidar_por_m2m(sender, instance, reverse, model, pk_set):
+    """Invalida los objetos afectados al cambiar una relación ManyToMany."""
+    for tipo, (modelo, _, _) in TIPOS_CACHE.items():
+        if not reverse and isinstance(instance, modelo):
+            invalidar(tipo, instance.pk)
+        elif reverse and model is modelo:
+            if pk_set:
+                for pk in pk_set:
+                    invalidar(tipo, pk)
+            else:
+                invalidar_tipo(tipo)
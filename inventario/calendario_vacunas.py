@@ -0,0 +1,224 @@
+# inventario/calendario_vacunas.py
+"""
+Calendario de vacunación de todo el ganado vivo.
+
+Una dosis pendiente sale de:
+
+- `registro`: la última aplicación de cada vacuna a cada animal, con su
+  `fecha_proxima_dosis`;
+- `refuerzo`: la última aplicación sin `fecha_proxima_dosis`, más el
+  intervalo de `Vacuna.dosis_edad` ("cada 6 meses", "anual", ...);
+- `edad`: animales que nunca recibieron una vacuna disponible cuya
+  `dosis_edad` indica la edad de la primera dosis ("a los 3 meses");
+- `peso`: lo mismo con un peso mínimo en `dosis_peso` ("desde 200 kg"). La
+  báscula no dice cuándo se alcanzó, así que la dosis queda para hoy.
+
+Las reglas son texto libre; `regla_de` entiende esas formas y lo que no
+entiende se ignora. Los intervalos se convierten, por vacuna, en fechas de
+corte sobre `fecha_aplicacion` y `fecha_nacimiento`, así la base filtra
+con comparaciones simples (sumar meses no es igual en todos los motores) y
+todo el rebaño sale de una sola consulta (un UNION ALL: las aplicaciones
+más la primera dosis de cada vacuna con regla). Python calcula la fecha
+exacta, descarta lo que el margen dejó pasar y ordena.
+"""
+import datetime
+import re
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import DateField, Exists, F, IntegerField, OuterRef, Q, Value
+from django.utils import timezone
+
+from .busqueda import normalizar
+from .models import Ganado, RegistroVacunacion, Vacuna
+
+# Los cortes se calculan restando meses, que no siempre deshace una suma (31/01 + 1 mes = 28/02)
+MARGEN = datetime.timedelta(days=3)
+
+_UNIDADES = {'dia': 'days', 'semana': 'weeks', 'mes': 'months', 'ano': 'years'}
+_CANTIDAD_Y_UNIDAD = r'(\d+)\s*(dia|semana|mes|ano)'
+_INTERVALO = re.compile(r'cada\s+(\d+\s*)?(dia|semana|mes|ano)')
+_EDAD_INICIAL = re.compile(r'(?:a\s+los|desde\s+los|a\s+partir\s+de\s+los|desde)\s+' + _CANTIDAD_Y_UNIDAD)
+_PESO_MINIMO = re.compile(r'(\d+(?:[.,]\d+)?)\s*(?:kg|kilo)')
+_PERIODOS = {
+    'anual': relativedelta(years=1), 'semestral': relativedelta(months=6),
+    'trimestral': relativedelta(months=3), 'mensual': relativedelta(months=1),
+}
+
+
+class ReglaDosis(NamedTuple):
+    intervalo: Optional[relativedelta] = None
+    edad_inicial: Optional[relativedelta] = None
+    peso_minimo: Optional[Decimal] = None
+
+
+class DosisProgramada(NamedTuple):
+    ganado_id: int
+    identificador: str
+    vacuna_id: int
+    vacuna: str
+    fecha: datetime.date
+    estado: str  # 'vencida' o 'pendiente'
+    origen: str  # 'registro', 'refuerzo', 'edad' o 'peso'
+    ultima_aplicacion: Optional[datetime.date] = None
+
+
+def _duracion(cantidad, unidad):
+    return relativedelta(**{_UNIDADES[unidad]: int(cantidad or 1)})
+
+
+def regla_de(dosis_edad, dosis_peso):
+    """Regla de una vacuna a partir de sus textos de dosis por edad y por peso; None si no dicen nada."""
+    edad, peso = normalizar(dosis_edad), normalizar(dosis_peso)
+    intervalo = next((periodo for palabra, periodo in _PERIODOS.items() if palabra in edad), None)
+    if coincidencia := _INTERVALO.search(edad):
+        intervalo = _duracion(*coincidencia.groups())
+    coincidencia = _EDAD_INICIAL.search(edad)
+    edad_inicial = _duracion(*coincidencia.groups()) if coincidencia else None
+    coincidencia = _PESO_MINIMO.search(peso)
+    peso_minimo = Decimal(coincidencia.group(1).replace(',', '.')) if coincidencia else None
+    regla = ReglaDosis(intervalo, edad_inicial, peso_minimo)
+    return regla if any(regla) else None
+
+
+def _en_rango(campo, desde, hasta, hoy, vencidas, desfase=relativedelta()):
+    """Filas cuya fecha `campo` + `desfase` puede caer en [desde, hasta], o antes de hoy con `vencidas`."""
+    rango = Q(**{f'{campo}__gte': desde - desfase - MARGEN})
+    if vencidas:
+        rango |= Q(**{f'{campo}__lt': hoy - desfase + MARGEN})
+    return Q(**{f'{campo}__lte': hasta - desfase + MARGEN}) & rango
+
+
+def ultimas_aplicaciones():
+    """La aplicación más reciente de cada vacuna a cada animal vivo."""
+    posterior = RegistroVacunacion.objects.filter(ganado=OuterRef('ganado'), vacuna=OuterRef('vacuna')).filter(
+        Q(fecha_aplicacion__gt=OuterRef('fecha_aplicacion'))
+        | Q(fecha_aplicacion=OuterRef('fecha_aplicacion'), pk__gt=OuterRef('pk')),
+    )
+    return RegistroVacunacion.objects.filter(~Exists(posterior), ganado__estado=Ganado.EstadoAnimal.VIVO)
+
+
+def sin_aplicar(vacuna_id):
+    """Animales vivos que nunca recibieron la vacuna."""
+    aplicada = RegistroVacunacion.objects.filter(ganado=OuterRef('pk'), vacuna_id=vacuna_id)
+    return Ganado.objects.filter(~Exists(aplicada), estado=Ganado.EstadoAnimal.VIVO)
+
+
+# Columnas comunes de las partes del UNION
+_COLUMNAS = ['c_ganado', 'c_identificador', 'c_peso', 'c_vacuna', 'c_base', 'c_proxima', 'c_primera']
+
+
+def _consulta(reglas, desde, hasta, hoy, vencidas, vacuna_id=None):
+    aplicaciones = ultimas_aplicaciones()
+    if vacuna_id is not None:
+        aplicaciones = aplicaciones.filter(vacuna_id=vacuna_id)
+    filtro = Q(fecha_proxima_dosis__isnull=False) & _en_rango('fecha_proxima_dosis', desde, hasta, hoy, vencidas)
+    for pk, (_, regla) in reglas.items():
+        if regla.intervalo:
+            filtro |= Q(fecha_proxima_dosis__isnull=True, vacuna_id=pk) & _en_rango(
+                'fecha_aplicacion', desde, hasta, hoy, vencidas, regla.intervalo,
+            )
+    partes = [aplicaciones.filter(filtro).annotate(
+        c_ganado=F('ganado_id'), c_identificador=F('ganado__identificador'), c_peso=F('ganado__peso_kg'),
+        c_vacuna=F('vacuna_id'), c_base=F('fecha_aplicacion'), c_proxima=F('fecha_proxima_dosis'),
+        c_primera=Value(False),
+    ).order_by().values_list(*_COLUMNAS)]
+
+    for pk, (disponible, regla) in reglas.items():
+        con_primera_dosis = regla.edad_inicial or regla.peso_minimo is not None
+        if not disponible or not con_primera_dosis or vacuna_id not in (None, pk):
+            continue
+        primera = Q(pk__in=[])
+        if regla.edad_inicial:
+            primera |= _en_rango('fecha_nacimiento', desde, hasta, hoy, vencidas, regla.edad_inicial)
+        if regla.peso_minimo is not None and desde <= hoy <= hasta:
+            primera |= Q(peso_kg__gte=regla.peso_minimo)
+        partes.append(sin_aplicar(pk).filter(primera).annotate(
+            c_ganado=F('pk'), c_identificador=F('identificador'), c_peso=F('peso_kg'),
+            c_vacuna=Value(pk, output_field=IntegerField()), c_base=F('fecha_nacimiento'),
+            c_proxima=Value(None, output_field=DateField()), c_primera=Value(True),
+        ).order_by().values_list(*_COLUMNAS))
+    return partes[0].union(*partes[1:], all=True) if len(partes) > 1 else partes[0]
+
+
+def _dosis(fila, reglas, hoy):
+    """(fecha, origen, última aplicación) de una fila del UNION, o None si no corresponde dosis."""
+    _, _, peso, vacuna_id, base, proxima, primera = fila
+    if not primera and proxima is not None:
+        return proxima, 'registro', base
+    regla = reglas.get(vacuna_id, (True, ReglaDosis()))[1]
+    if not primera:
+        return (base + regla.intervalo, 'refuerzo', base) if regla.intervalo else None
+    fecha = base + regla.edad_inicial if regla.edad_inicial else None
+    con_peso = regla.peso_minimo is not None and peso is not None and Decimal(str(peso)) >= regla.peso_minimo
+    if con_peso and (fecha is None or fecha > hoy):
+        return hoy, 'peso', None
+    return (fecha, 'edad', None) if fecha else None
+
+
+def calendario(desde=None, hasta=None, vencidas=True, vacuna_id=None, hoy=None):
+    """
+    Dosis de todo el ganado vivo con fecha en [desde, hasta] y, con
+    `vencidas`, también las atrasadas (antes de hoy). Lista de
+    `DosisProgramada` ordenada por fecha, animal y vacuna.
+    """
+    hoy = hoy or timezone.localdate()
+    desde = desde or hoy
+    hasta = hasta or hoy + datetime.timedelta(days=30)
+    vacunas = {pk: (nombre, disponible, regla_de(edad, peso)) for pk, nombre, disponible, edad, peso in Vacuna.objects.values_list(
+        'pk', 'nombre', 'disponible', 'dosis_edad', 'dosis_peso',
+    )}
+    reglas = {pk: (disponible, regla) for pk, (_, disponible, regla) in vacunas.items() if regla}
+
+    dosis = []
+    for fila in _consulta(reglas, desde, hasta, hoy, vencidas, vacuna_id):
+        calculada = _dosis(fila, reglas, hoy)
+        if calculada is None:
+            continue
+        fecha, origen, ultima = calculada
+        if not (desde <= fecha <= hasta or (vencidas and fecha < hoy and fecha <= hasta)):
+            continue
+        dosis.append(DosisProgramada(
+            fila[0], fila[1], fila[3], vacunas[fila[3]][0], fecha, 'vencida' if fecha < hoy else 'pendiente', origen, ultima,
+        ))
+    return sorted(dosis, key=lambda d: (d.fecha, d.identificador, d.vacuna))
+
+
+def _texto_ical(texto):
+    return str(texto).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _plegar(linea):
+    """Parte las líneas de más de 75 octetos, como pide RFC 5545."""
+    partes, actual = [], ''
+    for caracter in linea:
+        if len((actual + caracter).encode()) > (75 if not partes else 74):
+            partes.append(actual)
+            actual = ''
+        actual += caracter
+    partes.append(actual)
+    return '\r\n '.join(partes)
+
+
+def icalendar(dosis, ahora=None):
+    """Las dosis como calendario iCalendar (RFC 5545), un evento de día completo por dosis."""
+    marca = (ahora or timezone.now()).astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lineas = [
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Finca La Matutina//Calendario de vacunacion//ES',
+        'CALSCALE:GREGORIAN', 'X-WR-CALNAME:Vacunación del ganado',
+    ]
+    for d in dosis:
+        estado = 'Vencida' if d.estado == 'vencida' else 'Pendiente'
+        lineas += [
+            'BEGIN:VEVENT',
+            f'UID:vacuna-{d.ganado_id}-{d.vacuna_id}-{d.fecha:%Y%m%d}@finca-la-matutina',
+            f'DTSTAMP:{marca}',
+            f'DTSTART;VALUE=DATE:{d.fecha:%Y%m%d}',
+            f'DTEND;VALUE=DATE:{d.fecha + datetime.timedelta(days=1):%Y%m%d}',
+            f'SUMMARY:{_texto_ical(f"{d.vacuna} - {d.identificador}")}',
+            f'DESCRIPTION:{_texto_ical(f"{estado} ({d.origen}).")}',
+            'END:VEVENT',
+        ]
+    lineas.append('END:VCALENDAR')
+    return '\r\n'.join(_plegar(linea) for linea in lineas) + '\r\n'
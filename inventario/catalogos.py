@@ -0,0 +1,65 @@
+# inventario/catalogos.py
+"""
+Catálogos de referencia que usan los formularios de los modales
+(categorías, etiquetas, proveedores, ubicaciones, compradores, ...).
+
+Se sirven todos juntos en /catalogos/ con un ETag calculado a partir de
+`VersionCatalogo`, que las señales incrementan al guardar o borrar los
+modelos de origen. Los detalles de cada ítem ya no los incluyen.
+"""
+import hashlib
+
+from caracteristicas.models import Categoria, Etiqueta, Proveedor, Ubicacion
+from .models import Comprador, Medicamento, Potrero, Vacuna, VersionCatalogo
+
+CONSTRUCTORES_CATALOGO = {
+    'categorias': lambda: list(Categoria.objects.values('id', 'nombre')),
+    'etiquetas_principales': lambda: list(Etiqueta.objects.filter(parent__isnull=True).values('id', 'nombre')),
+    'proveedores': lambda: list(Proveedor.objects.values('id', 'nombre')),
+    'ubicaciones': lambda: list(Ubicacion.objects.values('id', 'nombre')),
+    'compradores': lambda: list(Comprador.objects.values('id', 'nombre')),
+    'vacunas_disponibles': lambda: list(Vacuna.objects.filter(disponible=True).values('id', 'nombre')),
+    'medicamentos_disponibles': lambda: list(Medicamento.objects.disponibles().values('id', 'nombre')),
+    'potreros': lambda: list(Potrero.objects.values('id', 'nombre')),
+}
+
+# Catálogos cuya versión cambia al guardar o borrar cada modelo.
+CATALOGOS_POR_MODELO = {
+    Categoria: ['categorias'],
+    Etiqueta: ['etiquetas_principales'],
+    Proveedor: ['proveedores'],
+    Ubicacion: ['ubicaciones'],
+    Comprador: ['compradores'],
+    Vacuna: ['vacunas_disponibles'],
+    Medicamento: ['medicamentos_disponibles'],
+    Potrero: ['potreros'],
+}
+
+
+class Catalogos:
+    """Carga cada catálogo la primera vez que se pide y lo reutiliza durante la petición."""
+
+    def __init__(self):
+        self._cargados = {}
+
+    def __getitem__(self, nombre):
+        if nombre not in self._cargados:
+            self._cargados[nombre] = CONSTRUCTORES_CATALOGO[nombre]()
+        return self._cargados[nombre]
+
+    def cargados(self):
+        return dict(self._cargados)
+
+
+def marcar_modificado(*nombres):
+    """Incrementa la versión de los catálogos indicados."""
+    for nombre in nombres:
+        VersionCatalogo.incrementar(nombre)
+
+
+def etag_catalogos(nombres=None):
+    """ETag de los catálogos indicados (todos por defecto), con una sola consulta."""
+    nombres = sorted(nombres or CONSTRUCTORES_CATALOGO)
+    versiones = dict(VersionCatalogo.objects.filter(clave__in=nombres).values_list('clave', 'version'))
+    firma = ';'.join(f'{nombre}:{versiones.get(nombre, 0)}' for nombre in nombres)
+    return hashlib.md5(firma.encode()).hexdigest()
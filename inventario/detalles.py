@@ -0,0 +1,435 @@
+# inventario/detalles.py
+"""
+Serialización de los detalles que consumen los modales (`*_detalles_json`).
+
+Cada tipo declara el queryset con sus relaciones precargadas y la función que
+convierte un objeto en el diccionario del modal, así la vista individual y la
+vista por lotes comparten el mismo código. Los catálogos de los formularios
+no viajan con el detalle: se piden aparte a /catalogos/ (ver catalogos.py) y
+`claves_catalogo` indica con qué clave los espera cada modal.
+"""
+from django.db.models import Prefetch
+
+from .cache import obtener_detalles
+from .imagenes import url_miniatura
+from .models import (
+    Alimento, Combustible, Comprador, ControlPlaga, Ganado, LugarMantenimiento, Mantenimiento,
+    Medicamento, Potrero, Producto, RegistroMedicamento, RegistroVacunacion, Vacuna, VentaProducto,
+)
+
+# Máximo de ítems que acepta una petición por lotes.
+MAX_ITEMS_LOTE = 100
+
+
+def get_safe_image_url(image_field):
+    """
+    Safely gets the image URL from a CloudinaryField.
+    Returns None if the image does not exist or if there's an error generating the URL.
+    """
+    if not image_field:
+        return None
+    try:
+        return image_field.url
+    except Exception:
+        # Could log the error here if needed
+        return None
+
+
+# --- Serializadores por tipo ---
+
+def _proveedores_data(proveedores):
+    return [{
+        'nombre': p.nombre, 'nombre_local': p.nombre_local, 'correo': p.correo_electronico,
+        'telefono': p.telefono, 'imagen_url': get_safe_image_url(p.imagen)
+    } for p in proveedores]
+
+
+def _ubicaciones_data(ubicaciones):
+    return [{
+        'nombre': u.nombre, 'barrio': u.barrio, 'direccion': u.direccion,
+        'link': u.link, 'imagen_url': get_safe_image_url(u.imagen)
+    } for u in ubicaciones]
+
+
+def _choices_data(choices):
+    return [{'value': choice[0], 'label': choice[1]} for choice in choices]
+
+
+def serializar_alimento(alimento):
+    estado = "Disponible" if alimento.cantidad_kg_restante > 0 else "Agotado"
+    return {
+        'id': alimento.id,
+        'nombre': alimento.nombre,
+        'cantidad_ingresada': str(alimento.cantidad_kg_ingresada),
+        'cantidad_usada': str(alimento.cantidad_kg_usada),
+        'cantidad_restante': str(alimento.cantidad_kg_restante),
+        'precio': str(alimento.precio),
+        'estado': estado,
+        'fecha_compra': alimento.fecha_compra.strftime('%d/%m/%Y'),
+        'fecha_vencimiento': alimento.fecha_vencimiento.strftime('%d/%m/%Y'),
+        'descripcion': alimento.descripcion or "No hay descripción.",
+        'imagen_url': get_safe_image_url(alimento.imagen),
+        'thumb_url': url_miniatura(alimento.imagen, 'modal'),
+        'categoria': {'id': alimento.categoria.id, 'nombre': alimento.categoria.nombre} if alimento.categoria else None,
+        'proveedores': _proveedores_data(alimento.proveedores.all()),
+        'ubicaciones': _ubicaciones_data(alimento.ubicaciones.all()),
+        'etiquetas': [{'id': e.id, 'nombre': e.nombre, 'parent_id': e.parent_id} for e in alimento.etiquetas.all()],
+    }
+
+
+def serializar_combustible(combustible):
+    return {
+        'id': combustible.id,
+        'tipo': combustible.tipo,
+        'cantidad_galones_ingresada': str(combustible.cantidad_galones_ingresada),
+        'cantidad_galones_usados': str(combustible.cantidad_galones_usados),
+        'cantidad_galones_restantes': str(combustible.cantidad_galones_restantes),
+        'precio': str(combustible.precio),
+        'proveedores': _proveedores_data(combustible.proveedores.all()),
+        'ubicaciones': _ubicaciones_data(combustible.ubicaciones.all()),
+        'descripcion': combustible.descripcion or "No hay descripción.",
+        'imagen_url': get_safe_image_url(combustible.imagen),
+        'thumb_url': url_miniatura(combustible.imagen, 'modal'),
+    }
+
+
+def serializar_control_plaga(item):
+    return {
+        'id': item.id,
+        'nombre': item.nombre_producto,
+        'tipo': item.tipo,
+        'cantidad_ingresada': str(item.cantidad_ingresada),
+        'cantidad_usada': str(item.cantidad_usada),
+        'cantidad_restante': str(item.cantidad_restante),
+        'unidad_medida': item.get_unidad_medida_display(),
+        'precio': str(item.precio),
+        'proveedores': _proveedores_data(item.proveedores.all()),
+        'ubicaciones': _ubicaciones_data(item.ubicaciones.all()),
+        'fecha_compra': item.fecha_compra.strftime('%d/%m/%Y'),
+        'fecha_vencimiento': item.fecha_vencimiento.strftime('%d/%m/%Y'),
+        'descripcion': item.descripcion or "No hay descripción.",
+        'imagen_url': get_safe_image_url(item.imagen),
+        'thumb_url': url_miniatura(item.imagen, 'modal'),
+    }
+
+
+def serializar_mantenimiento(mantenimiento):
+    return {
+        'id': mantenimiento.id,
+        'equipo': mantenimiento.equipo,
+        'fecha_ultimo_mantenimiento': mantenimiento.fecha_ultimo_mantenimiento.strftime('%Y-%m-%d'),
+        'fecha_proximo_mantenimiento': mantenimiento.fecha_proximo_mantenimiento.strftime('%Y-%m-%d'),
+        'completado': mantenimiento.completado,
+        'descripcion': mantenimiento.descripcion,
+        'lugares_mantenimiento': [
+            {'id': lugar.id, 'nombre': lugar.nombre_lugar} for lugar in mantenimiento.lugares_mantenimiento.all()
+        ],
+        'imagen_url': get_safe_image_url(mantenimiento.imagen),
+        'thumb_url': url_miniatura(mantenimiento.imagen, 'modal'),
+    }
+
+
+def serializar_lugar_mantenimiento(lugar):
+    return {
+        'nombre_lugar': lugar.nombre_lugar,
+        'nombre_empresa': lugar.nombre_empresa,
+        'correo': lugar.correo,
+        'numero': lugar.numero,
+        'descripcion': lugar.descripcion,
+        'proveedores': [{'nombre': p.nombre} for p in lugar.proveedores.all()],
+        'ubicaciones': [{'link': u.link} for u in lugar.ubicaciones.all() if u.link],
+    }
+
+
+def serializar_potrero(potrero):
+    return {
+        'id': potrero.id,
+        'nombre': potrero.nombre,
+        'area_hectareas': str(potrero.area_hectareas),
+        'empastado': potrero.empastado,
+        'fumigado': potrero.fumigado,
+        'rozado': potrero.rozado,
+        'fecha_proximo_empaste': potrero.fecha_proximo_empaste.strftime('%Y-%m-%d') if potrero.fecha_proximo_empaste else '',
+        'fecha_proxima_fumigacion': potrero.fecha_proxima_fumigacion.strftime('%Y-%m-%d') if potrero.fecha_proxima_fumigacion else '',
+        'fecha_proximo_rozado': potrero.fecha_proximo_rozado.strftime('%Y-%m-%d') if potrero.fecha_proximo_rozado else '',
+        'intercambio_con_potrero_id': potrero.intercambio_con_potrero_id,
+        'fecha_intercambio': potrero.fecha_intercambio.strftime('%Y-%m-%d') if potrero.fecha_intercambio else '',
+        'descripcion': potrero.descripcion,
+        'imagen_url': get_safe_image_url(potrero.imagen),
+        'thumb_url': url_miniatura(potrero.imagen, 'modal'),
+    }
+
+
+def serializar_producto(producto):
+    ventas_info = [{
+        'comprador_id': venta.comprador.id,
+        'comprador_nombre': venta.comprador.nombre,
+        'fecha_venta': venta.fecha_venta.strftime('%Y-%m-%d'),
+        'valor_compra': str(venta.valor_compra),
+        'valor_abono': str(venta.valor_abono)
+    } for venta in producto.ventaproducto_set.all()]
+
+    return {
+        'id': producto.id,
+        'nombre': producto.nombre,
+        'categoria': {'nombre': producto.categoria.nombre} if producto.categoria else None,
+        'descripcion': producto.descripcion or "No hay descripción.",
+        'cantidad': str(producto.cantidad),
+        'unidad_medida': producto.get_unidad_medida_display(),
+        'estado': producto.estado,
+        'precio': str(producto.precio),
+        'precio_total': str(producto.precio_total),
+        'fechas_produccion': [f.fecha.strftime('%Y-%m-%d') for f in producto.fechas_produccion.all()],
+        'ventas': ventas_info,
+        'ubicaciones': _ubicaciones_data(producto.ubicaciones.all()),
+        'imagen_url': get_safe_image_url(producto.imagen),
+        'thumb_url': url_miniatura(producto.imagen, 'modal'),
+    }
+
+
+def serializar_comprador(comprador):
+    return {
+        'nombre': comprador.nombre,
+        'telefono': comprador.telefono
+    }
+
+
+def serializar_medicamento(medicamento):
+    return {
+        'id': medicamento.id,
+        'nombre': medicamento.nombre,
+        'cantidad_ingresada': str(medicamento.cantidad_ingresada),
+        'cantidad_usada': str(medicamento.cantidad_usada),
+        'cantidad_restante': str(medicamento.cantidad_restante),
+        'categoria': {'nombre': medicamento.categoria.nombre} if medicamento.categoria else None,
+        'precio': str(medicamento.precio),
+        'proveedores': _proveedores_data(medicamento.proveedores.all()),
+        'ubicaciones': _ubicaciones_data(medicamento.ubicaciones.all()),
+        'fecha_compra': medicamento.fecha_compra.strftime('%Y-%m-%d'),
+        'fecha_ingreso': medicamento.fecha_ingreso.strftime('%Y-%m-%d'),
+        'fecha_vencimiento': medicamento.fecha_vencimiento.strftime('%Y-%m-%d'),
+        'imagen_url': get_safe_image_url(medicamento.imagen),
+        'thumb_url': url_miniatura(medicamento.imagen, 'modal'),
+        'descripcion': medicamento.descripcion or "No hay descripción.",
+        'unidad_medida': medicamento.get_unidad_medida_display(),
+    }
+
+
+def serializar_vacuna(vacuna):
+    return {
+        'id': vacuna.id,
+        'nombre': vacuna.nombre,
+        'tipo': vacuna.tipo,
+        'cantidad': str(vacuna.cantidad),
+        'unidad_medida': vacuna.get_unidad_medida_display(),
+        'dosis_crecimiento': vacuna.dosis_crecimiento,
+        'dosis_edad': vacuna.dosis_edad,
+        'dosis_peso': vacuna.dosis_peso,
+        'descripcion': vacuna.descripcion or "No hay descripción.",
+        'disponible': vacuna.disponible,
+        'precio': str(vacuna.precio),
+        'fecha_compra': vacuna.fecha_compra.strftime('%d/%m/%Y') if vacuna.fecha_compra else '',
+        'fecha_vencimiento': vacuna.fecha_vencimiento.strftime('%d/%m/%Y') if vacuna.fecha_vencimiento else '',
+        'proveedores': [{'id': p.id, 'nombre': p.nombre} for p in vacuna.proveedores.all()],
+        'ubicaciones': [{'id': u.id, 'nombre': u.nombre} for u in vacuna.ubicaciones.all()],
+        'etiquetas': [{'id': e.id, 'nombre': e.nombre} for e in vacuna.etiquetas.all()],
+        'imagen_url': get_safe_image_url(vacuna.imagen),
+        'thumb_url': url_miniatura(vacuna.imagen, 'modal'),
+    }
+
+
+def serializar_ganado(ganado):
+    historial_vacunacion = []
+    for reg in ganado.vacunaciones.all():
+        # Verificamos que la vacuna asociada existe antes de usarla
+        if hasattr(reg, 'vacuna') and reg.vacuna:
+            historial_vacunacion.append({
+                'id': reg.id, 'vacuna_id': reg.vacuna.id, 'vacuna_nombre': reg.vacuna.nombre,
+                'fecha_aplicacion': reg.fecha_aplicacion.strftime('%d/%m/%Y'),
+                'fecha_proxima_dosis': reg.fecha_proxima_dosis.strftime('%d/%m/%Y') if reg.fecha_proxima_dosis else 'N/A',
+                'notas': reg.notas or 'No hay notas.',
+            })
+        else:
+            historial_vacunacion.append({
+                'id': reg.id, 'vacuna_id': None, 'vacuna_nombre': f"Vacuna eliminada (ID: {reg.vacuna_id})",
+                'fecha_aplicacion': reg.fecha_aplicacion.strftime('%d/%m/%Y'),
+                'fecha_proxima_dosis': reg.fecha_proxima_dosis.strftime('%d/%m/%Y') if reg.fecha_proxima_dosis else 'N/A',
+                'notas': 'Error: La vacuna asociada a este registro ya no existe.',
+            })
+
+    historial_medicamentos = []
+    for reg in ganado.medicamentos_aplicados.all():
+        if hasattr(reg, 'medicamento') and reg.medicamento:
+            historial_medicamentos.append({
+                'id': reg.id, 'medicamento_id': reg.medicamento.id, 'medicamento_nombre': reg.medicamento.nombre,
+                'fecha_aplicacion': reg.fecha_aplicacion.strftime('%d/%m/%Y'),
+                'notas': reg.notas or 'No hay notas.',
+            })
+        else:
+            historial_medicamentos.append({
+                'id': reg.id, 'medicamento_id': None, 'medicamento_nombre': f"Medicamento eliminado (ID: {reg.medicamento_id})",
+                'fecha_aplicacion': reg.fecha_aplicacion.strftime('%d/%m/%Y'),
+                'notas': 'Error: El medicamento asociado a este registro ya no existe.',
+            })
+
+    return {
+        'id': ganado.id, 'identificador': ganado.identificador,
+        'animal': ganado.animal.nombre if ganado.animal else 'N/A', 'raza': ganado.raza,
+        'genero': ganado.get_genero_display(), 'peso_kg': str(ganado.peso_kg),
+        'edad': ganado.edad if ganado.fecha_nacimiento else 'N/A',
+        'fecha_nacimiento': ganado.fecha_nacimiento.strftime('%Y-%m-%d') if ganado.fecha_nacimiento else '',
+        'estado_salud': ganado.estado_salud,
+        # Leemos del modelo (peñe) y lo asignamos a la clave del JSON (preñez)
+        'preñez': ganado.peñe,
+        'descripcion': ganado.descripcion or "No hay descripción.",
+        'imagen_url': get_safe_image_url(ganado.imagen),
+        'thumb_url': url_miniatura(ganado.imagen, 'modal'),
+        'historial_vacunacion': historial_vacunacion,
+        'historial_medicamentos': historial_medicamentos,
+        'crecimiento': ganado.crecimiento,
+        'fecha_fallecimiento': ganado.fecha_fallecimiento.strftime('%Y-%m-%d') if ganado.fecha_fallecimiento else '',
+        'fecha_venta': ganado.fecha_venta.strftime('%Y-%m-%d') if ganado.fecha_venta else '',
+        'valor_venta': str(ganado.valor_venta) if ganado.valor_venta is not None else '',
+        'razon_venta': ganado.razon_venta or '',
+        'razon_fallecimiento': ganado.razon_fallecimiento or '',
+        'comprador': ganado.comprador or '',
+        'comprador_telefono': ganado.comprador_telefono or '',
+        'fecha_preñez': ganado.fecha_peñe.strftime('%Y-%m-%d') if ganado.fecha_peñe else '',
+        'descripcion_preñez': ganado.descripcion_peñe or '',
+        # Las opciones son constantes del modelo, no necesitan consulta
+        'todos_los_estados_salud': _choices_data(Ganado.EstadoSalud.choices),
+        'todos_los_tipos_preñez': _choices_data(Ganado.TipoPrenez.choices),
+        'todos_los_estados': _choices_data(Ganado.EstadoAnimal.choices),
+        'todos_los_crecimientos': _choices_data(Ganado.Crecimiento.choices),
+    }
+
+
+class TipoDetalle:
+    """
+    Describe un tipo de detalle: queryset con precargas, serializador y
+    catálogos que el modal espera, como {clave en el JSON: nombre del catálogo}.
+    """
+
+    def __init__(self, queryset, serializar, claves_catalogo=None):
+        self._queryset = queryset
+        self.serializar = serializar
+        self.claves_catalogo = claves_catalogo or {}
+
+    def queryset(self):
+        return self._queryset()
+
+
+TIPOS_DETALLE = {
+    'alimento': TipoDetalle(
+        lambda: Alimento.objects.select_related('categoria').prefetch_related('etiquetas', 'proveedores', 'ubicaciones'),
+        serializar_alimento,
+        {'todas_las_etiquetas_principales': 'etiquetas_principales', 'todas_las_categorias': 'categorias'},
+    ),
+    'combustible': TipoDetalle(
+        lambda: Combustible.objects.prefetch_related('proveedores', 'ubicaciones'),
+        serializar_combustible,
+    ),
+    'control-plaga': TipoDetalle(
+        lambda: ControlPlaga.objects.prefetch_related('proveedores', 'ubicaciones'),
+        serializar_control_plaga,
+    ),
+    'mantenimiento': TipoDetalle(
+        lambda: Mantenimiento.objects.prefetch_related('lugares_mantenimiento'),
+        serializar_mantenimiento,
+    ),
+    'lugar-mantenimiento': TipoDetalle(
+        lambda: LugarMantenimiento.objects.prefetch_related('proveedores', 'ubicaciones'),
+        serializar_lugar_mantenimiento,
+    ),
+    'potrero': TipoDetalle(
+        lambda: Potrero.objects.all(),
+        serializar_potrero,
+        {'otros_potreros': 'potreros'},
+    ),
+    'producto': TipoDetalle(
+        lambda: Producto.objects.select_related('categoria').prefetch_related(
+            'fechas_produccion', 'ubicaciones',
+            Prefetch('ventaproducto_set', queryset=VentaProducto.objects.select_related('comprador')),
+        ),
+        serializar_producto,
+        {'todos_los_compradores': 'compradores'},
+    ),
+    'comprador': TipoDetalle(
+        lambda: Comprador.objects.all(),
+        serializar_comprador,
+    ),
+    'medicamento': TipoDetalle(
+        lambda: Medicamento.objects.select_related('categoria').prefetch_related('proveedores', 'ubicaciones'),
+        serializar_medicamento,
+        {'all_proveedores': 'proveedores', 'all_ubicaciones': 'ubicaciones', 'all_etiquetas': 'etiquetas_principales'},
+    ),
+    'vacuna': TipoDetalle(
+        lambda: Vacuna.objects.prefetch_related('proveedores', 'ubicaciones', 'etiquetas'),
+        serializar_vacuna,
+    ),
+    'ganado': TipoDetalle(
+        lambda: Ganado.objects.select_related('animal').prefetch_related(
+            Prefetch('vacunaciones', queryset=RegistroVacunacion.objects.select_related('vacuna').order_by('-fecha_aplicacion')),
+            Prefetch('medicamentos_aplicados', queryset=RegistroMedicamento.objects.select_related('medicamento').order_by('-fecha_aplicacion')),
+        ),
+        serializar_ganado,
+        {'todas_las_vacunas': 'vacunas_disponibles', 'todos_los_medicamentos': 'medicamentos_disponibles'},
+    ),
+}
+
+
+def claves_catalogo_por_tipo():
+    """{tipo: {clave en el JSON: catálogo}} para que el cliente complete los formularios."""
+    return {tipo: config.claves_catalogo for tipo, config in TIPOS_DETALLE.items() if config.claves_catalogo}
+
+
+class LoteInvalido(ValueError):
+    """El parámetro `items` de la petición por lotes no es válido."""
+
+
+def parsear_lote(valor):
+    """
+    Convierte 'alimento:1,ganado:3' en [('alimento', 1), ('ganado', 3)],
+    sin repetir pares y conservando el orden.
+    """
+    pares = []
+    for parte in (valor or '').split(','):
+        parte = parte.strip()
+        if not parte:
+            continue
+        tipo, _, pk = parte.rpartition(':')
+        if tipo not in TIPOS_DETALLE or not pk.isdigit():
+            raise LoteInvalido(f"Ítem no válido: '{parte}'.")
+        par = (tipo, int(pk))
+        if par not in pares:
+            pares.append(par)
+    if len(pares) > MAX_ITEMS_LOTE:
+        raise LoteInvalido(f"Se permiten como máximo {MAX_ITEMS_LOTE} ítems por petición.")
+    return pares
+
+
+def detalles_lote(pares):
+    """
+    Detalles de varios ítems: los que no están en caché se cargan con una
+    consulta (más sus precargas) por tipo.
+    """
+    def construir(faltantes):
+        ids_por_tipo = {}
+        for tipo, pk in faltantes:
+            ids_por_tipo.setdefault(tipo, []).append(pk)
+        construidos = {}
+        for tipo, ids in ids_por_tipo.items():
+            for obj in TIPOS_DETALLE[tipo].queryset().filter(pk__in=ids):
+                construidos[(tipo, obj.pk)] = TIPOS_DETALLE[tipo].serializar(obj)
+        return construidos
+
+    encontrados = obtener_detalles(pares, construir)
+
+    items, no_encontrados = [], []
+    for tipo, pk in pares:
+        if (tipo, pk) in encontrados:
+            items.append({'tipo': tipo, 'id': pk, 'data': encontrados[(tipo, pk)]})
+        else:
+            no_encontrados.append({'tipo': tipo, 'id': pk})
+
+    return {'items': items, 'no_encontrados': no_encontrados}
@@ -0,0 +1,253 @@
+# inventario/filtros.py
+"""
+Filtros declarativos para las vistas `lista_*`.
+
+Cada modelo declara la lista de filtros que acepta (parámetro GET -> campo) y
+`aplicar_filtros` construye con ellos una única llamada a `.filter()`.
+Los filtros por id sobre relaciones ManyToMany se resuelven con un EXISTS
+sobre la tabla intermedia, de modo que combinar proveedor y ubicación no
+multiplica filas ni necesita DISTINCT.
+"""
+from abc import ABC, abstractmethod
+
+from dateutil.relativedelta import relativedelta
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+
+def _recorre_relacion_multiple(modelo, ruta):
+    """Indica si la ruta de lookup `a__b__c` atraviesa alguna relación a-muchos."""
+    for parte in ruta.split('__'):
+        try:
+            campo = modelo._meta.get_field(parte)
+        except FieldDoesNotExist:
+            # Es un lookup (icontains, gt, ...) y no un campo.
+            return False
+        if not campo.is_relation:
+            return False
+        if campo.many_to_many or campo.one_to_many:
+            return True
+        modelo = campo.related_model
+    return False
+
+
+class Filtro(ABC):
+    """Filtro base: lee `parametro` de la petición y devuelve un Q sobre `campo`."""
+
+    def __init__(self, parametro, campo=None):
+        self.parametro = parametro
+        self.campo = campo or parametro
+
+    def limpiar(self, valor):
+        return valor or None
+
+    @abstractmethod
+    def condicion(self, modelo, valor):
+        """Q que aplica el valor ya limpio sobre `modelo`."""
+
+    def requiere_distinct(self, modelo):
+        return _recorre_relacion_multiple(modelo, self.campo)
+
+
+class Texto(Filtro):
+    def condicion(self, modelo, valor):
+        return Q(**{f'{self.campo}__icontains': valor})
+
+
+class Exacto(Filtro):
+    def condicion(self, modelo, valor):
+        return Q(**{self.campo: valor})
+
+
+class PorId(Filtro):
+    """
+    Filtra por el id de una relación (`categoria`, `proveedores`, ...).
+    Los ids no numéricos se ignoran. Si la relación es ManyToMany se usa un
+    EXISTS sobre la tabla intermedia en lugar de un JOIN.
+    """
+
+    def limpiar(self, valor):
+        try:
+            return int(valor)
+        except (TypeError, ValueError):
+            return None
+
+    def condicion(self, modelo, valor):
+        campo = modelo._meta.get_field(self.campo)
+        if campo.many_to_many and not campo.auto_created:
+            intermedia = campo.remote_field.through
+            return Q(Exists(intermedia.objects.filter(**{
+                campo.m2m_field_name(): OuterRef('pk'),
+                f'{campo.m2m_reverse_field_name()}_id': valor,
+            })))
+        return Q(**{f'{self.campo}__id': valor})
+
+    def requiere_distinct(self, modelo):
+        return False
+
+
+class Booleano(Filtro):
+    def limpiar(self, valor):
+        if valor in ('true', 'false'):
+            return valor == 'true'
+        return None
+
+    def condicion(self, modelo, valor):
+        return Q(**{self.campo: valor})
+
+
+class Disponibilidad(Filtro):
+    """'disponible' / 'agotado' sobre la columna generada `restante` (ver StockQuerySet)."""
+
+    def __init__(self, parametro='disponibilidad'):
+        super().__init__(parametro)
+
+    def limpiar(self, valor):
+        return valor if valor in ('disponible', 'agotado') else None
+
+    def condicion(self, modelo, valor):
+        return Q(restante__gt=0) if valor == 'disponible' else Q(restante__lte=0)
+
+    def requiere_distinct(self, modelo):
+        return False
+
+
+class RangoVencimiento(Filtro):
+    """Vence dentro del plazo indicado, o después de un año con 'mas_1_ano'."""
+
+    PLAZOS = {
+        '1_semana': relativedelta(weeks=1),
+        '1_mes': relativedelta(months=1),
+        '3_meses': relativedelta(months=3),
+        '6_meses': relativedelta(months=6),
+        '1_ano': relativedelta(years=1),
+        'mas_1_ano': relativedelta(years=1),
+    }
+
+    def __init__(self, parametro='vencimiento', campo='fecha_vencimiento'):
+        super().__init__(parametro, campo)
+
+    def limpiar(self, valor):
+        return valor if valor in self.PLAZOS else None
+
+    def condicion(self, modelo, valor):
+        today = timezone.now().date()
+        end_date = today + self.PLAZOS[valor]
+        if valor == 'mas_1_ano':
+            return Q(**{f'{self.campo}__gt': end_date})
+        return Q(**{f'{self.campo}__range': [today, end_date]})
+
+
+class RangoPeso(Filtro):
+    """Rangos de peso en kg: [desde, hasta), `None` significa sin límite."""
+
+    RANGOS = {
+        '0_10': (None, 10),
+        '10_100': (10, 100),
+        '100_250': (100, 250),
+        '250_500': (250, 500),
+        '500_1000': (500, 1000),
+        '1000_mas': (1000, None),
+    }
+
+    def __init__(self, parametro='peso', campo='peso_kg'):
+        super().__init__(parametro, campo)
+
+    def limpiar(self, valor):
+        return valor if valor in self.RANGOS else None
+
+    def condicion(self, modelo, valor):
+        desde, hasta = self.RANGOS[valor]
+        condicion = Q()
+        if desde is not None:
+            condicion &= Q(**{f'{self.campo}__gte': desde})
+        if hasta is not None:
+            condicion &= Q(**{f'{self.campo}__lt': hasta})
+        return condicion
+
+
+FILTROS_ALIMENTO = [
+    Texto('nombre'),
+    PorId('categoria'),
+    PorId('proveedor', 'proveedores'),
+    PorId('ubicacion', 'ubicaciones'),
+    Disponibilidad(),
+    RangoVencimiento(),
+]
+
+FILTROS_COMBUSTIBLE = [
+    Texto('nombre', 'tipo'),
+    PorId('proveedor', 'proveedores'),
+    PorId('ubicacion', 'ubicaciones'),
+]
+
+FILTROS_CONTROL_PLAGA = [
+    Texto('nombre', 'nombre_producto'),
+    PorId('ubicacion', 'ubicaciones'),
+    Texto('tipo'),
+    Disponibilidad(),
+    RangoVencimiento(),
+]
+
+FILTROS_GANADO = [
+    Texto('nombre', 'identificador'),
+    PorId('animal'),
+    Texto('raza'),
+    Exacto('crecimiento'),
+    Exacto('estado'),
+    Exacto('estado_salud'),
+    # El parámetro 'preñez' filtra el campo 'peñe' del modelo
+    Exacto('preñez', 'peñe'),
+    RangoPeso(),
+]
+
+FILTROS_MANTENIMIENTO = [
+    Texto('nombre', 'equipo'),
+    Booleano('completado'),
+    PorId('lugar_mantenimiento', 'lugares_mantenimiento'),
+]
+
+FILTROS_MEDICAMENTO = [
+    Texto('nombre'),
+    PorId('categoria'),
+    PorId('proveedor', 'proveedores'),
+    PorId('ubicacion', 'ubicaciones'),
+    Disponibilidad(),
+]
+
+FILTROS_POTRERO = [
+    Texto('nombre'),
+    Booleano('empastado'),
+    Booleano('fumigado'),
+    Booleano('rozado'),
+]
+
+FILTROS_PRODUCTO = [
+    Texto('nombre'),
+    PorId('categoria'),
+    Exacto('estado'),
+]
+
+
+def aplicar_filtros(queryset, params, filtros):
+    """
+    Aplica a `queryset` los filtros cuyo parámetro venga en `params`.
+    Todas las condiciones van en un solo `.filter()`, y solo se añade
+    DISTINCT si algún filtro activo recorre una relación a-muchos con JOIN.
+    """
+    modelo = queryset.model
+    condiciones = []
+    distinct = False
+    for filtro in filtros:
+        valor = filtro.limpiar(params.get(filtro.parametro))
+        if valor is None:
+            continue
+        condiciones.append(filtro.condicion(modelo, valor))
+        distinct = distinct or filtro.requiere_distinct(modelo)
+
+    if condiciones:
+        queryset = queryset.filter(*condiciones)
+    if distinct:
+        queryset = queryset.distinct()
+    return queryset
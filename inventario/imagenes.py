@@ -0,0 +1,47 @@
+# inventario/imagenes.py
+"""
+Miniaturas de las imágenes de Cloudinary.
+
+Las vistas no deben enviar la foto original (varios MB) para mostrarla a
+100 px: `url_miniatura(imagen, preset)` devuelve la URL de una versión
+transformada por Cloudinary con el tamaño del sitio donde se muestra y con
+formato y calidad automáticos. Las URLs se memorizan por
+(public_id, versión, preset), así una lista de cientos de ítems no vuelve a
+firmar ni armar la misma URL en cada petición.
+"""
+from functools import lru_cache
+
+import cloudinary
+
+# Transformaciones por sitio de uso. El ancho es el doble del tamaño en
+# pantalla para que se vean nítidas en pantallas de alta densidad.
+PRESETS = {
+    # Tarjetas de las listas de los modales (.item-card-img, 150 px de alto)
+    'tarjeta': {'width': 400, 'height': 300, 'crop': 'fill', 'gravity': 'auto'},
+    # Imagen grande del modal de detalles (.details-img, hasta 300 px de alto)
+    'modal': {'width': 800, 'height': 600, 'crop': 'limit'},
+    # Columna "Vista Previa" de las listas del admin (100 px de ancho)
+    'admin': {'width': 200, 'height': 200, 'crop': 'limit'},
+}
+OPCIONES_COMUNES = {'fetch_format': 'auto', 'quality': 'auto'}
+
+
+@lru_cache(maxsize=4096)
+def _construir_url(public_id, version, preset):
+    return cloudinary.CloudinaryImage(public_id, version=version).build_url(**PRESETS[preset], **OPCIONES_COMUNES)
+
+
+def url_miniatura(imagen, preset):
+    """
+    URL de la miniatura de `imagen` (un CloudinaryResource) para `preset`.
+    Devuelve None si no hay imagen o no se puede construir la URL.
+    """
+    if preset not in PRESETS:
+        raise ValueError(f'Preset de miniatura desconocido: {preset}')
+    public_id = getattr(imagen, 'public_id', None)
+    if not public_id:
+        return None
+    try:
+        return _construir_url(public_id, getattr(imagen, 'version', None), preset)
+    except Exception:
+        return None
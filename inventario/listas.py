@@ -0,0 +1,157 @@
+# inventario/listas.py
+"""
+Páginas de las listas que consumen los modales (`lista_*`).
+
+Cada tipo declara su queryset, sus filtros (filtros.py), su orden y cómo
+serializa una página, así las vistas y la tarea `calentar_cache` (tareas.py)
+construyen y guardan en caché exactamente la misma respuesta sin pasar por
+una petición HTTP.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .cache import obtener_lista
+from .detalles import get_safe_image_url
+from .filtros import (
+    aplicar_filtros, FILTROS_ALIMENTO, FILTROS_COMBUSTIBLE, FILTROS_CONTROL_PLAGA, FILTROS_GANADO,
+    FILTROS_MANTENIMIENTO, FILTROS_MEDICAMENTO, FILTROS_POTRERO, FILTROS_PRODUCTO,
+)
+from .imagenes import url_miniatura
+from .models import Alimento, Combustible, ControlPlaga, Ganado, Mantenimiento, Medicamento, Potrero, Producto
+from .paginacion import paginar
+from .pronostico import pronosticar
+
+# Ítems por página si la petición no trae `items_per_page` (o el tipo no lo admite)
+ITEMS_POR_PAGINA = 8
+# Tope de `items_per_page`: más allá la lista dejaría de paginar
+MAX_ITEMS_POR_PAGINA = 50
+
+
+def _tarjeta(item, nombre, detalle):
+    return {
+        'id': item.id,
+        'nombre': nombre,
+        'detalle': detalle,
+        'imagen_url': get_safe_image_url(item.imagen),
+        'thumb_url': url_miniatura(item.imagen, 'tarjeta'),
+    }
+
+
+def serializar_alimentos(alimentos):
+    pronosticos = pronosticar(alimentos)
+    return [{
+        'id': alimento.id,
+        'nombre': alimento.nombre,
+        'cantidad_kg_ingresada': str(alimento.cantidad_kg_ingresada),
+        'imagen_url': get_safe_image_url(alimento.imagen),
+        'thumb_url': url_miniatura(alimento.imagen, 'tarjeta'),
+        'consumo_diario': pronosticos[alimento.id].consumo_diario,
+        'dias_restantes': pronosticos[alimento.id].dias_restantes,
+        'fecha_agotamiento': pronosticos[alimento.id].fecha_agotamiento,
+    } for alimento in alimentos]
+
+
+def serializar_combustibles(combustibles):
+    pronosticos = pronosticar(combustibles)
+    return [{
+        'id': combustible.id,
+        'tipo': combustible.tipo,
+        'cantidad_galones_ingresada': str(combustible.cantidad_galones_ingresada),
+        'imagen_url': get_safe_image_url(combustible.imagen),
+        'thumb_url': url_miniatura(combustible.imagen, 'tarjeta'),
+        'consumo_diario': pronosticos[combustible.id].consumo_diario,
+        'dias_restantes': pronosticos[combustible.id].dias_restantes,
+        'fecha_agotamiento': pronosticos[combustible.id].fecha_agotamiento,
+    } for combustible in combustibles]
+
+
+class TipoLista:
+    """
+    Describe la lista de un tipo: queryset con precargas, filtros, campo de
+    orden y serializador de una página. Con `orden_stock`, ?orden=restante
+    ordena por la columna generada (indexada); con `tamano_variable` se
+    respeta ?items_per_page=, entre 1 y `MAX_ITEMS_POR_PAGINA`.
+    """
+
+    def __init__(self, queryset, filtros, orden, serializar, orden_stock=False, tamano_variable=False):
+        self._queryset = queryset
+        self.filtros = filtros
+        self.orden = orden
+        self.serializar = serializar
+        self.orden_stock = orden_stock
+        self.tamano_variable = tamano_variable
+
+    def construir(self, params):
+        """Diccionario de la respuesta para los parámetros GET `params`; lanza CursorInvalido."""
+        orden = ['restante'] if self.orden_stock and params.get('orden') == 'restante' else [self.orden]
+        queryset = aplicar_filtros(self._queryset().order_by(*orden, 'pk'), params, self.filtros)
+        por_pagina = ITEMS_POR_PAGINA
+        if self.tamano_variable:
+            try:
+                por_pagina = max(1, min(int(params.get('items_per_page', ITEMS_POR_PAGINA)), MAX_ITEMS_POR_PAGINA))
+            except (ValueError, TypeError):
+                pass
+        objetos, paginacion = paginar(params, queryset, orden, por_pagina)
+        return {'items': self.serializar(objetos), **paginacion}
+
+
+TIPOS_LISTA = {
+    'alimento': TipoLista(
+        lambda: Alimento.objects.select_related('categoria').prefetch_related('proveedores', 'ubicaciones'),
+        FILTROS_ALIMENTO, 'nombre', serializar_alimentos, orden_stock=True, tamano_variable=True,
+    ),
+    'combustible': TipoLista(
+        lambda: Combustible.objects.prefetch_related('proveedores', 'ubicaciones'),
+        FILTROS_COMBUSTIBLE, 'tipo', serializar_combustibles, orden_stock=True, tamano_variable=True,
+    ),
+    'control-plaga': TipoLista(
+        lambda: ControlPlaga.objects.all(), FILTROS_CONTROL_PLAGA, 'nombre_producto',
+        lambda items: [
+            _tarjeta(item, item.nombre_producto, f"Quedan: {item.restante} {item.get_unidad_medida_display()}")
+            for item in items
+        ],
+        orden_stock=True,
+    ),
+    'ganado': TipoLista(
+        lambda: Ganado.objects.select_related('animal'), FILTROS_GANADO, 'identificador',
+        lambda items: [
+            _tarjeta(item, item.identificador, f"{item.animal.nombre if item.animal else 'N/A'} - {item.get_estado_display()}")
+            for item in items
+        ],
+    ),
+    'mantenimiento': TipoLista(
+        lambda: Mantenimiento.objects.all(), FILTROS_MANTENIMIENTO, 'equipo',
+        lambda items: [
+            _tarjeta(item, item.equipo, f"Próximo: {item.fecha_proximo_mantenimiento.strftime('%d/%m/%Y')}")
+            for item in items
+        ],
+    ),
+    'medicamento': TipoLista(
+        lambda: Medicamento.objects.select_related('categoria').prefetch_related('proveedores', 'ubicaciones'),
+        FILTROS_MEDICAMENTO, 'nombre',
+        lambda items: [
+            _tarjeta(item, item.nombre, f"Quedan: {item.restante} {item.get_unidad_medida_display()}")
+            for item in items
+        ],
+        orden_stock=True,
+    ),
+    'potrero': TipoLista(
+        lambda: Potrero.objects.all(), FILTROS_POTRERO, 'nombre',
+        lambda items: [_tarjeta(item, item.nombre, f"Área: {item.area_hectareas} ha") for item in items],
+    ),
+    'producto': TipoLista(
+        lambda: Producto.objects.select_related('categoria'), FILTROS_PRODUCTO, 'nombre',
+        lambda items: [
+            _tarjeta(item, item.nombre, f"Cantidad: {item.cantidad} {item.get_unidad_medida_display()}")
+            for item in items
+        ],
+    ),
+}
+
+
+def lista_json(tipo, params):
+    """JSON (bytes) de la página de la lista de `tipo` que piden `params`, desde la caché si está."""
+    return obtener_lista(
+        tipo, params, lambda: json.dumps(TIPOS_LISTA[tipo].construir(params), cls=DjangoJSONEncoder).encode(),
+    )
@@ -1,112 +1,66 @@
 # inventario/management/commands/enviar_recordatorios.py
 
+import time
+
 from django.core.management.base import BaseCommand
-from django.core.mail import send_mail
 from django.utils import timezone
-from datetime import timedelta
-from dateutil.relativedelta import relativedelta
-from inventario.models import Alimento, Medicamento, Vacuna, Mantenimiento, Pago, Dotacion
-from django.contrib.auth.models import User
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from django.conf import settings
-
-# --- Constantes ---
-DIAS_ANTICIPACION = 7
-MESES_DOTACION = 4
+from inventario.recordatorios import (
+    HILOS, TAMANO_LOTE, correos_pendientes, destinatarios, enviar_por_lotes, preparar_correos, recolectar,
+    recolectar_nuevos, registrar_envio,
+)
 
 class Command(BaseCommand):
-    help = 'Envía recordatorios por correo electrónico para fechas de vencimiento y tareas próximas.'
-
-    def _get_superusuario(self):
-        """Obtiene el primer superusuario con un correo electrónico configurado."""
-        try:
-            superusuario = User.objects.filter(is_superuser=True, email__isnull=False).first()
-            if not superusuario:
-                self.stdout.write(self.style.ERROR('No se encontró un superusuario con correo electrónico.'))
-                return None
-            return superusuario
-        except User.DoesNotExist:
-            self.stdout.write(self.style.ERROR('No hay superusuarios configurados.'))
-            return None
-
-    def _get_alimentos_por_vencer(self, hoy, limite):
-        return Alimento.objects.filter(fecha_vencimiento__range=[hoy, limite])
-
-    def _get_medicamentos_por_vencer(self, hoy, limite):
-        return Medicamento.objects.filter(fecha_vencimiento__range=[hoy, limite])
-
-    def _get_vacunas_por_vencer(self, hoy, limite):
-        return Vacuna.objects.filter(fecha_vencimiento__range=[hoy, limite])
-
-    def _get_mantenimientos_proximos(self, hoy, limite):
-        return Mantenimiento.objects.filter(fecha_proximo_mantenimiento__range=[hoy, limite], completado=False)
-
-    def _get_pagos_pendientes(self, hoy, limite):
-        return Pago.objects.filter(fecha_pago__range=[hoy, limite], pago_realizado=False)
-
-    def _get_dotaciones_proximas(self, hoy, limite):
-        """
-        Calcula las próximas dotaciones basadas en la última entrega.
-        La dotación se entrega cada `MESES_DOTACION` meses.
-        """
-        dotaciones_proximas = []
-        # Obtenemos la dotación más reciente para cada trabajador
-        trabajadores_ids = Dotacion.objects.values_list('trabajador_id', flat=True).distinct()
-        
-        for trabajador_id in trabajadores_ids:
-            ultima_dotacion = Dotacion.objects.filter(trabajador_id=trabajador_id).latest('fecha_entrega')
-            
-            # Calculamos la fecha de la próxima dotación
-            fecha_proxima_dotacion = ultima_dotacion.fecha_entrega + relativedelta(months=MESES_DOTACION)
-
-            # Si la próxima fecha está en el rango, la añadimos a la lista
-            if hoy <= fecha_proxima_dotacion <= limite:
-                # Creamos un objeto "virtual" para pasarlo al template
-                dotaciones_proximas.append({
-                    'trabajador': ultima_dotacion.trabajador,
-                    'fecha_proxima_entrega': fecha_proxima_dotacion
-                })
-        return dotaciones_proximas
+    help = (
+        'Envía por correo electrónico los recordatorios de fechas de vencimiento y tareas próximas '
+        'a los usuarios suscritos, según sus alcances. Solo envía lo que no se notificó antes, '
+        'así que puede ejecutarse cada pocos minutos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Correos por conexión SMTP.')
+        parser.add_argument('--hilos', type=int, default=HILOS, help='Conexiones SMTP simultáneas.')
+        parser.add_argument(
+            '--completo', action='store_true',
+            help='Envía todos los recordatorios de la ventana, aunque ya se hayan notificado.',
+        )
 
     def handle(self, *args, **options):
-        superusuario = self._get_superusuario()
-        if not superusuario:
+        hoy = timezone.localdate()
+        # Solo se consultan las categorías y los días que cambiaron; ver inventario/recordatorios.py
+        if options['completo']:
+            recordatorios, revisiones = recolectar(hoy), []
+        else:
+            recordatorios, revisiones = recolectar_nuevos(hoy)
+        # Correos de lotes que fallaron antes; se reintentan solo para sus destinatarios
+        pendientes = correos_pendientes()
+        if not recordatorios and not pendientes:
+            registrar_envio([], revisiones, set(), [], [], hoy)
+            self.stdout.write(self.style.SUCCESS('No hay recordatorios nuevos para enviar.'))
             return
 
-        hoy = timezone.now().date()
-        limite = hoy + timedelta(days=DIAS_ANTICIPACION)
-        destinatario = superusuario.email
-
-        context = {
-            'alimentos': self._get_alimentos_por_vencer(hoy, limite),
-            'medicamentos': self._get_medicamentos_por_vencer(hoy, limite),
-            'vacunas': self._get_vacunas_por_vencer(hoy, limite),
-            'mantenimientos': self._get_mantenimientos_proximos(hoy, limite),
-            'pagos': self._get_pagos_pendientes(hoy, limite),
-            'dotaciones': self._get_dotaciones_proximas(hoy, limite),
-        }
-
-        # Comprobar si hay algo que notificar
-        hay_recordatorios = any(context.values())
-
-        if hay_recordatorios:
-            asunto = 'Recordatorios de Fechas Importantes - Finca La Matutina'
-            
-            html_mensaje = render_to_string('inventario/email/recordatorio.html', context)
-            texto_plano_mensaje = strip_tags(html_mensaje)
-
-            try:
-                send_mail(
-                    asunto,
-                    texto_plano_mensaje,
-                    settings.EMAIL_HOST_USER,
-                    [destinatario],
-                    html_message=html_mensaje,
-                    fail_silently=False,
-                )
-                self.stdout.write(self.style.SUCCESS(f'Correo de recordatorio enviado a {destinatario}'))
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Error al enviar el correo: {e}"))
-        else:
-            self.stdout.write(self.style.SUCCESS('No hay recordatorios para enviar.'))
\ No newline at end of file
+        alcances_por_correo = destinatarios() if recordatorios else {}
+        if recordatorios and not alcances_por_correo:
+            self.stdout.write(self.style.ERROR('No hay usuarios con correo suscritos a los recordatorios.'))
+            if not pendientes:
+                # Nada queda notificado: se envían cuando alguien se suscriba
+                return
+
+        inicio = time.perf_counter()
+        correos, resumenes, entregados = preparar_correos(recordatorios, alcances_por_correo)
+        correos += [mensaje for _, mensaje in pendientes]
+        enviados, fallidos = enviar_por_lotes(correos, max(1, options['lote']), max(1, options['hilos']))
+        duracion = time.perf_counter() - inicio
+        # Lo enviado queda registrado aunque falle algún lote; sus correos quedan pendientes
+        registrar_envio(recordatorios, revisiones, entregados, pendientes, fallidos, hoy)
+
+        reintentos = f', {len(pendientes)} reintentos' if pendientes else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{enviados} correos de recordatorio enviados ({resumenes} resúmenes distintos{reintentos}) '
+            f'en {duracion:.2f} s ({enviados / duracion if duracion else 0:.0f} correos/s).'
+        ))
+        for error in sorted({error for _, error in fallidos}):
+            self.stdout.write(self.style.ERROR(f'Error al enviar un lote de correos: {error}'))
+        if fallidos:
+            self.stdout.write(self.style.WARNING(
+                f'{len(fallidos)} correos quedaron pendientes; se reintentan en la próxima ejecución.'
+            ))
@@ -0,0 +1,118 @@
+# inventario/management/commands/explicar_consultas.py
+
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from inventario.calendario_vacunas import sin_aplicar, ultimas_aplicaciones
+from inventario.filtros import (
+    FILTROS_ALIMENTO, FILTROS_CONTROL_PLAGA, FILTROS_GANADO, FILTROS_MANTENIMIENTO, FILTROS_PRODUCTO,
+    aplicar_filtros,
+)
+from inventario.listas import ITEMS_POR_PAGINA
+from inventario.models import (
+    Alimento, Combustible, ControlPlaga, Ganado, Mantenimiento, Medicamento, Potrero,
+    Producto, RegistroMedicamento, RegistroVacunacion, Vacuna,
+)
+from inventario.recordatorios import (
+    DIAS_ANTICIPACION, alimentos_por_vencer, mantenimientos_proximos, medicamentos_por_vencer, pagos_pendientes,
+    ultimas_dotaciones, vacunas_por_vencer,
+)
+
+# LIMIT de la primera página de las listas: los ítems por página de listas.py
+# más el que pide la paginación por cursor para saber si hay otra página
+PAGINA = ITEMS_POR_PAGINA + 1
+
+
+def _lista(queryset, orden, params=None, filtros=()):
+    """Primera página de una vista lista_* con los filtros de `params`."""
+    queryset = aplicar_filtros(queryset, params or {}, filtros)
+    return queryset.order_by(*orden, 'pk')[:PAGINA]
+
+
+def consultas():
+    """(descripción, queryset, índice esperado) de las consultas de las vistas y los recordatorios."""
+    hoy = datetime.date.today()
+    limite = hoy + datetime.timedelta(days=DIAS_ANTICIPACION)
+    return [
+        ('lista_alimentos', _lista(Alimento.objects.all(), ['nombre']), 'alimento_nombre_idx'),
+        ('lista_alimentos?vencimiento=1_mes',
+         _lista(Alimento.objects.all(), ['nombre'], {'vencimiento': '1_mes'}, FILTROS_ALIMENTO), 'alimento_vence_idx'),
+        ('lista_combustibles', _lista(Combustible.objects.all(), ['tipo']), 'combustible_tipo_idx'),
+        ('lista_combustibles?orden=restante', _lista(Combustible.objects.all(), ['restante']), 'combustible_restante_idx'),
+        ('lista_control_plagas', _lista(ControlPlaga.objects.all(), ['nombre_producto']), 'controlplaga_nombre_idx'),
+        ('lista_control_plagas?vencimiento=1_semana',
+         _lista(ControlPlaga.objects.all(), ['nombre_producto'], {'vencimiento': '1_semana'}, FILTROS_CONTROL_PLAGA),
+         'controlplaga_vence_idx'),
+        ('lista_ganado?estado=VIVO',
+         _lista(Ganado.objects.all(), ['identificador'], {'estado': 'VIVO'}, FILTROS_GANADO), 'ganado_estado_idx'),
+        ('lista_ganado?estado_salud=ENFERMO',
+         _lista(Ganado.objects.all(), ['identificador'], {'estado_salud': 'ENFERMO'}, FILTROS_GANADO),
+         'ganado_estado_salud_idx'),
+        ('lista_ganado?crecimiento=ADULTO',
+         _lista(Ganado.objects.all(), ['identificador'], {'crecimiento': 'ADULTO'}, FILTROS_GANADO),
+         'ganado_crecimiento_idx'),
+        ('lista_mantenimientos', _lista(Mantenimiento.objects.all(), ['equipo']), 'mantenimiento_equipo_idx'),
+        ('lista_mantenimientos?completado=false',
+         _lista(Mantenimiento.objects.all(), ['equipo'], {'completado': 'false'}, FILTROS_MANTENIMIENTO),
+         'mantenimiento_equipo_idx'),
+        ('lista_medicamentos', _lista(Medicamento.objects.all(), ['nombre']), 'medicamento_nombre_idx'),
+        ('lista_medicamentos?orden=restante', _lista(Medicamento.objects.all(), ['restante']), 'medicamento_restante_idx'),
+        ('lista_potreros', _lista(Potrero.objects.all(), ['nombre']), 'potrero_nombre_idx'),
+        ('lista_productos', _lista(Producto.objects.all(), ['nombre']), 'producto_nombre_idx'),
+        ('lista_productos?estado=VENDIDO',
+         _lista(Producto.objects.all(), ['nombre'], {'estado': 'VENDIDO'}, FILTROS_PRODUCTO), 'producto_estado_nombre_idx'),
+        ('alimentos agotados', Alimento.objects.agotados(), 'alimento_restante_idx'),
+        ('control de plagas con stock bajo', ControlPlaga.objects.stock_bajo(5), 'controlplaga_restante_idx'),
+        ('catálogo vacunas_disponibles', Vacuna.objects.filter(disponible=True).values('id', 'nombre'), 'vacuna_disponible_idx'),
+        ('detalle de ganado: vacunaciones',
+         RegistroVacunacion.objects.filter(ganado_id=1).order_by('-fecha_aplicacion'), 'regvacuna_ganado_fecha_idx'),
+        ('detalle de ganado: medicamentos',
+         RegistroMedicamento.objects.filter(ganado_id=1).order_by('-fecha_aplicacion'), 'regmedic_ganado_fecha_idx'),
+        ('recordatorio: alimentos por vencer', alimentos_por_vencer(hoy, limite), 'alimento_vence_idx'),
+        ('recordatorio: medicamentos por vencer', medicamentos_por_vencer(hoy, limite), 'medicamento_vence_idx'),
+        ('recordatorio: vacunas por vencer', vacunas_por_vencer(hoy, limite), 'vacuna_vence_idx'),
+        ('recordatorio: mantenimientos pendientes',
+         mantenimientos_proximos(hoy, limite), 'mantenimiento_pendiente_idx'),
+        ('recordatorio: pagos pendientes', pagos_pendientes(hoy, limite), 'pago_pendiente_idx'),
+        ('recordatorio: última dotación por trabajador', ultimas_dotaciones(hoy, limite), 'dotacion_trabajador_fecha_idx'),
+        ('calendario de vacunación: última aplicación por animal y vacuna',
+         ultimas_aplicaciones(), 'regvacuna_ganado_vacuna_idx'),
+        ('calendario de vacunación: animales sin una vacuna', sin_aplicar(1), 'regvacuna_ganado_vacuna_idx'),
+    ]
+
+
+def explicar(queryset):
+    """Plan de `queryset`. En PostgreSQL se desactiva el seq scan, que con tablas pequeñas siempre gana."""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta EXPLAIN sobre las consultas de las listas, catálogos y recordatorios '
+        'y comprueba que cada una use el índice declarado para ella.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--planes', action='store_true', help='Muestra el plan completo de cada consulta.')
+
+    def handle(self, *args, **options):
+        sin_indice = []
+        for descripcion, queryset, indice in consultas():
+            plan = explicar(queryset)
+            if indice in plan:
+                self.stdout.write(self.style.SUCCESS(f'OK  {descripcion} -> {indice}'))
+            else:
+                sin_indice.append(descripcion)
+                self.stdout.write(self.style.WARNING(f'NO  {descripcion} (se esperaba {indice})'))
+            if options['planes'] or indice not in plan:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        if sin_indice:
+            raise CommandError(f'{len(sin_indice)} consultas no usan su índice.')
+        self.stdout.write(self.style.SUCCESS('Todas las consultas usan su índice.'))
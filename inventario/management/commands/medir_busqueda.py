@@ -0,0 +1,66 @@
+# inventario/management/commands/medir_busqueda.py
+
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from inventario.busqueda import TIPOS_BUSQUEDA, normalizar
+from inventario.models import EntradaBusqueda
+from inventario.views import buscar_json
+
+PALABRAS = [
+    'maíz', 'sal', 'mineral', 'concentrado', 'melaza', 'ivermectina', 'aftosa', 'brucelosis', 'diésel',
+    'gasolina', 'glifosato', 'tractor', 'guadaña', 'potrero', 'loma', 'quebrada', 'holstein', 'brahman',
+    'cebú', 'leche', 'queso', 'huevos', 'agropecuaria', 'veterinaria', 'el', 'la', 'san', 'josé', 'preñez',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la latencia de /buscar/ (p50, p95 y máximo) con un índice de búsqueda de prueba. '
+        'Los datos de prueba se descartan.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=50000, help='Entradas en el índice (por defecto 50000).')
+        parser.add_argument('--consultas', type=int, default=500, help='Búsquedas a medir.')
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def _nombre(self, azar):
+        return ' '.join(azar.choice(PALABRAS) for _ in range(azar.randint(1, 3))) + f' {azar.randint(1, 999)}'
+
+    def handle(self, *args, **options):
+        azar = random.Random(options['semilla'])
+        tipos = list(TIPOS_BUSQUEDA)
+        request_factory = RequestFactory()
+        usuario = User(username='medicion', is_active=True)
+        consultas = [
+            azar.choice(PALABRAS)[:azar.randint(2, 8)] for _ in range(options['consultas'])
+        ]
+
+        duraciones = []
+        with transaction.atomic():
+            EntradaBusqueda.objects.all().delete()
+            entradas = []
+            for i in range(options['filas']):
+                nombre = self._nombre(azar)
+                entradas.append(EntradaBusqueda(tipo=tipos[i % len(tipos)], object_id=i, nombre=nombre, texto=normalizar(nombre)))
+            EntradaBusqueda.objects.bulk_create(entradas, batch_size=1000)
+
+            for q in consultas:
+                request = request_factory.get('/buscar/', {'q': q})
+                request.user = usuario
+                inicio = time.perf_counter()
+                buscar_json(request)
+                duraciones.append((time.perf_counter() - inicio) * 1000)
+            transaction.set_rollback(True)
+
+        duraciones.sort()
+        p95 = duraciones[max(0, int(len(duraciones) * 0.95) - 1)]
+        self.stdout.write(f'/buscar/ con {options["filas"]} entradas y {len(duraciones)} consultas:')
+        self.stdout.write(f'  p50 {statistics.median(duraciones):.2f} ms   p95 {p95:.2f} ms   máximo {duraciones[-1]:.2f} ms')
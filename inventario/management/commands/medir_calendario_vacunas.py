@@ -0,0 +1,76 @@
+# inventario/management/commands/medir_calendario_vacunas.py
+
+import datetime
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from inventario.calendario_vacunas import calendario
+from inventario.models import Ganado, RegistroVacunacion, Vacuna
+
+# (nombre, dosis por edad, dosis por peso)
+VACUNAS = [
+    ('Aftosa', 'Cada 6 meses', ''),
+    ('Brucelosis', 'A los 3 meses', ''),
+    ('Carbón', 'Anual', 'Desde 200 kg'),
+    ('Rabia', '', ''),
+    ('Clostridiosis', 'Cada 12 meses desde los 2 meses', ''),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el calendario de vacunación (calendario_vacunas.calendario) con un rebaño de prueba. '
+        'Los datos de prueba se descartan.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animales', type=int, default=20000, help='Animales vivos (por defecto 20000).')
+        parser.add_argument('--registros', type=int, default=200000, help='Registros de vacunación (por defecto 200000).')
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        azar = random.Random(options['semilla'])
+        hoy = timezone.localdate()
+        duraciones = []
+        with transaction.atomic():
+            vacunas = Vacuna.objects.bulk_create([
+                Vacuna(nombre=nombre, dosis_edad=edad, dosis_peso=peso, fecha_vencimiento=hoy)
+                for nombre, edad, peso in VACUNAS
+            ])
+            ganado = Ganado.objects.bulk_create([
+                Ganado(
+                    identificador=f'MEDICION-{i}', peso_kg=azar.randint(40, 600),
+                    fecha_nacimiento=hoy - datetime.timedelta(days=azar.randint(30, 3650)),
+                )
+                for i in range(options['animales'])
+            ], batch_size=1000)
+            registros = []
+            for _ in range(options['registros']):
+                aplicacion = hoy - datetime.timedelta(days=azar.randint(0, 1500))
+                proxima = aplicacion + datetime.timedelta(days=azar.randint(30, 400)) if azar.random() < 0.5 else None
+                registros.append(RegistroVacunacion(
+                    ganado=azar.choice(ganado), vacuna=azar.choice(vacunas),
+                    fecha_aplicacion=aplicacion, fecha_proxima_dosis=proxima,
+                ))
+            RegistroVacunacion.objects.bulk_create(registros, batch_size=2000)
+
+            for _ in range(options['repeticiones']):
+                inicio = time.perf_counter()
+                dosis = calendario(hoy, hoy + datetime.timedelta(days=30), vencidas=False)
+                duraciones.append((time.perf_counter() - inicio) * 1000)
+            inicio = time.perf_counter()
+            con_vencidas = calendario(hoy, hoy + datetime.timedelta(days=30))
+            duracion_vencidas = (time.perf_counter() - inicio) * 1000
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'Calendario de 30 días con {options["animales"]} animales y {options["registros"]} registros: '
+            f'{len(dosis)} dosis, p50 {statistics.median(duraciones):.0f} ms, máximo {max(duraciones):.0f} ms.'
+        )
+        self.stdout.write(f'Con las vencidas: {len(con_vencidas)} dosis en {duracion_vencidas:.0f} ms.')
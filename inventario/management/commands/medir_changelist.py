@@ -0,0 +1,98 @@
+# inventario/management/commands/medir_changelist.py
+
+import time
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from django.utils.html import mark_safe
+
+from inventario.models import Animal, Ganado, Medicamento, RegistroMedicamento, RegistroVacunacion, Vacuna
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el tamaño y el tiempo de render de la lista de Ganado del admin con los modales '
+        'incrustados en cada fila y con los modales bajo demanda. Los datos de prueba se descartan.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1000, help='Cantidad de ganado en la página (por defecto 1000).')
+        parser.add_argument('--repeticiones', type=int, default=3, help='Renders por modo; se informa el más rápido.')
+
+    def _crear_datos(self, filas):
+        hoy = timezone.now().date()
+        animal = Animal.objects.create(nombre='Bovino (medición)')
+        vacuna = Vacuna.objects.create(nombre='Aftosa (medición)', fecha_vencimiento=hoy)
+        medicamento = Medicamento.objects.create(nombre='Ivermectina (medición)')
+        ganado = Ganado.objects.bulk_create([
+            Ganado(identificador=f'MED-{i:05d}', animal=animal, fecha_nacimiento=hoy, descripcion='x' * 200)
+            for i in range(filas)
+        ])
+        RegistroVacunacion.objects.bulk_create([
+            RegistroVacunacion(ganado=g, vacuna=vacuna, fecha_aplicacion=hoy, notas='Dosis de refuerzo')
+            for g in ganado for _ in range(3)
+        ])
+        RegistroMedicamento.objects.bulk_create([
+            RegistroMedicamento(ganado=g, medicamento=medicamento, fecha_aplicacion=hoy, notas='Tratamiento')
+            for g in ganado for _ in range(2)
+        ])
+
+    def _medir(self, model_admin, request, repeticiones):
+        mejor, tamano = None, 0
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            response = model_admin.changelist_view(request)
+            response.render()
+            duracion = time.perf_counter() - inicio
+            mejor = duracion if mejor is None else min(mejor, duracion)
+            tamano = len(response.content)
+        return tamano, mejor
+
+    def _admins(self, filas):
+        clase = type(admin.site._registry[Ganado])
+
+        class Diferido(clase):
+            list_per_page = filas
+
+        class EnLinea(clase):
+            # Como antes del cambio: el modal va en cada fila y la lista
+            # precarga todo lo que los modales muestran.
+            list_per_page = filas
+            _precargando = False
+
+            def get_queryset(self, request):
+                if self._precargando:
+                    return super().get_queryset(request)
+                self._precargando = True
+                try:
+                    return self.get_detalles_queryset(request)
+                finally:
+                    self._precargando = False
+
+            def ver_detalles(self, obj):
+                return mark_safe(self.detalles_html(obj) + '<button class="button">Ver</button>')
+            ver_detalles.short_description = 'Detalles'
+
+        return [
+            ('Antes (modal en cada fila)', EnLinea(Ganado, admin.site)),
+            ('Después (bajo demanda)', Diferido(Ganado, admin.site)),
+        ]
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        resultados = {}
+        with transaction.atomic():
+            self._crear_datos(filas)
+            request = RequestFactory().get('/admin/inventario/ganado/')
+            request.user = User(username='medicion', is_staff=True, is_superuser=True, is_active=True)
+            for nombre, model_admin in self._admins(filas):
+                resultados[nombre] = self._medir(model_admin, request, options['repeticiones'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'Lista de Ganado con {filas} filas:')
+        for nombre, (tamano, duracion) in resultados.items():
+            self.stdout.write(f'  {nombre:<28} {tamano / 1024:>10.1f} KB {duracion * 1000:>10.1f} ms')
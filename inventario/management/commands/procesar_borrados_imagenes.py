@@ -0,0 +1,34 @@
+# inventario/management/commands/procesar_borrados_imagenes.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventario.borrado_imagenes import HILOS, TAMANO_LOTE, procesar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Borra en Cloudinary, por lotes y con reintentos, las imágenes encoladas por las señales.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Imágenes por llamada a Cloudinary.')
+        parser.add_argument('--hilos', type=int, default=HILOS, help='Lotes enviados a Cloudinary a la vez.')
+        parser.add_argument('--continuo', action='store_true', help='Sigue esperando nuevos borrados en lugar de terminar.')
+        parser.add_argument('--intervalo', type=float, default=30, help='Segundos entre consultas en modo continuo.')
+
+    def handle(self, *args, **options):
+        total_borrados = total_fallidos = 0
+        while True:
+            borrados, fallidos = procesar_pendientes(lote=options['lote'], hilos=options['hilos'])
+            total_borrados += borrados
+            total_fallidos += fallidos
+            if fallidos:
+                self.stdout.write(self.style.WARNING(f'{fallidos} borrados fallaron y se reintentarán más tarde.'))
+            if borrados or fallidos:
+                # Puede haber más lotes vencidos
+                continue
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS(f'{total_borrados} imágenes borradas, {total_fallidos} reprogramadas.'))
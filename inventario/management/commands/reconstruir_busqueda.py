@@ -0,0 +1,15 @@
+# inventario/management/commands/reconstruir_busqueda.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from inventario.busqueda import reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Rehace el índice de /buscar/ a partir de los datos del inventario (p. ej. tras cargas masivas).'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS(f'{total} entradas indexadas.'))
@@ -0,0 +1,30 @@
+# inventario/management/commands/reconstruir_saldos.py
+
+from django.core.management.base import BaseCommand
+
+from inventario.stock import CAMPOS_STOCK, reconstruir_saldos
+
+MODELOS_POR_NOMBRE = {modelo.__name__.lower(): modelo for modelo in CAMPOS_STOCK}
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las cantidades ingresadas y usadas a partir del registro de movimientos de inventario.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modelo', action='append', choices=sorted(MODELOS_POR_NOMBRE),
+            help='Modelo a reconstruir (se puede repetir). Por defecto, todos.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra las diferencias, no guarda.')
+
+    def handle(self, *args, **options):
+        modelos = [MODELOS_POR_NOMBRE[nombre] for nombre in options['modelo'] or []]
+        diferencias = reconstruir_saldos(modelos or None, guardar=not options['dry_run'])
+        for obj, (ingresada, usada), (nueva_ingresada, nueva_usada) in diferencias:
+            self.stdout.write(
+                f'{type(obj).__name__} #{obj.pk}: ingresada {ingresada} -> {nueva_ingresada}, '
+                f'usada {usada} -> {nueva_usada}'
+            )
+
+        accion = 'encontrados' if options['dry_run'] else 'corregidos'
+        self.stdout.write(self.style.SUCCESS(f'{len(diferencias)} saldos {accion}.'))
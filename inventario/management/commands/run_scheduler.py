@@ -0,0 +1,42 @@
+# inventario/management/commands/run_scheduler.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from inventario.programador import ejecutar_pendientes, segundos_hasta_la_proxima, sincronizar_tareas
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta las tareas programadas (recordatorios, borrados en Cloudinary, caché e informes) según su '
+        'expresión cron. Varios workers pueden correr a la vez: cada tarea la ejecuta solo el que la reserva.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Ejecuta las tareas vencidas y termina.')
+        parser.add_argument('--intervalo', type=float, default=30, help='Máximo de segundos entre consultas.')
+
+    def handle(self, *args, **options):
+        sincronizar_tareas()
+        while True:
+            # El bucle no pasa por el ciclo de peticiones de Django: se descartan aquí las
+            # conexiones caídas o que superaron CONN_MAX_AGE, como al empezar una petición
+            close_old_connections()
+            try:
+                for tarea, exito in ejecutar_pendientes():
+                    if exito:
+                        self.stdout.write(self.style.SUCCESS(f'{tarea.nombre}: {tarea.ultima_duracion:.2f} s'))
+                    else:
+                        self.stdout.write(self.style.ERROR(f'{tarea.nombre} falló: {tarea.ultimo_error}'))
+                if options['una_vez']:
+                    break
+                espera = segundos_hasta_la_proxima()
+            except DatabaseError as e:
+                # Las tareas reservadas antes del error se liberan solas al vencer la reserva
+                if options['una_vez']:
+                    raise
+                self.stderr.write(self.style.ERROR(f'Error de base de datos, se reintenta: {e}'))
+                espera = None
+            time.sleep(options['intervalo'] if espera is None else min(max(espera, 1), options['intervalo']))
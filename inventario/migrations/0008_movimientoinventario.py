@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('inventario', '0007_versioncatalogo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('tipo', models.CharField(choices=[('INGRESO', 'Ingreso'), ('CONSUMO', 'Consumo'), ('AJUSTE', 'Ajuste')], max_length=10)),
+                ('cantidad', models.DecimalField(decimal_places=2, help_text='Negativa solo en ajustes o correcciones.', max_digits=12)),
+                ('unidad', models.CharField(blank=True, max_length=20)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('nota', models.CharField(blank=True, max_length=255)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Inventario',
+                'verbose_name_plural': 'Movimientos de Inventario',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['content_type', 'object_id', 'fecha'], name='inventario__content_21e086_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# modelo -> (campo ingresada, campo usada, unidad fija o None si usa unidad_medida)
+CAMPOS_STOCK = {
+    'alimento': ('cantidad_kg_ingresada', 'cantidad_kg_usada', 'Kg'),
+    'combustible': ('cantidad_galones_ingresada', 'cantidad_galones_usados', 'gal'),
+    'controlplaga': ('cantidad_ingresada', 'cantidad_usada', None),
+    'medicamento': ('cantidad_ingresada', 'cantidad_usada', None),
+}
+
+
+def crear_saldos_iniciales(apps, schema_editor):
+    """Un INGRESO y un CONSUMO por ítem para que el registro cuadre con los saldos actuales."""
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    MovimientoInventario = apps.get_model('inventario', 'MovimientoInventario')
+    movimientos = []
+    for nombre_modelo, (ingresada, usada, unidad) in CAMPOS_STOCK.items():
+        modelo = apps.get_model('inventario', nombre_modelo)
+        content_type, _ = ContentType.objects.get_or_create(app_label='inventario', model=nombre_modelo)
+        for item in modelo.objects.all().iterator():
+            unidad_item = unidad or item.unidad_medida
+            for tipo, cantidad in (('INGRESO', getattr(item, ingresada)), ('CONSUMO', getattr(item, usada))):
+                if cantidad:
+                    movimientos.append(MovimientoInventario(
+                        content_type=content_type, object_id=item.pk, tipo=tipo,
+                        cantidad=cantidad, unidad=unidad_item, nota='Saldo inicial',
+                    ))
+    MovimientoInventario.objects.bulk_create(movimientos, batch_size=500)
+
+
+def borrar_saldos_iniciales(apps, schema_editor):
+    MovimientoInventario = apps.get_model('inventario', 'MovimientoInventario')
+    MovimientoInventario.objects.filter(nota='Saldo inicial').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('inventario', '0008_movimientoinventario'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_saldos_iniciales, borrar_saldos_iniciales),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0009_saldos_iniciales_movimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BorradoImagenPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('public_id', models.CharField(max_length=255)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Borrado de Imagen Pendiente',
+                'verbose_name_plural': 'Borrados de Imágenes Pendientes',
+                'indexes': [models.Index(fields=['proximo_intento'], name='inventario__proximo_1194c1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caracteristicas', '0005_proveedor_correo_electronico_proveedor_imagen_and_more'),
+        ('inventario', '0010_borradoimagenpendiente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alimento',
+            index=models.Index(fields=['nombre', 'id'], name='alimento_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alimento',
+            index=models.Index(fields=['fecha_vencimiento'], name='alimento_vence_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='combustible',
+            index=models.Index(fields=['tipo', 'id'], name='combustible_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='controlplaga',
+            index=models.Index(fields=['nombre_producto', 'id'], name='controlplaga_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='controlplaga',
+            index=models.Index(fields=['fecha_vencimiento'], name='controlplaga_vence_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dotacion',
+            index=models.Index(fields=['trabajador', 'fecha_entrega'], name='dotacion_trabajador_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ganado',
+            index=models.Index(fields=['estado', 'identificador'], name='ganado_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ganado',
+            index=models.Index(fields=['estado_salud', 'identificador'], name='ganado_estado_salud_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ganado',
+            index=models.Index(fields=['crecimiento', 'identificador'], name='ganado_crecimiento_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mantenimiento',
+            index=models.Index(fields=['equipo', 'id'], name='mantenimiento_equipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mantenimiento',
+            index=models.Index(condition=models.Q(('completado', False)), fields=['fecha_proximo_mantenimiento'], name='mantenimiento_pendiente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicamento',
+            index=models.Index(fields=['nombre', 'id'], name='medicamento_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicamento',
+            index=models.Index(fields=['fecha_vencimiento'], name='medicamento_vence_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(condition=models.Q(('pago_realizado', False)), fields=['fecha_pago'], name='pago_pendiente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='potrero',
+            index=models.Index(fields=['nombre', 'id'], name='potrero_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['nombre', 'id'], name='producto_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['estado', 'nombre'], name='producto_estado_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registromedicamento',
+            index=models.Index(fields=['ganado', '-fecha_aplicacion'], name='regmedic_ganado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrovacunacion',
+            index=models.Index(fields=['ganado', '-fecha_aplicacion'], name='regvacuna_ganado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacuna',
+            index=models.Index(fields=['fecha_vencimiento'], name='vacuna_vence_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacuna',
+            index=models.Index(condition=models.Q(('disponible', True)), fields=['nombre'], name='vacuna_disponible_idx'),
+        ),
+    ]
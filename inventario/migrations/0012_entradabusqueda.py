@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0011_indices_listas_y_recordatorios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntradaBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('nombre', models.CharField(max_length=255)),
+                ('texto', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Entrada de Búsqueda',
+                'verbose_name_plural': 'Entradas de Búsqueda',
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'object_id'), name='entrada_busqueda_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+import unicodedata
+
+from django.db import migrations
+
+# tipo -> (modelo, campos con texto; el primero es el nombre). Copia de busqueda.TIPOS_BUSQUEDA.
+TIPOS_BUSQUEDA = {
+    'alimento': ('alimento', ['nombre']),
+    'combustible': ('combustible', ['tipo']),
+    'control_plaga': ('controlplaga', ['nombre_producto', 'tipo']),
+    'ganado': ('ganado', ['identificador', 'raza']),
+    'mantenimiento': ('mantenimiento', ['equipo']),
+    'medicamento': ('medicamento', ['nombre']),
+    'potrero': ('potrero', ['nombre']),
+    'producto': ('producto', ['nombre']),
+    'vacuna': ('vacuna', ['nombre']),
+}
+
+SQL_POSTGRESQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS entrada_busqueda_trgm_idx ON inventario_entradabusqueda USING gin (texto gin_trgm_ops)',
+]
+SQL_POSTGRESQL_REVERSO = ['DROP INDEX IF EXISTS entrada_busqueda_trgm_idx']
+
+# Tabla FTS5 de contenido externo: guarda solo el índice y lee el texto de inventario_entradabusqueda.
+SQL_SQLITE = [
+    "CREATE VIRTUAL TABLE inventario_busqueda_fts USING fts5("
+    "texto, content='inventario_entradabusqueda', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER inventario_busqueda_ai AFTER INSERT ON inventario_entradabusqueda BEGIN "
+    "INSERT INTO inventario_busqueda_fts(rowid, texto) VALUES (new.id, new.texto); END",
+    "CREATE TRIGGER inventario_busqueda_ad AFTER DELETE ON inventario_entradabusqueda BEGIN "
+    "INSERT INTO inventario_busqueda_fts(inventario_busqueda_fts, rowid, texto) VALUES ('delete', old.id, old.texto); END",
+    "CREATE TRIGGER inventario_busqueda_au AFTER UPDATE ON inventario_entradabusqueda BEGIN "
+    "INSERT INTO inventario_busqueda_fts(inventario_busqueda_fts, rowid, texto) VALUES ('delete', old.id, old.texto); "
+    "INSERT INTO inventario_busqueda_fts(rowid, texto) VALUES (new.id, new.texto); END",
+]
+SQL_SQLITE_REVERSO = [
+    'DROP TRIGGER IF EXISTS inventario_busqueda_ai',
+    'DROP TRIGGER IF EXISTS inventario_busqueda_ad',
+    'DROP TRIGGER IF EXISTS inventario_busqueda_au',
+    'DROP TABLE IF EXISTS inventario_busqueda_fts',
+]
+
+
+def _ejecutar(schema_editor, por_motor):
+    for sentencia in por_motor.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sentencia)
+
+
+def crear_indice(apps, schema_editor):
+    _ejecutar(schema_editor, {'postgresql': SQL_POSTGRESQL, 'sqlite': SQL_SQLITE})
+
+
+def borrar_indice(apps, schema_editor):
+    _ejecutar(schema_editor, {'postgresql': SQL_POSTGRESQL_REVERSO, 'sqlite': SQL_SQLITE_REVERSO})
+
+
+def _normalizar(texto):
+    descompuesto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower().strip()
+
+
+def poblar_entradas(apps, schema_editor):
+    EntradaBusqueda = apps.get_model('inventario', 'EntradaBusqueda')
+    entradas = []
+    for tipo, (nombre_modelo, campos) in TIPOS_BUSQUEDA.items():
+        modelo = apps.get_model('inventario', nombre_modelo)
+        for obj in modelo.objects.only(*campos).iterator():
+            valores = [str(getattr(obj, campo) or '') for campo in campos]
+            entradas.append(EntradaBusqueda(
+                tipo=tipo, object_id=obj.pk, nombre=valores[0][:255],
+                texto=_normalizar(' '.join(v for v in valores if v)),
+            ))
+    EntradaBusqueda.objects.bulk_create(entradas, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0012_entradabusqueda'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+        migrations.RunPython(poblar_entradas, migrations.RunPython.noop),
+    ]
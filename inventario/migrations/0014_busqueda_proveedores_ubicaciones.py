@@ -0,0 +1,45 @@
+import unicodedata
+
+from django.db import migrations
+
+# tipo -> (modelo de caracteristicas, campos con texto). Copia de busqueda.TIPOS_BUSQUEDA.
+TIPOS_BUSQUEDA = {
+    'proveedor': ('proveedor', ['nombre', 'nombre_local']),
+    'ubicacion': ('ubicacion', ['nombre', 'barrio']),
+}
+
+
+def _normalizar(texto):
+    descompuesto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower().strip()
+
+
+def poblar_entradas(apps, schema_editor):
+    EntradaBusqueda = apps.get_model('inventario', 'EntradaBusqueda')
+    entradas = []
+    for tipo, (nombre_modelo, campos) in TIPOS_BUSQUEDA.items():
+        modelo = apps.get_model('caracteristicas', nombre_modelo)
+        for obj in modelo.objects.only(*campos).iterator():
+            valores = [str(getattr(obj, campo) or '') for campo in campos]
+            entradas.append(EntradaBusqueda(
+                tipo=tipo, object_id=obj.pk, nombre=valores[0][:255],
+                texto=_normalizar(' '.join(v for v in valores if v)),
+            ))
+    EntradaBusqueda.objects.bulk_create(entradas, batch_size=500)
+
+
+def borrar_entradas(apps, schema_editor):
+    EntradaBusqueda = apps.get_model('inventario', 'EntradaBusqueda')
+    EntradaBusqueda.objects.filter(tipo__in=TIPOS_BUSQUEDA).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caracteristicas', '0005_proveedor_correo_electronico_proveedor_imagen_and_more'),
+        ('inventario', '0013_indice_busqueda'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_entradas, borrar_entradas),
+    ]
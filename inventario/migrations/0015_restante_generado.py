@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:53
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caracteristicas', '0005_proveedor_correo_electronico_proveedor_imagen_and_more'),
+        ('inventario', '0014_busqueda_proveedores_ubicaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alimento',
+            name='restante',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('cantidad_kg_ingresada'), '-', models.F('cantidad_kg_usada')), output_field=models.DecimalField(decimal_places=2, max_digits=10), verbose_name='Restante'),
+        ),
+        migrations.AddField(
+            model_name='combustible',
+            name='restante',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('cantidad_galones_ingresada'), '-', models.F('cantidad_galones_usados')), output_field=models.DecimalField(decimal_places=2, max_digits=10), verbose_name='Restante'),
+        ),
+        migrations.AddField(
+            model_name='controlplaga',
+            name='restante',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('cantidad_ingresada'), '-', models.F('cantidad_usada')), output_field=models.DecimalField(decimal_places=2, max_digits=10), verbose_name='Restante'),
+        ),
+        migrations.AddField(
+            model_name='medicamento',
+            name='restante',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('cantidad_ingresada'), '-', models.F('cantidad_usada')), output_field=models.DecimalField(decimal_places=2, max_digits=10), verbose_name='Restante'),
+        ),
+        migrations.AddIndex(
+            model_name='alimento',
+            index=models.Index(fields=['restante', 'id'], name='alimento_restante_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='combustible',
+            index=models.Index(fields=['restante', 'id'], name='combustible_restante_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='controlplaga',
+            index=models.Index(fields=['restante', 'id'], name='controlplaga_restante_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicamento',
+            index=models.Index(fields=['restante', 'id'], name='medicamento_restante_idx'),
+        ),
+    ]
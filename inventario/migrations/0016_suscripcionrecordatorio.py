@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Copia de SuscripcionRecordatorio.Alcance
+ALCANCES = ['ganado', 'alimentos', 'pagos', 'mantenimiento']
+
+
+def suscribir_superusuarios(apps, schema_editor):
+    # Hasta ahora los recordatorios iban al superusuario con correo: lo siguen recibiendo todo
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    SuscripcionRecordatorio = apps.get_model('inventario', 'SuscripcionRecordatorio')
+    SuscripcionRecordatorio.objects.bulk_create([
+        SuscripcionRecordatorio(usuario_id=pk, alcance=alcance)
+        for pk in User.objects.filter(is_superuser=True).exclude(email='').values_list('pk', flat=True)
+        for alcance in ALCANCES
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0015_restante_generado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuscripcionRecordatorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alcance', models.CharField(choices=[('ganado', 'Ganado (vacunas y medicamentos)'), ('alimentos', 'Alimentos y stock'), ('pagos', 'Pagos y dotaciones'), ('mantenimiento', 'Mantenimientos')], max_length=20)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suscripciones_recordatorios', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Suscripción a Recordatorios',
+                'verbose_name_plural': 'Suscripciones a Recordatorios',
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'alcance'), name='suscripcion_recordatorio_unica')],
+            },
+        ),
+        migrations.RunPython(suscribir_superusuarios, migrations.RunPython.noop),
+    ]
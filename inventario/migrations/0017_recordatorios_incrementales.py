@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0016_suscripcionrecordatorio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevisionRecordatorios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('categoria', models.CharField(max_length=30, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('revisado_hasta', models.DateField()),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Revisión de Recordatorios',
+                'verbose_name_plural': 'Revisiones de Recordatorios',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecordatorioNotificado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('categoria', models.CharField(max_length=30)),
+                ('modelo', models.CharField(max_length=100)),
+                ('objeto_id', models.PositiveBigIntegerField()),
+                ('fecha', models.DateField()),
+                ('notificado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Recordatorio Notificado',
+                'verbose_name_plural': 'Recordatorios Notificados',
+                'indexes': [models.Index(fields=['fecha'], name='recordatorio_notificado_fecha')],
+                'constraints': [models.UniqueConstraint(fields=('categoria', 'modelo', 'objeto_id', 'fecha'), name='recordatorio_notificado_unico')],
+            },
+        ),
+    ]
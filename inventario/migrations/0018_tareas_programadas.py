@@ -0,0 +1,67 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:04
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0017_recordatorios_incrementales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InformeMaterializado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('informe', models.CharField(max_length=50)),
+                ('fecha', models.DateField()),
+                ('datos', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('generado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Informe Materializado',
+                'verbose_name_plural': 'Informes Materializados',
+                'constraints': [models.UniqueConstraint(fields=('informe', 'fecha'), name='informe_materializado_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TareaProgramada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('programacion', models.CharField(help_text='Expresión cron de cinco campos en hora local: minuto hora día mes día de la semana. Ej: */15 * * * *', max_length=100)),
+                ('activa', models.BooleanField(default=True)),
+                ('proxima_ejecucion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reservada_hasta', models.DateTimeField(blank=True, null=True)),
+                ('ultima_ejecucion', models.DateTimeField(blank=True, null=True)),
+                ('ultima_duracion', models.FloatField(blank=True, help_text='Segundos.', null=True)),
+                ('ultimo_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Tarea Programada',
+                'verbose_name_plural': 'Tareas Programadas',
+                'indexes': [models.Index(condition=models.Q(('activa', True)), fields=['proxima_ejecucion'], name='tarea_proxima_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EjecucionTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateTimeField()),
+                ('duracion', models.FloatField(help_text='Segundos.')),
+                ('exito', models.BooleanField()),
+                ('resultado', models.TextField(blank=True)),
+                ('proceso', models.CharField(blank=True, help_text='host:pid del worker que la ejecutó.', max_length=100)),
+                ('tarea', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ejecuciones', to='inventario.tareaprogramada')),
+            ],
+            options={
+                'verbose_name': 'Ejecución de Tarea',
+                'verbose_name_plural': 'Ejecuciones de Tareas',
+                'indexes': [models.Index(fields=['tarea', '-inicio'], name='ejecucion_tarea_inicio_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0018_tareas_programadas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registrovacunacion',
+            index=models.Index(fields=['ganado', 'vacuna', 'fecha_aplicacion'], name='regvacuna_ganado_vacuna_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0019_indice_calendario_vacunas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoRecordatorioPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('correo', models.EmailField(max_length=254)),
+                ('texto', models.TextField()),
+                ('html', models.TextField()),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('intentos', models.PositiveIntegerField(default=1)),
+                ('ultimo_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Correo de Recordatorio Pendiente',
+                'verbose_name_plural': 'Correos de Recordatorio Pendientes',
+            },
+        ),
+    ]
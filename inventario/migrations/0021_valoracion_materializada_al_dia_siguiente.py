@@ -0,0 +1,36 @@
+import datetime
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def programar_a_medianoche(apps, schema_editor):
+    """
+    `materializar_informes` pasa de las 23:55 a las 00:00 y guarda el día
+    anterior desde el registro de movimientos. Las copias guardadas antes
+    tienen todos los modelos (sin `excluidos`); se borran para que esos días
+    se reconstruyan igual que los demás.
+    """
+    TareaProgramada = apps.get_model('inventario', 'TareaProgramada')
+    InformeMaterializado = apps.get_model('inventario', 'InformeMaterializado')
+    manana = timezone.localdate() + datetime.timedelta(days=1)
+    TareaProgramada.objects.filter(nombre='materializar_informes', programacion='55 23 * * *').update(
+        programacion='0 0 * * *',
+        proxima_ejecucion=timezone.make_aware(datetime.datetime.combine(manana, datetime.time.min)),
+    )
+    antiguas = [
+        informe.pk for informe in InformeMaterializado.objects.filter(informe='valoracion')
+        if not informe.datos.get('excluidos')
+    ]
+    InformeMaterializado.objects.filter(pk__in=antiguas).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0020_correo_recordatorio_pendiente'),
+    ]
+
+    operations = [
+        migrations.RunPython(programar_a_medianoche, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,12 @@
 # inventario/models.py
 from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import ExtractMonth, ExtractYear
 from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.core.validators import MinValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
 from cloudinary.models import CloudinaryField
 from django.utils import timezone
 import datetime
@@ -9,6 +14,59 @@ from dateutil.relativedelta import relativedelta
 
 # inventario/models.py
 
+def restante_generado(ingresada, usada):
+    """
+    Columna `restante` = ingresada - usada que calcula y guarda la propia base
+    (STORED en PostgreSQL y SQLite). Cada modelo la indexa con el pk, así
+    que filtrar agotados o stock bajo y paginar ordenando por restante son
+    recorridos de rango del índice.
+    """
+    return models.GeneratedField(
+        expression=F(ingresada) - F(usada),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+        verbose_name='Restante',
+    )
+
+
+class StockQuerySet(models.QuerySet):
+    """QuerySet de los modelos con la columna generada `restante`."""
+
+    def disponibles(self):
+        return self.filter(restante__gt=0)
+
+    def agotados(self):
+        # restante <= 0 y no NOT (restante > 0), que no puede usar el índice
+        return self.filter(restante__lte=0)
+
+    def stock_bajo(self, limite):
+        """Disponibles con `limite` o menos de cantidad restante."""
+        return self.filter(restante__gt=0, restante__lte=limite)
+
+
+class ProductoQuerySet(models.QuerySet):
+    def con_precio_total(self):
+        """Anota `valor_total` (cantidad × precio); `precio_total` es la propiedad de cada objeto."""
+        return self.annotate(valor_total=ExpressionWrapper(
+            F('cantidad') * F('precio'), output_field=models.DecimalField(max_digits=20, decimal_places=2),
+        ))
+
+
+class GanadoQuerySet(models.QuerySet):
+    def con_edad(self, hoy=None):
+        """
+        Anota `edad_meses`: meses cumplidos a `hoy`, como relativedelta.
+        Se arma con EXTRACT en lugar de restar fechas, que cada motor hace distinto.
+        """
+        hoy = hoy or datetime.date.today()
+        return self.annotate(edad_meses=ExpressionWrapper(
+            (Value(hoy.year) - ExtractYear('fecha_nacimiento')) * 12
+            + (Value(hoy.month) - ExtractMonth('fecha_nacimiento'))
+            - Case(When(Q(fecha_nacimiento__day__gt=hoy.day), then=Value(1)), default=Value(0)),
+            output_field=models.IntegerField(),
+        ))
+
+
 class Producto(models.Model):
     class UnidadMedida(models.TextChoices):
         UNIDADES = 'U', 'Unidades'
@@ -35,6 +93,15 @@ class Producto(models.Model):
     descripcion = models.TextField(max_length=1000, blank=True, null=True, help_text="Descripción detallada del producto.")
     compradores = models.ManyToManyField('Comprador', through='VentaProducto', blank=True, related_name='productos_comprados')
 
+    objects = ProductoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Orden de lista_productos (nombre + pk para la paginación por cursor)
+            models.Index(fields=['nombre', 'id'], name='producto_nombre_idx'),
+            models.Index(fields=['estado', 'nombre'], name='producto_estado_nombre_idx'),
+        ]
+
     @property
     def precio_total(self):
         if self.cantidad is not None and self.precio is not None:
@@ -120,12 +187,26 @@ class Ganado(models.Model):
 
     imagen = CloudinaryField('image', folder='ganado', null=True, blank=True)
     descripcion = models.TextField(max_length=1000, blank=True, null=True, help_text="Notas o descripción del animal.")
+
+    objects = GanadoQuerySet.as_manager()
+
+    class Meta:
+        # lista_ganado ordena por identificador (ya único) y filtra por estos campos
+        indexes = [
+            models.Index(fields=['estado', 'identificador'], name='ganado_estado_idx'),
+            models.Index(fields=['estado_salud', 'identificador'], name='ganado_estado_salud_idx'),
+            models.Index(fields=['crecimiento', 'identificador'], name='ganado_crecimiento_idx'),
+        ]
     
     @property
     def edad(self):
         if not self.fecha_nacimiento:
             return "Fecha no registrada"
-        
+        # Calculada en la base si el objeto viene de Ganado.objects.con_edad()
+        meses = getattr(self, 'edad_meses', None)
+        if meses is not None and meses >= 0:
+            return f"{meses // 12} años, {meses % 12} meses"
+
         # AÑADIMOS UN BLOQUE TRY-EXCEPT PARA MANEJAR ERRORES
         try:
             hoy = datetime.date.today()
@@ -153,6 +234,7 @@ class Medicamento(models.Model):
     nombre = models.CharField(max_length=100)
     cantidad_ingresada = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     cantidad_usada = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+    restante = restante_generado('cantidad_ingresada', 'cantidad_usada')
     unidad_medida = models.CharField(max_length=2, choices=UnidadMedida.choices, default=UnidadMedida.UNIDAD)
     categoria = models.ForeignKey('caracteristicas.Categoria', on_delete=models.SET_NULL, null=True, blank=True)
     precio = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
@@ -163,6 +245,15 @@ class Medicamento(models.Model):
     fecha_vencimiento = models.DateField(null=True, blank=True)
     imagen = CloudinaryField('image', folder='medicamentos', null=True, blank=True)
     descripcion = models.TextField(max_length=1000, blank=True, null=True, help_text="Descripción y notas sobre el medicamento.")
+
+    objects = StockQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nombre', 'id'], name='medicamento_nombre_idx'),
+            models.Index(fields=['fecha_vencimiento'], name='medicamento_vence_idx'),
+            models.Index(fields=['restante', 'id'], name='medicamento_restante_idx'),
+        ]
     
     @property
     def cantidad_restante(self):
@@ -206,6 +297,11 @@ class Vacuna(models.Model):
         verbose_name = 'Vacuna'
         verbose_name_plural = 'Vacunas'
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['fecha_vencimiento'], name='vacuna_vence_idx'),
+            # Catálogo 'vacunas_disponibles'
+            models.Index(fields=['nombre'], condition=models.Q(disponible=True), name='vacuna_disponible_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
@@ -222,6 +318,12 @@ class RegistroVacunacion(models.Model):
         verbose_name = 'Registro de Vacunación'
         verbose_name_plural = 'Registros de Vacunación'
         ordering = ['-fecha_aplicacion']
+        # Historial de cada animal, del más reciente al más antiguo
+        indexes = [
+            models.Index(fields=['ganado', '-fecha_aplicacion'], name='regvacuna_ganado_fecha_idx'),
+            # Última aplicación de cada vacuna a cada animal (calendario_vacunas.py)
+            models.Index(fields=['ganado', 'vacuna', 'fecha_aplicacion'], name='regvacuna_ganado_vacuna_idx'),
+        ]
 
     def __str__(self):
         return f"Vacunación de {self.ganado.identificador} con {self.vacuna.nombre}"
@@ -237,6 +339,7 @@ class RegistroMedicamento(models.Model):
         verbose_name = 'Registro de Medicamento'
         verbose_name_plural = 'Registros de Medicamentos'
         ordering = ['-fecha_aplicacion']
+        indexes = [models.Index(fields=['ganado', '-fecha_aplicacion'], name='regmedic_ganado_fecha_idx')]
 
     def __str__(self):
         return f"Aplicación de {self.medicamento.nombre} a {self.ganado.identificador}"
@@ -248,6 +351,7 @@ class Alimento(models.Model):
     etiquetas = models.ManyToManyField('caracteristicas.Etiqueta', blank=True)
     cantidad_kg_ingresada = models.DecimalField("Cantidad (Kg)", max_digits=10, decimal_places=2, validators=[MinValueValidator(0.0)], default=0.0)
     cantidad_kg_usada = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0.0)])
+    restante = restante_generado('cantidad_kg_ingresada', 'cantidad_kg_usada')
     precio = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     ubicaciones = models.ManyToManyField('caracteristicas.Ubicacion', blank=True, related_name="alimentos_ubicados")
     proveedores = models.ManyToManyField('caracteristicas.Proveedor', blank=True, related_name='alimentos')
@@ -256,6 +360,15 @@ class Alimento(models.Model):
     imagen = CloudinaryField('image', folder='alimentos', null=True, blank=True)
     descripcion = models.TextField(max_length=1000, blank=True, null=True, help_text="Descripción del alimento.")
 
+    objects = StockQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nombre', 'id'], name='alimento_nombre_idx'),
+            models.Index(fields=['fecha_vencimiento'], name='alimento_vence_idx'),
+            models.Index(fields=['restante', 'id'], name='alimento_restante_idx'),
+        ]
+
     @property
     def cantidad_kg_restante(self):
         return self.cantidad_kg_ingresada - self.cantidad_kg_usada
@@ -276,6 +389,7 @@ class ControlPlaga(models.Model):
     unidad_medida = models.CharField(max_length=2, choices=UnidadMedida.choices, default=UnidadMedida.LITROS)
     cantidad_ingresada = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0.0)], default=0.0)
     cantidad_usada = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0.0)])
+    restante = restante_generado('cantidad_ingresada', 'cantidad_usada')
     precio = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     
     ubicaciones = models.ManyToManyField('caracteristicas.Ubicacion', blank=True, related_name="controles_plaga_ubicados")
@@ -285,6 +399,15 @@ class ControlPlaga(models.Model):
     imagen = CloudinaryField('image', folder='control_plagas', null=True, blank=True)
     descripcion = models.TextField(max_length=1000, blank=True, null=True, help_text="Descripción del producto de control de plagas.")
 
+    objects = StockQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nombre_producto', 'id'], name='controlplaga_nombre_idx'),
+            models.Index(fields=['fecha_vencimiento'], name='controlplaga_vence_idx'),
+            models.Index(fields=['restante', 'id'], name='controlplaga_restante_idx'),
+        ]
+
     @property
     def cantidad_restante(self):
         return self.cantidad_ingresada - self.cantidad_usada
@@ -312,6 +435,9 @@ class Potrero(models.Model):
 
     imagen = CloudinaryField('image', folder='potreros', null=True, blank=True)
     descripcion = models.TextField(max_length=1000, blank=True, null=True, help_text="Descripción y estado del potrero.")
+
+    class Meta:
+        indexes = [models.Index(fields=['nombre', 'id'], name='potrero_nombre_idx')]
     
     def __str__(self): 
         return self.nombre
@@ -332,16 +458,32 @@ class Mantenimiento(models.Model):
         related_name="mantenimientos"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['equipo', 'id'], name='mantenimiento_equipo_idx'),
+            # Recordatorios: solo los pendientes, por fecha
+            models.Index(fields=['fecha_proximo_mantenimiento'], condition=models.Q(completado=False), name='mantenimiento_pendiente_idx'),
+        ]
+
 class Combustible(models.Model):
     tipo = models.CharField(max_length=50, help_text="Ej: Diesel, Gasolina")
     cantidad_galones_ingresada = models.DecimalField("Galones ingresados", max_digits=10, decimal_places=2, validators=[MinValueValidator(0.0)], default=0.0)
     cantidad_galones_usados = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0.0)])
+    restante = restante_generado('cantidad_galones_ingresada', 'cantidad_galones_usados')
     precio = models.DecimalField("Precio por galón", max_digits=10, decimal_places=2, default=0.0)
     ubicaciones = models.ManyToManyField('caracteristicas.Ubicacion', blank=True, related_name="combustibles_ubicados")
     proveedores = models.ManyToManyField('caracteristicas.Proveedor', blank=True, related_name='combustibles')
     imagen = CloudinaryField('image', folder='combustible', null=True, blank=True)
     descripcion = models.TextField(max_length=1000, blank=True, null=True, help_text="Notas sobre el combustible.")
 
+    objects = StockQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tipo', 'id'], name='combustible_tipo_idx'),
+            models.Index(fields=['restante', 'id'], name='combustible_restante_idx'),
+        ]
+
     @property
     def cantidad_galones_restantes(self):
         return self.cantidad_galones_ingresada - self.cantidad_galones_usados
@@ -391,6 +533,8 @@ class Dotacion(models.Model):
     class Meta:
         verbose_name = 'Dotación'
         verbose_name_plural = 'Dotaciones'
+        # Última dotación de cada trabajador
+        indexes = [models.Index(fields=['trabajador', 'fecha_entrega'], name='dotacion_trabajador_fecha_idx')]
 
     def __str__(self):
         return f"Dotación de {self.trabajador}"
@@ -409,6 +553,10 @@ class Pago(models.Model):
     forma_pago = models.CharField(max_length=1, choices=FormaPago.choices, default=FormaPago.MENSUAL)
     fecha_pago = models.DateField(default=timezone.now)
 
+    class Meta:
+        # Recordatorios: solo los pagos pendientes, por fecha
+        indexes = [models.Index(fields=['fecha_pago'], condition=models.Q(pago_realizado=False), name='pago_pendiente_idx')]
+
     def __str__(self):
         return f"Pago a {self.trabajador} - {self.get_forma_pago_display()} - {self.fecha_pago}"
 
@@ -441,3 +589,249 @@ class VentaProducto(models.Model):
 
     def __str__(self):
         return f"Venta de {self.producto.nombre} a {self.comprador.nombre} por {self.valor_compra}"
+
+
+class VersionCatalogo(models.Model):
+    """
+    Versión de un catálogo de referencia (categorías, proveedores, ...) o de
+    una categoría de recordatorios (clave `recordatorios:<categoría>`).
+    Se incrementa cada vez que cambian sus datos; con ella se calcula el
+    ETag de /catalogos/ y se sabe qué recordatorios hay que volver a revisar.
+    """
+    clave = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Versión de Catálogo'
+        verbose_name_plural = 'Versiones de Catálogos'
+
+    def __str__(self):
+        return f"{self.clave} v{self.version}"
+
+    @classmethod
+    def incrementar(cls, clave):
+        if not cls.objects.filter(clave=clave).update(version=models.F('version') + 1):
+            cls.objects.get_or_create(clave=clave, defaults={'version': 1})
+
+
+class MovimientoInventario(models.Model):
+    """
+    Registro inmutable de cada entrada o salida de stock de Alimento,
+    Medicamento, ControlPlaga y Combustible. Las columnas *_ingresada y
+    *_usada de esos modelos son el saldo acumulado de este registro:
+    ingresada = ingresos + ajustes, usada = consumos.
+    """
+    class Tipo(models.TextChoices):
+        INGRESO = 'INGRESO', 'Ingreso'
+        CONSUMO = 'CONSUMO', 'Consumo'
+        AJUSTE = 'AJUSTE', 'Ajuste'
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    item = GenericForeignKey('content_type', 'object_id')
+    tipo = models.CharField(max_length=10, choices=Tipo.choices)
+    cantidad = models.DecimalField(max_digits=12, decimal_places=2, help_text="Negativa solo en ajustes o correcciones.")
+    unidad = models.CharField(max_length=20, blank=True)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha = models.DateTimeField(default=timezone.now)
+    nota = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        verbose_name = 'Movimiento de Inventario'
+        verbose_name_plural = 'Movimientos de Inventario'
+        ordering = ['-fecha']
+        indexes = [models.Index(fields=['content_type', 'object_id', 'fecha'])]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} de {self.cantidad} {self.unidad} ({self.fecha:%d/%m/%Y})"
+
+
+class BorradoImagenPendiente(models.Model):
+    """
+    Imagen de Cloudinary que hay que borrar. Las señales solo insertan la
+    fila, en la misma transacción que el cambio; el comando
+    `procesar_borrados_imagenes` hace las llamadas a Cloudinary por lotes.
+    """
+    public_id = models.CharField(max_length=255)
+    creado = models.DateTimeField(auto_now_add=True)
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Borrado de Imagen Pendiente'
+        verbose_name_plural = 'Borrados de Imágenes Pendientes'
+        indexes = [models.Index(fields=['proximo_intento'])]
+
+    def __str__(self):
+        return self.public_id
+
+
+class EntradaBusqueda(models.Model):
+    """
+    Texto normalizado (minúsculas, sin tildes) de un objeto del inventario
+    para `/buscar/`. Lo mantienen las señales; en PostgreSQL `texto` tiene un
+    índice GIN de trigramas y en SQLite una tabla FTS5 espejo (ver busqueda.py).
+    """
+    tipo = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+    nombre = models.CharField(max_length=255)
+    texto = models.TextField()
+
+    class Meta:
+        verbose_name = 'Entrada de Búsqueda'
+        verbose_name_plural = 'Entradas de Búsqueda'
+        constraints = [models.UniqueConstraint(fields=['tipo', 'object_id'], name='entrada_busqueda_unica')]
+
+    def __str__(self):
+        return f"{self.tipo}: {self.nombre}"
+
+
+class SuscripcionRecordatorio(models.Model):
+    """
+    El usuario recibe por correo los recordatorios de un alcance. Las
+    categorías de cada alcance están en recordatorios.CATEGORIAS_POR_ALCANCE.
+    """
+    class Alcance(models.TextChoices):
+        GANADO = 'ganado', 'Ganado (vacunas y medicamentos)'
+        ALIMENTOS = 'alimentos', 'Alimentos y stock'
+        PAGOS = 'pagos', 'Pagos y dotaciones'
+        MANTENIMIENTO = 'mantenimiento', 'Mantenimientos'
+
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='suscripciones_recordatorios')
+    alcance = models.CharField(max_length=20, choices=Alcance.choices)
+
+    class Meta:
+        verbose_name = 'Suscripción a Recordatorios'
+        verbose_name_plural = 'Suscripciones a Recordatorios'
+        constraints = [models.UniqueConstraint(fields=['usuario', 'alcance'], name='suscripcion_recordatorio_unica')]
+
+    def __str__(self):
+        return f"{self.usuario} - {self.get_alcance_display()}"
+
+
+class RecordatorioNotificado(models.Model):
+    """
+    Recordatorio ya enviado, identificado por (categoría, objeto, fecha). Si
+    la fecha del objeto cambia es un recordatorio nuevo y se vuelve a enviar,
+    salvo en el stock por agotarse, cuya fecha es un pronóstico
+    (recordatorios.SIN_FECHA_FIJA).
+    """
+    categoria = models.CharField(max_length=30)
+    modelo = models.CharField(max_length=100)
+    objeto_id = models.PositiveBigIntegerField()
+    fecha = models.DateField()
+    notificado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Recordatorio Notificado'
+        verbose_name_plural = 'Recordatorios Notificados'
+        constraints = [
+            models.UniqueConstraint(fields=['categoria', 'modelo', 'objeto_id', 'fecha'], name='recordatorio_notificado_unico'),
+        ]
+        indexes = [models.Index(fields=['fecha'], name='recordatorio_notificado_fecha')]
+
+    def __str__(self):
+        return f"{self.categoria} {self.modelo}#{self.objeto_id} ({self.fecha})"
+
+
+class RevisionRecordatorios(models.Model):
+    """
+    Marca de hasta dónde se revisó una categoría de recordatorios: la versión
+    de sus datos (`VersionCatalogo`) y el último día de la ventana revisada.
+    """
+    categoria = models.CharField(max_length=30, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    revisado_hasta = models.DateField()
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Revisión de Recordatorios'
+        verbose_name_plural = 'Revisiones de Recordatorios'
+
+    def __str__(self):
+        return f"{self.categoria} v{self.version} hasta {self.revisado_hasta}"
+
+
+class CorreoRecordatorioPendiente(models.Model):
+    """
+    Resumen de recordatorios cuyo lote SMTP falló. `enviar_recordatorios` lo
+    reintenta en cada ejecución solo para este destinatario, con el mismo
+    contenido, hasta enviarlo o hasta que sus recordatorios vencen.
+    """
+    correo = models.EmailField()
+    texto = models.TextField()
+    html = models.TextField()
+    creado = models.DateTimeField(auto_now_add=True)
+    intentos = models.PositiveIntegerField(default=1)
+    ultimo_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Correo de Recordatorio Pendiente'
+        verbose_name_plural = 'Correos de Recordatorio Pendientes'
+
+    def __str__(self):
+        return f"{self.correo} ({self.intentos} intentos)"
+
+
+class TareaProgramada(models.Model):
+    """
+    Tarea periódica que ejecuta `run_scheduler` (ver programador.py). El
+    worker que la toma fija `reservada_hasta`; mientras no venza, ningún otro
+    proceso la ejecuta.
+    """
+    nombre = models.CharField(max_length=50, unique=True)
+    programacion = models.CharField(
+        max_length=100, help_text="Expresión cron de cinco campos en hora local: minuto hora día mes día de la semana. Ej: */15 * * * *",
+    )
+    activa = models.BooleanField(default=True)
+    proxima_ejecucion = models.DateTimeField(default=timezone.now)
+    reservada_hasta = models.DateTimeField(null=True, blank=True)
+    ultima_ejecucion = models.DateTimeField(null=True, blank=True)
+    ultima_duracion = models.FloatField(null=True, blank=True, help_text="Segundos.")
+    ultimo_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Tarea Programada'
+        verbose_name_plural = 'Tareas Programadas'
+        indexes = [models.Index(fields=['proxima_ejecucion'], condition=models.Q(activa=True), name='tarea_proxima_idx')]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.programacion})"
+
+
+class EjecucionTarea(models.Model):
+    tarea = models.ForeignKey(TareaProgramada, on_delete=models.CASCADE, related_name='ejecuciones')
+    inicio = models.DateTimeField()
+    duracion = models.FloatField(help_text="Segundos.")
+    exito = models.BooleanField()
+    resultado = models.TextField(blank=True)
+    proceso = models.CharField(max_length=100, blank=True, help_text="host:pid del worker que la ejecutó.")
+
+    class Meta:
+        verbose_name = 'Ejecución de Tarea'
+        verbose_name_plural = 'Ejecuciones de Tareas'
+        indexes = [models.Index(fields=['tarea', '-inicio'], name='ejecucion_tarea_inicio_idx')]
+
+    def __str__(self):
+        return f"{self.tarea.nombre} {self.inicio:%Y-%m-%d %H:%M} ({self.duracion:.2f} s)"
+
+
+class InformeMaterializado(models.Model):
+    """
+    Copia de un informe calculado por una tarea programada (p. ej. la
+    valoración del inventario al cierre de cada día), para consultarlo sin
+    recalcularlo.
+    """
+    informe = models.CharField(max_length=50)
+    fecha = models.DateField()
+    datos = models.JSONField(encoder=DjangoJSONEncoder)
+    generado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Informe Materializado'
+        verbose_name_plural = 'Informes Materializados'
+        constraints = [models.UniqueConstraint(fields=['informe', 'fecha'], name='informe_materializado_unico')]
+
+    def __str__(self):
+        return f"{self.informe} {self.fecha}"
@@ -0,0 +1,112 @@
+# inventario/paginacion.py
+import base64
+import json
+
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se pudo decodificar."""
+
+
+def _codificar_cursor(valores):
+    crudo = json.dumps(valores, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor, num_campos):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise CursorInvalido(cursor)
+    if not isinstance(valores, list) or len(valores) != num_campos:
+        raise CursorInvalido(cursor)
+    return valores
+
+
+def _filtro_keyset(campos, valores, hacia_atras):
+    """
+    Construye la condición (a, b, pk) > (x, y, z) (o < al retroceder)
+    expandida como OR de prefijos, que es lo que entienden todos los motores.
+    """
+    operador = 'lt' if hacia_atras else 'gt'
+    condicion = Q()
+    for i, campo in enumerate(campos):
+        igualdades = {campos[j]: valores[j] for j in range(i)}
+        condicion |= Q(**igualdades, **{f'{campo}__{operador}': valores[i]})
+    return condicion
+
+
+def _valores_de(obj, campos):
+    return [getattr(obj, campo) for campo in campos]
+
+
+def paginar_por_cursor(queryset, orden, cursor, por_pagina):
+    """
+    Paginación keyset sobre `orden` (más el pk como desempate).
+    No ejecuta COUNT(*) ni OFFSET: cada página es un único SELECT ... LIMIT
+    que usa el mismo plan en la página 1 y en la 500.
+    """
+    campos = list(orden) + ['pk']
+    hacia_atras = False
+    if cursor:
+        direccion, _, resto = cursor.partition('.')
+        if direccion not in ('n', 'p') or not resto:
+            raise CursorInvalido(cursor)
+        hacia_atras = direccion == 'p'
+        valores = _decodificar_cursor(resto, len(campos))
+        queryset = queryset.filter(_filtro_keyset(campos, valores, hacia_atras))
+
+    if hacia_atras:
+        queryset = queryset.order_by(*[f'-{campo}' for campo in campos])
+    else:
+        queryset = queryset.order_by(*campos)
+
+    # Se pide un elemento extra para saber si hay más sin contar.
+    objetos = list(queryset[:por_pagina + 1])
+    hay_mas = len(objetos) > por_pagina
+    objetos = objetos[:por_pagina]
+    if hacia_atras:
+        objetos.reverse()
+
+    if hacia_atras:
+        has_next, has_previous = bool(cursor), hay_mas
+    else:
+        has_next, has_previous = hay_mas, bool(cursor)
+
+    meta = {
+        'has_next': has_next,
+        'has_previous': has_previous,
+        'next_cursor': None,
+        'prev_cursor': None,
+    }
+    if objetos and has_next:
+        meta['next_cursor'] = 'n.' + _codificar_cursor(_valores_de(objetos[-1], campos))
+    if objetos and has_previous:
+        meta['prev_cursor'] = 'p.' + _codificar_cursor(_valores_de(objetos[0], campos))
+    return objetos, meta
+
+
+def paginar(params, queryset, orden, por_pagina=8):
+    """
+    Pagina `queryset` según los parámetros GET `params` de la petición.
+
+    Por defecto usa el Paginator de Django (page=N). Si la petición trae el
+    parámetro `cursor` (aunque sea vacío, para la primera página) se usa la
+    paginación por cursor, que no calcula el total de páginas.
+    Devuelve (objetos, metadatos) listos para añadir a la respuesta JSON.
+    """
+    if 'cursor' in params:
+        return paginar_por_cursor(queryset, orden, params.get('cursor'), por_pagina)
+
+    paginator = Paginator(queryset, por_pagina)
+    page_obj = paginator.get_page(params.get('page', 1))
+    return page_obj.object_list, {
+        'has_next': page_obj.has_next(),
+        'has_previous': page_obj.has_previous(),
+        'total_pages': paginator.num_pages,
+        'current_page': page_obj.number,
+    }
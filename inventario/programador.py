@@ -0,0 +1,169 @@
+# inventario/programador.py
+"""
+Programador de tareas periódicas dentro del propio proyecto, sin cron externo.
+
+Cada tarea de `tareas.TAREAS` tiene una fila en `TareaProgramada` con su
+expresión cron y su próxima ejecución. `run_scheduler` llama en bucle a
+`ejecutar_pendientes`, que:
+
+1. reserva las tareas vencidas (SELECT ... FOR UPDATE SKIP LOCKED donde la
+   base lo permite) fijando `reservada_hasta` y la próxima ejecución según
+   su expresión cron, en una transacción corta. Otro worker, en otro dyno o
+   proceso, salta las filas bloqueadas y las que siguen reservadas;
+2. ejecuta cada tarea fuera de la transacción;
+3. guarda la duración y el resultado en `EjecucionTarea` y libera la reserva.
+
+Si un worker muere a mitad de una tarea, la reserva vence a los `RESERVA`
+y otro la vuelve a tomar en su próxima ejecución.
+
+Las expresiones cron tienen los cinco campos habituales (minuto, hora, día
+del mes, mes, día de la semana con 0 = domingo) y admiten `*`, listas,
+rangos y pasos (`*/15`, `1-5`, `0,30`), en la hora local de TIME_ZONE.
+"""
+import datetime
+import os
+import socket
+import time
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EjecucionTarea, TareaProgramada
+from .tareas import TAREAS
+
+RESERVA = datetime.timedelta(hours=1)
+# Los días de la semana de cron empiezan en domingo; 7 también es domingo
+_CAMPOS_CRON = [('minuto', 0, 59), ('hora', 0, 23), ('dia', 1, 31), ('mes', 1, 12), ('dia_semana', 0, 7)]
+
+
+class ExpresionCronInvalida(ValueError):
+    """La programación de una tarea no es una expresión cron válida."""
+
+
+def _valores_campo(texto, minimo, maximo):
+    valores = set()
+    for parte in texto.split(','):
+        rango, _, paso = parte.partition('/')
+        try:
+            paso = int(paso) if paso else 1
+            if rango == '*':
+                inicio, fin = minimo, maximo
+            elif '-' in rango:
+                inicio, fin = (int(v) for v in rango.split('-', 1))
+            else:
+                inicio = int(rango)
+                fin = maximo if paso > 1 else inicio
+        except ValueError:
+            raise ExpresionCronInvalida(texto)
+        if paso < 1 or not minimo <= inicio <= fin <= maximo:
+            raise ExpresionCronInvalida(texto)
+        valores.update(range(inicio, fin + 1, paso))
+    return valores
+
+
+class Cron:
+    """Expresión cron de cinco campos; `siguiente(desde)` es la primera coincidencia posterior."""
+
+    def __init__(self, expresion):
+        campos = expresion.split()
+        if len(campos) != len(_CAMPOS_CRON):
+            raise ExpresionCronInvalida(expresion)
+        self.expresion = expresion
+        for texto, (nombre, minimo, maximo) in zip(campos, _CAMPOS_CRON):
+            setattr(self, nombre, _valores_campo(texto, minimo, maximo))
+        self.dia_semana = {d % 7 for d in self.dia_semana}
+        # Como en cron: si se restringen el día del mes y el de la semana, basta con uno de los dos
+        self._ambos_dias = campos[2] != '*' and campos[4] != '*'
+
+    def _coincide_dia(self, fecha):
+        del_mes = fecha.day in self.dia
+        de_semana = (fecha.weekday() + 1) % 7 in self.dia_semana
+        return (del_mes or de_semana) if self._ambos_dias else (del_mes and de_semana)
+
+    def siguiente(self, desde):
+        """Próximo instante (aware) posterior a `desde` que cumple la expresión."""
+        local = timezone.localtime(desde).replace(tzinfo=None, second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        fecha = local.date()
+        # Cinco años cubren cualquier expresión que pueda cumplirse (29 de febrero incluido)
+        for _ in range(366 * 5):
+            if fecha.month in self.mes and self._coincide_dia(fecha):
+                for hora in sorted(self.hora):
+                    for minuto in sorted(self.minuto):
+                        instante = datetime.datetime.combine(fecha, datetime.time(hora, minuto))
+                        if instante >= local:
+                            return timezone.make_aware(instante)
+            fecha += datetime.timedelta(days=1)
+        raise ExpresionCronInvalida(self.expresion)
+
+
+def sincronizar_tareas(ahora=None):
+    """Crea las filas de las tareas de `TAREAS` que aún no existen, con su programación por defecto."""
+    ahora = ahora or timezone.now()
+    existentes = set(TareaProgramada.objects.values_list('nombre', flat=True))
+    TareaProgramada.objects.bulk_create([
+        TareaProgramada(nombre=nombre, programacion=programacion, proxima_ejecucion=Cron(programacion).siguiente(ahora))
+        for nombre, (_, programacion, _) in TAREAS.items() if nombre not in existentes
+    ], ignore_conflicts=True)
+
+
+def _reservar(ahora):
+    """Reserva las tareas vencidas y libres, y programa su próxima ejecución."""
+    with transaction.atomic():
+        vencidas = TareaProgramada.objects.filter(
+            Q(reservada_hasta__isnull=True) | Q(reservada_hasta__lte=ahora),
+            activa=True, proxima_ejecucion__lte=ahora, nombre__in=TAREAS,
+        ).order_by('proxima_ejecucion')
+        if connection.features.has_select_for_update_skip_locked:
+            vencidas = vencidas.select_for_update(skip_locked=True)
+        reservadas = []
+        for tarea in vencidas:
+            try:
+                proxima = Cron(tarea.programacion).siguiente(ahora)
+            except ExpresionCronInvalida:
+                # Se desactiva para no intentarla en cada vuelta; el error queda a la vista en el admin
+                TareaProgramada.objects.filter(pk=tarea.pk).update(
+                    activa=False, ultimo_error=f'Programación inválida: {tarea.programacion}',
+                )
+                continue
+            tarea.reservada_hasta, tarea.proxima_ejecucion = ahora + RESERVA, proxima
+            reservadas.append(tarea)
+        TareaProgramada.objects.bulk_update(reservadas, ['reservada_hasta', 'proxima_ejecucion'])
+    return reservadas
+
+
+def ejecutar(tarea):
+    """Ejecuta una tarea reservada, guarda su duración y resultado y libera la reserva."""
+    funcion = TAREAS[tarea.nombre][0]
+    inicio = timezone.now()
+    reloj = time.perf_counter()
+    try:
+        resultado, exito = funcion() or '', True
+    except Exception as e:
+        resultado, exito = f'{e.__class__.__name__}: {e}', False
+    duracion = time.perf_counter() - reloj
+
+    EjecucionTarea.objects.create(
+        tarea=tarea, inicio=inicio, duracion=duracion, exito=exito, resultado=resultado,
+        proceso=f'{socket.gethostname()}:{os.getpid()}'[:100],
+    )
+    tarea.reservada_hasta, tarea.ultima_ejecucion, tarea.ultima_duracion = None, inicio, duracion
+    tarea.ultimo_error = '' if exito else resultado
+    TareaProgramada.objects.filter(pk=tarea.pk).update(
+        reservada_hasta=None, ultima_ejecucion=inicio, ultima_duracion=duracion, ultimo_error=tarea.ultimo_error,
+    )
+    return exito
+
+
+def ejecutar_pendientes(ahora=None):
+    """Ejecuta las tareas vencidas que este proceso logre reservar. Devuelve [(tarea, éxito)]."""
+    return [(tarea, ejecutar(tarea)) for tarea in _reservar(ahora or timezone.now())]
+
+
+def segundos_hasta_la_proxima(ahora=None):
+    """Segundos hasta la próxima tarea activa, o None si no hay ninguna."""
+    ahora = ahora or timezone.now()
+    proxima = TareaProgramada.objects.filter(activa=True, nombre__in=TAREAS).order_by('proxima_ejecucion').values_list(
+        'proxima_ejecucion', flat=True,
+    ).first()
+    return None if proxima is None else max(0.0, (proxima - ahora).total_seconds())
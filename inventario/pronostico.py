@@ -0,0 +1,95 @@
+# inventario/pronostico.py
+"""
+Pronóstico de consumo y días de stock restantes.
+
+La tasa de consumo diaria de cada ítem es un promedio móvil exponencial
+(EWMA) de sus consumos de los últimos `DIAS_HISTORIA` días, tomados de
+`MovimientoInventario`, sin el saldo inicial ni las correcciones manuales
+(no son consumo de un día concreto). Los consumos de todos los ítems se traen en una sola
+consulta agrupada por (ítem, día) y se recorren una vez; los días sin
+consumo se descuentan con una potencia en lugar de iterarlos uno a uno.
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from math import floor
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import MovimientoInventario
+from .stock import CAMPOS_STOCK, NOTAS_SIN_CONSUMO_REAL
+
+DIAS_HISTORIA = 60
+# Equivale a un promedio móvil de unas dos semanas (alpha = 2 / (14 + 1)).
+ALPHA = 2 / 15
+# Más allá de este plazo el pronóstico no es útil y se trata como "sin consumo".
+HORIZONTE_MAXIMO_DIAS = 3650
+
+Pronostico = namedtuple('Pronostico', ['consumo_diario', 'dias_restantes', 'fecha_agotamiento'])
+
+
+def _tasas_de_consumo(modelo, pks, hoy):
+    """{pk: consumo diario suavizado} de los ítems con consumos en la ventana."""
+    inicio = hoy - timedelta(days=DIAS_HISTORIA - 1)
+    filas = MovimientoInventario.objects.filter(
+        content_type=ContentType.objects.get_for_model(modelo),
+        object_id__in=pks,
+        tipo=MovimientoInventario.Tipo.CONSUMO,
+        fecha__gte=timezone.make_aware(datetime.combine(inicio, time.min)),
+    ).exclude(nota__in=NOTAS_SIN_CONSUMO_REAL).annotate(dia=TruncDate('fecha')).values_list('object_id', 'dia').annotate(
+        total=Sum('cantidad')
+    ).order_by('object_id', 'dia')
+
+    retencion = 1 - ALPHA
+    tasas = {}
+    # Estado por ítem: (valor suavizado, último día aplicado)
+    estado = {}
+    for pk, dia, total in filas:
+        suavizado, ultimo = estado.get(pk, (0.0, inicio - timedelta(days=1)))
+        suavizado *= retencion ** ((dia - ultimo).days - 1)
+        suavizado = ALPHA * float(total) + retencion * suavizado
+        estado[pk] = (suavizado, dia)
+    for pk, (suavizado, ultimo) in estado.items():
+        tasas[pk] = suavizado * retencion ** (hoy - ultimo).days
+    return tasas
+
+
+def pronosticar(objetos, hoy=None):
+    """
+    Pronóstico para cada objeto de `objetos` (todos del mismo modelo de
+    CAMPOS_STOCK), con una sola consulta: {pk: Pronostico}.
+    `dias_restantes` y `fecha_agotamiento` son None si no hay consumo reciente.
+    """
+    objetos = list(objetos)
+    if not objetos:
+        return {}
+    hoy = hoy or timezone.localdate()
+    modelo = type(objetos[0])
+    ingresada, usada = CAMPOS_STOCK[modelo]
+    tasas = _tasas_de_consumo(modelo, [obj.pk for obj in objetos], hoy)
+
+    pronosticos = {}
+    for obj in objetos:
+        restante = float(getattr(obj, ingresada)) - float(getattr(obj, usada))
+        tasa = round(tasas.get(obj.pk, 0.0), 2)
+        if restante <= 0:
+            dias = 0
+        elif tasa > 0 and restante / tasa <= HORIZONTE_MAXIMO_DIAS:
+            dias = floor(restante / tasa)
+        else:
+            dias = None
+        fecha = hoy + timedelta(days=dias) if dias is not None else None
+        pronosticos[obj.pk] = Pronostico(tasa, dias, fecha)
+    return pronosticos
+
+
+def por_agotarse(queryset, dias, hoy=None):
+    """Objetos de `queryset` que se agotan en `dias` días o menos, con su pronóstico."""
+    objetos = list(queryset)
+    pronosticos = pronosticar(objetos, hoy)
+    return [
+        (obj, pronosticos[obj.pk]) for obj in objetos
+        if pronosticos[obj.pk].dias_restantes is not None and pronosticos[obj.pk].dias_restantes <= dias
+    ]
@@ -0,0 +1,447 @@
+# inventario/recordatorios.py
+"""
+Recolección de los recordatorios que envía `enviar_recordatorios`.
+
+Cada categoría es una consulta (dos por modelo en el stock por agotarse,
+por el pronóstico) que se evalúa una sola vez y se convierte en una lista
+de `Recordatorio`. El número de consultas no depende de cuántos ítems,
+trabajadores o pagos haya: las dotaciones salen de un único
+`Max('dotaciones__fecha_entrega')` agrupado por trabajador.
+
+El envío es incremental (`recolectar_nuevos`):
+
+- las señales incrementan la versión `recordatorios:<categoría>` de
+  `VersionCatalogo` al guardar o borrar los modelos de los que sale cada
+  categoría (`FUENTES`);
+- `RevisionRecordatorios` guarda, por categoría, la versión revisada y el
+  último día de la ventana revisada. Si la versión no cambió, solo se
+  consultan los días que entraron en la ventana desde entonces; si tampoco
+  cambió el día, la categoría no se consulta;
+- `RecordatorioNotificado` guarda lo ya enviado por (categoría, objeto,
+  fecha) y solo se envía lo que no está ahí. En las categorías de
+  `SIN_FECHA_FIJA` la fecha es un pronóstico que se mueve casi cada día:
+  cuenta solo el objeto, y se vuelve a notificar si sale de la lista y
+  regresa.
+
+Una ejecución sin cambios son dos consultas, así que el comando puede
+correr cada pocos minutos. Lo notificado es global: quien se suscribe
+después recibe los recordatorios desde entonces.
+
+Cada usuario recibe las categorías de los alcances a los que está suscrito
+(`SuscripcionRecordatorio`). Los destinatarios que reciben las mismas
+categorías comparten el resumen, que se renderiza una sola vez, y los
+correos se envían en lotes de `TAMANO_LOTE` por conexión SMTP, con hasta
+`HILOS` conexiones a la vez. Los recordatorios se marcan como notificados
+aunque falle un lote: los correos de ese lote quedan en
+`CorreoRecordatorioPendiente` y se reintentan solo para esos destinatarios.
+"""
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Max, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import (
+    Alimento, Combustible, CorreoRecordatorioPendiente, Dotacion, Mantenimiento, Medicamento, Pago,
+    RecordatorioNotificado, RevisionRecordatorios, SuscripcionRecordatorio, Trabajador, Vacuna, VersionCatalogo,
+)
+from .pronostico import por_agotarse
+
+DIAS_ANTICIPACION = 7
+MESES_DOTACION = 4
+
+# categoría -> título de su sección en el correo, en el orden en que se muestran
+CATEGORIAS = {
+    'alimentos': 'Alimentos por Vencer',
+    'medicamentos': 'Medicamentos por Vencer',
+    'vacunas': 'Vacunas por Vencer',
+    'mantenimientos': 'Mantenimientos Próximos',
+    'pagos': 'Pagos Pendientes',
+    'dotaciones': 'Dotaciones Próximas',
+    'stock_por_agotarse': 'Stock por Agotarse',
+}
+
+# Categorías cuya fecha es un pronóstico: lo notificado se identifica solo por el objeto
+SIN_FECHA_FIJA = {'stock_por_agotarse'}
+
+Alcance = SuscripcionRecordatorio.Alcance
+CATEGORIAS_POR_ALCANCE = {
+    Alcance.GANADO: ['medicamentos', 'vacunas'],
+    Alcance.ALIMENTOS: ['alimentos', 'stock_por_agotarse'],
+    Alcance.PAGOS: ['pagos', 'dotaciones'],
+    Alcance.MANTENIMIENTO: ['mantenimientos'],
+}
+
+ASUNTO = 'Recordatorios de Fechas Importantes - Finca La Matutina'
+PLANTILLA = 'inventario/email/recordatorio.html'
+TAMANO_LOTE = 50  # correos por conexión SMTP
+HILOS = 4
+
+
+class Recordatorio(NamedTuple):
+    categoria: str
+    nombre: str
+    fecha: datetime.date
+    detalle: str
+    objeto_id: Optional[int] = None
+    modelo: str = ''
+
+    @property
+    def clave(self):
+        return _clave(self.categoria, self.modelo, self.objeto_id, self.fecha)
+
+
+def _clave(categoria, modelo, objeto_id, fecha):
+    return (categoria, modelo, objeto_id, None if categoria in SIN_FECHA_FIJA else fecha)
+
+
+def _fecha(fecha):
+    return fecha.strftime('%d/%m/%Y')
+
+
+def alimentos_por_vencer(hoy, limite):
+    return Alimento.objects.filter(fecha_vencimiento__range=[hoy, limite]).only('nombre', 'fecha_vencimiento')
+
+
+def medicamentos_por_vencer(hoy, limite):
+    return Medicamento.objects.filter(fecha_vencimiento__range=[hoy, limite]).only('nombre', 'fecha_vencimiento')
+
+
+def vacunas_por_vencer(hoy, limite):
+    return Vacuna.objects.filter(fecha_vencimiento__range=[hoy, limite]).only('nombre', 'fecha_vencimiento')
+
+
+def mantenimientos_proximos(hoy, limite):
+    return Mantenimiento.objects.filter(
+        fecha_proximo_mantenimiento__range=[hoy, limite], completado=False,
+    ).only('equipo', 'fecha_proximo_mantenimiento')
+
+
+def pagos_pendientes(hoy, limite):
+    return Pago.objects.filter(fecha_pago__range=[hoy, limite], pago_realizado=False).select_related('trabajador')
+
+
+def ultimas_dotaciones(hoy, limite):
+    """
+    Trabajadores con su última entrega (`ultima_entrega`) cuya próxima dotación
+    puede caer en [hoy, limite]. Sumar meses no es igual en todos los motores,
+    así que la base filtra con unos días de margen y `_dotaciones` afina.
+    """
+    margen = datetime.timedelta(days=3)
+    desde = hoy - relativedelta(months=MESES_DOTACION) - margen
+    hasta = limite - relativedelta(months=MESES_DOTACION) + margen
+    return Trabajador.objects.annotate(
+        ultima_entrega=Max('dotaciones__fecha_entrega'),
+    ).filter(ultima_entrega__range=[desde, hasta])
+
+
+def _modelo(obj):
+    return obj._meta.label_lower
+
+
+def _vencimientos(categoria, queryset):
+    return [
+        Recordatorio(
+            categoria, obj.nombre, obj.fecha_vencimiento, f'Vence el {_fecha(obj.fecha_vencimiento)}.', obj.pk, _modelo(obj),
+        )
+        for obj in queryset
+    ]
+
+
+def _mantenimientos(hoy, limite):
+    return [
+        Recordatorio(
+            'mantenimientos', obj.equipo, obj.fecha_proximo_mantenimiento,
+            f'Próximo mantenimiento el {_fecha(obj.fecha_proximo_mantenimiento)}.', obj.pk, _modelo(obj),
+        )
+        for obj in mantenimientos_proximos(hoy, limite)
+    ]
+
+
+def _pagos(hoy, limite):
+    return [
+        Recordatorio(
+            'pagos', f'Pago a {pago.trabajador}', pago.fecha_pago, f'Programado para el {_fecha(pago.fecha_pago)}.',
+            pago.pk, _modelo(pago),
+        )
+        for pago in pagos_pendientes(hoy, limite)
+    ]
+
+
+def _dotaciones(hoy, limite):
+    recordatorios = []
+    for trabajador in ultimas_dotaciones(hoy, limite):
+        proxima = trabajador.ultima_entrega + relativedelta(months=MESES_DOTACION)
+        if hoy <= proxima <= limite:
+            recordatorios.append(Recordatorio(
+                'dotaciones', f'Dotación para {trabajador}', proxima,
+                f'Próxima entrega estimada para el {_fecha(proxima)}.', trabajador.pk, _modelo(trabajador),
+            ))
+    return recordatorios
+
+
+def _stock_por_agotarse(hoy):
+    """Alimentos y combustibles que al consumo reciente se agotan en `DIAS_ANTICIPACION` días."""
+    recordatorios = []
+    for queryset, campo_nombre, unidad in (
+        (Alimento.objects.only('nombre', 'cantidad_kg_ingresada', 'cantidad_kg_usada'), 'nombre', 'Kg'),
+        (Combustible.objects.only('tipo', 'cantidad_galones_ingresada', 'cantidad_galones_usados'), 'tipo', 'gal'),
+    ):
+        for obj, pronostico in por_agotarse(queryset, DIAS_ANTICIPACION, hoy):
+            recordatorios.append(Recordatorio(
+                'stock_por_agotarse', getattr(obj, campo_nombre), pronostico.fecha_agotamiento,
+                f'Al consumo actual ({pronostico.consumo_diario} {unidad}/día) '
+                f'se agota el {_fecha(pronostico.fecha_agotamiento)}.',
+                obj.pk, _modelo(obj),
+            ))
+    return recordatorios
+
+
+# categoría -> (recordatorios(hoy, desde, limite), modelos de los que sale, se puede consultar por tramos de fecha).
+# Los que no van por tramos se consultan enteros cada día o al cambiar. El pronóstico del stock depende del
+# día y del consumo: se revisa una vez al día y al editar el ítem, no con cada MovimientoInventario, para no
+# sumar una escritura a `usar_cantidad`.
+FUENTES = {
+    'alimentos': (lambda hoy, desde, limite: _vencimientos('alimentos', alimentos_por_vencer(desde, limite)), [Alimento], True),
+    'medicamentos': (
+        lambda hoy, desde, limite: _vencimientos('medicamentos', medicamentos_por_vencer(desde, limite)), [Medicamento], True,
+    ),
+    'vacunas': (lambda hoy, desde, limite: _vencimientos('vacunas', vacunas_por_vencer(desde, limite)), [Vacuna], True),
+    'mantenimientos': (lambda hoy, desde, limite: _mantenimientos(desde, limite), [Mantenimiento], True),
+    'pagos': (lambda hoy, desde, limite: _pagos(desde, limite), [Pago], True),
+    'dotaciones': (lambda hoy, desde, limite: _dotaciones(desde, limite), [Dotacion], True),
+    'stock_por_agotarse': (
+        lambda hoy, desde, limite: _stock_por_agotarse(hoy), [Alimento, Combustible], False,
+    ),
+}
+
+# Categorías cuya versión cambia al guardar o borrar cada modelo.
+CATEGORIAS_POR_MODELO = {
+    modelo: [categoria for categoria, (_, modelos, _) in FUENTES.items() if modelo in modelos]
+    for modelo in {modelo for _, modelos, _ in FUENTES.values() for modelo in modelos}
+}
+
+
+def clave_version(categoria):
+    return f'recordatorios:{categoria}'
+
+
+def marcar_modificadas(*categorias):
+    """Incrementa la versión de las categorías indicadas: se revisan enteras en la próxima ejecución."""
+    for categoria in categorias:
+        VersionCatalogo.incrementar(clave_version(categoria))
+
+
+def _ordenar(recordatorios):
+    orden = list(CATEGORIAS)
+    return sorted(recordatorios, key=lambda r: (orden.index(r.categoria), r.fecha, r.nombre))
+
+
+def recolectar(hoy=None):
+    """Todos los recordatorios de los próximos `DIAS_ANTICIPACION` días, por categoría y fecha."""
+    hoy = hoy or timezone.localdate()
+    limite = hoy + datetime.timedelta(days=DIAS_ANTICIPACION)
+    return _ordenar([r for construir, _, _ in FUENTES.values() for r in construir(hoy, hoy, limite)])
+
+
+def recolectar_nuevos(hoy=None):
+    """
+    Recordatorios de la ventana que todavía no se notificaron, consultando
+    solo las categorías y los días que pudieron cambiar desde la última
+    revisión. Devuelve (recordatorios, revisiones); una vez enviados hay que
+    pasar ambos a `registrar_notificados`.
+    """
+    hoy = hoy or timezone.localdate()
+    limite = hoy + datetime.timedelta(days=DIAS_ANTICIPACION)
+    versiones = dict(VersionCatalogo.objects.filter(
+        clave__in=[clave_version(c) for c in FUENTES],
+    ).values_list('clave', 'version'))
+    revisiones = {r.categoria: r for r in RevisionRecordatorios.objects.all()}
+
+    candidatos, revisadas = [], []
+    for categoria, (construir, _, por_tramos) in FUENTES.items():
+        version = versiones.get(clave_version(categoria), 0)
+        revision = revisiones.get(categoria) or RevisionRecordatorios(categoria=categoria)
+        desde = hoy
+        if revision.pk and revision.version == version:
+            if revision.revisado_hasta >= limite:
+                continue
+            if por_tramos:
+                desde = max(hoy, revision.revisado_hasta + datetime.timedelta(days=1))
+        candidatos.extend(construir(hoy, desde, limite))
+        revision.version, revision.revisado_hasta = version, limite
+        revisadas.append(revision)
+
+    sin_fecha = {r.categoria for r in revisadas} & SIN_FECHA_FIJA
+    if sin_fecha:
+        _olvidar_salidos(sin_fecha, candidatos)
+    if not candidatos:
+        return [], revisadas
+    notificados = {_clave(*fila) for fila in RecordatorioNotificado.objects.filter(
+        Q(fecha__gte=hoy) | Q(categoria__in=SIN_FECHA_FIJA), categoria__in={r.categoria for r in candidatos},
+    ).values_list('categoria', 'modelo', 'objeto_id', 'fecha')}
+    return _ordenar([r for r in candidatos if r.clave not in notificados]), revisadas
+
+
+def _olvidar_salidos(categorias, candidatos):
+    """
+    Borra lo notificado de `categorias` (de `SIN_FECHA_FIJA`, que se
+    consultan enteras) cuyo objeto ya no está en la lista: si vuelve, se
+    notifica de nuevo.
+    """
+    en_lista = {(r.categoria, r.modelo, r.objeto_id) for r in candidatos}
+    salidos = [
+        pk for pk, *objeto in RecordatorioNotificado.objects.filter(
+            categoria__in=categorias,
+        ).values_list('pk', 'categoria', 'modelo', 'objeto_id')
+        if tuple(objeto) not in en_lista
+    ]
+    if salidos:
+        RecordatorioNotificado.objects.filter(pk__in=salidos).delete()
+
+
+def registrar_notificados(recordatorios, revisiones=(), hoy=None):
+    """Guarda los recordatorios como enviados, avanza las revisiones y olvida los ya vencidos."""
+    if not recordatorios and not revisiones:
+        return
+    hoy = hoy or timezone.localdate()
+    for revision in revisiones:
+        revision.actualizado = timezone.now()
+    with transaction.atomic():
+        RecordatorioNotificado.objects.filter(fecha__lt=hoy).exclude(categoria__in=SIN_FECHA_FIJA).delete()
+        RecordatorioNotificado.objects.bulk_create([
+            RecordatorioNotificado(categoria=r.categoria, modelo=r.modelo, objeto_id=r.objeto_id, fecha=r.fecha)
+            for r in recordatorios
+        ], ignore_conflicts=True)
+        RevisionRecordatorios.objects.bulk_update([r for r in revisiones if r.pk], ['version', 'revisado_hasta', 'actualizado'])
+        RevisionRecordatorios.objects.bulk_create([r for r in revisiones if not r.pk])
+
+
+def secciones(recordatorios):
+    """[{'titulo', 'recordatorios'}] de las categorías con algo, para la plantilla del correo."""
+    por_categoria = {}
+    for recordatorio in recordatorios:
+        por_categoria.setdefault(recordatorio.categoria, []).append(recordatorio)
+    return [
+        {'titulo': titulo, 'recordatorios': por_categoria[categoria]}
+        for categoria, titulo in CATEGORIAS.items() if categoria in por_categoria
+    ]
+
+
+def destinatarios():
+    """{correo: alcances} de los usuarios activos con correo y alguna suscripción, en una consulta."""
+    alcances = {}
+    suscripciones = SuscripcionRecordatorio.objects.filter(usuario__is_active=True).exclude(usuario__email='')
+    for correo, alcance in suscripciones.values_list('usuario__email', 'alcance'):
+        alcances.setdefault(correo, set()).add(alcance)
+    return alcances
+
+
+def preparar_correos(recordatorios, alcances_por_correo):
+    """
+    Un correo por destinatario con las categorías de sus alcances que tienen
+    recordatorios; quien no tiene nada que leer no recibe correo. Cada
+    combinación distinta de categorías se renderiza una sola vez.
+    Devuelve (correos, cantidad de resúmenes renderizados, claves de los
+    recordatorios que van en algún correo).
+    """
+    con_recordatorios = {r.categoria for r in recordatorios}
+    resumenes = {}
+    correos = []
+    entregadas = set()
+    for correo, alcances in sorted(alcances_por_correo.items()):
+        suscritas = {c for alcance in alcances for c in CATEGORIAS_POR_ALCANCE.get(alcance, [])}
+        categorias = tuple(c for c in CATEGORIAS if c in suscritas and c in con_recordatorios)
+        if not categorias:
+            continue
+        if categorias not in resumenes:
+            html = render_to_string(PLANTILLA, {
+                'secciones': secciones([r for r in recordatorios if r.categoria in categorias]),
+            })
+            resumenes[categorias] = (strip_tags(html), html)
+        correos.append(_mensaje(correo, *resumenes[categorias]))
+        entregadas.update(categorias)
+    return correos, len(resumenes), {r.clave for r in recordatorios if r.categoria in entregadas}
+
+
+def _mensaje(correo, texto, html):
+    mensaje = EmailMultiAlternatives(ASUNTO, texto, settings.EMAIL_HOST_USER, [correo])
+    mensaje.attach_alternative(html, 'text/html')
+    return mensaje
+
+
+def correos_pendientes(ahora=None):
+    """
+    [(CorreoRecordatorioPendiente, mensaje)] de los correos que fallaron antes.
+    Los de más de `DIAS_ANTICIPACION` días se descartan: sus recordatorios ya vencieron.
+    """
+    ahora = ahora or timezone.now()
+    CorreoRecordatorioPendiente.objects.filter(creado__lt=ahora - datetime.timedelta(days=DIAS_ANTICIPACION)).delete()
+    return [
+        (pendiente, _mensaje(pendiente.correo, pendiente.texto, pendiente.html))
+        for pendiente in CorreoRecordatorioPendiente.objects.order_by('pk')
+    ]
+
+
+def registrar_envio(recordatorios, revisiones, entregados, pendientes, fallidos, hoy=None):
+    """
+    Guarda el resultado de un envío: los recordatorios con clave en
+    `entregados` (ver `preparar_correos`) quedan notificados, los correos de
+    `pendientes` que salieron se borran y los `fallidos` ([(mensaje, error)]
+    de `enviar_por_lotes`) quedan pendientes. Las categorías con algún
+    recordatorio sin destinatario no avanzan su revisión, así se vuelven a
+    consultar cuando alguien se suscriba.
+    """
+    sin_entregar = {r.categoria for r in recordatorios if r.clave not in entregados}
+    recordatorios = [r for r in recordatorios if r.clave in entregados]
+    revisiones = [r for r in revisiones if r.categoria not in sin_entregar]
+    error_de = {id(mensaje): error for mensaje, error in fallidos}
+    reintentados = {id(mensaje) for _, mensaje in pendientes}
+    siguen_pendientes = []
+    for pendiente, mensaje in pendientes:
+        if id(mensaje) in error_de:
+            pendiente.intentos += 1
+            pendiente.ultimo_error = error_de[id(mensaje)]
+            siguen_pendientes.append(pendiente)
+    with transaction.atomic():
+        registrar_notificados(recordatorios, revisiones, hoy)
+        CorreoRecordatorioPendiente.objects.filter(
+            pk__in=[p.pk for p, mensaje in pendientes if id(mensaje) not in error_de],
+        ).delete()
+        CorreoRecordatorioPendiente.objects.bulk_update(siguen_pendientes, ['intentos', 'ultimo_error'])
+        CorreoRecordatorioPendiente.objects.bulk_create([
+            CorreoRecordatorioPendiente(
+                correo=mensaje.to[0], texto=mensaje.body, html=mensaje.alternatives[0][0], ultimo_error=error,
+            )
+            for mensaje, error in fallidos if id(mensaje) not in reintentados
+        ])
+
+
+def _enviar_lote(correos):
+    """(enviados, mensaje de error) de un lote enviado por una sola conexión."""
+    try:
+        return get_connection(fail_silently=False).send_messages(correos) or 0, ''
+    except Exception as e:
+        return 0, str(e) or e.__class__.__name__
+
+
+def enviar_por_lotes(correos, lote=TAMANO_LOTE, hilos=HILOS):
+    """
+    Envía `correos` en lotes de `lote` (una conexión SMTP por lote), con hasta
+    `hilos` lotes a la vez. Devuelve (cantidad enviada, [(correo, error)] de los
+    lotes fallidos).
+    """
+    lotes = [correos[i:i + lote] for i in range(0, len(correos), lote)]
+    if not lotes:
+        return 0, []
+    with ThreadPoolExecutor(max_workers=min(hilos, len(lotes))) as pool:
+        resultados = list(pool.map(_enviar_lote, lotes))
+    fallidos = [(correo, error) for correos_lote, (_, error) in zip(lotes, resultados) if error for correo in correos_lote]
+    return sum(enviados for enviados, _ in resultados), fallidos
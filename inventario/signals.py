@@ -1,40 +1,130 @@
 # inventario/signals.py
-from django.db.models.signals import pre_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete, post_init, m2m_changed
 from django.dispatch import receiver
-import cloudinary
 from .models import (
     Producto, Ganado, Medicamento, Alimento, ControlPlaga,
     Potrero, Mantenimiento, Combustible
 )
+from .catalogos import CATALOGOS_POR_MODELO, marcar_modificado
+from .borrado_imagenes import encolar_borrado
+from .busqueda import TIPO_POR_MODELO, desindexar, indexar
+from .cache import invalidar_por_instancia, invalidar_por_m2m
+from .recordatorios import CATEGORIAS_POR_MODELO, marcar_modificadas
+from .stock import CAMPOS_STOCK, guardar_saldo_inicial, registrar_cambios_de_saldo
 
 MODELS_WITH_IMAGES = [
     Producto, Ganado, Medicamento, Alimento, ControlPlaga,
     Potrero, Mantenimiento, Combustible
 ]
 
-@receiver(pre_save)
-def handle_image_change(sender, instance, **kwargs):
+def _public_id(imagen):
+    """public_id de un CloudinaryResource, o el valor tal cual si ya es un public_id."""
+    return getattr(imagen, 'public_id', imagen)
+
+def handle_imagen_cargada(sender, instance, **kwargs):
+    """Recuerda el public_id con el que se cargó la imagen, para no consultarlo al guardar."""
+    if 'imagen' not in instance.get_deferred_fields():
+        instance._imagen_cargada = _public_id(instance.imagen)
+
+def handle_image_change(sender, instance, update_fields=None, **kwargs):
     """
     Se ejecuta antes de guardar una instancia.
-    Borra la imagen antigua si se sube una nueva o si se limpia el campo.
+    Recuerda la imagen antigua si se sube una nueva o si se limpia el campo;
+    su borrado se encola en post_save, cuando el guardado ya se hizo.
+    Solo consulta la base si la imagen se difirió al cargar y luego se asignó.
     """
-    if sender in MODELS_WITH_IMAGES and instance.pk:
-        try:
-            old_instance = sender.objects.get(pk=instance.pk)
-            old_image = old_instance.imagen
-            new_image = instance.imagen
+    if instance._state.adding or (update_fields is not None and 'imagen' not in update_fields):
+        return
+    if 'imagen' in instance.get_deferred_fields():
+        return
+    # La imagen nueva puede ser un CloudinaryResource, un public_id o un archivo subido
+    nueva = _public_id(instance.imagen)
+    if '_imagen_cargada' in instance.__dict__:
+        anterior = instance._imagen_cargada
+    else:
+        anterior = _public_id(sender.objects.filter(pk=instance.pk).values_list('imagen', flat=True).first())
+    if anterior and anterior != nueva:
+        instance._imagen_reemplazada = anterior
 
-            if old_image and old_image != new_image:
-                cloudinary.uploader.destroy(old_image.public_id)
-        except sender.DoesNotExist:
-            pass
+def handle_image_replaced(sender, instance, update_fields=None, **kwargs):
+    """Encola el borrado en Cloudinary de la imagen reemplazada y actualiza la copia cargada."""
+    public_id = instance.__dict__.pop('_imagen_reemplazada', None)
+    if public_id:
+        encolar_borrado(public_id)
+    if update_fields is None or 'imagen' in update_fields:
+        if 'imagen' not in instance.get_deferred_fields():
+            instance._imagen_cargada = _public_id(instance.imagen)
 
 @receiver(post_delete)
 def handle_image_delete_on_model_delete(sender, instance, **kwargs):
     """
     Se ejecuta después de que un objeto es eliminado.
-    Borra la imagen asociada de Cloudinary.
+    Encola el borrado de la imagen asociada en Cloudinary.
     """
     if sender in MODELS_WITH_IMAGES:
         if instance.imagen:
-            cloudinary.uploader.destroy(instance.imagen.public_id)
\ No newline at end of file
+            encolar_borrado(_public_id(instance.imagen))
+
+@receiver(post_save)
+@receiver(post_delete)
+def handle_catalogo_modificado(sender, instance, **kwargs):
+    """
+    Incrementa la versión de los catálogos que dependen del modelo guardado
+    o eliminado, para que /catalogos/ responda con un ETag nuevo.
+    """
+    catalogos = CATALOGOS_POR_MODELO.get(sender)
+    if catalogos:
+        marcar_modificado(*catalogos)
+
+@receiver(post_save)
+@receiver(post_delete)
+def handle_recordatorios_modificados(sender, instance, **kwargs):
+    """
+    Incrementa la versión de las categorías de recordatorios que salen del
+    modelo guardado o eliminado, para que el próximo envío las revise enteras.
+    """
+    categorias = CATEGORIAS_POR_MODELO.get(sender)
+    if categorias:
+        marcar_modificadas(*categorias)
+
+@receiver(post_save)
+@receiver(post_delete)
+def handle_cache_invalidacion(sender, instance, **kwargs):
+    """Invalida en la caché los detalles y listas que muestran la instancia."""
+    invalidar_por_instancia(sender, instance)
+
+@receiver(m2m_changed)
+def handle_cache_invalidacion_m2m(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Invalida los objetos cuya relación ManyToMany cambió."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidar_por_m2m(sender, instance, reverse, model, pk_set)
+
+def handle_saldo_cargado(sender, instance, **kwargs):
+    """Guarda el saldo con el que se cargó el objeto para comparar al guardarlo."""
+    guardar_saldo_inicial(instance)
+
+def handle_saldo_guardado(sender, instance, created, raw=False, **kwargs):
+    """Registra en MovimientoInventario los cambios de saldo hechos con save()."""
+    if not raw:
+        registrar_cambios_de_saldo(instance, created)
+
+for modelo_stock in CAMPOS_STOCK:
+    post_init.connect(handle_saldo_cargado, sender=modelo_stock)
+    post_save.connect(handle_saldo_guardado, sender=modelo_stock)
+
+for modelo_imagen in MODELS_WITH_IMAGES:
+    post_init.connect(handle_imagen_cargada, sender=modelo_imagen)
+    pre_save.connect(handle_image_change, sender=modelo_imagen)
+    post_save.connect(handle_image_replaced, sender=modelo_imagen)
+
+def handle_busqueda_guardado(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Actualiza la entrada de /buscar/ del objeto guardado."""
+    if not raw:
+        indexar(instance, update_fields)
+
+def handle_busqueda_borrado(sender, instance, **kwargs):
+    desindexar(instance)
+
+for modelo_busqueda in TIPO_POR_MODELO:
+    post_save.connect(handle_busqueda_guardado, sender=modelo_busqueda)
+    post_delete.connect(handle_busqueda_borrado, sender=modelo_busqueda)
@@ -0,0 +1,30 @@
+// Modales "Ver detalles" de las listas del admin: el HTML se pide al pulsar el botón.
+document.addEventListener('click', async (event) => {
+    const boton = event.target.closest('[data-detalles-url]');
+    if (!boton) return;
+    event.preventDefault();
+    event.stopPropagation();
+
+    // Se pide una sola vez por fila y se reutiliza al reabrir
+    if (!boton.modalDetalles) {
+        boton.disabled = true;
+        try {
+            const response = await fetch(boton.dataset.detallesUrl, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                credentials: 'same-origin',
+            });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const contenedor = document.createElement('div');
+            contenedor.innerHTML = await response.text();
+            boton.modalDetalles = contenedor.querySelector('.modal');
+            document.body.appendChild(boton.modalDetalles);
+        } catch (error) {
+            console.error('Error al cargar los detalles:', error);
+            alert('No se pudieron cargar los detalles.');
+            return;
+        } finally {
+            boton.disabled = false;
+        }
+    }
+    boton.modalDetalles.style.display = 'block';
+});
@@ -4,6 +4,53 @@ document.addEventListener('DOMContentLoaded', () => {
     const detailsContent = detailsModal.querySelector('.details-content');
     const infoContent = infoModal.querySelector('.info-content');
 
+    // Catálogos de los formularios. El navegador revalida con el ETag y recibe 304 si no cambiaron.
+    const obtenerCatalogos = async () => {
+        const response = await fetch('/catalogos/', { cache: 'no-cache' });
+        if (!response.ok) throw new Error('Error al cargar los catálogos.');
+        return response.json();
+    };
+
+    // Añade a los detalles los catálogos que su modal espera, con las claves de siempre
+    const completarConCatalogos = async (singleItemType, data) => {
+        const { catalogos, claves_por_tipo } = await obtenerCatalogos();
+        Object.entries(claves_por_tipo[singleItemType] || {}).forEach(([clave, catalogo]) => {
+            const valores = catalogos[catalogo] || [];
+            data[clave] = clave === 'otros_potreros' ? valores.filter(p => p.id !== data.id) : valores;
+        });
+        return data;
+    };
+
+    // Detalles precargados por lotes para las tarjetas visibles, clave "tipo:id"
+    const detallesCache = new Map();
+
+    const prefetchDetalles = async (singleItemType, ids) => {
+        detallesCache.clear();
+        if (ids.length === 0) return;
+        const items = ids.map(id => `${singleItemType}:${id}`).join(',');
+        try {
+            const response = await fetch(`/detalles/batch/?items=${encodeURIComponent(items)}`);
+            if (!response.ok) return;
+            const lote = await response.json();
+            lote.items.forEach(({ tipo, id, data }) => detallesCache.set(`${tipo}:${id}`, data));
+        } catch (error) {
+            console.error('Error precargando detalles:', error);
+        }
+    };
+
+    const obtenerDetalles = async (singleItemType, itemId) => {
+        const clave = `${singleItemType}:${itemId}`;
+        if (detallesCache.has(clave)) {
+            // Se usa una sola vez para que al reabrir el modal se vean los datos actuales
+            const data = detallesCache.get(clave);
+            detallesCache.delete(clave);
+            return completarConCatalogos(singleItemType, data);
+        }
+        const response = await fetch(`/${singleItemType}/detalles/${itemId}/`);
+        if (!response.ok) throw new Error('Error al cargar datos del item.');
+        return completarConCatalogos(singleItemType, await response.json());
+    };
+
     window.setupModal = (itemType) => {
         const openBtn = document.getElementById(`${itemType}-btn`);
         const mainModal = document.getElementById(`${itemType}-modal`);
@@ -45,6 +92,9 @@ document.addEventListener('DOMContentLoaded', () => {
             if (event.target === infoModal) closeInfoModal();
         });
 
+        const supportedTypes = ['alimentos', 'combustibles', 'control-plagas', 'mantenimientos', 'potreros', 'productos', 'medicamentos', 'ganado'];
+        const singleItemType = itemType.endsWith('s') ? itemType.slice(0, -1) : itemType;
+
         const fetchItems = async (page = 1) => {
             const params = new URLSearchParams({
                 page,
@@ -78,6 +128,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 const data = await response.json();
                 renderGrid(data.items);
                 renderPagination(data);
+                if (supportedTypes.includes(itemType)) {
+                    prefetchDetalles(singleItemType, (data.items || []).map(item => item.id));
+                }
             } catch (error) {
                 console.error(`Error fetching ${itemType}:`, error);
                 gridContainer.innerHTML = `<p>Error al cargar los ${itemType.replace('-', ' ')}.</p>`;
@@ -87,16 +140,12 @@ document.addEventListener('DOMContentLoaded', () => {
         const attachDetailButtonListener = (button) => {
             button.addEventListener('click', async () => {
                 const itemId = button.dataset.id;
-                const supportedTypes = ['alimentos', 'combustibles', 'control-plagas', 'mantenimientos', 'potreros', 'productos', 'medicamentos', 'ganado'];
                 if (!supportedTypes.includes(itemType)) {
                     alert('La vista de detalles para esta sección aún no está implementada.');
                     return;
                 }
                 try {
-                    const singleItemType = itemType.endsWith('s') ? itemType.slice(0, -1) : itemType;
-                    const response = await fetch(`/${singleItemType}/detalles/${itemId}/`);
-                    if (!response.ok) throw new Error('Error al cargar datos del item.');
-                    const data = await response.json();
+                    const data = await obtenerDetalles(singleItemType, itemId);
                     renderDetailsModal(data, itemType);
                     detailsModal.style.display = 'block';
                 } catch (error) {
@@ -119,7 +168,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 const itemCard = document.createElement('div');
                 itemCard.className = 'item-card';
                 itemCard.innerHTML = `
-                    ${item.imagen_url ? `<img src="${item.imagen_url}" alt="${item.nombre}" class="item-card-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
+                    ${item.imagen_url ? `<img src="${item.thumb_url || item.imagen_url}" alt="${item.nombre}" class="item-card-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
                     <div class="item-card-body">
                         <h3 class="item-card-title">${item.nombre || item.tipo}</h3>
                         ${item.detalle ? `<p class="item-card-text">${item.detalle}</p>` : ''}
@@ -173,12 +222,11 @@ document.addEventListener('DOMContentLoaded', () => {
         const closeBtn = modal.querySelector('.close-btn');
 
         try {
-            const response = await fetch('/get_vacuna_form_data/');
-            const data = await response.json();
+            const { catalogos } = await obtenerCatalogos();
             
-            const allProveedoresOptions = data.proveedores.map(p => `<option value="${p.id}">${p.nombre}</option>`).join('');
-            const allUbicacionesOptions = data.ubicaciones.map(u => `<option value="${u.id}">${u.nombre}</option>`).join('');
-            const allEtiquetasOptions = data.etiquetas.map(e => `<option value="${e.id}">${e.nombre}</option>`).join('');
+            const allProveedoresOptions = catalogos.proveedores.map(p => `<option value="${p.id}">${p.nombre}</option>`).join('');
+            const allUbicacionesOptions = catalogos.ubicaciones.map(u => `<option value="${u.id}">${u.nombre}</option>`).join('');
+            const allEtiquetasOptions = catalogos.etiquetas_principales.map(e => `<option value="${e.id}">${e.nombre}</option>`).join('');
 
             // HTML del formulario con los nuevos wrappers para los selectores múltiples
             form.innerHTML = `
@@ -294,29 +342,29 @@ document.addEventListener('DOMContentLoaded', () => {
             
             return `<div class="details-section tags-section"><h4>Etiquetas</h4><div class="tags-container">${tagsHtml || '<li>Ninguna</li>'}</div><div class="management-grid"><form id="assign-category-form" data-id="${d.id}" class="additional-form"><label>Asignar Categoría:</label><div class="form-row"><select id="category-select" required><option value="">Seleccione...</option>${availableCategories}</select><button type="submit">Asignar</button></div></form><form id="create-category-form" data-id="${d.id}" class="additional-form"><label>Crear Categoría:</label><div class="form-row"><input type="text" id="new-category-name" placeholder="Nombre..." required><button type="submit">Crear</button></div></form><form id="add-tag-form" data-id="${d.id}" class="additional-form"><label>Añadir Etiqueta:</label><div class="form-row"><select id="tag-select" required><option value="">Seleccione...</option>${availableMainTags}</select><button type="submit">Añadir</button></div></form><form id="create-tag-form" data-id="${d.id}" class="additional-form"><label>Crear Etiqueta Principal:</label><div class="form-row"><input type="text" id="new-tag-name" placeholder="Nombre..." required><button type="submit">Crear</button></div></form><form id="add-subtag-form" data-id="${d.id}" class="additional-form"><label>Añadir Sub-Etiqueta:</label><div class="form-row"><select id="add-subtag-parent-select" required><option value="">Etiqueta Padre...</option>${assignedMainTags}</select><select id="add-subtag-select" required><option value="">Sub-Etiqueta...</option></select><button type="submit">Añadir</button></div></form><form id="create-subtag-form" data-id="${d.id}" class="additional-form"><label>Crear Sub-Etiqueta:</label><div class="form-row"><input type="text" id="new-subtag-name" placeholder="Nombre..." required><select id="parent-tag-select" required><option value="">Asociar a...</option>${assignedMainTags}</select><button type="submit">Crear</button></div></form></div></div>`;
         };
-        return `<div class="modal-header"><h2>${d.nombre}</h2><span class="close-btn" id="details-close-btn">&times;</span></div><hr class="separator"><div class="modal-body"><div class="details-grid"><div class="details-left-column">${d.imagen_url ? `<img src="${d.imagen_url}" alt="${d.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}</div><div class="details-right-column">${renderInventarioSection(d)}${renderDespachoSection(d)}</div></div><div class="details-bottom-grid">${renderInfoSection(d)}${renderAdicionalSection(d)}</div></div>`;
+        return `<div class="modal-header"><h2>${d.nombre}</h2><span class="close-btn" id="details-close-btn">&times;</span></div><hr class="separator"><div class="modal-body"><div class="details-grid"><div class="details-left-column">${d.imagen_url ? `<img src="${d.thumb_url || d.imagen_url}" alt="${d.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}</div><div class="details-right-column">${renderInventarioSection(d)}${renderDespachoSection(d)}</div></div><div class="details-bottom-grid">${renderInfoSection(d)}${renderAdicionalSection(d)}</div></div>`;
     }
 
     function renderCombustibleDetails(d) {
         const renderProviders = () => d.proveedores.map((p, index) => `<li class="info-list-item">${p.nombre} <button class="info-btn" data-type="proveedor" data-index="${index}">Ver más</button></li>`).join('') || '<li>N/A</li>';
         const renderUbicaciones = () => d.ubicaciones.map((u, index) => `<li class="info-list-item">${u.nombre} <button class="info-btn" data-type="ubicacion" data-index="${index}">Ver más</button></li>`).join('') || '<li>N/A</li>';
-        return `<div class="modal-header"><h2>${d.tipo}</h2><span class="close-btn" id="details-close-btn">&times;</span></div><hr class="separator"><div class="modal-body"><div class="details-grid"><div class="details-left-column">${d.imagen_url ? `<img src="${d.imagen_url}" alt="${d.tipo}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}</div><div class="details-right-column"><div class="details-section"><h4>Inventario</h4><p><strong>Galones ingresados:</strong> ${d.cantidad_galones_ingresada}</p><p><strong>Galones usados:</strong> ${d.cantidad_galones_usados}</p><p><strong>Galones restantes:</strong> ${d.cantidad_galones_restantes}</p><p><strong>Precio por galón:</strong> $${d.precio}</p></div><div class="details-section"><h4>Despacho</h4><div class="management-grid"><form id="dispatch-form" data-id="${d.id}" class="additional-form"><label>Usar Cantidad (Gal):</label><div class="form-row"><input type="number" step="0.01" min="0" id="dispatch-qty" required><button type="submit">Aceptar</button></div></form><form id="add-stock-form" data-id="${d.id}" class="additional-form"><label>Añadir Cantidad (Gal):</label><div class="form-row"><input type="number" step="0.01" min="0" id="add-qty" required><button type="submit">Añadir</button></div></form></div></div><div class="details-section"><h4>Información</h4><p><strong>Descripción:</strong> ${d.descripcion || 'N/A'}</p><p><strong>Proveedores:</strong></p><ul class="info-list">${renderProviders()}</ul><p><strong>Ubicaciones:</strong></p><ul class="info-list">${renderUbicaciones()}</ul></div></div></div></div>`;
+        return `<div class="modal-header"><h2>${d.tipo}</h2><span class="close-btn" id="details-close-btn">&times;</span></div><hr class="separator"><div class="modal-body"><div class="details-grid"><div class="details-left-column">${d.imagen_url ? `<img src="${d.thumb_url || d.imagen_url}" alt="${d.tipo}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}</div><div class="details-right-column"><div class="details-section"><h4>Inventario</h4><p><strong>Galones ingresados:</strong> ${d.cantidad_galones_ingresada}</p><p><strong>Galones usados:</strong> ${d.cantidad_galones_usados}</p><p><strong>Galones restantes:</strong> ${d.cantidad_galones_restantes}</p><p><strong>Precio por galón:</strong> $${d.precio}</p></div><div class="details-section"><h4>Despacho</h4><div class="management-grid"><form id="dispatch-form" data-id="${d.id}" class="additional-form"><label>Usar Cantidad (Gal):</label><div class="form-row"><input type="number" step="0.01" min="0" id="dispatch-qty" required><button type="submit">Aceptar</button></div></form><form id="add-stock-form" data-id="${d.id}" class="additional-form"><label>Añadir Cantidad (Gal):</label><div class="form-row"><input type="number" step="0.01" min="0" id="add-qty" required><button type="submit">Añadir</button></div></form></div></div><div class="details-section"><h4>Información</h4><p><strong>Descripción:</strong> ${d.descripcion || 'N/A'}</p><p><strong>Proveedores:</strong></p><ul class="info-list">${renderProviders()}</ul><p><strong>Ubicaciones:</strong></p><ul class="info-list">${renderUbicaciones()}</ul></div></div></div></div>`;
     }
 
     function renderControlPlagaDetails(d) {
         const renderProviders = () => d.proveedores.map((p, index) => `<li class="info-list-item">${p.nombre} <button class="info-btn" data-type="proveedor" data-index="${index}">Ver más</button></li>`).join('') || '<li>N/A</li>';
         const renderUbicaciones = () => d.ubicaciones.map((u, index) => `<li class="info-list-item">${u.nombre} <button class="info-btn" data-type="ubicacion" data-index="${index}">Ver más</button></li>`).join('') || '<li>N/A</li>';
-        return `<div class="modal-header"><h2>${d.nombre}</h2><span class="close-btn" id="details-close-btn">&times;</span></div><hr class="separator"><div class="modal-body"><div class="details-grid"><div class="details-left-column">${d.imagen_url ? `<img src="${d.imagen_url}" alt="${d.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}</div><div class="details-right-column"><div class="details-section"><h4>Inventario</h4><p><strong>Tipo:</strong> ${d.tipo}</p><p><strong>Ingresado:</strong> ${d.cantidad_ingresada} ${d.unidad_medida}</p><p><strong>Usado:</strong> ${d.cantidad_usada} ${d.unidad_medida}</p><p><strong>Restante:</strong> ${d.cantidad_restante} ${d.unidad_medida}</p><p><strong>Precio:</strong> $${d.precio}</p></div><div class="details-section"><h4>Despacho</h4><div class="management-grid"><form id="dispatch-form" data-id="${d.id}" class="additional-form"><label>Usar Cantidad:</label><div class="form-row"><input type="number" step="0.01" min="0" id="dispatch-qty" required><button type="submit">Aceptar</button></div></form><form id="add-stock-form" data-id="${d.id}" class="additional-form"><label>Añadir Cantidad:</label><div class="form-row"><input type="number" step="0.01" min="0" id="add-qty" required><button type="submit">Añadir</button></div></form></div></div><div class="details-section"><h4>Información</h4><p><strong>Descripción:</strong> ${d.descripcion || 'N/A'}</p><p><strong>Proveedores:</strong></p><ul class="info-list">${renderProviders()}</ul><p><strong>Ubicaciones:</strong></p><ul class="info-list">${renderUbicaciones()}</ul><p><strong>Fechas:</strong> Compra: ${d.fecha_compra} | Vence: ${d.fecha_vencimiento}</p></div></div></div></div>`;
+        return `<div class="modal-header"><h2>${d.nombre}</h2><span class="close-btn" id="details-close-btn">&times;</span></div><hr class="separator"><div class="modal-body"><div class="details-grid"><div class="details-left-column">${d.imagen_url ? `<img src="${d.thumb_url || d.imagen_url}" alt="${d.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}</div><div class="details-right-column"><div class="details-section"><h4>Inventario</h4><p><strong>Tipo:</strong> ${d.tipo}</p><p><strong>Ingresado:</strong> ${d.cantidad_ingresada} ${d.unidad_medida}</p><p><strong>Usado:</strong> ${d.cantidad_usada} ${d.unidad_medida}</p><p><strong>Restante:</strong> ${d.cantidad_restante} ${d.unidad_medida}</p><p><strong>Precio:</strong> $${d.precio}</p></div><div class="details-section"><h4>Despacho</h4><div class="management-grid"><form id="dispatch-form" data-id="${d.id}" class="additional-form"><label>Usar Cantidad:</label><div class="form-row"><input type="number" step="0.01" min="0" id="dispatch-qty" required><button type="submit">Aceptar</button></div></form><form id="add-stock-form" data-id="${d.id}" class="additional-form"><label>Añadir Cantidad:</label><div class="form-row"><input type="number" step="0.01" min="0" id="add-qty" required><button type="submit">Añadir</button></div></form></div></div><div class="details-section"><h4>Información</h4><p><strong>Descripción:</strong> ${d.descripcion || 'N/A'}</p><p><strong>Proveedores:</strong></p><ul class="info-list">${renderProviders()}</ul><p><strong>Ubicaciones:</strong></p><ul class="info-list">${renderUbicaciones()}</ul><p><strong>Fechas:</strong> Compra: ${d.fecha_compra} | Vence: ${d.fecha_vencimiento}</p></div></div></div></div>`;
     }
 
     function renderMantenimientoDetails(d) {
         const lugaresHtml = d.lugares_mantenimiento.map(lugar => `<li class="info-list-item">${lugar.nombre} <button class="info-btn" data-type="lugar-mantenimiento" data-id="${lugar.id}">Ver más</button></li>`).join('') || '<li>No asignado</li>';
-        return `<div class="modal-header"><h2>${d.equipo}</h2><span class="close-btn" id="details-close-btn">&times;</span></div><hr class="separator"><div class="modal-body"><div class="details-grid"><div class="details-left-column">${d.imagen_url ? `<img src="${d.imagen_url}" alt="${d.equipo}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}<div class="details-section"><h4>Descripción</h4><p>${d.descripcion || 'No hay descripción.'}</p></div></div><div class="details-right-column"><div class="details-section"><h4>Estado y Fechas</h4><form id="update-mantenimiento-form" data-id="${d.id}"><div class="form-field"><label for="fecha-ultimo">Último Mantenimiento:</label><input type="date" id="fecha-ultimo" value="${d.fecha_ultimo_mantenimiento}"></div><div class="form-field"><label for="fecha-proximo">Próximo Mantenimiento:</label><input type="date" id="fecha-proximo" value="${d.fecha_proximo_mantenimiento}"></div><div class="form-field-checkbox"><input type="checkbox" id="completado" ${d.completado ? 'checked' : ''}><label for="completado">Completado</label></div><button type="submit" class="panel-btn">Guardar Cambios</button></form></div><div class="details-section"><h4>Lugares de Mantenimiento</h4><ul class="info-list">${lugaresHtml}</ul></div></div></div></div>`;
+        return `<div class="modal-header"><h2>${d.equipo}</h2><span class="close-btn" id="details-close-btn">&times;</span></div><hr class="separator"><div class="modal-body"><div class="details-grid"><div class="details-left-column">${d.imagen_url ? `<img src="${d.thumb_url || d.imagen_url}" alt="${d.equipo}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}<div class="details-section"><h4>Descripción</h4><p>${d.descripcion || 'No hay descripción.'}</p></div></div><div class="details-right-column"><div class="details-section"><h4>Estado y Fechas</h4><form id="update-mantenimiento-form" data-id="${d.id}"><div class="form-field"><label for="fecha-ultimo">Último Mantenimiento:</label><input type="date" id="fecha-ultimo" value="${d.fecha_ultimo_mantenimiento}"></div><div class="form-field"><label for="fecha-proximo">Próximo Mantenimiento:</label><input type="date" id="fecha-proximo" value="${d.fecha_proximo_mantenimiento}"></div><div class="form-field-checkbox"><input type="checkbox" id="completado" ${d.completado ? 'checked' : ''}><label for="completado">Completado</label></div><button type="submit" class="panel-btn">Guardar Cambios</button></form></div><div class="details-section"><h4>Lugares de Mantenimiento</h4><ul class="info-list">${lugaresHtml}</ul></div></div></div></div>`;
     }
 
     function renderPotreroDetails(d) {
         const otrosPotrerosOptions = d.otros_potreros.map(p => `<option value="${p.id}" ${p.id === d.intercambio_con_potrero_id ? 'selected' : ''}>${p.nombre}</option>`).join('');
-        return `<div class="modal-header"><h2>${d.nombre}</h2><span class="close-btn" id="details-close-btn">&times;</span></div><hr class="separator"><div class="modal-body"><div class="details-grid"><div class="details-left-column">${d.imagen_url ? `<img src="${d.imagen_url}" alt="${d.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}<div class="details-section"><h4>Información General</h4><p><strong>Área:</strong> ${d.area_hectareas} hectáreas</p><p><strong>Descripción:</strong> ${d.descripcion || 'No hay descripción.'}</p></div></div><div class="details-right-column"><div class="details-section"><h4>Estado y Acciones</h4><form id="update-potrero-form" data-id="${d.id}"><div class="form-field-checkbox"><input type="checkbox" id="empastado" ${d.empastado ? 'checked' : ''}><label for="empastado">Empastado</label></div><div class="form-field"><label for="fecha-empaste">Próximo Empaste:</label><input type="date" id="fecha-empaste" value="${d.fecha_proximo_empaste}"></div><div class="form-field-checkbox"><input type="checkbox" id="fumigado" ${d.fumigado ? 'checked' : ''}><label for="fumigado">Fumigado</label></div><div class="form-field"><label for="fecha-fumigacion">Próxima Fumigación:</label><input type="date" id="fecha-fumigacion" value="${d.fecha_proxima_fumigacion}"></div><div class="form-field-checkbox"><input type="checkbox" id="rozado" ${d.rozado ? 'checked' : ''}><label for="rozado">Rozado</label></div><div class="form-field"><label for="fecha-rozado">Próximo Rozado:</label><input type="date" id="fecha-rozado" value="${d.fecha_proximo_rozado}"></div><hr class="separator"><h4>Intercambio</h4><div class="form-field"><label for="intercambio-potrero">Intercambiar con:</label><select id="intercambio-potrero"><option value="">Ninguno</option>${otrosPotrerosOptions}</select></div><div class="form-field"><label for="fecha-intercambio">Fecha de Intercambio:</label><input type="date" id="fecha-intercambio" value="${d.fecha_intercambio}"></div><button type="submit" class="panel-btn">Guardar Cambios</button></form></div></div></div></div>`;
+        return `<div class="modal-header"><h2>${d.nombre}</h2><span class="close-btn" id="details-close-btn">&times;</span></div><hr class="separator"><div class="modal-body"><div class="details-grid"><div class="details-left-column">${d.imagen_url ? `<img src="${d.thumb_url || d.imagen_url}" alt="${d.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}<div class="details-section"><h4>Información General</h4><p><strong>Área:</strong> ${d.area_hectareas} hectáreas</p><p><strong>Descripción:</strong> ${d.descripcion || 'No hay descripción.'}</p></div></div><div class="details-right-column"><div class="details-section"><h4>Estado y Acciones</h4><form id="update-potrero-form" data-id="${d.id}"><div class="form-field-checkbox"><input type="checkbox" id="empastado" ${d.empastado ? 'checked' : ''}><label for="empastado">Empastado</label></div><div class="form-field"><label for="fecha-empaste">Próximo Empaste:</label><input type="date" id="fecha-empaste" value="${d.fecha_proximo_empaste}"></div><div class="form-field-checkbox"><input type="checkbox" id="fumigado" ${d.fumigado ? 'checked' : ''}><label for="fumigado">Fumigado</label></div><div class="form-field"><label for="fecha-fumigacion">Próxima Fumigación:</label><input type="date" id="fecha-fumigacion" value="${d.fecha_proxima_fumigacion}"></div><div class="form-field-checkbox"><input type="checkbox" id="rozado" ${d.rozado ? 'checked' : ''}><label for="rozado">Rozado</label></div><div class="form-field"><label for="fecha-rozado">Próximo Rozado:</label><input type="date" id="fecha-rozado" value="${d.fecha_proximo_rozado}"></div><hr class="separator"><h4>Intercambio</h4><div class="form-field"><label for="intercambio-potrero">Intercambiar con:</label><select id="intercambio-potrero"><option value="">Ninguno</option>${otrosPotrerosOptions}</select></div><div class="form-field"><label for="fecha-intercambio">Fecha de Intercambio:</label><input type="date" id="fecha-intercambio" value="${d.fecha_intercambio}"></div><button type="submit" class="panel-btn">Guardar Cambios</button></form></div></div></div></div>`;
     }
     
     function renderProductoDetails(d) {
@@ -338,7 +386,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 <div class="modal-body">
                     <div class="details-grid">
                         <div class="details-left-column">
-                            ${d.imagen_url ? `<img src="${d.imagen_url}" alt="${d.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
+                            ${d.imagen_url ? `<img src="${d.thumb_url || d.imagen_url}" alt="${d.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
                             <div class="details-section">
                                 <h4>Información</h4>
                                 <p><strong>Categoría:</strong> ${d.categoria ? d.categoria.nombre : 'N/A'}</p>
@@ -429,7 +477,7 @@ document.addEventListener('DOMContentLoaded', () => {
             <div class="modal-body">
                 <div class="details-grid">
                     <div class="details-left-column">
-                        ${d.imagen_url ? `<img src="${d.imagen_url}" alt="${d.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
+                        ${d.imagen_url ? `<img src="${d.thumb_url || d.imagen_url}" alt="${d.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
                         <div class="details-section">
                             <h4>Inventario</h4>
                             <p><strong>Cantidad:</strong> ${d.cantidad_ingresada} ${d.unidad_medida}</p>
@@ -517,7 +565,7 @@ document.addEventListener('DOMContentLoaded', () => {
             <div class="modal-body">
                 <div class="details-grid-ganado">
                     <div class="details-left-column">
-                        ${d.imagen_url ? `<img src="${d.imagen_url}" alt="${d.identificador}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
+                        ${d.imagen_url ? `<img src="${d.thumb_url || d.imagen_url}" alt="${d.identificador}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
                         <div class="details-section">
                             <h4>Información Principal</h4>
                             <form id="update-ganado-form" data-id="${d.id}">
@@ -811,7 +859,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     if (itemId && singleItemType) {
                         const detailsResponse = await fetch(`/${singleItemType}/detalles/${itemId}/`);
                         if (!detailsResponse.ok) throw new Error('Error al recargar los datos del item.');
-                        const updatedDetails = await detailsResponse.json();
+                        const updatedDetails = await completarConCatalogos(singleItemType, await detailsResponse.json());
                         const pluralItemType = singleItemType === 'ganado' ? 'ganado' : singleItemType + 's';
                         renderDetailsModal(updatedDetails, pluralItemType);
                     } else if (result.nuevo_comprador) {
@@ -1052,7 +1100,7 @@ document.addEventListener('DOMContentLoaded', () => {
             let contentHtml = `
                 <div class="details-grid">
                     <div class="details-left-column">
-                        ${data.imagen_url ? `<img src="${data.imagen_url}" alt="${data.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
+                        ${data.imagen_url ? `<img src="${data.thumb_url || data.imagen_url}" alt="${data.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
                         <div class="details-section"><h4>Información Principal</h4><p><strong>Nombre:</strong> ${data.nombre}</p><p><strong>Tipo:</strong> ${data.tipo || 'N/A'}</p><p><strong>Cantidad Restante:</strong> ${data.cantidad} ${data.unidad_medida}</p><p><strong>Precio:</strong> $${parseFloat(data.precio).toLocaleString('es-CO', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}</p><p><strong>Disponible:</strong> <span class="status-${data.disponible ? 'disponible' : 'agotado'}">${data.disponible ? 'Sí' : 'No'}</span></p></div>
                         <div class="details-section"><h4>Dosis Recomendadas</h4><p><strong>Crecimiento:</strong> ${data.dosis_crecimiento || 'N/A'}</p><p><strong>Edad:</strong> ${data.dosis_edad || 'N/A'}</p><p><strong>Peso:</strong> ${data.dosis_peso || 'N/A'}</p></div>
                     </div>
@@ -1080,7 +1128,7 @@ document.addEventListener('DOMContentLoaded', () => {
             let contentHtml = `
                 <div class="details-grid">
                     <div class="details-left-column">
-                        ${data.imagen_url ? `<img src="${data.imagen_url}" alt="${data.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
+                        ${data.imagen_url ? `<img src="${data.thumb_url || data.imagen_url}" alt="${data.nombre}" class="details-img">` : '<div class="item-card-img-placeholder">Sin imagen</div>'}
                         <div class="details-section"><h4>Información</h4><p><strong>Categoría:</strong> ${data.categoria ? data.categoria.nombre : 'N/A'}</p><p><strong>Descripción:</strong> ${data.descripcion}</p><p><strong>Fechas:</strong> Compra: ${data.fecha_compra} | Vence: ${data.fecha_vencimiento}</p></div>
                     </div>
                     <div class="details-right-column">
@@ -0,0 +1,181 @@
+# inventario/stock.py
+"""
+Movimientos de stock atómicos para los endpoints "usar cantidad" y "añadir stock".
+
+El descuento se hace con un único UPDATE condicional:
+
+    UPDATE ... SET usada = usada + x WHERE id = pk AND ingresada >= usada + x
+
+así dos operarios en workers distintos no pueden pasar ambos la validación y
+dejar el inventario en negativo, y solo se escribe la columna que cambia.
+`queryset.update()` no dispara señales, por eso aquí se invalidan a mano la
+caché y los catálogos que dependen del modelo.
+
+Cada movimiento queda en `MovimientoInventario`, en la misma transacción que
+el cambio de saldo. Las columnas de cantidad son el saldo de ese registro y
+`reconstruir_saldos` puede recalcularlas desde cero.
+"""
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .cache import invalidar_por_instancia
+from .catalogos import CATALOGOS_POR_MODELO, marcar_modificado
+from .models import Alimento, Combustible, ControlPlaga, Medicamento, MovimientoInventario
+
+# modelo -> (campo de cantidad ingresada, campo de cantidad usada)
+CAMPOS_STOCK = {
+    Alimento: ('cantidad_kg_ingresada', 'cantidad_kg_usada'),
+    Combustible: ('cantidad_galones_ingresada', 'cantidad_galones_usados'),
+    ControlPlaga: ('cantidad_ingresada', 'cantidad_usada'),
+    Medicamento: ('cantidad_ingresada', 'cantidad_usada'),
+}
+
+# Unidad de los modelos que no tienen campo unidad_medida
+UNIDAD_FIJA = {
+    Alimento: 'Kg',
+    Combustible: 'gal',
+}
+
+
+# Consumos que no son uso real: el saldo acumulado que la migración 0009 cargó
+# de una vez y las correcciones del saldo desde el admin
+NOTA_SALDO_INICIAL = 'Saldo inicial'
+NOTA_CORRECCION = 'Corrección manual'
+NOTAS_SIN_CONSUMO_REAL = [NOTA_SALDO_INICIAL, NOTA_CORRECCION]
+
+
+class StockInsuficiente(Exception):
+    """No queda cantidad suficiente para el descuento pedido."""
+
+
+def _despues_de_actualizar(modelo, obj):
+    invalidar_por_instancia(modelo, obj)
+    marcar_modificado(*CATALOGOS_POR_MODELO.get(modelo, []))
+
+
+def registrar_movimiento(obj, tipo, cantidad, usuario=None, nota=''):
+    """Añade un movimiento al registro sin tocar el saldo del objeto."""
+    return MovimientoInventario.objects.create(
+        content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk, tipo=tipo,
+        cantidad=cantidad, unidad=UNIDAD_FIJA.get(type(obj)) or obj.unidad_medida,
+        usuario=usuario, nota=nota,
+    )
+
+
+def usar_cantidad(modelo, pk, cantidad, usuario=None, nota=''):
+    """
+    Suma `cantidad` a lo usado si alcanza el stock, registra el CONSUMO y
+    devuelve el objeto actualizado. Lanza `modelo.DoesNotExist` o `StockInsuficiente`.
+    """
+    ingresada, usada = CAMPOS_STOCK[modelo]
+    with transaction.atomic():
+        actualizadas = modelo.objects.filter(
+            pk=pk, **{f'{ingresada}__gte': F(usada) + cantidad}
+        ).update(**{usada: F(usada) + cantidad})
+        if not actualizadas:
+            # Solo en el caso de error se consulta por qué no se actualizó
+            if not modelo.objects.filter(pk=pk).exists():
+                raise modelo.DoesNotExist
+            raise StockInsuficiente
+        obj = modelo.objects.get(pk=pk)
+        registrar_movimiento(obj, MovimientoInventario.Tipo.CONSUMO, cantidad, usuario, nota)
+    _despues_de_actualizar(modelo, obj)
+    return obj
+
+
+def anadir_cantidad(modelo, pk, cantidad, usuario=None, nota=''):
+    """Suma `cantidad` a lo ingresado, registra el INGRESO y devuelve el objeto actualizado."""
+    ingresada, _ = CAMPOS_STOCK[modelo]
+    with transaction.atomic():
+        if not modelo.objects.filter(pk=pk).update(**{ingresada: F(ingresada) + cantidad}):
+            raise modelo.DoesNotExist
+        obj = modelo.objects.get(pk=pk)
+        registrar_movimiento(obj, MovimientoInventario.Tipo.INGRESO, cantidad, usuario, nota)
+    _despues_de_actualizar(modelo, obj)
+    return obj
+
+
+def _saldo(obj):
+    ingresada, usada = CAMPOS_STOCK[type(obj)]
+    return Decimal(str(getattr(obj, ingresada))), Decimal(str(getattr(obj, usada)))
+
+
+def guardar_saldo_inicial(obj):
+    """Recuerda el saldo con el que se cargó el objeto (lo llama la señal post_init)."""
+    ingresada, usada = CAMPOS_STOCK[type(obj)]
+    if not {ingresada, usada} & obj.get_deferred_fields():
+        obj._saldo_registrado = _saldo(obj)
+
+
+def registrar_cambios_de_saldo(obj, creado):
+    """
+    Registra como movimientos lo que cambió el saldo al guardar el objeto
+    con `save()` (alta, edición en el admin, ...). Lo llama la señal post_save;
+    el usuario se toma de `obj._usuario_movimiento` si la vista lo asignó.
+    """
+    anterior = (Decimal(0), Decimal(0)) if creado else getattr(obj, '_saldo_registrado', None)
+    if anterior is None:
+        return
+    actual = _saldo(obj)
+    usuario = getattr(obj, '_usuario_movimiento', None)
+    delta_ingresada, delta_usada = actual[0] - anterior[0], actual[1] - anterior[1]
+    if delta_ingresada:
+        if creado:
+            registrar_movimiento(obj, MovimientoInventario.Tipo.INGRESO, delta_ingresada, usuario)
+        else:
+            registrar_movimiento(obj, MovimientoInventario.Tipo.AJUSTE, delta_ingresada, usuario, 'Ajuste manual')
+    if delta_usada:
+        registrar_movimiento(obj, MovimientoInventario.Tipo.CONSUMO, delta_usada, usuario, '' if creado else NOTA_CORRECCION)
+    obj._saldo_registrado = actual
+
+
+def reconstruir_saldos(modelos=None, guardar=True):
+    """
+    Recalcula las columnas de saldo desde el registro de movimientos con una
+    sola agregación por modelo y las guarda con `bulk_update`.
+    Devuelve [(objeto, saldo anterior, saldo reconstruido)] de los que no cuadraban.
+    """
+    diferencias = []
+    for modelo in modelos or CAMPOS_STOCK:
+        ingresada, usada = CAMPOS_STOCK[modelo]
+        cero = Decimal(0)
+        sumas = {
+            fila['object_id']: (fila['ingresos'], fila['consumos'])
+            for fila in MovimientoInventario.objects.filter(
+                content_type=ContentType.objects.get_for_model(modelo)
+            ).values('object_id').annotate(
+                ingresos=Coalesce(Sum('cantidad', filter=~Q(tipo=MovimientoInventario.Tipo.CONSUMO)), cero),
+                consumos=Coalesce(Sum('cantidad', filter=Q(tipo=MovimientoInventario.Tipo.CONSUMO)), cero),
+            ).order_by()
+        }
+        cambiados = []
+        for obj in modelo.objects.only('pk', ingresada, usada):
+            anterior = _saldo(obj)
+            nuevo = sumas.get(obj.pk, (cero, cero))
+            if anterior != nuevo:
+                setattr(obj, ingresada, nuevo[0])
+                setattr(obj, usada, nuevo[1])
+                cambiados.append(obj)
+                diferencias.append((obj, anterior, nuevo))
+        if guardar and cambiados:
+            modelo.objects.bulk_update(cambiados, [ingresada, usada], batch_size=500)
+            for obj in cambiados:
+                invalidar_por_instancia(modelo, obj)
+            marcar_modificado(*CATALOGOS_POR_MODELO.get(modelo, []))
+    return diferencias
+
+
+def consumo_mensual(modelo, pk=None):
+    """Consumo total por mes de un modelo (o de un ítem): [{'mes': date, 'total': Decimal}]."""
+    movimientos = MovimientoInventario.objects.filter(
+        content_type=ContentType.objects.get_for_model(modelo), tipo=MovimientoInventario.Tipo.CONSUMO,
+    )
+    if pk is not None:
+        movimientos = movimientos.filter(object_id=pk)
+    return list(
+        movimientos.annotate(mes=TruncMonth('fecha')).values('mes').annotate(total=Sum('cantidad')).order_by('mes')
+    )
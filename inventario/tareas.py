@@ -0,0 +1,76 @@
+# inventario/tareas.py
+"""
+Tareas periódicas que ejecuta `run_scheduler` (ver programador.py).
+
+Cada tarea es una función sin argumentos que devuelve un resumen corto de
+lo que hizo; si lanza una excepción, la ejecución queda como fallida con
+el error. La programación de `TAREAS` es la que se usa al crear la fila de
+la tarea; después se cambia desde el admin.
+"""
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from .cache import cache_compartida
+from .listas import TIPOS_LISTA, lista_json
+from .models import InformeMaterializado
+from .valoracion import FechaSinRegistro, valoracion
+
+# Tamaños de página que pide modalManager.js (escritorio y móvil)
+TAMANOS_PAGINA = [8, 6]
+
+
+def _comando(nombre, *args):
+    salida = StringIO()
+    call_command(nombre, *args, stdout=salida)
+    return salida.getvalue().strip()
+
+
+def enviar_recordatorios():
+    return _comando('enviar_recordatorios')
+
+
+def borrar_imagenes():
+    return _comando('procesar_borrados_imagenes')
+
+
+def calentar_cache():
+    """
+    Deja en caché la primera página de cada lista sin filtros, así la primera
+    visita después de un cambio no espera las consultas. Solo sirve con una
+    caché compartida entre procesos (Redis o archivos, ver settings.CACHES):
+    con la memoria local del worker no llegaría a la web y no hace nada.
+    """
+    if not cache_compartida():
+        return 'Sin caché compartida (settings.CACHES): no se calienta nada.'
+    for tipo in TIPOS_LISTA:
+        for tamano in TAMANOS_PAGINA:
+            lista_json(tipo, {'page': 1, 'items_per_page': tamano})
+    return f'{len(TIPOS_LISTA) * len(TAMANOS_PAGINA)} páginas de listas en caché.'
+
+
+def materializar_informes():
+    """
+    Guarda la valoración del inventario al cierre de ayer, con los precios
+    actuales. Es la misma que valoracion_json reconstruye para esa fecha desde
+    el registro de movimientos (mismos modelos y `excluidos`), así que no
+    importa si la tarea se ejecuta a medianoche o más tarde.
+    """
+    ayer = timezone.localdate() - datetime.timedelta(days=1)
+    try:
+        informe = valoracion(ayer)
+    except FechaSinRegistro as e:
+        return f'Sin valoración del {ayer:%d/%m/%Y}: {e}'
+    InformeMaterializado.objects.update_or_create(informe='valoracion', fecha=ayer, defaults={'datos': informe})
+    return f'Valoración del {ayer:%d/%m/%Y}: ${informe["total"]}.'
+
+
+# nombre -> (función, programación cron por defecto, descripción)
+TAREAS = {
+    'enviar_recordatorios': (enviar_recordatorios, '*/15 * * * *', 'Envía los recordatorios nuevos por correo.'),
+    'borrar_imagenes': (borrar_imagenes, '* * * * *', 'Borra en Cloudinary las imágenes encoladas.'),
+    'calentar_cache': (calentar_cache, '*/10 * * * *', 'Precalcula la primera página de las listas.'),
+    'materializar_informes': (materializar_informes, '0 0 * * *', 'Guarda la valoración del inventario al cierre de ayer.'),
+}
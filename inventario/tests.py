@@ -97,4 +97,1409 @@ class CustomUserAdminTest(TestCase):
         # link = self.admin.password_change_link(self.user)
         # expected_link = f'<a href="/admin/auth/user/{self.user.pk}/password/">Restablecer contraseña</a>'
         # self.assertIn('Restablecer contraseña', link)
-        pass
\ No newline at end of file
+        pass
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from .listas import MAX_ITEMS_POR_PAGINA
+
+
+class PaginacionCursorTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.login(username='testuser', password='password')
+        for i in range(20):
+            Alimento.objects.create(nombre=f"Alimento {i:02d}")
+        # Nombres repetidos para comprobar el desempate por pk
+        Alimento.objects.create(nombre="Alimento 05")
+        Alimento.objects.create(nombre="Alimento 05")
+
+    def _get(self, url, **params):
+        return self.client.get(url, params, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        url = reverse('lista_alimentos')
+        vistos = []
+        cursor = ''
+        while True:
+            data = self._get(url, cursor=cursor, items_per_page=5).json()
+            vistos.extend(item['id'] for item in data['items'])
+            if not data['has_next']:
+                break
+            cursor = data['next_cursor']
+        esperados = list(Alimento.objects.order_by('nombre', 'pk').values_list('pk', flat=True))
+        self.assertEqual(vistos, esperados)
+
+    def test_cursor_anterior_devuelve_la_misma_pagina(self):
+        url = reverse('lista_alimentos')
+        primera = self._get(url, cursor='', items_per_page=5).json()
+        segunda = self._get(url, cursor=primera['next_cursor'], items_per_page=5).json()
+        self.assertTrue(segunda['has_previous'])
+        de_vuelta = self._get(url, cursor=segunda['prev_cursor'], items_per_page=5).json()
+        self.assertEqual([i['id'] for i in de_vuelta['items']], [i['id'] for i in primera['items']])
+        self.assertFalse(de_vuelta['has_previous'])
+        self.assertTrue(de_vuelta['has_next'])
+
+    def test_modo_cursor_no_ejecuta_count(self):
+        url = reverse('lista_alimentos')
+        with CaptureQueriesContext(connection) as ctx:
+            self._get(url, cursor='', items_per_page=5)
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+
+    def test_sin_cursor_mantiene_paginacion_por_numero(self):
+        data = self._get(reverse('lista_alimentos'), page=2, items_per_page=5).json()
+        self.assertEqual(data['current_page'], 2)
+        self.assertEqual(data['total_pages'], 5)
+
+    def test_items_por_pagina_fuera_de_rango(self):
+        url = reverse('lista_alimentos')
+        data = self._get(url, cursor='', items_per_page=-3).json()
+        self.assertEqual(len(data['items']), 1)
+        self.assertTrue(data['has_next'])
+        Alimento.objects.bulk_create([Alimento(nombre=f"Alimento {i:02d}") for i in range(20, 60)])
+        data = self._get(url, cursor='', items_per_page=10 ** 9).json()
+        self.assertEqual(len(data['items']), MAX_ITEMS_POR_PAGINA)
+        self.assertTrue(data['has_next'])
+        self.assertEqual(self._get(url, page=1, items_per_page='muchos').json()['total_pages'], 8)
+
+    def test_cursor_invalido(self):
+        response = self._get(reverse('lista_ganado'), cursor='n.no-es-un-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    def test_todas_las_listas_aceptan_cursor(self):
+        for nombre in ['lista_alimentos', 'lista_combustibles', 'lista_control_plagas', 'lista_ganado',
+                       'lista_mantenimientos', 'lista_medicamentos', 'lista_potreros', 'lista_productos_view']:
+            with self.subTest(vista=nombre):
+                response = self._get(reverse(nombre), cursor='')
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('next_cursor', response.json())
+
+
+import datetime
+from django.http import QueryDict
+from django.utils import timezone
+from caracteristicas.models import Proveedor
+from .models import Animal, Ganado, Medicamento, Potrero, Mantenimiento
+from .filtros import (
+    aplicar_filtros, FILTROS_ALIMENTO, FILTROS_COMBUSTIBLE, FILTROS_GANADO,
+    FILTROS_MANTENIMIENTO, FILTROS_MEDICAMENTO, FILTROS_POTRERO,
+)
+
+
+class FiltrosListaTest(TestCase):
+
+    def setUp(self):
+        hoy = timezone.now().date()
+        self.bodega = Ubicacion.objects.create(nombre="Bodega")
+        self.establo = Ubicacion.objects.create(nombre="Establo")
+        self.agro = Proveedor.objects.create(nombre="Agro", ubicacion=self.bodega)
+        self.campo = Proveedor.objects.create(nombre="Campo", ubicacion=self.bodega)
+
+        self.maiz = Alimento.objects.create(nombre="Maíz", cantidad_kg_ingresada=10, fecha_vencimiento=hoy + datetime.timedelta(days=3))
+        self.sal = Alimento.objects.create(nombre="Sal", cantidad_kg_ingresada=5, cantidad_kg_usada=5, fecha_vencimiento=hoy + datetime.timedelta(days=400))
+        self.maiz.proveedores.add(self.agro, self.campo)
+        self.maiz.ubicaciones.add(self.bodega, self.establo)
+        self.sal.proveedores.add(self.campo)
+
+        vaca = Animal.objects.create(nombre="Vaca")
+        self.liviano = Ganado.objects.create(identificador="G-1", animal=vaca, peso_kg=80, fecha_nacimiento=hoy)
+        self.pesado = Ganado.objects.create(identificador="G-2", animal=vaca, peso_kg=600, fecha_nacimiento=hoy)
+
+    def _ids(self, queryset, params, filtros):
+        return sorted(aplicar_filtros(queryset, QueryDict(params), filtros).values_list('pk', flat=True))
+
+    def test_matriz_filtros_alimento(self):
+        casos = [
+            ('', [self.maiz.pk, self.sal.pk]),
+            ('nombre=ma', [self.maiz.pk]),
+            (f'proveedor={self.campo.pk}', [self.maiz.pk, self.sal.pk]),
+            (f'ubicacion={self.establo.pk}', [self.maiz.pk]),
+            ('disponibilidad=disponible', [self.maiz.pk]),
+            ('disponibilidad=agotado', [self.sal.pk]),
+            ('vencimiento=1_semana', [self.maiz.pk]),
+            ('vencimiento=mas_1_ano', [self.sal.pk]),
+            ('proveedor=abc', [self.maiz.pk, self.sal.pk]),
+            ('vencimiento=nunca', [self.maiz.pk, self.sal.pk]),
+        ]
+        for params, esperados in casos:
+            with self.subTest(params=params):
+                self.assertEqual(self._ids(Alimento.objects.all(), params, FILTROS_ALIMENTO), esperados)
+
+    def test_matriz_filtros_ganado(self):
+        casos = [
+            ('peso=10_100', [self.liviano.pk]),
+            ('peso=500_1000', [self.pesado.pk]),
+            ('peso=1000_mas', []),
+            ('nombre=g-2', [self.pesado.pk]),
+        ]
+        for params, esperados in casos:
+            with self.subTest(params=params):
+                self.assertEqual(self._ids(Ganado.objects.all(), params, FILTROS_GANADO), esperados)
+
+    def test_filtros_booleanos(self):
+        potrero = Potrero.objects.create(nombre="Alto", area_hectareas=2, empastado=True)
+        Potrero.objects.create(nombre="Bajo", area_hectareas=3, empastado=False)
+        self.assertEqual(self._ids(Potrero.objects.all(), 'empastado=true', FILTROS_POTRERO), [potrero.pk])
+        self.assertEqual(len(self._ids(Potrero.objects.all(), 'empastado=quizas', FILTROS_POTRERO)), 2)
+
+    def test_proveedor_y_ubicacion_sin_duplicados_ni_distinct(self):
+        params = QueryDict(f'proveedor={self.agro.pk}&ubicacion={self.bodega.pk}')
+        queryset = aplicar_filtros(Alimento.objects.all(), params, FILTROS_ALIMENTO)
+        self.assertFalse(queryset.query.distinct)
+        self.assertEqual(list(queryset), [self.maiz])
+
+    def test_todos_los_filtros_m2m_construyen_consulta(self):
+        for filtros, modelo in [(FILTROS_COMBUSTIBLE, Combustible), (FILTROS_MEDICAMENTO, Medicamento),
+                                (FILTROS_MANTENIMIENTO, Mantenimiento)]:
+            with self.subTest(modelo=modelo.__name__):
+                params = QueryDict('proveedor=1&ubicacion=1&lugar_mantenimiento=1')
+                self.assertEqual(list(aplicar_filtros(modelo.objects.all(), params, filtros)), [])
+
+
+from caracteristicas.models import Categoria
+from .models import Comprador
+
+
+class DetallesBatchTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.login(username='testuser', password='password')
+        self.url = reverse('detalles_batch_json')
+        categoria = Categoria.objects.create(nombre="Concentrados")
+        bodega = Ubicacion.objects.create(nombre="Bodega")
+        proveedor = Proveedor.objects.create(nombre="Agro", ubicacion=bodega)
+        self.alimentos = []
+        for i in range(10):
+            alimento = Alimento.objects.create(nombre=f"Alimento {i}", categoria=categoria)
+            alimento.proveedores.add(proveedor)
+            alimento.ubicaciones.add(bodega)
+            self.alimentos.append(alimento)
+        self.potreros = [Potrero.objects.create(nombre=n, area_hectareas=1) for n in ("Alto", "Bajo")]
+
+    def _items(self, pares):
+        return ','.join(f'{tipo}:{pk}' for tipo, pk in pares)
+
+    def test_lote_equivale_a_los_detalles_individuales(self):
+        pares = [('alimento', self.alimentos[0].pk), ('potrero', self.potreros[0].pk)]
+        lote = self.client.get(self.url, {'items': self._items(pares)}).json()
+        for item in lote['items']:
+            with self.subTest(tipo=item['tipo']):
+                individual = self.client.get(f"/{item['tipo']}/detalles/{item['id']}/").json()
+                self.assertEqual(item['data'], individual)
+
+    def test_consultas_no_crecen_con_el_numero_de_items(self):
+        def consultas(n):
+            items = self._items(('alimento', a.pk) for a in self.alimentos[:n])
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(self.url, {'items': items})
+            self.assertEqual(len(response.json()['items']), n)
+            return len(ctx.captured_queries)
+        self.assertEqual(consultas(2), consultas(10))
+
+    def test_ids_inexistentes_y_parametros_invalidos(self):
+        lote = self.client.get(self.url, {'items': 'alimento:999999'}).json()
+        self.assertEqual(lote['no_encontrados'], [{'tipo': 'alimento', 'id': 999999}])
+        self.assertEqual(self.client.get(self.url, {'items': 'usuario:1'}).status_code, 400)
+        demasiados = ','.join(f'alimento:{i}' for i in range(1, 102))
+        self.assertEqual(self.client.get(self.url, {'items': demasiados}).status_code, 400)
+
+
+class CatalogosETagTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.login(username='testuser', password='password')
+        self.url = reverse('catalogos_json')
+        Categoria.objects.create(nombre="Concentrados")
+
+    def test_304_mientras_no_cambian_los_catalogos(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(response.json()['catalogos']['categorias'][0]['nombre'], "Concentrados")
+        self.assertIn('alimento', response.json()['claves_por_tipo'])
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Comprador.objects.create(nombre="Juan")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_borrar_tambien_cambia_la_version(self):
+        etag = self.client.get(self.url)['ETag']
+        Categoria.objects.all().delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detalles_ya_no_incluyen_catalogos(self):
+        alimento = Alimento.objects.create(nombre="Maíz")
+        data = self.client.get(reverse('alimento_detalles_json', args=[alimento.pk])).json()
+        self.assertNotIn('todas_las_categorias', data)
+        self.assertNotIn('todas_las_etiquetas_principales', data)
+
+
+from django.core.cache import cache
+from django.test import override_settings
+from .cache import contadores, obtener_detalle
+from .models import RegistroVacunacion, Vacuna
+
+
+class CacheVistasJSONTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        contadores.reiniciar()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.login(username='testuser', password='password')
+        self.bodega = Ubicacion.objects.create(nombre="Bodega")
+        self.proveedor = Proveedor.objects.create(nombre="Agro", ubicacion=self.bodega)
+        self.alimento = Alimento.objects.create(nombre="Maíz")
+        self.alimento.proveedores.add(self.proveedor)
+        self.url = reverse('alimento_detalles_json', args=[self.alimento.pk])
+
+    def _detalle(self):
+        return self.client.get(self.url).json()
+
+    def test_segunda_lectura_sale_de_la_cache(self):
+        with CaptureQueriesContext(connection) as primera:
+            self._detalle()
+        with CaptureQueriesContext(connection) as segunda:
+            self._detalle()
+        self.assertLess(len(segunda.captured_queries), len(primera.captured_queries))
+        valores = contadores.valores()
+        self.assertEqual(valores[('detalle', 'misses')], 1)
+        self.assertEqual(valores[('detalle', 'hits')], 1)
+
+    def test_invalidacion_por_modelo_dependencia_y_m2m(self):
+        self._detalle()
+        self.alimento.nombre = "Maíz amarillo"
+        self.alimento.save()
+        self.assertEqual(self._detalle()['nombre'], "Maíz amarillo")
+
+        self.proveedor.nombre = "Agro Norte"
+        self.proveedor.save()
+        self.assertEqual(self._detalle()['proveedores'][0]['nombre'], "Agro Norte")
+
+        self.alimento.ubicaciones.add(self.bodega)
+        self.assertEqual(len(self._detalle()['ubicaciones']), 1)
+        self.bodega.alimentos_ubicados.remove(self.alimento)
+        self.assertEqual(self._detalle()['ubicaciones'], [])
+
+    def test_registro_hijo_invalida_el_detalle_del_padre(self):
+        hoy = timezone.now().date()
+        ganado = Ganado.objects.create(identificador="G-1", fecha_nacimiento=hoy)
+        url = reverse('ganado_detalles_json', args=[ganado.pk])
+        self.assertEqual(self.client.get(url).json()['historial_vacunacion'], [])
+        vacuna = Vacuna.objects.create(nombre="Aftosa", cantidad=1, fecha_vencimiento=hoy)
+        RegistroVacunacion.objects.create(ganado=ganado, vacuna=vacuna, fecha_aplicacion=hoy)
+        self.assertEqual(len(self.client.get(url).json()['historial_vacunacion']), 1)
+
+    def test_listas_por_querystring_e_invalidacion(self):
+        url = reverse('lista_alimentos')
+        ajax = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+        self.assertEqual(len(self.client.get(url, {'page': 1}, **ajax).json()['items']), 1)
+        self.client.get(url, {'page': 1}, **ajax)
+        self.assertEqual(contadores.valores()[('lista', 'hits')], 1)
+        self.assertEqual(self.client.get(url, {'nombre': 'trigo'}, **ajax).json()['items'], [])
+
+        Alimento.objects.create(nombre="Trigo")
+        self.assertEqual(len(self.client.get(url, {'page': 1}, **ajax).json()['items']), 2)
+        self.assertEqual(len(self.client.get(url, {'nombre': 'trigo'}, **ajax).json()['items']), 1)
+
+    def test_lectura_antes_del_commit_no_queda_en_cache(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.alimento.nombre = "Maíz amarillo"
+            self.alimento.save()
+            # Otro proceso lee la fila confirmada (la vieja) antes del COMMIT y la guarda con la generación nueva
+            obtener_detalle('alimento', self.alimento.pk, lambda: {'nombre': "Maíz"})
+            self.assertEqual(obtener_detalle('alimento', self.alimento.pk, lambda: {}), {'nombre': "Maíz"})
+        self.assertTrue(callbacks)
+        self.assertEqual(self._detalle()['nombre'], "Maíz amarillo")
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_metricas_prometheus(self):
+        self._detalle()
+        url = reverse('metricas_cache')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('inventario_cache_misses_total{espacio="detalle"} 1', response.content.decode())
+
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.db import OperationalError
+from django.test import TransactionTestCase
+from django.contrib.contenttypes.models import ContentType
+from .stock import usar_cantidad, anadir_cantidad, StockInsuficiente
+
+
+class StockAtomicoTest(TransactionTestCase):
+
+    def _usar_en_hilo(self, pk):
+        # SQLite en memoria no espera a que se libere el bloqueo de escritura,
+        # así que se reintenta; Postgres simplemente serializa los UPDATE.
+        try:
+            while True:
+                try:
+                    usar_cantidad(Alimento, pk, Decimal('1'))
+                    return True
+                except StockInsuficiente:
+                    return False
+                except OperationalError:
+                    continue
+        finally:
+            connection.close()
+
+    def test_descuentos_concurrentes_no_sobregiran_el_stock(self):
+        alimento = Alimento.objects.create(nombre="Maíz", cantidad_kg_ingresada=10)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            resultados = list(pool.map(self._usar_en_hilo, [alimento.pk] * 30))
+        alimento.refresh_from_db()
+        self.assertEqual(resultados.count(True), 10)
+        self.assertEqual(alimento.cantidad_kg_usada, Decimal('10'))
+        self.assertEqual(alimento.cantidad_kg_restante, 0)
+
+    def _consultas_sin_transaccion(self, funcion, *args):
+        with CaptureQueriesContext(connection) as consultas:
+            try:
+                funcion(*args)
+            except StockInsuficiente:
+                pass
+        return [q['sql'].split()[0] for q in consultas if q['sql'] not in ('BEGIN', 'COMMIT', 'ROLLBACK')]
+
+    def test_un_update_y_una_lectura_por_descuento(self):
+        alimento = Alimento.objects.create(nombre="Maíz", cantidad_kg_ingresada=5)
+        ContentType.objects.get_for_model(Alimento)
+        self.assertEqual(
+            self._consultas_sin_transaccion(usar_cantidad, Alimento, alimento.pk, Decimal('2')),
+            ['UPDATE', 'SELECT', 'INSERT'],
+        )
+        alimento.refresh_from_db()
+        self.assertEqual(alimento.cantidad_kg_restante, Decimal('3'))
+        self.assertEqual(
+            self._consultas_sin_transaccion(usar_cantidad, Alimento, alimento.pk, Decimal('4')),
+            ['UPDATE', 'SELECT'],
+        )
+        self.assertRaises(Alimento.DoesNotExist, anadir_cantidad, Alimento, alimento.pk + 1, Decimal('1'))
+
+    def test_endpoints_usar_cantidad(self):
+        User.objects.create_user(username='testuser', password='password')
+        self.client.login(username='testuser', password='password')
+        combustible = Combustible.objects.create(tipo="ACPM", cantidad_galones_ingresada=3)
+        url = reverse('actualizar_cantidad_combustible')
+        cuerpo = lambda pk, x: json.dumps({'combustible_id': pk, 'cantidad_a_usar': x})
+        response = self.client.post(url, cuerpo(combustible.pk, '2'), content_type='application/json')
+        self.assertEqual(response.json()['nueva_cantidad_restante'], '1.00')
+        response = self.client.post(url, cuerpo(combustible.pk, '2'), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, cuerpo(combustible.pk + 1, '1'), content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+from datetime import timedelta
+from .models import MovimientoInventario
+from .stock import consumo_mensual, reconstruir_saldos
+
+class MovimientoInventarioTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.login(username='testuser', password='password')
+        self.alimento = Alimento.objects.create(nombre="Maíz", cantidad_kg_ingresada=10)
+
+    def _movimientos(self, obj):
+        return list(MovimientoInventario.objects.filter(
+            content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk,
+        ).order_by('fecha', 'pk').values_list('tipo', 'cantidad'))
+
+    def test_endpoints_y_save_registran_movimientos(self):
+        self.client.post(reverse('actualizar_cantidad_alimento'),
+                         json.dumps({'alimento_id': self.alimento.pk, 'cantidad_a_usar': '3'}),
+                         content_type='application/json')
+        self.client.post(reverse('anadir_stock_alimento'),
+                         json.dumps({'alimento_id': self.alimento.pk, 'cantidad_a_anadir': '5'}),
+                         content_type='application/json')
+        alimento = Alimento.objects.get(pk=self.alimento.pk)
+        alimento.cantidad_kg_ingresada = Decimal('14')
+        alimento.save()
+        self.assertEqual(self._movimientos(alimento), [
+            ('INGRESO', Decimal('10')), ('CONSUMO', Decimal('3')),
+            ('INGRESO', Decimal('5')), ('AJUSTE', Decimal('-1')),
+        ])
+        self.assertEqual(MovimientoInventario.objects.filter(usuario=self.user).count(), 2)
+
+    def test_reconstruir_saldos_corrige_columnas_alteradas(self):
+        usar_cantidad(Alimento, self.alimento.pk, Decimal('4'))
+        Alimento.objects.filter(pk=self.alimento.pk).update(cantidad_kg_ingresada=99, cantidad_kg_usada=0)
+        diferencias = reconstruir_saldos([Alimento])
+        self.assertEqual(len(diferencias), 1)
+        self.alimento.refresh_from_db()
+        self.assertEqual((self.alimento.cantidad_kg_ingresada, self.alimento.cantidad_kg_usada),
+                         (Decimal('10'), Decimal('4')))
+        self.assertEqual(reconstruir_saldos([Alimento]), [])
+
+    def test_consumo_mensual(self):
+        usar_cantidad(Alimento, self.alimento.pk, Decimal('2'))
+        usar_cantidad(Alimento, self.alimento.pk, Decimal('1.5'))
+        MovimientoInventario.objects.filter(cantidad=Decimal('2')).update(fecha=timezone.now() - timedelta(days=62))
+        totales = [fila['total'] for fila in consumo_mensual(Alimento, self.alimento.pk)]
+        self.assertEqual(totales, [Decimal('2'), Decimal('1.5')])
+
+
+from .pronostico import por_agotarse, pronosticar
+
+class PronosticoConsumoTest(TestCase):
+
+    def setUp(self):
+        self.maiz = Alimento.objects.create(nombre="Maíz", cantidad_kg_ingresada=100)
+        self.sal = Alimento.objects.create(nombre="Sal", cantidad_kg_ingresada=20)
+        tipo_alimento = ContentType.objects.get_for_model(Alimento)
+        ahora = timezone.now()
+        MovimientoInventario.objects.bulk_create([
+            MovimientoInventario(content_type=tipo_alimento, object_id=self.maiz.pk, tipo='CONSUMO',
+                                 cantidad=Decimal('5'), fecha=ahora - timedelta(days=dias))
+            for dias in range(30)
+        ])
+
+    def test_tasa_y_fecha_de_agotamiento_sin_consultas_por_item(self):
+        hoy = timezone.localdate()
+        # Una consulta para los ítems y otra para todos sus consumos
+        with self.assertNumQueries(2):
+            pronosticos = pronosticar(Alimento.objects.filter(pk__in=[self.maiz.pk, self.sal.pk]), hoy)
+        maiz = pronosticos[self.maiz.pk]
+        self.assertAlmostEqual(maiz.consumo_diario, 5, delta=0.2)
+        self.assertEqual(maiz.dias_restantes, 20)
+        self.assertEqual(maiz.fecha_agotamiento, hoy + timedelta(days=20))
+        self.assertEqual(pronosticos[self.sal.pk], (0, None, None))
+
+    def test_saldo_inicial_y_correcciones_no_cuentan_como_consumo(self):
+        from importlib import import_module
+        from django.apps import apps
+        saldos_iniciales = import_module('inventario.migrations.0009_saldos_iniciales_movimientos')
+        # Ítems cargados antes del registro de movimientos, como los encuentra la migración 0009
+        antiguos = Alimento.objects.bulk_create([
+            Alimento(nombre=f"Antiguo {i}", cantidad_kg_ingresada=1000, cantidad_kg_usada=900) for i in range(3)
+        ])
+        saldos_iniciales.crear_saldos_iniciales(apps, None)
+        corregido = Alimento.objects.get(pk=self.sal.pk)
+        corregido.cantidad_kg_usada = Decimal('15')
+        corregido.save()
+
+        hoy = timezone.localdate()
+        pronosticos = pronosticar(Alimento.objects.filter(pk__in=[a.pk for a in antiguos] + [self.sal.pk]), hoy)
+        self.assertEqual({p.dias_restantes for p in pronosticos.values()}, {None})
+        self.assertEqual(por_agotarse(Alimento.objects.filter(nombre__startswith="Antiguo"), 7, hoy), [])
+        self.assertAlmostEqual(pronosticar([self.maiz], hoy)[self.maiz.pk].consumo_diario, 5, delta=0.2)
+
+    def test_lista_alimentos_incluye_pronostico(self):
+        User.objects.create_user(username='testuser', password='password')
+        self.client.login(username='testuser', password='password')
+        response = self.client.get(reverse('lista_alimentos'), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        items = {item['nombre']: item for item in response.json()['items']}
+        self.assertEqual(items['Maíz']['dias_restantes'], 20)
+        self.assertIsNone(items['Sal']['fecha_agotamiento'])
+
+
+from caracteristicas.models import Etiqueta
+from .models import LugarMantenimiento
+
+class AdminChangelistConsultasTest(TestCase):
+    """Las listas del admin hacen las mismas consultas con 1 fila que con 5."""
+
+    def setUp(self):
+        User.objects.create_superuser(username='admin', password='password', email='admin@example.com')
+        self.client.login(username='admin', password='password')
+        ubicacion = Ubicacion.objects.create(nombre="Bodega")
+        self.proveedor = Proveedor.objects.create(nombre="Agro", ubicacion=ubicacion)
+        self.ubicacion = ubicacion
+        self.etiqueta = Etiqueta.objects.create(nombre="Urgente")
+        self.lugar = LugarMantenimiento.objects.create(
+            nombre_lugar="Taller", nombre_empresa="Taller SA", direccion="Calle 1", correo="t@example.com", numero="1",
+        )
+        self.lugar.ubicaciones.add(ubicacion)
+        self.lugar.proveedores.add(self.proveedor)
+
+    def _crear(self, modelo, i):
+        if modelo is Alimento:
+            obj = Alimento.objects.create(nombre=f"Alimento {i}")
+            obj.etiquetas.add(self.etiqueta)
+        elif modelo is Vacuna:
+            obj = Vacuna.objects.create(nombre=f"Vacuna {i}", fecha_vencimiento=datetime.date.today())
+            obj.etiquetas.add(self.etiqueta)
+        elif modelo is Mantenimiento:
+            obj = Mantenimiento.objects.create(equipo=f"Tractor {i}", fecha_proximo_mantenimiento=datetime.date.today())
+            obj.lugares_mantenimiento.add(self.lugar)
+            return
+        else:
+            obj = modelo.objects.create(nombre=f"Medicamento {i}")
+        obj.ubicaciones.add(self.ubicacion)
+        obj.proveedores.add(self.proveedor)
+
+    def _consultas(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(consultas)
+
+    def test_consultas_constantes_por_pagina(self):
+        for modelo in (Alimento, Medicamento, Vacuna, Mantenimiento):
+            with self.subTest(modelo=modelo.__name__):
+                url = reverse(f'admin:inventario_{modelo._meta.model_name}_changelist')
+                self._crear(modelo, 0)
+                con_una_fila = self._consultas(url)
+                for i in range(1, 5):
+                    self._crear(modelo, i)
+                self.assertEqual(self._consultas(url), con_una_fila)
+
+
+class AdminDetallesDiferidosTest(TestCase):
+
+    def setUp(self):
+        User.objects.create_superuser(username='admin', password='password', email='admin@example.com')
+        self.client.login(username='admin', password='password')
+        self.alimento = Alimento.objects.create(nombre="Maíz")
+        self.alimento.proveedores.add(Proveedor.objects.create(nombre="Agro"))
+
+    def test_lista_solo_envia_el_boton(self):
+        response = self.client.get(reverse('admin:inventario_alimento_changelist'))
+        url = reverse('admin:inventario_alimento_detalles', args=[self.alimento.pk])
+        self.assertContains(response, f'data-detalles-url="{url}"')
+        self.assertNotContains(response, f'modal-alimento-{self.alimento.pk}')
+        self.assertContains(response, 'inventario/js/adminDetalles.js')
+
+    def test_endpoint_devuelve_el_modal(self):
+        response = self.client.get(reverse('admin:inventario_alimento_detalles', args=[self.alimento.pk]))
+        self.assertContains(response, f'id="modal-alimento-{self.alimento.pk}"')
+        self.assertContains(response, 'Agro')
+        response = self.client.get(reverse('admin:inventario_alimento_detalles', args=[self.alimento.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('admin:caracteristicas_proveedor_detalles', args=['abc']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_endpoint_requiere_staff(self):
+        self.client.logout()
+        response = self.client.get(reverse('admin:inventario_alimento_detalles', args=[self.alimento.pk]))
+        self.assertEqual(response.status_code, 302)
+
+
+from .borrado_imagenes import procesar_pendientes
+from .models import BorradoImagenPendiente
+
+class BorradoImagenesTest(TestCase):
+
+    def test_reemplazar_o_borrar_encola_sin_llamar_a_cloudinary(self):
+        alimento = Alimento.objects.create(nombre="Maíz", imagen="alimentos/vieja")
+        alimento.cantidad_kg_ingresada = 5
+        alimento.save()
+        self.assertFalse(BorradoImagenPendiente.objects.exists())
+
+        alimento.imagen = "alimentos/nueva"
+        alimento.save()
+        alimento.delete()
+        self.assertEqual(
+            list(BorradoImagenPendiente.objects.order_by('pk').values_list('public_id', flat=True)),
+            ['alimentos/vieja', 'alimentos/nueva'],
+        )
+
+    def test_procesar_borra_por_lotes_y_reintenta_con_espera(self):
+        for public_id in ('a', 'b', 'c'):
+            BorradoImagenPendiente.objects.create(public_id=public_id)
+        llamadas = []
+
+        def borrador(public_ids):
+            llamadas.append(set(public_ids))
+            return public_ids - {'c'}
+
+        ahora = timezone.now()
+        self.assertEqual(procesar_pendientes(borrador, ahora=ahora), (2, 1))
+        self.assertEqual(llamadas, [{'a', 'b', 'c'}])
+        pendiente = BorradoImagenPendiente.objects.get()
+        self.assertEqual((pendiente.public_id, pendiente.intentos), ('c', 1))
+        self.assertEqual(pendiente.proximo_intento, ahora + timedelta(minutes=1))
+
+        # Antes de la espera no se reintenta; después, un error de red cuenta como fallo
+        self.assertEqual(procesar_pendientes(borrador, ahora=ahora + timedelta(seconds=30)), (0, 0))
+
+        def sin_red(public_ids):
+            raise ConnectionError('sin conexión')
+
+        self.assertEqual(procesar_pendientes(sin_red, ahora=ahora + timedelta(minutes=1)), (0, 1))
+        pendiente.refresh_from_db()
+        self.assertEqual((pendiente.intentos, pendiente.ultimo_error), (2, 'sin conexión'))
+        self.assertEqual(pendiente.proximo_intento, ahora + timedelta(minutes=3))
+
+
+class ImagenSinConsultaPreviaTest(TestCase):
+    """Guardar un objeto cargado no vuelve a leer su fila para comparar la imagen."""
+
+    def _objetos(self):
+        hoy = timezone.now().date()
+        return [
+            Producto.objects.create(nombre="Machete", imagen="productos/p"),
+            Ganado.objects.create(identificador="G-1", fecha_nacimiento=hoy, imagen="ganado/g"),
+            Medicamento.objects.create(nombre="Ivermectina", imagen="medicamentos/m"),
+            Alimento.objects.create(nombre="Maíz", imagen="alimentos/a"),
+            ControlPlaga.objects.create(nombre_producto="Glifosato", tipo="Herbicida", imagen="plagas/c"),
+            Potrero.objects.create(nombre="La Loma", area_hectareas=2, imagen="potreros/p"),
+            Mantenimiento.objects.create(equipo="Tractor", fecha_proximo_mantenimiento=hoy, imagen="mantenimiento/m"),
+            Combustible.objects.create(tipo="Diesel", imagen="combustible/c"),
+        ]
+
+    def test_guardar_sin_cambiar_imagen_no_consulta_la_fila(self):
+        # Un campo cualquiera distinto de la imagen para save(update_fields=...)
+        for creado in self._objetos():
+            modelo = type(creado)
+            tabla = modelo._meta.db_table
+            obj = modelo.objects.get(pk=creado.pk)
+            with CaptureQueriesContext(connection) as ctx:
+                obj.save()
+                obj.save(update_fields=['imagen'])
+                obj.save(update_fields=[f.name for f in modelo._meta.concrete_fields if not f.primary_key][:1])
+            selects = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT') and tabla in q['sql']]
+            self.assertEqual(selects, [], modelo.__name__)
+        self.assertFalse(BorradoImagenPendiente.objects.exists())
+
+    def test_cambio_de_imagen_tras_cargar_o_diferir(self):
+        alimento = Alimento.objects.create(nombre="Sal", imagen="alimentos/1")
+        cargado = Alimento.objects.get(pk=alimento.pk)
+        cargado.imagen = "alimentos/2"
+        cargado.save(update_fields=['nombre'])  # la imagen no se escribe: nada que borrar
+        cargado.save()
+
+        # Con la imagen diferida se consulta la fila solo si se asigna una nueva
+        diferido = Alimento.objects.only('nombre').get(pk=alimento.pk)
+        diferido.imagen = "alimentos/3"
+        diferido.save()
+        self.assertEqual(list(BorradoImagenPendiente.objects.values_list('public_id', flat=True)), ['alimentos/1', 'alimentos/2'])
+
+
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cloudinary
+from .borrado_imagenes import borrar_en_cloudinary, borrar_por_lotes
+
+
+class _CloudinaryFalso(BaseHTTPRequestHandler):
+    """API de administración mínima: DELETE /v1_1/<nube>/resources/image/upload."""
+
+    def do_DELETE(self):
+        cuerpo = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        public_ids = cuerpo['public_ids']
+        self.server.llamadas.append(public_ids)
+        if any(p.startswith('error') for p in public_ids):
+            estado, respuesta = 500, {'error': {'message': 'Fallo simulado'}}
+        else:
+            estado, respuesta = 200, {'deleted': {p: 'not_found' if p.startswith('ya') else 'deleted' for p in public_ids}}
+        datos = json.dumps(respuesta).encode()
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, *args):
+        pass
+
+
+class BorradoMasivoImagenesTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _CloudinaryFalso)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.prefijo = 'http://127.0.0.1:%d' % cls.servidor.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.servidor.llamadas = []
+
+    def test_borrar_por_lotes_de_cien_e_informar_fallos(self):
+        borrador = partial(borrar_en_cloudinary, cloud_name='finca', api_key='k', api_secret='s', upload_prefix=self.prefijo)
+        public_ids = [f'ganado/{i:03d}' for i in range(230)] + ['ya/borrada', 'error/1']
+        borrados, errores = borrar_por_lotes(public_ids, borrador, hilos=3)
+
+        self.assertEqual(sorted(len(ids) for ids in self.servidor.llamadas), [32, 100, 100])
+        lote_fallido = next(set(ids) for ids in self.servidor.llamadas if 'error/1' in ids)
+        self.assertEqual(set(errores), lote_fallido)
+        self.assertIn('Fallo simulado', errores['error/1'])
+        self.assertEqual(borrados, set(public_ids) - lote_fallido)
+
+    def test_eliminar_seleccionados_del_admin_borra_las_imagenes(self):
+        config = cloudinary.config()
+        self.addCleanup(setattr, config, 'upload_prefix', config.upload_prefix)
+        config.upload_prefix = self.prefijo
+        productos = Producto.objects.bulk_create([Producto(nombre=f'P{i}', imagen=f'productos/{i}') for i in range(150)])
+        usuario = User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(usuario)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/admin/inventario/producto/', {
+                'action': 'delete_selected', 'post': 'yes', '_selected_action': [p.pk for p in productos],
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Producto.objects.exists())
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "inventario_borradoimagenpendiente"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(sorted(len(ids) for ids in self.servidor.llamadas), [50, 100])
+        self.assertFalse(BorradoImagenPendiente.objects.exists())
+
+
+from .imagenes import _construir_url, url_miniatura
+
+
+class MiniaturasTest(TestCase):
+
+    def setUp(self):
+        _construir_url.cache_clear()
+
+    def test_url_transformada_y_memorizada(self):
+        imagen = Alimento._meta.get_field('imagen').to_python('image/upload/v1712345678/alimentos/maiz.jpg')
+        url = url_miniatura(imagen, 'tarjeta')
+        self.assertIn('/image/upload/c_fill,f_auto,g_auto,h_300,q_auto,w_400/v1712345678/alimentos/maiz', url)
+        self.assertNotEqual(url, url_miniatura(imagen, 'admin'))
+
+        url_miniatura(imagen, 'tarjeta')
+        self.assertEqual(_construir_url.cache_info().hits, 1)
+        self.assertIsNone(url_miniatura(None, 'modal'))
+        with self.assertRaises(ValueError):
+            url_miniatura(imagen, 'gigante')
+
+    def test_listas_y_detalles_exponen_thumb_url(self):
+        User.objects.create_user(username='testuser', password='password')
+        self.client.login(username='testuser', password='password')
+        alimento = Alimento.objects.create(nombre="Maíz", imagen="alimentos/maiz")
+
+        item = self.client.get(reverse('lista_alimentos'), HTTP_X_REQUESTED_WITH='XMLHttpRequest').json()['items'][0]
+        self.assertTrue(item['imagen_url'].endswith('/alimentos/maiz'))
+        self.assertIn('w_400', item['thumb_url'])
+        detalle = self.client.get(reverse('alimento_detalles_json', args=[alimento.pk])).json()
+        self.assertIn('w_800', detalle['thumb_url'])
+
+
+from io import StringIO
+from django.core.management import call_command
+
+
+class IndicesConsultasTest(TestCase):
+
+    def test_cada_consulta_usa_su_indice(self):
+        salida = StringIO()
+        call_command('explicar_consultas', stdout=salida)
+        self.assertIn('Todas las consultas usan su índice.', salida.getvalue())
+
+
+from .busqueda import buscar, normalizar
+from .models import EntradaBusqueda
+
+
+class BusquedaGlobalTest(TestCase):
+
+    def setUp(self):
+        hoy = datetime.date.today()
+        self.maiz = Alimento.objects.create(nombre="Maíz amarillo")
+        Alimento.objects.create(nombre="Harina de maíz")
+        Ganado.objects.create(identificador="PREÑEZ-07", raza="Holstein", fecha_nacimiento=hoy)
+        Vacuna.objects.create(nombre="Aftosa", fecha_vencimiento=hoy)
+
+    def test_sin_tildes_ni_mayusculas_y_agrupado(self):
+        self.assertEqual(normalizar("  Maíz PREÑEZ "), "maiz prenez")
+        grupos = buscar("MAIZ")
+        self.assertEqual([g['tipo'] for g in grupos], ['alimento'])
+        # Lo que empieza por el texto buscado va primero
+        self.assertEqual([r['nombre'] for r in grupos[0]['resultados']], ["Maíz amarillo", "Harina de maíz"])
+        self.assertEqual(buscar("preñez")[0]['resultados'][0]['nombre'], "PREÑEZ-07")
+        self.assertEqual(buscar("holst")[0]['tipo'], 'ganado')
+        self.assertEqual(buscar("af")[0]['tipo'], 'vacuna')  # menos de un trigrama
+        self.assertEqual(buscar("zzz"), [])
+
+    def test_indice_sigue_los_cambios_en_una_consulta(self):
+        self.maiz.nombre = "Sorgo"
+        self.maiz.save()
+        Vacuna.objects.get().delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(buscar("sorgo")[0]['resultados'], [{'id': self.maiz.pk, 'nombre': "Sorgo"}])
+        self.assertEqual(buscar("aftosa"), [])
+        self.assertEqual(EntradaBusqueda.objects.count(), 3)
+
+    def test_endpoint(self):
+        User.objects.create_user(username='testuser', password='password')
+        self.client.login(username='testuser', password='password')
+        data = self.client.get(reverse('buscar_json'), {'q': 'maiz', 'por_grupo': 1}).json()
+        self.assertEqual(data['grupos'][0]['resultados'], [{
+            'id': self.maiz.pk, 'nombre': "Maíz amarillo",
+            'detalle_url': reverse('alimento_detalles_json', args=[self.maiz.pk]),
+        }])
+        self.assertEqual(self.client.get(reverse('buscar_json'), {'q': 'x', 'por_grupo': 'a'}).status_code, 400)
+
+
+    def test_incluye_proveedores_y_limita_cada_grupo(self):
+        for i in range(4):
+            Alimento.objects.create(nombre=f"Sal mineral {i}")
+        Proveedor.objects.create(nombre="Agropecuaria El Salado")
+        Ubicacion.objects.create(nombre="Bodega", barrio="Salamina")
+        with self.assertNumQueries(1):
+            grupos = buscar("sal", por_grupo=2)
+        # Los prefijos van primero; el resto de grupos, según su mejor resultado
+        self.assertEqual(grupos[0]['tipo'], 'alimento')
+        self.assertEqual({g['tipo'] for g in grupos[1:]}, {'proveedor', 'ubicacion'})
+        self.assertEqual(len(grupos[0]['resultados']), 2)
+
+
+from .valoracion import FechaSinRegistro, primera_fecha_registro, valoracion
+
+
+class ValoracionInventarioTest(TestCase):
+
+    def setUp(self):
+        self.concentrados = Categoria.objects.create(nombre="Concentrados")
+        self.bodega = Ubicacion.objects.create(nombre="Bodega")
+        self.establo = Ubicacion.objects.create(nombre="Establo")
+        self.proveedor = Proveedor.objects.create(nombre="Agro")
+        self.maiz = Alimento.objects.create(
+            nombre="Maíz", categoria=self.concentrados, cantidad_kg_ingresada=100, precio=2,
+        )
+        self.maiz.ubicaciones.add(self.bodega, self.establo)
+        self.maiz.proveedores.add(self.proveedor)
+        diesel = Combustible.objects.create(tipo="Diésel", cantidad_galones_ingresada=10, precio=15)
+        diesel.ubicaciones.add(self.bodega)
+        Producto.objects.create(nombre="Leche", cantidad=10, precio=Decimal("3.50"))
+        usar_cantidad(Alimento, self.maiz.pk, Decimal(30))
+
+    def test_valores_por_dimension_en_consultas_constantes(self):
+        with self.assertNumQueries(9):
+            informe = valoracion()
+        self.assertEqual(informe['total'], Decimal("325.00"))  # 70×2 + 10×15 + 10×3.5
+        categorias = informe['dimensiones']['categoria']
+        self.assertEqual([(g['nombre'], g['valor']) for g in categorias['grupos']], [("Concentrados", Decimal("140.00"))])
+        self.assertEqual(categorias['sin_asignar'], Decimal("185.00"))
+
+        # El maíz suma en sus dos ubicaciones; el acumulado sigue el orden por valor
+        ubicaciones = informe['dimensiones']['ubicacion']['grupos']
+        self.assertEqual(
+            [(g['nombre'], g['valor'], g['puesto'], g['acumulado']) for g in ubicaciones],
+            [("Bodega", Decimal("290.00"), 1, Decimal("290.00")), ("Establo", Decimal("140.00"), 2, Decimal("430.00"))],
+        )
+        self.assertEqual(ubicaciones[0]['porcentaje'], Decimal("67.44"))
+        self.assertEqual(ubicaciones[0]['por_tipo']['combustible'], Decimal("150.00"))
+        self.assertEqual(informe['dimensiones']['proveedor']['sin_asignar'], Decimal("185.00"))
+
+    def test_a_una_fecha_usa_el_registro_de_movimientos(self):
+        hoy = datetime.date.today()
+        MovimientoInventario.objects.filter(tipo=MovimientoInventario.Tipo.CONSUMO).update(
+            fecha=timezone.now() + timedelta(days=1),
+        )
+        informe = valoracion(hoy)
+        self.assertEqual(informe['excluidos'], ['producto', 'vacuna'])
+        self.assertEqual(informe['total'], Decimal("350.00"))  # el consumo de mañana aún no cuenta
+
+    def test_antes_del_registro_de_movimientos_no_hay_saldo(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.login(username='admin', password='clave')
+        primera = primera_fecha_registro()
+        self.assertEqual(primera, timezone.localdate())
+        self.assertEqual(valoracion(primera)["total"], Decimal("290.00"))
+        with self.assertRaises(FechaSinRegistro):
+            valoracion(primera - timedelta(days=1))
+        respuesta = self.client.get(reverse('valoracion_json'), {'fecha': (primera - timedelta(days=400)).isoformat()})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['desde'], primera.isoformat())
+        respuesta = self.client.get(reverse('valoracion_admin'), {'fecha': (primera - timedelta(days=1)).isoformat()})
+        self.assertContains(respuesta, "No hay registro de movimientos antes del")
+
+    def test_endpoint_y_pagina_del_admin(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.login(username='admin', password='clave')
+        data = self.client.get(reverse('valoracion_json')).json()
+        self.assertEqual(data['total'], "325.00")
+        self.assertEqual(self.client.get(reverse('valoracion_json'), {'fecha': '18/10'}).status_code, 400)
+        respuesta = self.client.get(reverse('valoracion_admin'), {'fecha': datetime.date.today().isoformat()})
+        self.assertContains(respuesta, "Concentrados")
+
+
+class AnotacionesQuerySetTest(TestCase):
+
+    def setUp(self):
+        self.lleno = Alimento.objects.create(nombre="Heno", cantidad_kg_ingresada=100, cantidad_kg_usada=10)
+        self.poco = Alimento.objects.create(nombre="Sal", cantidad_kg_ingresada=20, cantidad_kg_usada=15)
+        self.agotado = Alimento.objects.create(nombre="Melaza", cantidad_kg_ingresada=5, cantidad_kg_usada=5)
+
+    def test_restante_disponibles_y_agotados(self):
+        ordenados = Alimento.objects.order_by('restante')
+        self.assertEqual([a.restante for a in ordenados], [Decimal(0), Decimal(5), Decimal(90)])
+        self.assertQuerySetEqual(Alimento.objects.disponibles().order_by('nombre'), [self.lleno, self.poco])
+        self.assertQuerySetEqual(Alimento.objects.agotados(), [self.agotado])
+        self.assertQuerySetEqual(Alimento.objects.stock_bajo(5), [self.poco])
+
+    def test_columna_generada_sigue_los_movimientos(self):
+        combustible = Combustible.objects.create(tipo="Diésel", cantidad_galones_ingresada=8, cantidad_galones_usados=3)
+        usar_cantidad(Combustible, combustible.pk, Decimal(5))
+        self.assertEqual(Combustible.objects.get().restante, Decimal(0))
+        self.assertQuerySetEqual(Combustible.objects.agotados(), [combustible])
+
+    def test_edad_en_la_base_coincide_con_la_propiedad(self):
+        hoy = datetime.date(2024, 3, 15)
+        for nacimiento in [datetime.date(2020, 3, 15), datetime.date(2020, 3, 16), datetime.date(2023, 12, 31)]:
+            Ganado.objects.create(identificador=str(nacimiento), fecha_nacimiento=nacimiento)
+        meses = dict(Ganado.objects.con_edad(hoy).values_list('identificador', 'edad_meses'))
+        self.assertEqual(meses, {'2020-03-15': 48, '2020-03-16': 47, '2023-12-31': 2})
+
+    def test_lista_y_admin_ordenan_por_restante(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.login(username='admin', password='clave')
+        data = self.client.get(
+            reverse('lista_alimentos'), {'orden': 'restante', 'cursor': '', 'items_per_page': 2},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        ).json()
+        self.assertEqual([a['nombre'] for a in data['items']], ["Melaza", "Sal"])
+        siguiente = self.client.get(
+            reverse('lista_alimentos'), {'orden': 'restante', 'cursor': data['next_cursor'], 'items_per_page': 2},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        ).json()
+        self.assertEqual([a['nombre'] for a in siguiente['items']], ["Heno"])
+
+        url = reverse('admin:inventario_alimento_changelist')
+        # cantidad_kg_restante es la 6.ª columna de list_display
+        respuesta = self.client.get(url, {'o': '-6', 'disponibilidad': 'disponible'})
+        self.assertEqual([a.nombre for a in respuesta.context['cl'].result_list], ["Heno", "Sal"])
+
+
+from dateutil.relativedelta import relativedelta
+from django.core import mail
+from .models import Dotacion, Pago, SuscripcionRecordatorio, Trabajador
+from .recordatorios import Recordatorio, recolectar
+
+
+class RecordatoriosTest(TestCase):
+
+    def setUp(self):
+        self.hoy = datetime.date(2024, 6, 10)
+
+    def _trabajadores(self, cantidad, inicio=0):
+        for i in range(inicio, inicio + cantidad):
+            trabajador = Trabajador.objects.create(nombre=f"T{i}", apellido="Pérez", cedula=str(i), correo=f"t{i}@example.com")
+            # Una entrega vieja y la última, que toca renovar dentro de 3 días
+            Dotacion.objects.create(trabajador=trabajador, fecha_entrega=datetime.date(2023, 1, 1))
+            Dotacion.objects.create(trabajador=trabajador, fecha_entrega=datetime.date(2024, 2, 13))
+            Pago.objects.create(trabajador=trabajador, metodo_pago="Efectivo", fecha_pago=self.hoy)
+
+    def test_consultas_constantes_al_crecer_los_trabajadores(self):
+        Alimento.objects.create(nombre="Sal", cantidad_kg_ingresada=10, fecha_vencimiento=self.hoy + timedelta(days=2))
+        self._trabajadores(2)
+        recolectar(self.hoy)  # llena la caché de ContentType del pronóstico
+        with CaptureQueriesContext(connection) as con_pocos:
+            pocos = recolectar(self.hoy)
+        self._trabajadores(30, inicio=2)
+        with CaptureQueriesContext(connection) as con_muchos:
+            muchos = recolectar(self.hoy)
+        self.assertEqual(len(con_pocos), len(con_muchos))
+        self.assertEqual(len(muchos), 1 + 32 * 2)
+        self.assertEqual(pocos[0], Recordatorio('alimentos', "Sal", self.hoy + timedelta(days=2), "Vence el 12/06/2024.", pocos[0].objeto_id, 'inventario.alimento'))
+        dotacion = next(r for r in pocos if r.categoria == 'dotaciones')
+        self.assertEqual(dotacion.fecha, datetime.date(2024, 6, 13))
+
+    def test_correo_por_secciones(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        SuscripcionRecordatorio.objects.create(usuario=admin, alcance=SuscripcionRecordatorio.Alcance.PAGOS)
+        trabajador = Trabajador.objects.create(nombre="T0", apellido="Pérez", cedula="0", correo="t0@example.com")
+        Pago.objects.create(trabajador=trabajador, metodo_pago="Efectivo", fecha_pago=timezone.localdate())
+        Dotacion.objects.create(trabajador=trabajador, fecha_entrega=timezone.localdate() - relativedelta(months=4))
+        call_command('enviar_recordatorios', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        cuerpo = mail.outbox[0].body
+        self.assertIn("Pagos Pendientes", cuerpo)
+        self.assertIn("Dotación para T0 Pérez - 0:", cuerpo)
+        self.assertNotIn("Alimentos por Vencer", cuerpo)
+
+
+class SuscripcionesRecordatoriosTest(TestCase):
+
+    def setUp(self):
+        hoy = timezone.localdate()
+        Mantenimiento.objects.create(equipo="Tractor", fecha_proximo_mantenimiento=hoy)
+        trabajador = Trabajador.objects.create(nombre="T0", apellido="Pérez", cedula="0", correo="t0@example.com")
+        Pago.objects.create(trabajador=trabajador, metodo_pago="Efectivo", fecha_pago=hoy)
+
+    def _suscribir(self, cantidad, alcances, inicio=0):
+        usuarios = User.objects.bulk_create([
+            User(username=f"u{i}", email=f"u{i}@example.com") for i in range(inicio, inicio + cantidad)
+        ])
+        SuscripcionRecordatorio.objects.bulk_create([
+            SuscripcionRecordatorio(usuario=usuario, alcance=alcance) for usuario in usuarios for alcance in alcances
+        ])
+
+    def test_un_resumen_por_combinacion_y_un_correo_por_destinatario(self):
+        Alcance = SuscripcionRecordatorio.Alcance
+        self._suscribir(250, [Alcance.PAGOS])
+        self._suscribir(200, [Alcance.PAGOS, Alcance.MANTENIMIENTO], inicio=250)
+        # Sin recordatorios de ganado: estos usuarios no reciben correo
+        self._suscribir(50, [Alcance.GANADO], inicio=450)
+        User.objects.create_user('inactivo', 'inactivo@example.com', is_active=False).suscripciones_recordatorios.create(alcance=Alcance.PAGOS)
+
+        salida = StringIO()
+        call_command('enviar_recordatorios', '--lote', '40', '--hilos', '3', stdout=salida)
+        self.assertEqual(len(mail.outbox), 450)
+        self.assertIn("450 correos de recordatorio enviados (2 resúmenes distintos)", salida.getvalue())
+        self.assertTrue(all(len(correo.to) == 1 for correo in mail.outbox))
+        por_correo = {correo.to[0]: correo for correo in mail.outbox}
+        self.assertNotIn("inactivo@example.com", por_correo)
+        self.assertNotIn("Mantenimientos Próximos", por_correo["u0@example.com"].body)
+        self.assertIn("Mantenimientos Próximos", por_correo["u300@example.com"].body)
+        self.assertIn("Pagos Pendientes", por_correo["u300@example.com"].alternatives[0][0])
+
+
+from django.core.mail.backends import locmem
+from .models import CorreoRecordatorioPendiente, RecordatorioNotificado, RevisionRecordatorios
+from .recordatorios import recolectar_nuevos, registrar_notificados
+
+
+class RecordatoriosIncrementalesTest(TestCase):
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        SuscripcionRecordatorio.objects.bulk_create([
+            SuscripcionRecordatorio(usuario=admin, alcance=alcance) for alcance in SuscripcionRecordatorio.Alcance
+        ])
+        self.mantenimiento = Mantenimiento.objects.create(equipo="Tractor", fecha_proximo_mantenimiento=self.hoy)
+        trabajador = Trabajador.objects.create(nombre="T0", apellido="Pérez", cedula="0", correo="t0@example.com")
+        Pago.objects.create(trabajador=trabajador, metodo_pago="Efectivo", fecha_pago=self.hoy)
+        # Fuera de la ventana de hoy; entra mañana
+        Pago.objects.create(trabajador=trabajador, metodo_pago="Efectivo", fecha_pago=self.hoy + timedelta(days=8))
+
+    def _enviar(self):
+        salida = StringIO()
+        call_command('enviar_recordatorios', stdout=salida)
+        return salida.getvalue()
+
+    def test_solo_se_envia_lo_nuevo_o_cambiado(self):
+        self._enviar()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(RecordatorioNotificado.objects.count(), 2)
+
+        self.assertIn("No hay recordatorios nuevos", self._enviar())
+        self.assertEqual(len(mail.outbox), 1)
+
+        self.mantenimiento.fecha_proximo_mantenimiento = self.hoy + timedelta(days=3)
+        self.mantenimiento.save()
+        self._enviar()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn("Mantenimientos Próximos", mail.outbox[1].body)
+        self.assertNotIn("Pagos Pendientes", mail.outbox[1].body)
+
+    def test_sin_cambios_no_consulta_las_categorias(self):
+        registrar_notificados(*recolectar_nuevos(self.hoy), hoy=self.hoy)
+        with self.assertNumQueries(2):
+            nuevos, _ = recolectar_nuevos(self.hoy)
+        self.assertEqual(nuevos, [])
+
+        # Al día siguiente solo se consulta el día que entró en la ventana
+        manana = self.hoy + timedelta(days=1)
+        with CaptureQueriesContext(connection) as consultas:
+            nuevos, revisiones = recolectar_nuevos(manana)
+        self.assertEqual([(r.categoria, r.fecha) for r in nuevos], [('pagos', self.hoy + timedelta(days=8))])
+        nuevo_dia = (self.hoy + timedelta(days=8)).isoformat()
+        consulta_pagos = next(q['sql'] for q in consultas if '"fecha_pago" BETWEEN' in q['sql'])
+        self.assertIn(f"BETWEEN '{nuevo_dia}' AND '{nuevo_dia}'", consulta_pagos)
+        registrar_notificados(nuevos, revisiones, manana)
+        self.assertFalse(RecordatorioNotificado.objects.filter(fecha__lt=manana).exists())
+
+    @override_settings(EMAIL_BACKEND='inventario.tests.BackendConCaidas')
+    def test_lote_fallido_se_reintenta_solo_para_sus_destinatarios(self):
+        usuarios = User.objects.bulk_create([User(username=f"u{i}", email=f"u{i}@example.com") for i in range(4)])
+        SuscripcionRecordatorio.objects.bulk_create([
+            SuscripcionRecordatorio(usuario=u, alcance=SuscripcionRecordatorio.Alcance.PAGOS) for u in usuarios
+        ])
+        BackendConCaidas.caidos = {"u1@example.com"}
+        call_command('enviar_recordatorios', '--lote', '2', stdout=StringIO())
+        # El lote de admin y u0 sale; el de u1 y u2 falla; u3 sale en su propio lote
+        self.assertEqual(sorted(c.to[0] for c in mail.outbox), ["admin@example.com", "u0@example.com", "u3@example.com"])
+        self.assertEqual(RecordatorioNotificado.objects.count(), 2)
+        self.assertEqual(
+            sorted(CorreoRecordatorioPendiente.objects.values_list('correo', flat=True)), ["u1@example.com", "u2@example.com"],
+        )
+
+        salida = StringIO()
+        call_command('enviar_recordatorios', '--lote', '1', stdout=salida)
+        self.assertIn("1 correos de recordatorio enviados (0 resúmenes distintos, 2 reintentos)", salida.getvalue())
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(mail.outbox[3].to, ["u2@example.com"])
+        self.assertIn("Pagos Pendientes", mail.outbox[3].body)
+        pendiente = CorreoRecordatorioPendiente.objects.get()
+        self.assertEqual((pendiente.correo, pendiente.intentos), ("u1@example.com", 2))
+
+        BackendConCaidas.caidos = set()
+        self._enviar()
+        self.assertEqual(mail.outbox[4].to, ["u1@example.com"])
+        self.assertFalse(CorreoRecordatorioPendiente.objects.exists())
+        self.assertIn("No hay recordatorios nuevos", self._enviar())
+
+    def test_sin_suscriptores_no_marca_nada(self):
+        SuscripcionRecordatorio.objects.all().delete()
+        self.assertIn("No hay usuarios", self._enviar())
+        self.assertFalse(RecordatorioNotificado.objects.exists())
+        self.assertFalse(RevisionRecordatorios.objects.exists())
+        nuevos, _ = recolectar_nuevos(self.hoy)
+        self.assertEqual({r.categoria for r in nuevos}, {'mantenimientos', 'pagos'})
+
+    def test_categoria_sin_suscriptor_se_envia_al_suscribirse(self):
+        SuscripcionRecordatorio.objects.exclude(alcance=SuscripcionRecordatorio.Alcance.PAGOS).delete()
+        self._enviar()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertNotIn("Mantenimientos Próximos", mail.outbox[0].body)
+        self.assertEqual(list(RecordatorioNotificado.objects.values_list('categoria', flat=True)), ['pagos'])
+        self.assertFalse(RevisionRecordatorios.objects.filter(categoria='mantenimientos').exists())
+
+        SuscripcionRecordatorio.objects.create(
+            usuario=User.objects.get(username='admin'), alcance=SuscripcionRecordatorio.Alcance.MANTENIMIENTO,
+        )
+        self._enviar()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn("Mantenimientos Próximos", mail.outbox[1].body)
+        self.assertNotIn("Pagos Pendientes", mail.outbox[1].body)
+
+    def test_stock_por_agotarse_se_notifica_una_vez_mientras_siga_en_la_lista(self):
+        maiz = Alimento.objects.create(nombre="Maíz", cantidad_kg_ingresada=20)
+        MovimientoInventario.objects.bulk_create([
+            MovimientoInventario(content_type=ContentType.objects.get_for_model(Alimento), object_id=maiz.pk,
+                                 tipo='CONSUMO', cantidad=Decimal('5'), fecha=timezone.now() - timedelta(days=dias))
+            for dias in range(30)
+        ])
+
+        def stock(dia):
+            nuevos, revisiones = recolectar_nuevos(dia)
+            registrar_notificados(nuevos, revisiones, dia)
+            return [(r.nombre, r.fecha) for r in nuevos if r.categoria == 'stock_por_agotarse']
+
+        primero = stock(self.hoy)
+        self.assertEqual([nombre for nombre, _ in primero], ["Maíz"])
+        # Sin consumo hoy el pronóstico se mueve, pero ya se notificó
+        for dias in range(1, 4):
+            self.assertEqual(stock(self.hoy + timedelta(days=dias)), [])
+
+        maiz.cantidad_kg_ingresada = 1000
+        maiz.save()
+        self.assertEqual(stock(self.hoy), [])
+        self.assertFalse(RecordatorioNotificado.objects.filter(categoria='stock_por_agotarse').exists())
+        maiz.cantidad_kg_ingresada = 20
+        maiz.save()
+        self.assertEqual(stock(self.hoy), primero)
+
+
+class BackendConCaidas(locmem.EmailBackend):
+    """Backend de correo de prueba: falla el lote entero si lleva algún destinatario de `caidos`."""
+    caidos = set()
+
+    def send_messages(self, messages):
+        if any(set(m.to) & self.caidos for m in messages):
+            raise ConnectionError("Servidor SMTP caído")
+        return super().send_messages(messages)
+
+
+from .models import EjecucionTarea, InformeMaterializado, TareaProgramada
+from .programador import Cron, ExpresionCronInvalida, ejecutar_pendientes, sincronizar_tareas
+import tempfile
+from .tareas import TAREAS, calentar_cache
+
+
+class ProgramadorTareasTest(TestCase):
+
+    def _local(self, *args):
+        return timezone.make_aware(datetime.datetime(*args))
+
+    def test_expresiones_cron(self):
+        lunes = self._local(2026, 10, 19, 10, 7)
+        self.assertEqual(Cron('*/15 * * * *').siguiente(lunes), self._local(2026, 10, 19, 10, 15))
+        self.assertEqual(Cron('55 23 * * *').siguiente(lunes), self._local(2026, 10, 19, 23, 55))
+        self.assertEqual(Cron(TAREAS['materializar_informes'][1]).siguiente(lunes), self._local(2026, 10, 20, 0, 0))
+        self.assertEqual(Cron('0 9 * * 1').siguiente(lunes), self._local(2026, 10, 26, 9, 0))
+        self.assertEqual(Cron('0 6 1,15 * *').siguiente(lunes), self._local(2026, 11, 1, 6, 0))
+        self.assertEqual(Cron('30 8-17/4 * * *').siguiente(lunes), self._local(2026, 10, 19, 12, 30))
+        for invalida in ('* * * *', '61 * * * *', '*/0 * * * *', 'a * * * *'):
+            with self.assertRaises(ExpresionCronInvalida):
+                Cron(invalida)
+
+    def test_ejecuta_lo_vencido_una_sola_vez_y_registra_la_duracion(self):
+        Alimento.objects.create(nombre="Maíz", cantidad_kg_ingresada=10, precio=2)
+        MovimientoInventario.objects.update(fecha=timezone.now() - timedelta(days=1))
+        sincronizar_tareas()
+        self.assertEqual(set(TareaProgramada.objects.values_list('nombre', flat=True)), set(TAREAS))
+        ahora = timezone.now()
+        TareaProgramada.objects.filter(nombre='materializar_informes').update(proxima_ejecucion=ahora)
+        # Reservada por otro worker: no se toca aunque esté vencida
+        TareaProgramada.objects.filter(nombre='calentar_cache').update(
+            proxima_ejecucion=ahora, reservada_hasta=ahora + timedelta(minutes=5),
+        )
+
+        ejecutadas = ejecutar_pendientes(ahora)
+        self.assertEqual([(tarea.nombre, exito) for tarea, exito in ejecutadas], [('materializar_informes', True)])
+        self.assertEqual(ejecutar_pendientes(ahora), [])
+
+        tarea = TareaProgramada.objects.get(nombre='materializar_informes')
+        self.assertIsNone(tarea.reservada_hasta)
+        self.assertGreater(tarea.proxima_ejecucion, ahora)
+        ejecucion = EjecucionTarea.objects.get(tarea=tarea)
+        self.assertTrue(ejecucion.exito)
+        self.assertEqual(ejecucion.duracion, tarea.ultima_duracion)
+        # La copia es la valoración de ayer desde el registro, igual que la que se reconstruye sin copia
+        ayer = timezone.localdate() - timedelta(days=1)
+        informe = InformeMaterializado.objects.get(informe='valoracion', fecha=ayer)
+        self.assertEqual((informe.datos['total'], informe.datos['excluidos']), ('20.00', ['producto', 'vacuna']))
+        User.objects.create_user(username='staff', password='clave', is_staff=True)
+        self.client.login(username='staff', password='clave')
+        copia = self.client.get(reverse('valoracion_json'), {'fecha': ayer.isoformat()}).json()
+        informe.delete()
+        reconstruida = self.client.get(reverse('valoracion_json'), {'fecha': ayer.isoformat()}).json()
+        self.assertIsNotNone(copia.pop('materializado'))
+        self.assertIsNone(reconstruida.pop('materializado'))
+        self.assertEqual(copia, reconstruida)
+
+    def test_calentar_cache_llena_las_listas(self):
+        self.assertIn("Sin caché compartida", calentar_cache())
+        with tempfile.TemporaryDirectory() as directorio, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directorio,
+        }}):
+            contadores.reiniciar()
+            Alimento.objects.create(nombre="Maíz")
+            self.assertEqual(calentar_cache(), '16 páginas de listas en caché.')
+            User.objects.create_user(username='lector', password='clave')
+            self.client.login(username='lector', password='clave')
+            # Lo que envía modalManager.js: todos los filtros, vacíos, en otro orden
+            filtros = ['nombre', 'categoria', 'proveedor', 'ubicacion', 'vencimiento', 'disponibilidad', 'preñez']
+            parametros = {'items_per_page': 8, **dict.fromkeys(filtros, ''), 'page': 1}
+            respuesta = self.client.get(reverse('lista_alimentos'), parametros, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            self.assertEqual([item['nombre'] for item in respuesta.json()['items']], ["Maíz"])
+            self.assertEqual(contadores.valores()[('lista', 'hits')], 1)
+
+    def test_valoracion_de_un_dia_pasado_sale_de_la_copia_materializada(self):
+        User.objects.create_user(username='staff', password='clave', is_staff=True)
+        self.client.login(username='staff', password='clave')
+        ayer = timezone.localdate() - timedelta(days=1)
+        InformeMaterializado.objects.create(informe='valoracion', fecha=ayer, datos={'fecha': ayer, 'total': Decimal('7.50')})
+        datos = self.client.get(reverse('valoracion_json'), {'fecha': ayer.isoformat()}).json()
+        self.assertEqual(datos['total'], '7.50')
+        self.assertIn('materializado', datos)
+
+    def test_admin_valida_la_programacion_y_recalcula_la_proxima_ejecucion(self):
+        tarea = TareaProgramada.objects.create(
+            nombre='calentar_cache', programacion='*/15 * * * *', proxima_ejecucion=timezone.now() + timedelta(days=30),
+        )
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+        url = reverse('admin:inventario_tareaprogramada_changelist')
+
+        def guardar(programacion):
+            return self.client.post(url, {
+                'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1, 'form-0-id': tarea.pk,
+                'form-0-programacion': programacion, 'form-0-activa': 'on', '_save': 'Guardar',
+            })
+
+        respuesta = guardar('61 * * * *')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.context['cl'].formset.errors[0]['programacion'])
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.programacion, '*/15 * * * *')
+
+        antes = timezone.now()
+        self.assertEqual(guardar('0 * * * *').status_code, 302)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.programacion, '0 * * * *')
+        self.assertIn(tarea.proxima_ejecucion, {Cron('0 * * * *').siguiente(t) for t in (antes, timezone.now())})
+
+
+from .calendario_vacunas import ReglaDosis, calendario, regla_de
+
+
+class CalendarioVacunacionTest(TestCase):
+
+    def setUp(self):
+        self.hoy = datetime.date(2026, 10, 18)
+        vence = datetime.date(2027, 1, 1)
+        self.aftosa = Vacuna.objects.create(nombre="Aftosa", dosis_edad="Cada 6 meses", fecha_vencimiento=vence)
+        self.brucelosis = Vacuna.objects.create(nombre="Brucelosis", dosis_edad="A los 3 meses", fecha_vencimiento=vence)
+        self.carbon = Vacuna.objects.create(nombre="Carbón", dosis_peso="Desde 200 kg", fecha_vencimiento=vence)
+        self.rabia = Vacuna.objects.create(nombre="Rabia", fecha_vencimiento=vence)
+        self.g1 = Ganado.objects.create(identificador="G-1", fecha_nacimiento=datetime.date(2024, 1, 1), peso_kg=250)
+        self.g2 = Ganado.objects.create(identificador="G-2", fecha_nacimiento=datetime.date(2026, 8, 1), peso_kg=100)
+        vendido = Ganado.objects.create(
+            identificador="G-3", fecha_nacimiento=datetime.date(2024, 1, 1), estado=Ganado.EstadoAnimal.VENDIDO,
+        )
+        RegistroVacunacion.objects.create(ganado=self.g1, vacuna=self.aftosa, fecha_aplicacion=datetime.date(2026, 5, 1))
+        RegistroVacunacion.objects.create(
+            ganado=self.g1, vacuna=self.rabia, fecha_aplicacion=datetime.date(2025, 1, 1),
+            fecha_proxima_dosis=datetime.date(2025, 12, 1),
+        )
+        RegistroVacunacion.objects.create(
+            ganado=self.g1, vacuna=self.rabia, fecha_aplicacion=datetime.date(2026, 1, 1),
+            fecha_proxima_dosis=datetime.date(2026, 10, 10),
+        )
+        RegistroVacunacion.objects.create(
+            ganado=vendido, vacuna=self.rabia, fecha_aplicacion=datetime.date(2026, 1, 1),
+            fecha_proxima_dosis=datetime.date(2026, 10, 20),
+        )
+
+    def test_reglas_de_texto_libre(self):
+        self.assertEqual(
+            regla_de("Cada 6 meses desde los 4 meses", ""), ReglaDosis(relativedelta(months=6), relativedelta(months=4)),
+        )
+        self.assertEqual(regla_de("Refuerzo anual", ""), ReglaDosis(intervalo=relativedelta(years=1)))
+        self.assertEqual(regla_de("", "Desde 180,5 kilos"), ReglaDosis(peso_minimo=Decimal('180.5')))
+        self.assertIsNone(regla_de("2 ml subcutánea", ""))
+
+    def test_dosis_de_todo_el_rebano_en_dos_consultas(self):
+        with self.assertNumQueries(2):
+            dosis = calendario(self.hoy, self.hoy + timedelta(days=30), hoy=self.hoy)
+        self.assertEqual([(d.fecha, d.identificador, d.vacuna, d.estado, d.origen) for d in dosis], [
+            (datetime.date(2024, 4, 1), "G-1", "Brucelosis", 'vencida', 'edad'),
+            (datetime.date(2026, 10, 10), "G-1", "Rabia", 'vencida', 'registro'),
+            (self.hoy, "G-1", "Carbón", 'pendiente', 'peso'),
+            (datetime.date(2026, 11, 1), "G-1", "Aftosa", 'pendiente', 'refuerzo'),
+            (datetime.date(2026, 11, 1), "G-2", "Brucelosis", 'pendiente', 'edad'),
+        ])
+        sin_vencidas = calendario(self.hoy, self.hoy + timedelta(days=30), vencidas=False, hoy=self.hoy)
+        self.assertEqual(len(sin_vencidas), 3)
+        self.assertEqual(
+            [d.identificador for d in calendario(vacuna_id=self.brucelosis.pk, hasta=self.hoy + timedelta(days=30), hoy=self.hoy)],
+            ["G-1", "G-2"],
+        )
+
+    @override_settings(CALENDARIO_TOKEN='secreto')
+    def test_json_paginado_e_icalendar(self):
+        hoy = timezone.localdate()
+        RegistroVacunacion.objects.all().delete()
+        Vacuna.objects.exclude(pk=self.rabia.pk).delete()
+        for ganado, dias in ((self.g1, 3), (self.g2, 5)):
+            RegistroVacunacion.objects.create(
+                ganado=ganado, vacuna=self.rabia, fecha_aplicacion=hoy, fecha_proxima_dosis=hoy + timedelta(days=dias),
+            )
+        url = reverse('calendario_vacunacion_json')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        User.objects.create_user(username='vaquero', password='clave')
+        self.client.login(username='vaquero', password='clave')
+        datos = self.client.get(url, {'items_per_page': 1, 'page': 2}).json()
+        self.assertEqual((datos['total'], datos['total_pages'], datos['has_previous']), (2, 2, True))
+        self.assertEqual(datos['items'][0]['identificador'], "G-2")
+        self.assertEqual(self.client.get(url, {'desde': '18/10/2026'}).status_code, 400)
+
+        self.client.logout()
+        ics = reverse('calendario_vacunacion_ics')
+        self.assertEqual(self.client.get(ics).status_code, 403)
+        respuesta = self.client.get(ics, {'token': 'secreto'})
+        self.assertEqual(respuesta['Content-Type'], 'text/calendar; charset=utf-8')
+        contenido = respuesta.content.decode()
+        self.assertEqual(contenido.count('BEGIN:VEVENT'), 2)
+        self.assertIn(f'DTSTART;VALUE=DATE:{hoy + timedelta(days=3):%Y%m%d}\r\n', contenido)
+        self.assertIn('SUMMARY:Rabia - G-1\r\n', contenido)
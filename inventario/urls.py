@@ -59,6 +59,15 @@ urlpatterns = [
     path('get_vacuna_form_data/', views.get_vacuna_form_data, name='get_vacuna_form_data'),
     
 
+    # Catálogos de referencia (con ETag) y detalles de varios ítems en una sola petición
+    path('catalogos/', views.catalogos_json, name='catalogos_json'),
+    path('detalles/batch/', views.detalles_batch_json, name='detalles_batch_json'),
+    path('metricas/cache/', views.metricas_cache, name='metricas_cache'),
+    path('buscar/', views.buscar_json, name='buscar_json'),
+    path('valoracion/', views.valoracion_json, name='valoracion_json'),
+    path('ganado/calendario-vacunacion/', views.calendario_vacunacion_json, name='calendario_vacunacion_json'),
+    path('ganado/calendario-vacunacion.ics', views.calendario_vacunacion_ics, name='calendario_vacunacion_ics'),
+
     # URLs para las listas de los modales
     path('alimentos/', views.lista_alimentos, name='lista_alimentos'),
     path('combustibles/', views.lista_combustibles, name='lista_combustibles'),
@@ -0,0 +1,215 @@
+# inventario/valoracion.py
+"""
+Valoración del inventario (cantidad restante × precio) calculada en la base.
+
+`Producto.precio_total`, `Alimento.cantidad_kg_restante`, ... son propiedades
+de Python; sumarlas obligaría a cargar cada fila. Aquí el valor de cada ítem
+es una expresión SQL y el informe completo son siempre las mismas consultas,
+sin importar cuántos ítems haya:
+
+- una agregación por modelo (total, ítems y lo que no tiene categoría,
+  ubicación o proveedor);
+- una consulta por dimensión (categoría, ubicación, proveedor) sobre la
+  tabla de la dimensión, con una subconsulta por modelo y funciones de
+  ventana para el puesto, el porcentaje y el acumulado (análisis ABC).
+
+Ubicaciones y proveedores son ManyToMany: un ítem con dos ubicaciones suma
+su valor completo en las dos, así que los grupos de esas dimensiones pueden
+sumar más que el total del inventario.
+
+Con `fecha` la cantidad es el saldo de `MovimientoInventario` al final de
+ese día, valorado al precio actual. Solo los modelos de `CAMPOS_STOCK`
+tienen ese registro; el resto se informa en `excluidos`. El registro empieza
+con los saldos iniciales de la migración 0009: antes de su primer movimiento
+no hay saldo que reconstruir y se lanza `FechaSinRegistro`.
+"""
+import datetime
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import (
+    Case, Count, DecimalField, Exists, ExpressionWrapper, F, FloatField, Min, OuterRef, Q, Subquery, Sum, Value, When,
+    Window,
+)
+from django.db.models.functions import Cast, Coalesce, NullIf, Rank
+from django.utils import timezone
+
+from caracteristicas.models import Categoria, Proveedor, Ubicacion
+
+from .models import Alimento, Combustible, ControlPlaga, Medicamento, MovimientoInventario, Producto, Vacuna
+from .stock import CAMPOS_STOCK
+
+# tipo -> (etiqueta, modelo). Ganado, potreros y mantenimientos no tienen precio de stock.
+MODELOS_VALORACION = {
+    'producto': ('Productos', Producto),
+    'alimento': ('Alimentos', Alimento),
+    'medicamento': ('Medicamentos', Medicamento),
+    'control_plaga': ('Control de plagas', ControlPlaga),
+    'combustible': ('Combustibles', Combustible),
+    'vacuna': ('Vacunas', Vacuna),
+}
+
+# dimensión -> (modelo de la dimensión, campo en los modelos del inventario, etiqueta, etiqueta de lo no asignado)
+DIMENSIONES = {
+    'categoria': (Categoria, 'categoria', 'Por categoría', 'Sin categoría'),
+    'ubicacion': (Ubicacion, 'ubicaciones', 'Por ubicación', 'Sin ubicación'),
+    'proveedor': (Proveedor, 'proveedores', 'Por proveedor', 'Sin proveedor'),
+}
+
+CERO = Decimal('0.00')
+DINERO = DecimalField(max_digits=20, decimal_places=2)
+
+
+class FechaSinRegistro(ValueError):
+    """La fecha pedida es anterior al primer movimiento del registro."""
+
+    def __init__(self, primera):
+        self.primera = primera
+        super().__init__(f'No hay registro de movimientos antes del {primera:%d/%m/%Y}.')
+
+
+def primera_fecha_registro():
+    """Día (local) del primer movimiento del registro, o None si está vacío."""
+    primera = MovimientoInventario.objects.aggregate(primera=Min('fecha'))['primera']
+    return timezone.localdate(primera) if primera else None
+
+
+def _tiene_campo(modelo, campo):
+    try:
+        modelo._meta.get_field(campo)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def _dinero(valor):
+    """Decimal con dos decimales: SQLite devuelve las expresiones sin la escala de la columna."""
+    return Decimal(str(valor or 0)).quantize(CERO)
+
+
+def _fin_del_dia(fecha):
+    return timezone.make_aware(datetime.datetime.combine(fecha + datetime.timedelta(days=1), datetime.time.min))
+
+
+def _cantidad(modelo, fecha=None):
+    """Cantidad restante de cada fila como expresión SQL; con `fecha`, el saldo del registro a esa fecha."""
+    if modelo not in CAMPOS_STOCK:
+        return F('cantidad')
+    if fecha is None:
+        return F('restante')
+    saldo = MovimientoInventario.objects.filter(
+        content_type=ContentType.objects.get_for_model(modelo), object_id=OuterRef('pk'),
+        fecha__lt=_fin_del_dia(fecha),
+    ).order_by().values('object_id').annotate(
+        saldo=Sum(Case(
+            When(tipo=MovimientoInventario.Tipo.CONSUMO, then=-F('cantidad')), default=F('cantidad'),
+        )),
+    ).values('saldo')
+    return Coalesce(Subquery(saldo), Value(CERO), output_field=DINERO)
+
+
+def valor_item(modelo, fecha=None):
+    """Expresión del valor de cada fila de `modelo`: cantidad restante × precio."""
+    return ExpressionWrapper(_cantidad(modelo, fecha) * F('precio'), output_field=DINERO)
+
+
+def modelos_valorables(fecha=None):
+    """Modelos que entran en la valoración; a una fecha, solo los que tienen registro de movimientos."""
+    return {
+        tipo: (etiqueta, modelo) for tipo, (etiqueta, modelo) in MODELOS_VALORACION.items()
+        if fecha is None or modelo in CAMPOS_STOCK
+    }
+
+
+def _sin_asignar(modelo, campo):
+    """Filtro de las filas de `modelo` sin valor en `campo` (FK o ManyToMany)."""
+    relacion = modelo._meta.get_field(campo)
+    if not relacion.many_to_many:
+        return Q(**{f'{campo}__isnull': True})
+    # Con Exists no se multiplican las filas por cada relación, como pasaría con un JOIN
+    intermedia = relacion.remote_field.through
+    return ~Exists(intermedia.objects.filter(**{relacion.m2m_field_name(): OuterRef('pk')}))
+
+
+def _totales(modelo, fecha):
+    valor = valor_item(modelo, fecha)
+    agregados = {'items': Count('pk'), 'valor': Coalesce(Sum(valor), Value(CERO), output_field=DINERO)}
+    for dimension, (_, campo, _, _) in DIMENSIONES.items():
+        if _tiene_campo(modelo, campo):
+            agregados[f'sin_{dimension}'] = Coalesce(
+                Sum(valor, filter=_sin_asignar(modelo, campo)), Value(CERO), output_field=DINERO,
+            )
+    return modelo.objects.aggregate(**agregados)
+
+
+def _por_dimension(dimension, modelos, fecha):
+    """Una fila por categoría/ubicación/proveedor con valor, ordenadas de mayor a menor valor."""
+    modelo_dimension, campo, _, _ = DIMENSIONES[dimension]
+    por_modelo = {}
+    for tipo, (_, modelo) in modelos.items():
+        if not _tiene_campo(modelo, campo):
+            continue
+        suma = modelo.objects.filter(**{campo: OuterRef('pk')}).order_by().values(campo).annotate(
+            v=Sum(valor_item(modelo, fecha)),
+        ).values('v')
+        por_modelo[f'valor_{tipo}'] = Coalesce(Subquery(suma), Value(CERO), output_field=DINERO)
+    if not por_modelo:
+        return []
+
+    valor = sum((F(alias) for alias in por_modelo), Value(CERO))
+    orden = [F('valor').desc(), F('pk').asc()]
+    filas = modelo_dimension.objects.annotate(**por_modelo).annotate(
+        valor=ExpressionWrapper(valor, output_field=DINERO),
+    ).exclude(valor=0).annotate(
+        puesto=Window(Rank(), order_by=F('valor').desc()),
+        # En float: SQLite guarda los decimales enteros como INTEGER y dividiría sin decimales
+        porcentaje=ExpressionWrapper(
+            Cast('valor', FloatField()) * 100 / NullIf(Window(Sum('valor')), 0), output_field=FloatField(),
+        ),
+        acumulado=Window(Sum('valor'), order_by=orden),
+    ).order_by(*orden)
+    return [
+        {
+            'id': fila.pk, 'nombre': fila.nombre, 'valor': _dinero(fila.valor),
+            'porcentaje': _dinero(fila.porcentaje), 'acumulado': _dinero(fila.acumulado), 'puesto': fila.puesto,
+            'por_tipo': {alias[len('valor_'):]: _dinero(getattr(fila, alias)) for alias in por_modelo},
+        }
+        for fila in filas
+    ]
+
+
+def valoracion(fecha=None):
+    """
+    Informe de valoración: {'fecha', 'total', 'modelos', 'excluidos', 'dimensiones'}.
+    Cada dimensión es {'etiqueta', 'etiqueta_sin_asignar', 'sin_asignar', 'grupos': [...]}.
+    Lanza FechaSinRegistro si `fecha` es anterior al registro de movimientos.
+    """
+    if fecha is not None:
+        primera = primera_fecha_registro()
+        if primera is not None and fecha < primera:
+            raise FechaSinRegistro(primera)
+    modelos = modelos_valorables(fecha)
+    resumen = []
+    sin_asignar = dict.fromkeys(DIMENSIONES, CERO)
+    for tipo, (etiqueta, modelo) in modelos.items():
+        totales = _totales(modelo, fecha)
+        resumen.append({'tipo': tipo, 'etiqueta': etiqueta, 'items': totales['items'], 'valor': _dinero(totales['valor'])})
+        for dimension in DIMENSIONES:
+            sin_asignar[dimension] += _dinero(totales.get(f'sin_{dimension}', totales['valor']))
+
+    return {
+        'fecha': fecha,
+        'total': sum((fila['valor'] for fila in resumen), CERO),
+        'modelos': resumen,
+        'excluidos': [tipo for tipo in MODELOS_VALORACION if tipo not in modelos],
+        'dimensiones': {
+            dimension: {
+                'etiqueta': etiqueta,
+                'etiqueta_sin_asignar': etiqueta_sin_asignar,
+                'sin_asignar': sin_asignar[dimension],
+                'grupos': _por_dimension(dimension, modelos, fecha),
+            }
+            for dimension, (_, _, etiqueta, etiqueta_sin_asignar) in DIMENSIONES.items()
+        },
+    }
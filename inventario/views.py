@@ -1,23 +1,36 @@
 # inventario/views.py
-from django.db.models import F
 from django.shortcuts import render, redirect, get_object_or_404
 from .models import Producto, Alimento, Combustible, ControlPlaga, Ganado, Mantenimiento, Medicamento, Potrero, Animal, VentaProducto, RegistroMedicamento
 from caracteristicas.models import Etiqueta, Categoria, Proveedor, Ubicacion
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import AuthenticationForm
-from django.contrib import messages
+from django.contrib import admin, messages
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.core.paginator import Paginator
+from django.urls import reverse
+from django.views.decorators.http import require_POST, condition
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_protect
+import datetime
 import json
 from decimal import Decimal
 from django.contrib.admin.views.decorators import staff_member_required
-from django.core.paginator import Paginator
-from .models import Comprador
-from .models import Vacuna, RegistroVacunacion, FechaProduccion
+from .paginacion import CursorInvalido
+from .listas import lista_json
+from .busqueda import buscar, TIPOS_CON_DETALLE
+from .valoracion import valoracion, FechaSinRegistro
+from .calendario_vacunas import calendario, icalendar
+from .detalles import detalles_lote, parsear_lote, claves_catalogo_por_tipo, LoteInvalido, TIPOS_DETALLE
+from .catalogos import Catalogos, CONSTRUCTORES_CATALOGO, etag_catalogos
+from .cache import obtener_detalle, metricas_prometheus
+from .stock import usar_cantidad, anadir_cantidad, StockInsuficiente
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
 from django.utils import timezone
-from dateutil.relativedelta import relativedelta
+from .models import Comprador
+from .models import Vacuna, RegistroVacunacion, FechaProduccion, InformeMaterializado
 
 
 from django.contrib.admin.models import LogEntry, CHANGE, ADDITION
@@ -37,18 +50,185 @@ def log_user_action(request, obj, action_flag, message):
         change_message=message
     )
 
-def get_safe_image_url(image_field):
+def _detalle_json(request, tipo, pk):
+    """Respuesta de `<tipo>/detalles/<id>/` usando el serializador compartido de detalles.py."""
+    def construir():
+        obj = get_object_or_404(TIPOS_DETALLE[tipo].queryset(), pk=pk)
+        return TIPOS_DETALLE[tipo].serializar(obj)
+    return JsonResponse(obtener_detalle(tipo, pk, construir))
+
+def _lista_json(request, tipo):
+    """Respuesta de las vistas `lista_*` (peticiones AJAX) con la página que construye listas.py."""
+    if request.headers.get('x-requested-with') != 'XMLHttpRequest':
+        return JsonResponse({'status': 'error', 'message': 'Invalid request'}, status=400)
+    try:
+        contenido = lista_json(tipo, request.GET)
+    except CursorInvalido:
+        return JsonResponse({'status': 'error', 'message': 'Cursor inválido.'}, status=400)
+    return HttpResponse(contenido, content_type='application/json')
+
+@login_required
+def detalles_batch_json(request):
+    """
+    Detalles de varios ítems en una sola respuesta: ?items=alimento:1,ganado:3
+    """
+    try:
+        pares = parsear_lote(request.GET.get('items'))
+    except LoteInvalido as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse(detalles_lote(pares))
+
+def metricas_cache(request):
     """
-    Safely gets the image URL from a CloudinaryField.
-    Returns None if the image does not exist or if there's an error generating the URL.
+    Aciertos y fallos de la caché en formato Prometheus. Accesible para staff
+    o con el encabezado 'Authorization: Bearer <METRICAS_TOKEN>'.
     """
-    if not image_field:
-        return None
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    autorizado = settings.METRICAS_TOKEN and constant_time_compare(token, settings.METRICAS_TOKEN)
+    if not autorizado and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponse(status=403)
+    return HttpResponse(metricas_prometheus(), content_type='text/plain; version=0.0.4')
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=lambda request: etag_catalogos())
+def catalogos_json(request):
+    """
+    Todos los catálogos de referencia de los formularios. El navegador guarda la
+    respuesta y la revalida con If-None-Match; si nada cambió recibe un 304.
+    """
+    catalogos = Catalogos()
+    return JsonResponse({
+        'version': etag_catalogos(),
+        'catalogos': {nombre: catalogos[nombre] for nombre in CONSTRUCTORES_CATALOGO},
+        'claves_por_tipo': claves_catalogo_por_tipo(),
+    })
+
+@login_required
+@cache_control(private=True, max_age=60)
+def buscar_json(request):
+    """
+    Búsqueda global para el typeahead: ?q=maiz&por_grupo=5.
+    Busca en todo el inventario, proveedores y ubicaciones a la vez y devuelve
+    los resultados agrupados por tipo, sin distinguir tildes ni mayúsculas.
+    """
+    q = request.GET.get('q', '').strip()
     try:
-        return image_field.url
-    except Exception:
-        # Could log the error here if needed
-        return None
+        por_grupo = int(request.GET.get('por_grupo', 5))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'por_grupo debe ser un número.'}, status=400)
+    grupos = buscar(q, por_grupo)
+    for grupo in grupos:
+        con_detalle = grupo['tipo'] in TIPOS_CON_DETALLE
+        for resultado in grupo['resultados']:
+            resultado['detalle_url'] = (
+                reverse(f"{grupo['tipo']}_detalles_json", args=[resultado['id']]) if con_detalle else None
+            )
+    return JsonResponse({'q': q, 'grupos': grupos}, json_dumps_params={'separators': (',', ':')})
+
+def _fecha_valoracion(request):
+    """?fecha=AAAA-MM-DD de la valoración, o None para la de hoy. Lanza ValueError si no es válida."""
+    texto = request.GET.get('fecha', '').strip()
+    return datetime.date.fromisoformat(texto) if texto else None
+
+@staff_member_required
+def valoracion_json(request):
+    """
+    Valoración del inventario por categoría, ubicación y proveedor (ver
+    valoracion.py). Con ?fecha=AAAA-MM-DD, el stock que había ese día (400 con
+    `desde` si es anterior al registro de movimientos): la
+    copia que guardó la tarea `materializar_informes` al día siguiente si
+    existe, o si no la reconstruida desde el registro de movimientos. Las dos
+    tienen la misma forma; `materializado` indica cuándo se guardó la copia.
+    """
+    try:
+        fecha = _fecha_valoracion(request)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'La fecha debe tener el formato AAAA-MM-DD.'}, status=400)
+    if fecha and fecha < timezone.localdate():
+        materializado = InformeMaterializado.objects.filter(informe='valoracion', fecha=fecha).first()
+        if materializado:
+            return JsonResponse({**materializado.datos, 'materializado': materializado.generado})
+    try:
+        informe = valoracion(fecha)
+    except FechaSinRegistro as e:
+        return JsonResponse({'status': 'error', 'message': str(e), 'desde': e.primera}, status=400)
+    return JsonResponse({**informe, 'materializado': None})
+
+def _parametros_calendario(request, dias):
+    """
+    (desde, hasta, vencidas, vacuna_id) de ?desde=&hasta=AAAA-MM-DD&vencidas=0&vacuna=<id>.
+    Por defecto desde hoy y `dias` días. Lanza ValueError si algo no es válido.
+    """
+    desde = request.GET.get('desde', '').strip()
+    desde = datetime.date.fromisoformat(desde) if desde else timezone.localdate()
+    hasta = request.GET.get('hasta', '').strip()
+    hasta = datetime.date.fromisoformat(hasta) if hasta else desde + datetime.timedelta(days=dias)
+    if hasta < desde:
+        raise ValueError('hasta < desde')
+    vacuna = request.GET.get('vacuna', '').strip()
+    vencidas = request.GET.get('vencidas', '1').lower() not in ('0', 'false', 'no')
+    return desde, hasta, vencidas, int(vacuna) if vacuna else None
+
+_ERROR_CALENDARIO = 'Las fechas deben tener el formato AAAA-MM-DD (desde <= hasta) y vacuna debe ser un número.'
+
+@login_required
+def calendario_vacunacion_json(request):
+    """
+    Dosis de vacunas vencidas y pendientes de todo el ganado vivo (ver
+    calendario_vacunas.py), paginadas: ?desde=&hasta=&vencidas=&vacuna=&page=&items_per_page=.
+    """
+    try:
+        desde, hasta, vencidas, vacuna_id = _parametros_calendario(request, 30)
+        items_per_page = min(int(request.GET.get('items_per_page', 50)), 500)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': _ERROR_CALENDARIO}, status=400)
+
+    paginator = Paginator(calendario(desde, hasta, vencidas, vacuna_id), max(items_per_page, 1))
+    page_obj = paginator.get_page(request.GET.get('page', 1))
+    return JsonResponse({
+        'desde': desde, 'hasta': hasta, 'total': paginator.count,
+        'items': [d._asdict() for d in page_obj.object_list],
+        'has_next': page_obj.has_next(),
+        'has_previous': page_obj.has_previous(),
+        'total_pages': paginator.num_pages,
+        'current_page': page_obj.number,
+    })
+
+def calendario_vacunacion_ics(request):
+    """
+    El mismo calendario en formato iCalendar, para suscribirse desde una app de
+    calendario. Accesible con sesión o con ?token=<CALENDARIO_TOKEN>.
+    """
+    token = request.GET.get('token', '')
+    autorizado = settings.CALENDARIO_TOKEN and constant_time_compare(token, settings.CALENDARIO_TOKEN)
+    if not autorizado and not request.user.is_authenticated:
+        return HttpResponse(status=403)
+    try:
+        desde, hasta, vencidas, vacuna_id = _parametros_calendario(request, 90)
+    except ValueError:
+        return HttpResponse(_ERROR_CALENDARIO, status=400, content_type='text/plain; charset=utf-8')
+    respuesta = HttpResponse(icalendar(calendario(desde, hasta, vencidas, vacuna_id)), content_type='text/calendar; charset=utf-8')
+    respuesta['Content-Disposition'] = 'inline; filename="vacunacion.ics"'
+    return respuesta
+
+def valoracion_admin(request):
+    """Página del admin con el mismo informe que valoracion_json (la URL la protege admin_view)."""
+    try:
+        fecha = _fecha_valoracion(request)
+    except ValueError:
+        messages.error(request, 'La fecha debe tener el formato AAAA-MM-DD.')
+        fecha = None
+    try:
+        informe = valoracion(fecha)
+    except FechaSinRegistro as e:
+        messages.error(request, f'{e} Se muestra la valoración actual.')
+        informe = valoracion()
+    return render(request, 'admin/valoracion.html', {
+        **admin.site.each_context(request),
+        'title': 'Valoración del inventario',
+        'informe': informe,
+    })
 
 def custom_login_view(request):
     if request.user.is_authenticated:
@@ -93,83 +273,7 @@ def lista_productos(request):
 
 @login_required
 def lista_alimentos(request):
-    alimentos_list = Alimento.objects.select_related('categoria').prefetch_related('proveedores', 'ubicaciones').order_by('nombre')
-
-    # Filtros existentes
-    nombre_query = request.GET.get('nombre', '')
-    categoria_id = request.GET.get('categoria', '')
-    proveedor_id = request.GET.get('proveedor', '')
-    
-    # Nuevos filtros
-    disponibilidad = request.GET.get('disponibilidad')
-    ubicacion_id = request.GET.get('ubicacion')
-    vencimiento = request.GET.get('vencimiento')
-
-    if nombre_query:
-        alimentos_list = alimentos_list.filter(nombre__icontains=nombre_query)
-    if categoria_id:
-        alimentos_list = alimentos_list.filter(categoria__id=categoria_id)
-    if proveedor_id:
-        alimentos_list = alimentos_list.filter(proveedores__id=proveedor_id)
-    
-    # Lógica para nuevos filtros
-    if disponibilidad == 'disponible':
-        alimentos_list = alimentos_list.filter(cantidad_kg_ingresada__gt=F('cantidad_kg_usada'))
-    elif disponibilidad == 'agotado':
-        alimentos_list = alimentos_list.filter(cantidad_kg_ingresada__lte=F('cantidad_kg_usada'))
-
-    if ubicacion_id:
-        alimentos_list = alimentos_list.filter(ubicaciones__id=ubicacion_id)
-
-    if vencimiento:
-        today = timezone.now().date()
-        if vencimiento == '1_semana':
-            end_date = today + relativedelta(weeks=1)
-            alimentos_list = alimentos_list.filter(fecha_vencimiento__range=[today, end_date])
-        elif vencimiento == '1_mes':
-            end_date = today + relativedelta(months=1)
-            alimentos_list = alimentos_list.filter(fecha_vencimiento__range=[today, end_date])
-        elif vencimiento == '3_meses':
-            end_date = today + relativedelta(months=3)
-            alimentos_list = alimentos_list.filter(fecha_vencimiento__range=[today, end_date])
-        elif vencimiento == '6_meses':
-            end_date = today + relativedelta(months=6)
-            alimentos_list = alimentos_list.filter(fecha_vencimiento__range=[today, end_date])
-        elif vencimiento == '1_ano':
-            end_date = today + relativedelta(years=1)
-            alimentos_list = alimentos_list.filter(fecha_vencimiento__range=[today, end_date])
-        elif vencimiento == 'mas_1_ano':
-            end_date = today + relativedelta(years=1)
-            alimentos_list = alimentos_list.filter(fecha_vencimiento__gt=end_date)
-
-    try:
-        items_per_page = int(request.GET.get('items_per_page', 8))
-    except (ValueError, TypeError):
-        items_per_page = 8
-
-    paginator = Paginator(alimentos_list, items_per_page)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        alimentos_data = []
-        for alimento in page_obj.object_list:
-            alimentos_data.append({
-                'id': alimento.id,
-                'nombre': alimento.nombre,
-                'cantidad_kg_ingresada': str(alimento.cantidad_kg_ingresada),
-                'imagen_url': get_safe_image_url(alimento.imagen),
-            })
-        
-        return JsonResponse({
-            'items': alimentos_data,
-            'has_next': page_obj.has_next(),
-            'has_previous': page_obj.has_previous(),
-            'total_pages': paginator.num_pages,
-            'current_page': page_obj.number,
-        })
-
-    return JsonResponse({'status': 'error', 'message': 'Invalid request'}, status=400)
+    return _lista_json(request, 'alimento')
 
 @login_required
 def user_redirect(request):
@@ -178,52 +282,7 @@ def user_redirect(request):
 
 @login_required
 def alimento_detalles_json(request, alimento_id):
-    alimento = get_object_or_404(Alimento, pk=alimento_id)
-
-    etiquetas_del_alimento = list(alimento.etiquetas.values('id', 'nombre', 'parent_id'))
-    todas_las_etiquetas_principales = list(Etiqueta.objects.filter(parent__isnull=True).values('id', 'nombre'))
-    todas_las_categorias = list(Categoria.objects.values('id', 'nombre'))
-    
-    proveedores_data = []
-    for proveedor in alimento.proveedores.all():
-        proveedores_data.append({
-            'nombre': proveedor.nombre,
-            'nombre_local': getattr(proveedor, 'nombre_local', ''),
-            'correo': getattr(proveedor, 'correo_electronico', ''),
-            'telefono': getattr(proveedor, 'telefono', ''),
-            'imagen_url': get_safe_image_url(getattr(proveedor, 'imagen', None))
-        })
-
-    ubicaciones_data = []
-    for ubicacion in alimento.ubicaciones.all():
-        ubicaciones_data.append({
-            'nombre': ubicacion.nombre, 'barrio': ubicacion.barrio,
-            'direccion': ubicacion.direccion, 'link': ubicacion.link,
-            'imagen_url': get_safe_image_url(getattr(ubicacion, 'imagen', None))
-        })
-    
-    estado = "Disponible" if alimento.cantidad_kg_restante > 0 else "Agotado"
-
-    data = {
-        'id': alimento.id,
-        'nombre': alimento.nombre,
-        'cantidad_ingresada': str(alimento.cantidad_kg_ingresada),
-        'cantidad_usada': str(alimento.cantidad_kg_usada),
-        'cantidad_restante': str(alimento.cantidad_kg_restante),
-        'precio': str(alimento.precio),
-        'estado': estado,
-        'fecha_compra': alimento.fecha_compra.strftime('%d/%m/%Y'),
-        'fecha_vencimiento': alimento.fecha_vencimiento.strftime('%d/%m/%Y'),
-        'descripcion': alimento.descripcion or "No hay descripción.", # AÑADE ESTA LÍNEA
-        'imagen_url': get_safe_image_url(alimento.imagen),
-        'categoria': { 'id': alimento.categoria.id, 'nombre': alimento.categoria.nombre } if alimento.categoria else None,
-        'proveedores': proveedores_data,
-        'ubicaciones': ubicaciones_data,
-        'etiquetas': etiquetas_del_alimento,
-        'todas_las_etiquetas_principales': todas_las_etiquetas_principales,
-        'todas_las_categorias': todas_las_categorias,
-    }
-    return JsonResponse(data)
+    return _detalle_json(request, 'alimento', alimento_id)
 
 @require_POST
 @login_required
@@ -280,15 +339,10 @@ def actualizar_cantidad_alimento(request):
         data = json.loads(request.body)
         alimento_id = data.get('alimento_id')
         cantidad_a_usar = Decimal(data.get('cantidad_a_usar'))
-        alimento = get_object_or_404(Alimento, pk=alimento_id)
         if cantidad_a_usar <= 0:
             return JsonResponse({'status': 'error', 'message': 'La cantidad debe ser mayor a cero.'}, status=400)
-        if cantidad_a_usar > alimento.cantidad_kg_restante:
-            return JsonResponse({'status': 'error', 'message': 'No hay suficiente cantidad en inventario.'}, status=400)
-        
-        alimento.cantidad_kg_usada += cantidad_a_usar
-        alimento.save()
-        
+        alimento = usar_cantidad(Alimento, alimento_id, cantidad_a_usar, usuario=request.user)
+
         # AÑADIDO: Registrar en el historial
         log_user_action(request, alimento, CHANGE, f"Usó {cantidad_a_usar} Kg desde el panel de usuario.")
 
@@ -297,88 +351,20 @@ def actualizar_cantidad_alimento(request):
             'nueva_cantidad_usada': alimento.cantidad_kg_usada,
             'nueva_cantidad_restante': alimento.cantidad_kg_restante,
         })
+    except Alimento.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'El alimento no existe.'}, status=404)
+    except StockInsuficiente:
+        return JsonResponse({'status': 'error', 'message': 'No hay suficiente cantidad en inventario.'}, status=400)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 @login_required
 def lista_combustibles(request):
-    combustibles_list = Combustible.objects.prefetch_related('proveedores', 'ubicaciones').order_by('tipo')
-
-    nombre_query = request.GET.get('nombre', '')
-    proveedor_id = request.GET.get('proveedor', '')
-    ubicacion_id = request.GET.get('ubicacion', '')
-
-    if nombre_query:
-        combustibles_list = combustibles_list.filter(tipo__icontains=nombre_query)
-    if proveedor_id:
-        combustibles_list = combustibles_list.filter(proveedores__id=proveedor_id)
-    if ubicacion_id:
-        combustibles_list = combustibles_list.filter(ubicaciones__id=ubicacion_id)
-
-    try:
-        items_per_page = int(request.GET.get('items_per_page', 8))
-    except (ValueError, TypeError):
-        items_per_page = 8
-
-    paginator = Paginator(combustibles_list, items_per_page)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        combustibles_data = []
-        for combustible in page_obj.object_list:
-            combustibles_data.append({
-                'id': combustible.id,
-                'tipo': combustible.tipo,
-                'cantidad_galones_ingresada': str(combustible.cantidad_galones_ingresada),
-                'imagen_url': get_safe_image_url(combustible.imagen),
-            })
-        
-        return JsonResponse({
-            'items': combustibles_data,
-            'has_next': page_obj.has_next(),
-            'has_previous': page_obj.has_previous(),
-            'total_pages': paginator.num_pages,
-            'current_page': page_obj.number,
-        })
-
-    return JsonResponse({'status': 'error', 'message': 'Invalid request'}, status=400)
+    return _lista_json(request, 'combustible')
 
 @login_required
 def combustible_detalles_json(request, combustible_id):
-    combustible = get_object_or_404(Combustible, pk=combustible_id)
-
-    proveedores_data = []
-    for proveedor in combustible.proveedores.all():
-        proveedores_data.append({
-            'nombre': proveedor.nombre,
-            'nombre_local': getattr(proveedor, 'nombre_local', ''),
-            'correo': getattr(proveedor, 'correo_electronico', ''),
-            'telefono': getattr(proveedor, 'telefono', ''),
-            'imagen_url': get_safe_image_url(getattr(proveedor, 'imagen', None))
-        })
-
-    ubicaciones_data = []
-    for ubicacion in combustible.ubicaciones.all():
-        ubicaciones_data.append({
-            'nombre': ubicacion.nombre, 'barrio': ubicacion.barrio,
-            'direccion': ubicacion.direccion, 'link': ubicacion.link,
-            'imagen_url': get_safe_image_url(getattr(ubicacion, 'imagen', None))
-        })
-
-    data = {
-        'id': combustible.id,
-        'tipo': combustible.tipo,
-        'cantidad_galones_ingresada': str(combustible.cantidad_galones_ingresada),
-        'cantidad_galones_usados': str(combustible.cantidad_galones_usados),
-        'cantidad_galones_restantes': str(combustible.cantidad_galones_restantes),
-        'precio': str(combustible.precio),
-        'proveedores': proveedores_data,
-        'ubicaciones': ubicaciones_data,
-        'descripcion': combustible.descripcion or "No hay descripción.", # AÑADE ESTA LÍNEA
-        'imagen_url': get_safe_image_url(combustible.imagen),
-    }
-    return JsonResponse(data)
+    return _detalle_json(request, 'combustible', combustible_id)
 
 @require_POST
 @login_required
@@ -387,18 +373,18 @@ def actualizar_cantidad_combustible(request):
         data = json.loads(request.body)
         combustible_id = data.get('combustible_id')
         cantidad_a_usar = Decimal(data.get('cantidad_a_usar'))
-        combustible = get_object_or_404(Combustible, pk=combustible_id)
         if cantidad_a_usar <= 0:
             return JsonResponse({'status': 'error', 'message': 'La cantidad debe ser mayor a cero.'}, status=400)
-        if cantidad_a_usar > combustible.cantidad_galones_restantes:
-            return JsonResponse({'status': 'error', 'message': 'No hay suficiente cantidad en inventario.'}, status=400)
-        combustible.cantidad_galones_usados += cantidad_a_usar
-        combustible.save()
+        combustible = usar_cantidad(Combustible, combustible_id, cantidad_a_usar, usuario=request.user)
         return JsonResponse({
             'status': 'success', 'message': 'Cantidad actualizada correctamente.',
             'nueva_cantidad_usada': combustible.cantidad_galones_usados,
             'nueva_cantidad_restante': combustible.cantidad_galones_restantes,
         })
+    except Combustible.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'El combustible no existe.'}, status=404)
+    except StockInsuficiente:
+        return JsonResponse({'status': 'error', 'message': 'No hay suficiente cantidad en inventario.'}, status=400)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
@@ -413,9 +399,7 @@ def anadir_stock_combustible(request):
         if not isinstance(cantidad_a_anadir, Decimal) or cantidad_a_anadir <= 0:
             return JsonResponse({'status': 'error', 'message': 'La cantidad debe ser un número positivo.'}, status=400)
 
-        combustible = get_object_or_404(Combustible, pk=combustible_id)
-        combustible.cantidad_galones_ingresada += cantidad_a_anadir
-        combustible.save()
+        combustible = anadir_cantidad(Combustible, combustible_id, cantidad_a_anadir, usuario=request.user)
 
         return JsonResponse({
             'status': 'success',
@@ -423,6 +407,8 @@ def anadir_stock_combustible(request):
             'nueva_cantidad_ingresada': combustible.cantidad_galones_ingresada,
             'nueva_cantidad_restante': combustible.cantidad_galones_restantes,
         })
+    except Combustible.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'El combustible no existe.'}, status=404)
     except (json.JSONDecodeError, TypeError):
         return JsonResponse({'status': 'error', 'message': 'Datos inválidos.'}, status=400)
     except Exception as e:
@@ -475,9 +461,7 @@ def anadir_stock_alimento(request):
         if not isinstance(cantidad_a_anadir, Decimal) or cantidad_a_anadir <= 0:
             return JsonResponse({'status': 'error', 'message': 'La cantidad debe ser un número positivo.'}, status=400)
 
-        alimento = get_object_or_404(Alimento, pk=alimento_id)
-        alimento.cantidad_kg_ingresada += cantidad_a_anadir
-        alimento.save()
+        alimento = anadir_cantidad(Alimento, alimento_id, cantidad_a_anadir, usuario=request.user)
 
         # AÑADIDO: Registrar en el historial
         log_user_action(request, alimento, CHANGE, f"Añadió {cantidad_a_anadir} Kg de stock desde el panel de usuario.")
@@ -488,6 +472,8 @@ def anadir_stock_alimento(request):
             'nueva_cantidad_ingresada': alimento.cantidad_kg_ingresada,
             'nueva_cantidad_restante': alimento.cantidad_kg_restante,
         })
+    except Alimento.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'El alimento no existe.'}, status=404)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
         
@@ -575,300 +561,33 @@ def crear_categoria_ajax(request):
     
 @login_required
 def lista_control_plagas(request):
-    items_list = ControlPlaga.objects.order_by('nombre_producto')
-    
-    nombre_query = request.GET.get('nombre', '')
-    ubicacion_id = request.GET.get('ubicacion')
-    tipo_query = request.GET.get('tipo')
-    disponibilidad = request.GET.get('disponibilidad')
-    vencimiento = request.GET.get('vencimiento')
-
-    if nombre_query:
-        items_list = items_list.filter(nombre_producto__icontains=nombre_query)
-    if ubicacion_id:
-        items_list = items_list.filter(ubicaciones__id=ubicacion_id)
-    if tipo_query:
-        items_list = items_list.filter(tipo__icontains=tipo_query)
-    
-    if disponibilidad == 'disponible':
-        items_list = items_list.filter(cantidad_ingresada__gt=F('cantidad_usada'))
-    elif disponibilidad == 'agotado':
-        items_list = items_list.filter(cantidad_ingresada__lte=F('cantidad_usada'))
-
-    if vencimiento:
-        today = timezone.now().date()
-        if vencimiento == '1_semana':
-            end_date = today + relativedelta(weeks=1)
-            items_list = items_list.filter(fecha_vencimiento__range=[today, end_date])
-        elif vencimiento == '1_mes':
-            end_date = today + relativedelta(months=1)
-            items_list = items_list.filter(fecha_vencimiento__range=[today, end_date])
-        elif vencimiento == '3_meses':
-            end_date = today + relativedelta(months=3)
-            items_list = items_list.filter(fecha_vencimiento__range=[today, end_date])
-        elif vencimiento == '6_meses':
-            end_date = today + relativedelta(months=6)
-            items_list = items_list.filter(fecha_vencimiento__range=[today, end_date])
-        elif vencimiento == '1_ano':
-            end_date = today + relativedelta(years=1)
-            items_list = items_list.filter(fecha_vencimiento__range=[today, end_date])
-        elif vencimiento == 'mas_1_ano':
-            end_date = today + relativedelta(years=1)
-            items_list = items_list.filter(fecha_vencimiento__gt=end_date)
-
-    paginator = Paginator(items_list, 8)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        data = [{
-            'id': item.id,
-            'nombre': item.nombre_producto,
-            'detalle': f"Quedan: {item.cantidad_restante} {item.get_unidad_medida_display()}",
-            'imagen_url': get_safe_image_url(item.imagen),
-        } for item in page_obj.object_list]
-        
-        return JsonResponse({
-            'items': data, 'total_pages': paginator.num_pages, 'current_page': page_obj.number
-        })
-    return JsonResponse({'status': 'error'}, status=400)
+    return _lista_json(request, 'control-plaga')
 
 @login_required
 def lista_ganado(request):
-    items_list = Ganado.objects.select_related('animal').order_by('identificador')
-
-    nombre_query = request.GET.get('nombre', '')
-    animal_id = request.GET.get('animal', '')
-    raza_query = request.GET.get('raza')
-    peso_query = request.GET.get('peso')
-    crecimiento_query = request.GET.get('crecimiento')
-    estado_query = request.GET.get('estado')
-    estado_salud_query = request.GET.get('estado_salud')
-    preñez_query = request.GET.get('preñez')
-
-    if nombre_query:
-        items_list = items_list.filter(identificador__icontains=nombre_query)
-    if animal_id:
-        items_list = items_list.filter(animal__id=animal_id)
-    if raza_query:
-        items_list = items_list.filter(raza__icontains=raza_query)
-    if crecimiento_query:
-        items_list = items_list.filter(crecimiento=crecimiento_query)
-    if estado_query:
-        items_list = items_list.filter(estado=estado_query)
-    if estado_salud_query:
-        items_list = items_list.filter(estado_salud=estado_salud_query)
-    if preñez_query:
-    # Usamos el parámetro 'preñez' para filtrar el campo 'peñe' del modelo
-        items_list = items_list.filter(peñe=preñez_query)
-
-    if peso_query:
-        if peso_query == '0_10':
-            items_list = items_list.filter(peso_kg__lt=10)
-        elif peso_query == '10_100':
-            items_list = items_list.filter(peso_kg__gte=10, peso_kg__lt=100)
-        elif peso_query == '100_250':
-            items_list = items_list.filter(peso_kg__gte=100, peso_kg__lt=250)
-        elif peso_query == '250_500':
-            items_list = items_list.filter(peso_kg__gte=250, peso_kg__lt=500)
-        elif peso_query == '500_1000':
-            items_list = items_list.filter(peso_kg__gte=500, peso_kg__lt=1000)
-        elif peso_query == '1000_mas':
-            items_list = items_list.filter(peso_kg__gte=1000)
-
-    paginator = Paginator(items_list, 8)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        data = [{
-            'id': item.id,
-            'nombre': item.identificador,
-            'detalle': f"{item.animal.nombre if item.animal else 'N/A'} - {item.get_estado_display()}",
-            'imagen_url': get_safe_image_url(item.imagen),
-        } for item in page_obj.object_list]
-
-        return JsonResponse({
-            'items': data, 'total_pages': paginator.num_pages, 'current_page': page_obj.number
-        })
-    return JsonResponse({'status': 'error'}, status=400)
+    return _lista_json(request, 'ganado')
 
 @login_required
 def lista_mantenimientos(request):
-    items_list = Mantenimiento.objects.order_by('equipo')
-
-    nombre_query = request.GET.get('nombre', '')
-    completado_query = request.GET.get('completado')
-    lugar_id = request.GET.get('lugar_mantenimiento')
-
-    if nombre_query:
-        items_list = items_list.filter(equipo__icontains=nombre_query)
-    
-    if completado_query in ['true', 'false']:
-        items_list = items_list.filter(completado=(completado_query == 'true'))
-            
-    if lugar_id:
-        items_list = items_list.filter(lugares_mantenimiento__id=lugar_id)
-
-    paginator = Paginator(items_list, 8)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-    
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        data = [{
-            'id': item.id,
-            'nombre': item.equipo,
-            'detalle': f"Próximo: {item.fecha_proximo_mantenimiento.strftime('%d/%m/%Y')}",
-            'imagen_url': get_safe_image_url(item.imagen),
-        } for item in page_obj.object_list]
-        
-        return JsonResponse({
-            'items': data, 'total_pages': paginator.num_pages, 'current_page': page_obj.number
-        })
-    return JsonResponse({'status': 'error'}, status=400)
+    return _lista_json(request, 'mantenimiento')
 
 @login_required
 def lista_medicamentos(request):
-    items_list = Medicamento.objects.select_related('categoria').prefetch_related('proveedores', 'ubicaciones').order_by('nombre')
-    
-    nombre_query = request.GET.get('nombre', '')
-    categoria_id = request.GET.get('categoria', '')
-    proveedor_id = request.GET.get('proveedor')
-    ubicacion_id = request.GET.get('ubicacion')
-    disponibilidad = request.GET.get('disponibilidad')
-
-    if nombre_query:
-        items_list = items_list.filter(nombre__icontains=nombre_query)
-    if categoria_id:
-        items_list = items_list.filter(categoria__id=categoria_id)
-    if proveedor_id:
-        items_list = items_list.filter(proveedores__id=proveedor_id)
-    if ubicacion_id:
-        items_list = items_list.filter(ubicaciones__id=ubicacion_id)
-
-    if disponibilidad == 'disponible':
-        items_list = items_list.filter(cantidad_ingresada__gt=F('cantidad_usada'))
-    elif disponibilidad == 'agotado':
-        items_list = items_list.filter(cantidad_ingresada__lte=F('cantidad_usada'))
-        
-    paginator = Paginator(items_list, 8)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-    
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        data = [{
-            'id': item.id,
-            'nombre': item.nombre,
-            'detalle': f"Quedan: {item.cantidad_restante} {item.get_unidad_medida_display()}",
-            'imagen_url': get_safe_image_url(item.imagen),
-        } for item in page_obj.object_list]
-        
-        return JsonResponse({
-            'items': data, 'total_pages': paginator.num_pages, 'current_page': page_obj.number
-        })
-    return JsonResponse({'status': 'error'}, status=400)
+    return _lista_json(request, 'medicamento')
 
 @login_required
 def lista_potreros(request):
-    items_list = Potrero.objects.order_by('nombre')
-    
-    nombre_query = request.GET.get('nombre', '')
-    empastado_query = request.GET.get('empastado')
-    fumigado_query = request.GET.get('fumigado')
-    rozado_query = request.GET.get('rozado')
-
-    if nombre_query:
-        items_list = items_list.filter(nombre__icontains=nombre_query)
-    
-    if empastado_query in ['true', 'false']:
-        items_list = items_list.filter(empastado=(empastado_query == 'true'))
-    if fumigado_query in ['true', 'false']:
-        items_list = items_list.filter(fumigado=(fumigado_query == 'true'))
-    if rozado_query in ['true', 'false']:
-        items_list = items_list.filter(rozado=(rozado_query == 'true'))
-        
-    paginator = Paginator(items_list, 8)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-    
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        data = [{
-            'id': item.id,
-            'nombre': item.nombre,
-            'detalle': f"Área: {item.area_hectareas} ha",
-            'imagen_url': get_safe_image_url(item.imagen),
-        } for item in page_obj.object_list]
-        
-        return JsonResponse({
-            'items': data, 'total_pages': paginator.num_pages, 'current_page': page_obj.number
-        })
-    return JsonResponse({'status': 'error'}, status=400)
+    return _lista_json(request, 'potrero')
 
 @login_required
 def lista_productos_view(request):
-    items_list = Producto.objects.select_related('categoria').order_by('nombre')
-    
-    nombre_query = request.GET.get('nombre', '')
-    categoria_id = request.GET.get('categoria', '')
-    estado_query = request.GET.get('estado')
-
-    if nombre_query:
-        items_list = items_list.filter(nombre__icontains=nombre_query)
-    if categoria_id:
-        items_list = items_list.filter(categoria__id=categoria_id)
-    if estado_query:
-        items_list = items_list.filter(estado=estado_query)
-        
-    paginator = Paginator(items_list, 8)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-    
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        data = [{
-            'id': item.id,
-            'nombre': item.nombre,
-            'detalle': f"Cantidad: {item.cantidad} {item.get_unidad_medida_display()}",
-            'imagen_url': get_safe_image_url(item.imagen),
-        } for item in page_obj.object_list]
-        
-        return JsonResponse({
-            'items': data, 'total_pages': paginator.num_pages, 'current_page': page_obj.number
-        })
-    return JsonResponse({'status': 'error'}, status=400)
+    return _lista_json(request, 'producto')
 
 # AÑADE ESTE CÓDIGO AL FINAL DE TUS VISTAS
 
 @login_required
 def control_plaga_detalles_json(request, control_plaga_id):
-    item = get_object_or_404(ControlPlaga, pk=control_plaga_id)
-
-    proveedores_data = [{
-        'nombre': p.nombre, 'nombre_local': p.nombre_local, 'correo': p.correo_electronico,
-        'telefono': p.telefono, 'imagen_url': get_safe_image_url(p.imagen)
-    } for p in item.proveedores.all()]
-
-    ubicaciones_data = [{
-        'nombre': u.nombre, 'barrio': u.barrio, 'direccion': u.direccion,
-        'link': u.link, 'imagen_url': get_safe_image_url(u.imagen)
-    } for u in item.ubicaciones.all()]
-
-    data = {
-        'id': item.id,
-        'nombre': item.nombre_producto,
-        'tipo': item.tipo,
-        'cantidad_ingresada': str(item.cantidad_ingresada),
-        'cantidad_usada': str(item.cantidad_usada),
-        'cantidad_restante': str(item.cantidad_restante),
-        'unidad_medida': item.get_unidad_medida_display(),
-        'precio': str(item.precio),
-        'proveedores': proveedores_data,
-        'ubicaciones': ubicaciones_data,
-        'fecha_compra': item.fecha_compra.strftime('%d/%m/%Y'),
-        'fecha_vencimiento': item.fecha_vencimiento.strftime('%d/%m/%Y'),
-        'descripcion': item.descripcion or "No hay descripción.", # AÑADE ESTA LÍNEA
-        'imagen_url': get_safe_image_url(item.imagen),
-    }
-    return JsonResponse(data)
+    return _detalle_json(request, 'control-plaga', control_plaga_id)
 
 @require_POST
 @login_required
@@ -877,18 +596,17 @@ def actualizar_cantidad_control_plaga(request):
         data = json.loads(request.body)
         item_id = data.get('control_plaga_id')
         cantidad_a_usar = Decimal(data.get('cantidad_a_usar'))
-        item = get_object_or_404(ControlPlaga, pk=item_id)
 
         if cantidad_a_usar <= 0:
             return JsonResponse({'status': 'error', 'message': 'La cantidad debe ser mayor a cero.'}, status=400)
-        if cantidad_a_usar > item.cantidad_restante:
-            return JsonResponse({'status': 'error', 'message': 'No hay suficiente cantidad en inventario.'}, status=400)
-        
-        item.cantidad_usada += cantidad_a_usar
-        item.save()
+        usar_cantidad(ControlPlaga, item_id, cantidad_a_usar, usuario=request.user)
         return JsonResponse({
             'status': 'success', 'message': 'Cantidad actualizada correctamente.'
         })
+    except ControlPlaga.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'El producto de control de plagas no existe.'}, status=404)
+    except StockInsuficiente:
+        return JsonResponse({'status': 'error', 'message': 'No hay suficiente cantidad en inventario.'}, status=400)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
@@ -903,12 +621,12 @@ def anadir_stock_control_plaga(request):
         if cantidad_a_anadir <= 0:
             return JsonResponse({'status': 'error', 'message': 'La cantidad a añadir debe ser positiva.'}, status=400)
         
-        item = get_object_or_404(ControlPlaga, pk=item_id)
-        item.cantidad_ingresada += cantidad_a_anadir
-        item.save()
+        anadir_cantidad(ControlPlaga, item_id, cantidad_a_anadir, usuario=request.user)
         return JsonResponse({
             'status': 'success', 'message': 'Stock añadido correctamente.'
         })
+    except ControlPlaga.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'El producto de control de plagas no existe.'}, status=404)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
     
@@ -917,44 +635,11 @@ from .models import LugarMantenimiento # Asegúrate de que LugarMantenimiento es
 
 @login_required
 def mantenimiento_detalles_json(request, mantenimiento_id):
-    mantenimiento = get_object_or_404(Mantenimiento, pk=mantenimiento_id)
-    
-    lugares_data = []
-    for lugar in mantenimiento.lugares_mantenimiento.all():
-        lugares_data.append({
-            'id': lugar.id,
-            'nombre': lugar.nombre_lugar,
-        })
-
-    data = {
-        'id': mantenimiento.id,
-        'equipo': mantenimiento.equipo,
-        'fecha_ultimo_mantenimiento': mantenimiento.fecha_ultimo_mantenimiento.strftime('%Y-%m-%d'),
-        'fecha_proximo_mantenimiento': mantenimiento.fecha_proximo_mantenimiento.strftime('%Y-%m-%d'),
-        'completado': mantenimiento.completado,
-        'descripcion': mantenimiento.descripcion,
-        'lugares_mantenimiento': lugares_data,
-        'imagen_url': get_safe_image_url(mantenimiento.imagen),
-    }
-    return JsonResponse(data)
+    return _detalle_json(request, 'mantenimiento', mantenimiento_id)
 
 @login_required
 def lugar_mantenimiento_detalles_json(request, lugar_id):
-    lugar = get_object_or_404(LugarMantenimiento, pk=lugar_id)
-
-    proveedores_data = [{'nombre': p.nombre} for p in lugar.proveedores.all()]
-    ubicaciones_data = [{'link': u.link} for u in lugar.ubicaciones.all() if u.link]
-
-    data = {
-        'nombre_lugar': lugar.nombre_lugar,
-        'nombre_empresa': lugar.nombre_empresa,
-        'correo': lugar.correo,
-        'numero': lugar.numero,
-        'descripcion': lugar.descripcion,
-        'proveedores': proveedores_data,
-        'ubicaciones': ubicaciones_data,
-    }
-    return JsonResponse(data)
+    return _detalle_json(request, 'lugar-mantenimiento', lugar_id)
 
 
 @require_POST
@@ -980,28 +665,7 @@ def actualizar_mantenimiento(request):
 # AÑADE ESTE CÓDIGO AL FINAL DE TUS VISTAS
 @login_required
 def potrero_detalles_json(request, potrero_id):
-    potrero = get_object_or_404(Potrero, pk=potrero_id)
-    
-    # Obtenemos todos los potreros excepto el actual para la lista de intercambio
-    otros_potreros = Potrero.objects.exclude(pk=potrero_id).values('id', 'nombre')
-
-    data = {
-        'id': potrero.id,
-        'nombre': potrero.nombre,
-        'area_hectareas': str(potrero.area_hectareas),
-        'empastado': potrero.empastado,
-        'fumigado': potrero.fumigado,
-        'rozado': potrero.rozado,
-        'fecha_proximo_empaste': potrero.fecha_proximo_empaste.strftime('%Y-%m-%d') if potrero.fecha_proximo_empaste else '',
-        'fecha_proxima_fumigacion': potrero.fecha_proxima_fumigacion.strftime('%Y-%m-%d') if potrero.fecha_proxima_fumigacion else '',
-        'fecha_proximo_rozado': potrero.fecha_proximo_rozado.strftime('%Y-%m-%d') if potrero.fecha_proximo_rozado else '',
-        'intercambio_con_potrero_id': potrero.intercambio_con_potrero.id if potrero.intercambio_con_potrero else None,
-        'fecha_intercambio': potrero.fecha_intercambio.strftime('%Y-%m-%d') if potrero.fecha_intercambio else '',
-        'descripcion': potrero.descripcion,
-        'imagen_url': get_safe_image_url(potrero.imagen),
-        'otros_potreros': list(otros_potreros),
-    }
-    return JsonResponse(data)
+    return _detalle_json(request, 'potrero', potrero_id)
 
 @require_POST
 @login_required
@@ -1036,59 +700,11 @@ def actualizar_potrero(request):
 
 @login_required
 def producto_detalles_json(request, producto_id):
-    producto = get_object_or_404(Producto, pk=producto_id)
-    
-    # Obtener todas las fechas de producción
-    fechas_produccion = list(producto.fechas_produccion.all().values_list('fecha', flat=True))
-    
-    # Obtener todas las ventas asociadas
-    ventas = producto.ventaproducto_set.all()
-    ventas_info = []
-    for venta in ventas:
-        ventas_info.append({
-            'comprador_id': venta.comprador.id,
-            'comprador_nombre': venta.comprador.nombre,
-            'fecha_venta': venta.fecha_venta.strftime('%Y-%m-%d'),
-            'valor_compra': str(venta.valor_compra),
-            'valor_abono': str(venta.valor_abono)
-        })
-
-    ubicaciones_data = []
-    for u in producto.ubicaciones.all():
-        ubicaciones_data.append({
-            'nombre': u.nombre,
-            'barrio': u.barrio,
-            'direccion': u.direccion,
-            'link': u.link,
-            'imagen_url': get_safe_image_url(u.imagen)
-        })
-
-    data = {
-        'id': producto.id,
-        'nombre': producto.nombre,
-        'categoria': {'nombre': producto.categoria.nombre} if producto.categoria else None,
-        'descripcion': producto.descripcion or "No hay descripción.",
-        'cantidad': str(producto.cantidad),
-        'unidad_medida': producto.get_unidad_medida_display(),
-        'estado': producto.estado,
-        'precio': str(producto.precio),
-        'precio_total': str(producto.precio_total),
-        'fechas_produccion': [fecha.strftime('%Y-%m-%d') for fecha in fechas_produccion],
-        'ventas': ventas_info,
-        'ubicaciones': ubicaciones_data,
-        'imagen_url': get_safe_image_url(producto.imagen),
-        'todos_los_compradores': list(Comprador.objects.values('id', 'nombre')),
-    }
-    return JsonResponse(data)
+    return _detalle_json(request, 'producto', producto_id)
 
 @login_required
 def comprador_detalles_json(request, comprador_id):
-    comprador = get_object_or_404(Comprador, pk=comprador_id)
-    data = {
-        'nombre': comprador.nombre,
-        'telefono': comprador.telefono
-    }
-    return JsonResponse(data)
+    return _detalle_json(request, 'comprador', comprador_id)
 
 @require_POST
 @login_required
@@ -1216,55 +832,7 @@ def crear_comprador_ajax(request):
     
 @login_required
 def medicamento_detalles_json(request, medicamento_id):
-    medicamento = get_object_or_404(Medicamento, pk=medicamento_id)
-
-    # Detailed data for associated providers
-    proveedores_data = []
-    for proveedor in medicamento.proveedores.all():
-        proveedores_data.append({
-            'nombre': proveedor.nombre,
-            'nombre_local': getattr(proveedor, 'nombre_local', ''),
-            'correo': getattr(proveedor, 'correo_electronico', ''),
-            'telefono': getattr(proveedor, 'telefono', ''),
-            'imagen_url': get_safe_image_url(getattr(proveedor, 'imagen', None))
-        })
-
-    # Detailed data for associated locations
-    ubicaciones_data = []
-    for ubicacion in medicamento.ubicaciones.all():
-        ubicaciones_data.append({
-            'nombre': ubicacion.nombre, 'barrio': ubicacion.barrio,
-            'direccion': ubicacion.direccion, 'link': ubicacion.link,
-            'imagen_url': get_safe_image_url(getattr(ubicacion, 'imagen', None))
-        })
-
-    # Data for dropdowns/forms
-    all_proveedores_data = [{'nombre': p.nombre, 'id': p.id} for p in Proveedor.objects.all()]
-    all_ubicaciones_data = [{'nombre': u.nombre, 'id': u.id} for u in Ubicacion.objects.all()]
-    all_etiquetas_data = [{'nombre': e.nombre, 'id': e.id} for e in Etiqueta.objects.filter(parent__isnull=True)]
-
-    data = {
-        'id': medicamento.id,
-        'nombre': medicamento.nombre,
-        'cantidad_ingresada': str(medicamento.cantidad_ingresada),
-        'cantidad_usada': str(medicamento.cantidad_usada),
-        'cantidad_restante': str(medicamento.cantidad_restante),
-        'categoria': {'nombre': medicamento.categoria.nombre} if medicamento.categoria else None,
-        'precio': str(medicamento.precio),
-        'proveedores': proveedores_data,
-        'ubicaciones': ubicaciones_data,
-        'fecha_compra': medicamento.fecha_compra.strftime('%Y-%m-%d'),
-        'fecha_ingreso': medicamento.fecha_ingreso.strftime('%Y-%m-%d'),
-        'fecha_vencimiento': medicamento.fecha_vencimiento.strftime('%Y-%m-%d'),
-        'imagen_url': get_safe_image_url(medicamento.imagen),
-        'descripcion': medicamento.descripcion or "No hay descripción.",
-        'unidad_medida': medicamento.get_unidad_medida_display(),
-        # Datos para el formulario de vacunas
-        'all_proveedores': all_proveedores_data,
-        'all_ubicaciones': all_ubicaciones_data,
-        'all_etiquetas': all_etiquetas_data,
-    }
-    return JsonResponse(data)
+    return _detalle_json(request, 'medicamento', medicamento_id)
 
 @require_POST
 @login_required
@@ -1273,17 +841,16 @@ def actualizar_cantidad_medicamento(request):
         data = json.loads(request.body)
         item_id = data.get('medicamento_id')
         cantidad = Decimal(data.get('cantidad_a_usar'))
-        item = get_object_or_404(Medicamento, pk=item_id)
 
         if cantidad <= 0:
             return JsonResponse({'status': 'error', 'message': 'La cantidad debe ser positiva.'}, status=400)
-        if cantidad > item.cantidad_restante:
-            return JsonResponse({'status': 'error', 'message': 'No hay suficiente stock.'}, status=400)
-        
-        item.cantidad_usada += cantidad
-        item.save()
+        item = usar_cantidad(Medicamento, item_id, cantidad, usuario=request.user)
         log_user_action(request, item, CHANGE, f"Usó {cantidad} desde el panel de usuario.")
         return JsonResponse({'status': 'success', 'message': 'Cantidad actualizada.'})
+    except Medicamento.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'El medicamento no existe.'}, status=404)
+    except StockInsuficiente:
+        return JsonResponse({'status': 'error', 'message': 'No hay suficiente stock.'}, status=400)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
@@ -1294,15 +861,15 @@ def anadir_stock_medicamento(request):
         data = json.loads(request.body)
         item_id = data.get('medicamento_id')
         cantidad = Decimal(data.get('cantidad_a_anadir'))
-        item = get_object_or_404(Medicamento, pk=item_id)
 
         if cantidad <= 0:
             return JsonResponse({'status': 'error', 'message': 'La cantidad debe ser positiva.'}, status=400)
         
-        item.cantidad_ingresada += cantidad
-        item.save()
+        item = anadir_cantidad(Medicamento, item_id, cantidad, usuario=request.user)
         log_user_action(request, item, CHANGE, f"Añadió {cantidad} al stock desde el panel de usuario.")
         return JsonResponse({'status': 'success', 'message': 'Stock añadido.'})
+    except Medicamento.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'El medicamento no existe.'}, status=404)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
@@ -1342,121 +909,26 @@ def crear_vacuna_ajax(request):
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
     
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=lambda request: etag_catalogos(['proveedores', 'ubicaciones', 'etiquetas_principales']))
 def get_vacuna_form_data(request):
+    catalogos = Catalogos()
     data = {
-        'proveedores': list(Proveedor.objects.values('id', 'nombre')),
-        'ubicaciones': list(Ubicacion.objects.values('id', 'nombre')),
-        'etiquetas': list(Etiqueta.objects.filter(parent__isnull=True).values('id', 'nombre')),
+        'proveedores': catalogos['proveedores'],
+        'ubicaciones': catalogos['ubicaciones'],
+        'etiquetas': catalogos['etiquetas_principales'],
     }
     return JsonResponse(data)
 
 @login_required
 def vacuna_detalles_json(request, vacuna_id):
-    vacuna = get_object_or_404(Vacuna, pk=vacuna_id)
-    
-    data = {
-        'id': vacuna.id,
-        'nombre': vacuna.nombre,
-        'tipo': vacuna.tipo,
-        'cantidad': str(vacuna.cantidad),
-        'unidad_medida': vacuna.get_unidad_medida_display(),
-        'dosis_crecimiento': vacuna.dosis_crecimiento,
-        'dosis_edad': vacuna.dosis_edad,
-        'dosis_peso': vacuna.dosis_peso,
-        'descripcion': vacuna.descripcion or "No hay descripción.",
-        'disponible': vacuna.disponible,  # Devuelve booleano
-        'precio': str(vacuna.precio),  # Devuelve número como cadena
-        'fecha_compra': vacuna.fecha_compra.strftime('%d/%m/%Y') if vacuna.fecha_compra else '',
-        'fecha_vencimiento': vacuna.fecha_vencimiento.strftime('%d/%m/%Y') if vacuna.fecha_vencimiento else '',
-        'proveedores': list(vacuna.proveedores.values('id', 'nombre')),  # Devuelve lista de objetos
-        'ubicaciones': list(vacuna.ubicaciones.values('id', 'nombre')),  # Devuelve lista de objetos
-        'etiquetas': list(vacuna.etiquetas.values('id', 'nombre')),  # Devuelve lista de objetos
-        'imagen_url': get_safe_image_url(vacuna.imagen),
-    }
-    return JsonResponse(data)
+    return _detalle_json(request, 'vacuna', vacuna_id)
 
 # AÑADE ESTE CÓDIGO AL FINAL DE TUS VISTAS
 
 @login_required
 def ganado_detalles_json(request, ganado_id):
-    ganado = get_object_or_404(Ganado, pk=ganado_id)
-    
-    # Historial de vacunación - CÓDIGO MEJORADO
-    vacunaciones = ganado.vacunaciones.select_related('vacuna').order_by('-fecha_aplicacion')
-    historial_vacunacion = []
-    for reg in vacunaciones:
-        # Verificamos que la vacuna asociada existe antes de usarla
-        if hasattr(reg, 'vacuna') and reg.vacuna:
-            historial_vacunacion.append({
-                'id': reg.id, 'vacuna_id': reg.vacuna.id, 'vacuna_nombre': reg.vacuna.nombre,
-                'fecha_aplicacion': reg.fecha_aplicacion.strftime('%d/%m/%Y'),
-                'fecha_proxima_dosis': reg.fecha_proxima_dosis.strftime('%d/%m/%Y') if reg.fecha_proxima_dosis else 'N/A',
-                'notas': reg.notas or 'No hay notas.',
-            })
-        else: # Si no existe, lo manejamos de forma segura
-            historial_vacunacion.append({
-                'id': reg.id, 'vacuna_id': None, 'vacuna_nombre': f"Vacuna eliminada (ID: {reg.vacuna_id})",
-                'fecha_aplicacion': reg.fecha_aplicacion.strftime('%d/%m/%Y'),
-                'fecha_proxima_dosis': reg.fecha_proxima_dosis.strftime('%d/%m/%Y') if reg.fecha_proxima_dosis else 'N/A',
-                'notas': 'Error: La vacuna asociada a este registro ya no existe.',
-            })
-
-    # Historial de medicamentos - CÓDIGO MEJORADO
-    medicamentos_aplicados = ganado.medicamentos_aplicados.select_related('medicamento').order_by('-fecha_aplicacion')
-    historial_medicamentos = []
-    for reg in medicamentos_aplicados:
-        # Hacemos la misma verificación para los medicamentos
-        if hasattr(reg, 'medicamento') and reg.medicamento:
-            historial_medicamentos.append({
-                'id': reg.id, 'medicamento_id': reg.medicamento.id, 'medicamento_nombre': reg.medicamento.nombre,
-                'fecha_aplicacion': reg.fecha_aplicacion.strftime('%d/%m/%Y'),
-                'notas': reg.notas or 'No hay notas.',
-            })
-        else: # Manejo seguro si el medicamento fue eliminado
-            historial_medicamentos.append({
-                'id': reg.id, 'medicamento_id': None, 'medicamento_nombre': f"Medicamento eliminado (ID: {reg.medicamento_id})",
-                'fecha_aplicacion': reg.fecha_aplicacion.strftime('%d/%m/%Y'),
-                'notas': 'Error: El medicamento asociado a este registro ya no existe.',
-            })
-
-    estados_salud = [{'value': choice[0], 'label': choice[1]} for choice in Ganado.EstadoSalud.choices]
-    tipos_preñez = [{'value': choice[0], 'label': choice[1]} for choice in Ganado.TipoPrenez.choices]
-    estados_animal = [{'value': choice[0], 'label': choice[1]} for choice in Ganado.EstadoAnimal.choices]
-    crecimiento_animal = [{'value': choice[0], 'label': choice[1]} for choice in Ganado.Crecimiento.choices]
-
-    data = {
-        'id': ganado.id, 'identificador': ganado.identificador,
-        'animal': ganado.animal.nombre if ganado.animal else 'N/A', 'raza': ganado.raza,
-        'genero': ganado.get_genero_display(), 'peso_kg': str(ganado.peso_kg),
-        'edad': ganado.edad if ganado.fecha_nacimiento else 'N/A',
-        'fecha_nacimiento': ganado.fecha_nacimiento.strftime('%Y-%m-%d') if ganado.fecha_nacimiento else '',
-        'estado_salud': ganado.estado_salud,
-        # Leemos del modelo (peñe) y lo asignamos a la clave del JSON (preñez)
-        'preñez': ganado.peñe,
-        'descripcion': ganado.descripcion or "No hay descripción.",
-        'imagen_url': get_safe_image_url(ganado.imagen),
-        'historial_vacunacion': historial_vacunacion,
-        'historial_medicamentos': historial_medicamentos,
-        'crecimiento': ganado.crecimiento,
-        'fecha_fallecimiento': ganado.fecha_fallecimiento.strftime('%Y-%m-%d') if ganado.fecha_fallecimiento else '',
-        'fecha_venta': ganado.fecha_venta.strftime('%Y-%m-%d') if ganado.fecha_venta else '',
-        'valor_venta': str(ganado.valor_venta) if ganado.valor_venta is not None else '',
-        'razon_venta': ganado.razon_venta or '',
-        'razon_fallecimiento': ganado.razon_fallecimiento or '',
-        'comprador': ganado.comprador or '',
-        'comprador_telefono': ganado.comprador_telefono or '',
-        # Hacemos lo mismo para los otros campos relacionados
-        'fecha_preñez': ganado.fecha_peñe.strftime('%Y-%m-%d') if ganado.fecha_peñe else '',
-        'descripcion_preñez': ganado.descripcion_peñe or '',
-        # Datos para los formularios
-        'todas_las_vacunas': list(Vacuna.objects.filter(disponible=True).values('id', 'nombre')),
-        'todos_los_medicamentos': list(Medicamento.objects.filter(cantidad_ingresada__gt=F('cantidad_usada')).values('id', 'nombre')),
-        'todos_los_estados_salud': estados_salud,
-        'todos_los_tipos_preñez': tipos_preñez,
-        'todos_los_estados': estados_animal,
-        'todos_los_crecimientos': crecimiento_animal,
-    }
-    return JsonResponse(data)
+    return _detalle_json(request, 'ganado', ganado_id)
 
 @require_POST
 @login_required